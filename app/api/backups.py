@@ -0,0 +1,51 @@
+# app/api/backups.py - api endpoints to take and list online backups of the database
+from fastapi import APIRouter, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+import os
+from typing import Optional
+
+from app import backups
+from app.api.transactions import get_ledger
+from app.ledgers import DEFAULT, Ledger
+
+
+router = APIRouter(prefix="/backups", tags=["backups"])
+
+
+def backup_directory(app, ledger: Ledger) -> str:
+    """backup_dir (or backups/ next to the database); named ledgers get a subdirectory each, so retention stays per ledger."""
+    directory = app.state.settings.backup_dir or backups.default_directory(ledger.engine)
+    return directory if ledger.name == DEFAULT else os.path.join(directory, ledger.name)
+
+
+def run_backup(app, ledger: Optional[Ledger] = None) -> dict:
+    """Backup with the app's settings (used by the endpoint and, for the default ledger, the scheduler)."""
+    settings = app.state.settings
+    ledger = ledger or app.state.ledgers.default
+    return backups.backup_database(
+        ledger.engine,
+        backup_directory(app, ledger),
+        keep = settings.backup_keep,
+        compress = settings.backup_compress,
+    )
+
+
+@router.post("/")
+async def create_backup(request: Request):
+    """
+    Take an online backup now. Reads and writes keep running while it copies.
+    Returns size, duration and throughput of the copy.
+    """
+    try:
+        return await run_in_threadpool(run_backup, request.app, get_ledger(request))
+    except backups.BackupInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/")
+async def list_backups(request: Request):
+    """Backups on disk, newest first."""
+    return {"backups": backups.list_backups(backup_directory(request.app, get_ledger(request)))}
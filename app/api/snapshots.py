@@ -0,0 +1,69 @@
+# app/api/snapshots.py - api endpoints to download and restore Parquet snapshots of the ledger
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, UploadFile
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+
+import os
+import shutil
+import tempfile
+import zipfile
+
+from app import snapshots
+from app.api.transactions import get_ledger, get_writer
+from app.writer import WriteQueue
+
+
+router = APIRouter(prefix="/snapshots", tags=["snapshots"])
+
+
+def _zip_directory(directory: str, zip_path: str) -> None:
+    # Parquet pages are already compressed; store them as-is
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED) as archive:
+        for name in sorted(os.listdir(directory)):
+            archive.write(os.path.join(directory, name), name)
+
+
+@router.get("/parquet")
+async def export_parquet(request: Request, background: BackgroundTasks):
+    """Download the whole ledger as a zip of Parquet files (one per table)."""
+    workdir = tempfile.mkdtemp(prefix="ledger-export-")
+    background.add_task(shutil.rmtree, workdir, ignore_errors=True)
+
+    def build() -> str:
+        tables = os.path.join(workdir, "tables")
+        snapshots.export_ledger(get_ledger(request).engine, tables)
+        zip_path = os.path.join(workdir, "ledger.zip")
+        _zip_directory(tables, zip_path)
+        return zip_path
+
+    try:
+        zip_path = await run_in_threadpool(build)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return FileResponse(
+        zip_path,
+        media_type = "application/zip",
+        filename = "ledger-parquet.zip",
+        background = background,
+    )
+
+
+@router.post("/parquet")
+async def import_parquet(file: UploadFile, writer: WriteQueue = Depends(get_writer)):
+    """Restore a zip downloaded from GET /snapshots/parquet into an empty ledger."""
+    with tempfile.TemporaryDirectory(prefix="ledger-import-") as workdir:
+        def unpack() -> None:
+            with zipfile.ZipFile(file.file) as archive:
+                archive.extractall(workdir)
+
+        try:
+            await run_in_threadpool(unpack)
+            counts = await writer.run(snapshots.import_ledger, workdir)
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail="Snapshot must be a zip of Parquet files")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except RuntimeError as e:
+            raise HTTPException(status_code=501, detail=str(e))
+
+    return {"message": "Snapshot imported", "counts": counts}
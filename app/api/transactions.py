@@ -1,17 +1,24 @@
 # app/api/transactions.py - backend api endpoints for transaction crud, filtering, etc.
-from fastapi import APIRouter, UploadFile, HTTPException, Depends, Query, Form
+from fastapi import APIRouter, UploadFile, HTTPException, Depends, Query, Form, Request
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from typing import Optional, List
+from typing import Annotated, Optional, List, Union
 import datetime
+import hashlib
 import tempfile
+import time
 
-from app import schemas
-from app.crud import operations
-from app.database import SessionLocal
-from app.parsers import parse_csv
-from app.loaders import save_transactions
+from app import archive, formats, recurring, schemas, suggest
+from app.config import Settings
+from app.crud import anomalies, dimensions, imports, operations, distributions, staging
+from app.ledgers import Ledger
+from app.models import CostCenter, SpendCategory
+from app.parsers import Watermarks, parse_csv
+from app.profiling import StageTimer
+from app.writer import WriteQueue
 
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
@@ -20,30 +27,110 @@ router = APIRouter(prefix="/transactions", tags=["transactions"])
 # Constants
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 
+ReadSession = Union[Session, AsyncSession]
 
-def get_db():
-    db = SessionLocal()
+
+def get_ledger(request: Request) -> Ledger:
+    """The ledger named by the request's X-Ledger header (resolved by LedgerMiddleware)."""
+    return getattr(request.state, "ledger", None) or request.app.state.ledgers.default
+
+
+def get_db(request: Request):
+    db = get_ledger(request).SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
 
+async def get_read_db(request: Request):
+    """
+    Session for read endpoints: an AsyncSession when async reads are enabled
+    (FINANCE_ASYNC_READS=1), otherwise a regular Session used from the threadpool.
+    """
+    ledger = get_ledger(request)
+    async_factory = ledger.AsyncSessionLocal
+    if async_factory is None:
+        db = ledger.SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+    else:
+        async with async_factory() as db:
+            yield db
+
+
+async def run_read(db: ReadSession, fn, *args, **kwargs):
+    """
+    Run a sync read function fn(session, ...) without blocking the event loop.
+    Async sessions run it on the aiosqlite connection; sync sessions use the threadpool.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+def get_writer(request: Request) -> WriteQueue:
+    """The ledger's single writer; every mutation is queued on it and group-committed."""
+    return get_ledger(request).writer
+
+
+def get_settings(request: Request) -> Settings:
+    return request.app.state.settings
+
+
+def _to_response(txn) -> Optional[schemas.TransactionWithID]:
+    """Serialize inside the writer, while relationships can still be loaded."""
+    return None if txn is None else schemas.TransactionWithID.model_validate(txn)
+
+
+def _use_columnar(request: Request, settings: Settings, filters: schemas.TransactionFilterParams) -> bool:
+    """
+    Whether a read is served from the columnar snapshot. The snapshot holds the
+    hot database only, so ranges that touch archived years go through SQL.
+    """
+    return settings.columnar_engine and not archive.years_for(get_ledger(request).engine, filters.start_date, filters.end_date)
+
+
+async def _dimensions(request: Request) -> dimensions.Dimensions:
+    """Cached dimension tables; only a reload after a dimension change touches the database."""
+    cache = dimensions.get_cache(get_ledger(request).engine)
+    return cache.peek() or await run_in_threadpool(cache.get)
+
+
+def _columnar_snapshot(request: Request):
+    """In-memory snapshot of the request's ledger (numpy is only imported when enabled)."""
+    from app import columnar
+
+    return columnar.get_snapshot(get_ledger(request).engine)
+
+
 # ============================================
 # CRUD OPERATIONS
 # ============================================
 
 
 @router.post("/", response_model=schemas.TransactionWithID)
-def create_transaction(txn: schemas.TransactionCreate, db: Session = Depends(get_db)):
+async def create_transaction(txn: schemas.TransactionCreate, writer: WriteQueue = Depends(get_writer)):
     """Create a new transaction."""
-    return operations.create_transaction(db, txn)
+    def write(db: Session):
+        return _to_response(operations.create_transaction(db, txn))
+
+    return await writer.run(write)
 
 
 @router.get("/", response_model=schemas.TransactionListResponse)
-def get_all_transactions(db: Session = Depends(get_db)):
+async def get_all_transactions(
+    request: Request,
+    db: ReadSession = Depends(get_read_db),
+):
     """Get all transactions without filters."""
-    transactions = operations.get_transactions(session=db)
+    fmt = formats.negotiate(request)
+    if fmt != formats.ROWS:
+        columns = await run_read(db, operations.get_transaction_columns)
+        return await run_in_threadpool(formats.respond, fmt, columns)
+    transactions = await run_read(db, operations.get_transactions)
     return {
         "transactions": transactions,
         "count": len(transactions),
@@ -51,18 +138,25 @@ def get_all_transactions(db: Session = Depends(get_db)):
 
 
 @router.put("/{txn_id}", response_model=schemas.TransactionWithID)
-def update_transaction(txn_id: int, txn: schemas.TransactionUpdate, db: Session = Depends(get_db)):
+async def update_transaction(
+    txn_id: int,
+    txn: schemas.TransactionUpdate,
+    writer: WriteQueue = Depends(get_writer),
+):
     """Update an existing transaction."""
-    updated = operations.update_transaction(db, txn_id, txn)
+    def write(db: Session):
+        return _to_response(operations.update_transaction(db, txn_id, txn))
+
+    updated = await writer.run(write)
     if not updated:
         raise HTTPException(status_code=404, detail="Transaction not found")
     return updated
 
 
 @router.delete("/{txn_id}")
-def delete_transaction(txn_id: int, db: Session = Depends(get_db)):
+async def delete_transaction(txn_id: int, writer: WriteQueue = Depends(get_writer)):
     """Delete a transaction."""
-    deleted = operations.delete_transaction(db, txn_id)
+    deleted = await writer.run(operations.delete_transaction, txn_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Transaction not found")
     return {"message": "Transaction deleted", "id": txn_id}
@@ -74,40 +168,32 @@ def delete_transaction(txn_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/filter", response_model=schemas.TransactionListResponse)
-def filter_transactions(
-    # Text search
-    search: Optional[str] = Query(None),
-
-    # Categorical filters
-    cost_center_ids: Optional[List[int]] = Query(None),
-    spend_category_ids: Optional[List[int]] = Query(None),
-    account: Optional[List[str]] = Query(None),
-    
-    # Date range
-    start_date: Optional[datetime.date] = Query(None),
-    end_date: Optional[datetime.date] = Query(None),
-    
-    # Amount range
-    min_amount: Optional[float] = Query(None),
-    max_amount: Optional[float] = Query(None),
-    
-    db: Session = Depends(get_db),
+async def filter_transactions(
+    request: Request,
+    filters: Annotated[schemas.TransactionFilterParams, Query()],
+    db: ReadSession = Depends(get_read_db),
+    settings: Settings = Depends(get_settings),
 ):
     """
     Filter transactions with flexible criteria.
     Frontend will compute all analytics from this response.
+    
+    ?format=columnar (or Accept: application/vnd.finance.columnar+json) returns
+    struct-of-arrays JSON; ?format=arrow (or Accept: application/vnd.apache.arrow.stream)
+    returns an Arrow IPC stream.
     """
-    transactions = operations.get_transactions(
-        session = db,
-        search = search,
-        cost_center_ids = cost_center_ids,
-        spend_category_ids = spend_category_ids,
-        account = account,
-        start_date = start_date,
-        end_date = end_date,
-        min_amount = min_amount,
-        max_amount = max_amount,
-    )
+    fmt = formats.negotiate(request)
+    
+    if _use_columnar(request, settings, filters):
+        selection = _columnar_snapshot(request).select(**filters.model_dump())
+        if fmt != formats.ROWS:
+            return await run_in_threadpool(lambda: formats.respond(fmt, selection.to_columns()))
+        transactions = await run_in_threadpool(selection.rows)
+    else:
+        if fmt != formats.ROWS:
+            columns = await run_read(db, operations.get_transaction_columns, **filters.model_dump())
+            return await run_in_threadpool(formats.respond, fmt, columns)
+        transactions = await run_read(db, operations.get_transactions, **filters.model_dump())
     
     return {
         "transactions": transactions,
@@ -120,24 +206,151 @@ def filter_transactions(
 # ============================================
 
 
+@router.get("/suggest", response_model=schemas.SuggestionListResponse)
+async def suggest_descriptions(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=suggest.MAX_LIMIT),
+):
+    """
+    Description typeahead: descriptions with a word starting with q, ranked by
+    how often and how recently they were used. Served from an in-memory prefix
+    index, updated after each commit.
+    """
+    index = suggest.get_index(get_ledger(request).engine)
+    # A lookup is quick, but building the index, the daily re-rank or applying a large
+    # import hold its lock a while: never wait for it on the event loop
+    found = index.try_suggest(q, limit)
+    if found is None:
+        found = await run_in_threadpool(index.suggest, q, limit)
+    return {"query": q, "suggestions": [s._asdict() for s in found], "count": len(found)}
+
+
 @router.get("/cost_centers", response_model=schemas.CostCenterListResponse)
-def get_cost_centers(db: Session = Depends(get_db)):
+async def get_cost_centers(request: Request):
     """Get all cost centers for filter dropdowns."""
-    cost_centers = operations.get_all_cost_centers(db)
+    cost_centers = (await _dimensions(request)).rows(CostCenter)
     return {"cost_centers": cost_centers, "count": len(cost_centers)}
 
 
 @router.get("/spend_categories", response_model=schemas.SpendCategoryListResponse)
-def get_spend_categories(db: Session = Depends(get_db)):
+async def get_spend_categories(request: Request):
     """Get all spend categories for filter dropdowns."""
-    categories = operations.get_all_spend_categories(db)
+    categories = (await _dimensions(request)).rows(SpendCategory)
     return {"spend_categories": categories, "count": len(categories)}
 
 
+@router.get("/facets", response_model=schemas.TransactionFacetsResponse)
+async def get_facets(
+    filters: Annotated[schemas.TransactionFilterParams, Query()],
+    db: ReadSession = Depends(get_read_db),
+):
+    """
+    Cost centers, spend categories and accounts with matching counts and totals
+    under the current filters, so the filter panel needs a single request.
+    """
+    return await run_read(db, operations.get_facets, **filters.model_dump())
+
+
 @router.get("/accounts", response_model=List[str])
-def get_accounts(db: Session = Depends(get_db)):
+async def get_accounts(request: Request):
     """Get all unique account names for filter dropdowns."""
-    return operations.get_unique_accounts(db)
+    return list((await _dimensions(request)).accounts)
+
+
+# ============================================
+# ANALYTICS
+# ============================================
+
+
+@router.get("/summary", response_model=schemas.TransactionSummaryResponse)
+async def get_summary(
+    request: Request,
+    filters: Annotated[schemas.TransactionFilterParams, Query()],
+    db: ReadSession = Depends(get_read_db),
+    settings: Settings = Depends(get_settings),
+):
+    """Totals and per cost center / per month breakdowns for the filtered transactions."""
+    if _use_columnar(request, settings, filters):
+        # Building the snapshot (first use) and aggregating it are CPU work: keep them off the event loop
+        return await run_in_threadpool(lambda: _columnar_snapshot(request).select(**filters.model_dump()).summary())
+    return await run_read(db, operations.get_summary, **filters.model_dump())
+
+
+@router.get("/recurring", response_model=schemas.RecurringChargeListResponse)
+async def get_recurring_charges(
+    request: Request,
+    include_inactive: bool = Query(False, description="Also list runs that stopped (cancelled subscriptions)"),
+    account: Optional[List[str]] = Query(None),
+):
+    """
+    Weekly, monthly and annual charges detected per merchant and account,
+    with the next expected charge date and amount. Served from a cache that
+    is updated after each commit.
+    """
+    index = recurring.get_index(get_ledger(request).engine)
+    found = await run_in_threadpool(index.charges, include_inactive = include_inactive, accounts = account)
+    cost_center_names = {cc_id: name for name, cc_id in (await _dimensions(request)).cost_centers.items()}
+    today = datetime.date.today()
+    charges = [
+        {
+            "account": r.account,
+            "merchant": r.merchant,
+            "description": r.description,
+            "period": r.period,
+            "occurrences": r.occurrences,
+            "first_date": r.first_date,
+            "last_date": r.last_date,
+            "amount": r.amount_cents / 100,
+            "average_amount": r.average_cents / 100,
+            "next_date": r.next_date,
+            "next_amount": r.amount_cents / 100,
+            "cost_center": cost_center_names.get(r.cost_center_id),
+            "active": r.is_active(today),
+        }
+        for r in found
+    ]
+    return {"charges": charges, "count": len(charges)}
+
+
+@router.get("/anomalies", response_model=schemas.FlaggedTransactionListResponse)
+async def get_anomalies(
+    filters: Annotated[schemas.AnomalyFilterParams, Query()],
+    db: ReadSession = Depends(get_read_db),
+):
+    """
+    Transactions with unusual amounts for their cost center or merchant, under
+    the /filter filters. Each transaction is scored when written, against
+    running statistics of the amounts before it.
+    """
+    min_score = anomalies.FLAG_SCORE if filters.min_score is None else filters.min_score
+    transactions = await run_read(
+        db, operations.get_anomalies, **filters.model_dump(exclude={"min_score"}), min_score = min_score,
+    )
+    return {"transactions": transactions, "count": len(transactions), "min_score": min_score}
+
+
+@router.get("/distribution", response_model=schemas.AmountDistributionResponse)
+async def get_amount_distribution(
+    cost_center_ids: Optional[List[int]] = Query(None),
+    account: Optional[List[str]] = Query(None),
+    bins: int = Query(20, ge=1, le=100),
+    db: ReadSession = Depends(get_read_db),
+):
+    """
+    Median, p90, p99 and a histogram of amounts per cost center or account.
+    Served from persisted sketches, so cost doesn't grow with the ledger.
+    """
+    try:
+        return await run_read(
+            db,
+            distributions.get_distribution,
+            cost_center_ids = cost_center_ids,
+            account = account,
+            bins = bins,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 # ============================================
@@ -149,36 +362,128 @@ def get_accounts(db: Session = Depends(get_db)):
 async def upload_csv(
     institution: str = Form(..., description="Institution name (e.g., 'discover', 'schwab')"),
     file: UploadFile = Form(...),
+    preview: bool = Form(False, description="Only report what the upload would change"),
+    upsert: bool = Form(False, description="Custom exports: rows with an ID update that transaction"),
+    full: bool = Form(False, description="Read every row, ignoring the per-account watermarks"),
     db: Session = Depends(get_db),
+    writer: WriteQueue = Depends(get_writer),
 ):
     """
     Upload and parse a CSV file from a financial institution.
     Automatically saves transactions to database.
     
+    With preview=true nothing is written: the response's "diff" has per-account
+    new and duplicate counts, the cost centers, spend categories and accounts
+    that would be created, and a sample of new and duplicate rows.
+    
+    With upsert=true (for re-importing an edited custom export), rows whose ID
+    is in the ledger update that transaction: only changed fields are written,
+    and unchanged rows cost nothing. Rows of archived years are read-only:
+    they are counted under "archived" and not loaded. Rows without an ID are
+    loaded as usual.
+    
+    Re-uploading a file that was already imported is a no-op. Otherwise rows
+    at or below each account's watermark (the day before its latest imported
+    date) are skipped while parsing, and boundary rows already in the ledger
+    are dropped. The watermark only covers the dates imported so far: rows
+    older than an account's earliest import (a backfill) are read as usual.
+    With full=true no rows are skipped while parsing; rows already in the
+    ledger are still dropped as duplicates. "watermarked" counts the rows
+    the watermarks skipped (they are included in "skipped").
+    
     Maximum file size: 10MB
     """
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="File must be a CSV")
     
+    timer = StageTimer()
+    
     # Read and validate file size
-    content = await file.read()
+    with timer.stage("read"):
+        content = await file.read()
     if len(content) > MAX_FILE_SIZE:
         raise HTTPException(
             status_code=413, 
             detail=f"File too large. Maximum size is {MAX_FILE_SIZE / (1024*1024):.0f}MB"
         )
     
+    with timer.stage("hash"):
+        file_hash = hashlib.sha256(content).hexdigest()
+        previous = await run_in_threadpool(imports.find_import, db, file_hash)
+    if previous is not None:
+        return {
+            "message": "File was already imported",
+            "count": 0,
+            "skipped": 0,
+            "watermarked": 0,
+            "updated": 0,
+            "archived": 0,
+            "duplicate": True,
+            "preview": preview,
+            "institution": institution,
+            "timings": timer.as_dict(),
+        }
+    with timer.stage("watermarks"):
+        if full:
+            watermarks = Watermarks()
+        else:
+            watermarks = Watermarks(
+                await run_in_threadpool(imports.get_watermarks, db),
+                await run_in_threadpool(imports.get_watermark_starts, db),
+            )
+    
     with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp:
         tmp.write(content)
         tmp_path = tmp.name
 
     try:
-        transactions = parse_csv(tmp_path, institution)
-        save_transactions(transactions, db)
+        with timer.stage("parse"):
+            transactions = await run_in_threadpool(parse_csv, tmp_path, institution, watermarks)
+        
+        if preview:
+            # Staged on a read connection (temp tables only), so writers aren't blocked
+            with timer.stage("diff"):
+                diff = await run_in_threadpool(staging.preview, db, transactions, upsert = upsert)
+            return {
+                "message": f"{diff['new']} new transactions (preview, nothing was saved)",
+                "count": diff["new"],
+                "skipped": diff["duplicates"] + sum(watermarks.skipped.values()),
+                "watermarked": sum(watermarks.skipped.values()),
+                "updated": diff["updated"],
+                "archived": diff["archived"],
+                "duplicate": False,
+                "preview": True,
+                "institution": institution,
+                "diff": diff,
+                "timings": timer.as_dict(),
+            }
+        
+        submitted = time.perf_counter()
+        
+        def write(db: Session):
+            timer.add("queue", time.perf_counter() - submitted)
+            result = imports.load_import(
+                db, file_hash, institution, transactions, watermarks.skipped, timer=timer, upsert=upsert,
+            )
+            result["returned"] = time.perf_counter()
+            return result
+        
+        result = await writer.run(write)
+        # The group commit happens after write() returns, before the future resolves
+        timer.add("commit", time.perf_counter() - result.pop("returned"))
         return {
-            "message": f"Successfully loaded {len(transactions)} transactions",
-            "count": len(transactions),
-            "institution": institution
+            "message": f"Successfully loaded {result['loaded']} transactions"
+                + (f" and updated {result['updated']}" if result["updated"] else "")
+                + (f"; {result['archived']} rows of archived years are read-only and were left as is" if result["archived"] else ""),
+            "count": result["loaded"],
+            "skipped": result["skipped"],
+            "watermarked": result["watermarked"],
+            "updated": result["updated"],
+            "archived": result["archived"],
+            "duplicate": result["duplicate"],
+            "preview": False,
+            "institution": institution,
+            "timings": timer.as_dict(),
         }
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,330 @@
+# app/archive.py - moves closed years into per-year read-only SQLite files and unions them back into reads
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+import datetime
+import os
+import sqlite3
+import stat
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from . import events
+from .crud import anomalies, category_bits, distributions
+from .models import Archive, Base, Transaction, transaction_spend_categories
+
+
+# SQLite's default SQLITE_MAX_ATTACHED; one query can read at most this many archive years
+MAX_ATTACHED = 10
+ID_CHUNK = 10_000  # stay well under SQLite's bound-parameter limit
+
+_ATTACHED_KEY = "attached_archives"
+
+# Tables that move to archives; unqualified reads of these names see the union
+_TABLES = (Transaction.__table__, transaction_spend_categories)
+
+
+# ============================================
+# ARCHIVING
+# ============================================
+
+
+def archive_year(engine: Engine, year: int, directory: Optional[str] = None, vacuum: bool = True) -> dict:
+    """
+    Move every transaction dated in a closed year into its own SQLite file.
+
+    The file (archive/transactions_<year>.db next to the database by default)
+    holds the year's transactions and spend category links, is compacted with
+    VACUUM and made read-only. Cost centers, spend categories and accounts stay
+    in the hot database; the ones the archive uses are pinned there.
+    Amount sketches are rebuilt, so distributions cover the hot ledger only.
+    """
+    if year >= datetime.date.today().year:
+        raise ValueError(f"Only closed years can be archived, not {year}")
+
+    database = engine.url.database
+    if not database or database == ":memory:":
+        raise ValueError("Archiving needs a file-backed database")
+
+    directory = directory or os.path.join(os.path.dirname(os.path.abspath(database)), "archive")
+    path = os.path.abspath(os.path.join(directory, f"transactions_{year}.db"))
+    if os.path.exists(path):
+        raise ValueError(f"{year} is already archived ({path})")
+    os.makedirs(directory, exist_ok=True)
+
+    # Same table definitions as the hot database
+    archive_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(archive_engine, tables=list(_TABLES))
+    archive_engine.dispose()
+
+    start, end = datetime.date(year, 1, 1).isoformat(), datetime.date(year, 12, 31).isoformat()
+    columns = ", ".join(c.name for c in Transaction.__table__.columns)
+    link_columns = ", ".join(c.name for c in transaction_spend_categories.columns)
+
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("ATTACH DATABASE ? AS archive_new", (path,))
+            try:
+                row_count = conn.exec_driver_sql(
+                    f"INSERT INTO archive_new.transactions ({columns}) "
+                    f"SELECT {columns} FROM main.transactions WHERE date BETWEEN ? AND ?",
+                    (start, end),
+                ).rowcount
+                if row_count == 0:
+                    raise ValueError(f"No transactions in {year}")
+
+                conn.exec_driver_sql(
+                    f"INSERT INTO archive_new.transaction_spend_categories ({link_columns}) "
+                    f"SELECT {link_columns} FROM main.transaction_spend_categories "
+                    "WHERE transaction_id IN (SELECT id FROM archive_new.transactions)"
+                )
+
+                conn.execute(insert(Archive).values(
+                    year = year,
+                    path = path,
+                    row_count = row_count,
+                    cost_center_ids = _distinct(conn, "SELECT DISTINCT cost_center_id FROM archive_new.transactions"),
+                    spend_category_ids = _distinct(
+                        conn, "SELECT DISTINCT spend_category_id FROM archive_new.transaction_spend_categories"
+                    ),
+                    accounts = _distinct(conn, "SELECT DISTINCT account FROM archive_new.transactions"),
+                ))
+
+                conn.exec_driver_sql(
+                    "DELETE FROM main.transaction_spend_categories "
+                    "WHERE transaction_id IN (SELECT id FROM archive_new.transactions)"
+                )
+                conn.exec_driver_sql("DELETE FROM main.transactions WHERE date BETWEEN ? AND ?", (start, end))
+
+                conn.exec_driver_sql("DELETE FROM amount_sketches")
+                with Session(bind=conn) as db:
+                    distributions.rebuild_all_sketches(db)
+                    anomalies.rebuild_all(db)
+                    db.flush()
+
+                conn.commit()
+            finally:
+                conn.rollback()
+                conn.exec_driver_sql("DETACH DATABASE archive_new")
+                conn.commit()
+    except BaseException:
+        os.remove(path)
+        raise
+
+    _vacuum(path)
+    os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)  # 0444
+    if vacuum:
+        _vacuum_engine(engine)
+
+    events.invalidate(engine)
+    return {"year": year, "path": path, "row_count": row_count}
+
+
+# ============================================
+# QUERYING
+# ============================================
+
+
+def years_for(
+    bind: Union[Engine, Connection],
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+) -> List[Tuple[int, str]]:
+    """(year, path) of the archives a date range touches; no range means all of them."""
+    return [
+        (year, path) for year, path in _archives(bind).items()
+        if (start_date is None or year >= start_date.year) and (end_date is None or year <= end_date.year)
+    ]
+
+
+@contextmanager
+def including(
+    session: Session,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+):
+    """
+    Inside the block, unqualified reads of transactions / transaction_spend_categories
+    on this session also see the archived years the date range touches.
+
+    Only those years are attached (read-only, kept attached on the pooled
+    connection for later queries). TEMP views named like the hot tables shadow
+    them for the duration of the block, so ORM queries need no changes.
+    """
+    conn = session.connection()
+    years = years_for(conn, start_date, end_date)
+    if not years:
+        yield
+        return
+
+    if len(years) > MAX_ATTACHED:
+        raise ValueError(
+            f"Date range spans {len(years)} archived years; narrow it to at most {MAX_ATTACHED}"
+        )
+
+    schemas = _attach(conn, years)
+    for table in _TABLES:
+        union = " UNION ALL ".join(
+            f"SELECT {_columns(conn, schema, table)} FROM {schema}.{table.name}" for schema in ["main", *schemas]
+        )
+        conn.exec_driver_sql(f"CREATE TEMP VIEW {table.name} AS {union}")
+    try:
+        yield
+    finally:
+        for table in _TABLES:
+            conn.exec_driver_sql(f"DROP VIEW IF EXISTS temp.{table.name}")
+
+
+def archived_ids(bind: Union[Engine, Connection], ids: Iterable[int]) -> Set[int]:
+    """
+    The given ids that belong to archived rows. Each archive file is read on
+    its own read-only connection, so any number of years can be checked, from
+    inside a write transaction too.
+    """
+    ids = sorted(set(ids))
+    found = set()
+    for _, path in years_for(bind):
+        archive_conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            for start in range(0, len(ids), ID_CHUNK):
+                chunk = ids[start:start + ID_CHUNK]
+                found.update(tx_id for (tx_id,) in archive_conn.execute(
+                    f"SELECT id FROM {Transaction.__tablename__} WHERE id IN ({', '.join('?' * len(chunk))})", chunk,
+                ))
+        finally:
+            archive_conn.close()
+    return found
+
+
+def archived_selects(conn: Connection) -> Iterator[Dict[str, str]]:
+    """
+    Every archived year, MAX_ATTACHED at a time (where including() stops at
+    MAX_ATTACHED): per chunk, a SELECT over its years for each archived table
+    (table name -> SQL). A year can only be detached once its reads are over,
+    so end the transaction (conn.commit()) before asking for the next chunk.
+    """
+    years = years_for(conn)
+    for start in range(0, len(years), MAX_ATTACHED):
+        schemas = _attach(conn, years[start:start + MAX_ATTACHED])
+        yield {
+            table.name: " UNION ALL ".join(
+                f"SELECT {_columns(conn, schema, table)} FROM {schema}.{table.name}" for schema in schemas
+            )
+            for table in _TABLES
+        }
+
+
+# ============================================
+# INTERNAL HELPERS
+# ============================================
+
+
+# Keyed by database file, so the sync and async (aiosqlite) engines share one entry
+_registry: Dict[str, Dict[int, str]] = {}
+_registry_lock = threading.Lock()
+
+
+def _archives(bind: Union[Engine, Connection]) -> Dict[int, str]:
+    """year -> path for a database, cached until the next full invalidation."""
+    key = bind.engine.url.database
+    archives = _registry.get(key)
+    if archives is None:
+        query = select(Archive.year, Archive.path).order_by(Archive.year)
+        if isinstance(bind, Connection):
+            archives = dict(bind.execute(query).all())
+        else:
+            with bind.connect() as conn:
+                archives = dict(conn.execute(query).all())
+        with _registry_lock:
+            _registry[key] = archives
+    return archives
+
+
+@events.subscribe
+def _forget_archives(engine: Engine, changes: events.LedgerChanges) -> None:
+    if changes.full:
+        _forget(engine)
+
+
+@events.on_close
+def _forget(engine: Engine) -> None:
+    with _registry_lock:
+        _registry.pop(engine.url.database, None)
+
+
+def _attach(conn: Connection, years: List[Tuple[int, str]]) -> List[str]:
+    """Attach the given archive years (if not already) and return their schema names."""
+    attached = conn.info.setdefault(_ATTACHED_KEY, set())
+    wanted = {f"archive_{year}": path for year, path in years}
+
+    # Make room under SQLite's attach limit by dropping years this query doesn't need
+    for schema in sorted(attached - wanted.keys()):
+        if len(attached | wanted.keys()) <= MAX_ATTACHED:
+            break
+        conn.exec_driver_sql(f"DETACH DATABASE {schema}")
+        attached.discard(schema)
+
+    for schema, path in wanted.items():
+        if schema not in attached:
+            conn.exec_driver_sql(f"ATTACH DATABASE ? AS {schema}", (path,))
+            attached.add(schema)
+    return list(wanted)
+
+
+def _columns(conn: Connection, schema: str, table) -> str:
+    """Select list for a table in the view; archives written before a column existed fill it in."""
+    names = [c.name for c in table.columns]
+    if schema == "main":
+        return ", ".join(names)
+    present = {row[1] for row in conn.exec_driver_sql(f"PRAGMA {schema}.table_info({table.name})")}
+    missing = {
+        "category_mask": category_bits.MASK_SQL.format(
+            links=f"{schema}.transaction_spend_categories", id=f"{schema}.{table.name}.id",
+        ),
+        "anomaly_score": "SELECT NULL",
+    }
+    return ", ".join(name if name in present else f"({missing[name]}) AS {name}" for name in names)
+
+
+def _distinct(conn: Connection, sql: str) -> list:
+    return [value for (value,) in conn.exec_driver_sql(sql) if value is not None]
+
+
+def _vacuum(path: str) -> None:
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def _vacuum_engine(engine: Engine) -> None:
+    """VACUUM can't run inside a transaction, so use the DBAPI connection directly."""
+    raw = engine.raw_connection()
+    try:
+        isolation_level = raw.driver_connection.isolation_level
+        raw.driver_connection.isolation_level = None
+        raw.driver_connection.execute("VACUUM")
+        raw.driver_connection.isolation_level = isolation_level
+    finally:
+        raw.close()
+
+
+if __name__ == "__main__":
+    # python -m app.archive 2019 [2020 ...]
+    import argparse
+
+    from .database import get_engine, init_db
+
+    parser = argparse.ArgumentParser(description="Move closed years into read-only archive files")
+    parser.add_argument("years", type=int, nargs="+")
+    parser.add_argument("--no-vacuum", action="store_true", help="skip compacting the hot database")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    init_db(engine)
+    for year in sorted(args.years):
+        result = archive_year(engine, year, vacuum=not args.no_vacuum)
+        print(f"Archived {result['row_count']} transactions from {year} to {result['path']}")
@@ -0,0 +1,173 @@
+# app/backups.py - online backups with SQLite's backup API, retention and optional gzip
+from sqlalchemy.engine import Engine
+
+import datetime
+import gzip
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+
+PAGES_PER_STEP = 256        # pages copied per step; the source is unlocked between steps
+STEP_SLEEP_SECONDS = 0.005  # pause between steps so writers get the lock
+KEEP = 7
+
+_PREFIX = "transactions-"
+
+# One backup per process at a time
+_lock = threading.Lock()
+
+
+class BackupInProgress(RuntimeError):
+    pass
+
+
+# ============================================
+# BACKUP
+# ============================================
+
+
+def default_directory(engine: Engine) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(_database_path(engine))), "backups")
+
+
+def backup_database(
+    engine: Engine,
+    directory: Optional[str] = None,
+    keep: int = KEEP,
+    compress: bool = False,
+    pages: int = PAGES_PER_STEP,
+    sleep: float = STEP_SLEEP_SECONDS,
+) -> dict:
+    """
+    Copy the live database to <directory>/transactions-<utc timestamp>.db[.gz].
+
+    Uses the online backup API a few pages at a time, so API readers and the
+    writer keep running. A write from another connection restarts the copy
+    (counted in "restarts"); the result is always a consistent snapshot.
+    The copy is written under a temporary name, checked and then renamed, so
+    a crash never leaves a torn file that looks like a backup.
+
+    Keeps the newest `keep` backups and deletes older ones.
+    Raises BackupInProgress if another backup is running in this process.
+    """
+    if not _lock.acquire(blocking=False):
+        raise BackupInProgress("A backup is already running")
+    try:
+        return _backup(engine, directory or default_directory(engine), keep, compress, pages, sleep)
+    finally:
+        _lock.release()
+
+
+def list_backups(directory: str) -> List[dict]:
+    """Existing backups, newest first."""
+    if not os.path.isdir(directory):
+        return []
+    backups = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if name.startswith(_PREFIX) and name.endswith((".db", ".db.gz")):
+            path = os.path.join(directory, name)
+            backups.append({"name": name, "path": path, "bytes": os.path.getsize(path)})
+    return backups
+
+
+# ============================================
+# INTERNAL HELPERS
+# ============================================
+
+
+def _backup(engine: Engine, directory: str, keep: int, compress: bool, pages: int, sleep: float) -> dict:
+    os.makedirs(directory, exist_ok=True)
+    name = f"{_PREFIX}{datetime.datetime.now(datetime.timezone.utc):%Y%m%d-%H%M%S-%f}.db"
+    path = os.path.join(directory, name)
+    partial = path + ".partial"
+
+    progress = {"steps": 0, "restarts": 0, "remaining": None, "pages": 0}
+
+    def on_progress(status, remaining, total):
+        # Remaining pages only go up when a write from another connection restarted the copy
+        if progress["remaining"] is not None and remaining > progress["remaining"]:
+            progress["restarts"] += 1
+        progress["steps"] += 1
+        progress["remaining"] = remaining
+        progress["pages"] = total
+
+    started = time.perf_counter()
+    source = sqlite3.connect(_database_path(engine), timeout=5.0)
+    target = sqlite3.connect(partial)
+    try:
+        source.backup(target, pages=pages, progress=on_progress, sleep=sleep)
+        # The copy inherits WAL mode; a standalone backup file should be a single file
+        target.execute("PRAGMA journal_mode=DELETE")
+        check = target.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        target.close()
+        source.close()
+    copy_seconds = time.perf_counter() - started
+
+    if check != "ok":
+        os.remove(partial)
+        raise RuntimeError(f"Backup failed quick_check: {check}")
+
+    size = os.path.getsize(partial)
+    if compress:
+        with open(partial, "rb") as raw, gzip.open(path + ".gz.partial", "wb", compresslevel=6) as packed:
+            shutil.copyfileobj(raw, packed, length=1024 * 1024)
+        os.remove(partial)
+        partial, path = path + ".gz.partial", path + ".gz"
+    os.replace(partial, path)
+
+    removed = _prune(directory, keep)
+    seconds = time.perf_counter() - started
+    return {
+        "path": path,
+        "bytes": size,
+        "stored_bytes": os.path.getsize(path),
+        "pages": progress["pages"],
+        "steps": progress["steps"],
+        "restarts": progress["restarts"],
+        "seconds": round(seconds, 3),
+        "copy_mb_per_s": round(size / 1e6 / copy_seconds, 1) if copy_seconds else None,
+        "removed": removed,
+    }
+
+
+def _prune(directory: str, keep: int) -> List[str]:
+    """Delete all but the newest `keep` backups; returns the removed file names."""
+    removed = []
+    for backup in list_backups(directory)[max(keep, 1):]:
+        os.remove(backup["path"])
+        removed.append(backup["name"])
+    return removed
+
+
+def _database_path(engine: Engine) -> str:
+    database = engine.url.database
+    if not database or database == ":memory:":
+        raise ValueError("Backups need a file-backed database")
+    return database
+
+
+if __name__ == "__main__":
+    # python -m app.backups [--dir backups] [--keep 7] [--gzip]   (e.g. from cron)
+    import argparse
+
+    from .database import get_engine
+
+    parser = argparse.ArgumentParser(description="Online backup of the ledger database")
+    parser.add_argument("--dir", default=None, help="backup directory (default: backups/ next to the database)")
+    parser.add_argument("--keep", type=int, default=KEEP, help="number of backups to keep")
+    parser.add_argument("--gzip", action="store_true", help="compress the backup")
+    args = parser.parse_args()
+
+    result = backup_database(get_engine(), args.dir, keep=args.keep, compress=args.gzip)
+    print(
+        f"Backed up {result['bytes'] / 1e6:.1f} MB in {result['seconds']:.2f}s "
+        f"({result['copy_mb_per_s']} MB/s, {result['steps']} steps, {result['restarts']} restarts) "
+        f"to {result['path']}"
+    )
+    for name in result["removed"]:
+        print(f"Removed old backup {name}")
@@ -0,0 +1,412 @@
+# app/columnar.py - in-memory columnar snapshot of the ledger for vectorized filtering and aggregation
+import datetime
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from . import events
+from .models import CostCenter, SpendCategory, Transaction, transaction_spend_categories
+from .money import to_cents
+
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+WORD_BITS = 64
+ID_CHUNK = 10_000  # stay well under SQLite's bound-parameter limit
+
+
+# ============================================
+# COLUMN STORAGE
+# ============================================
+
+
+@dataclass(frozen=True)
+class _Columns:
+    """One immutable version of the ledger arrays. Writers swap in a new version."""
+    ids: np.ndarray            # int64
+    dates: np.ndarray          # int32 date ordinals
+    cents: np.ndarray          # int64 amounts in cents
+    cost_centers: np.ndarray   # int32 cost center ids (-1 = none)
+    accounts: np.ndarray       # int32 codes into LedgerSnapshot.account_names
+    categories: np.ndarray     # uint64 (rows, words) spend category bitsets
+    category_ids: np.ndarray   # object: tuple of spend category ids per row (for rendering)
+    descriptions: np.ndarray   # object: original description text
+    search_text: np.ndarray    # StringDType: lowercased descriptions for substring search
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class Selection:
+    """Rows of one snapshot version matching a filter set."""
+
+    def __init__(self, snapshot: "LedgerSnapshot", columns: _Columns, indices: np.ndarray):
+        self.snapshot = snapshot
+        self.columns = columns
+        self.indices = indices
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def rows(self) -> List[dict]:
+        """Render rows in the same shape as schemas.TransactionWithID."""
+        cols, idx = self.columns, self.indices
+        cost_center_names = self.snapshot.cost_center_names
+        category_names = self.snapshot.category_names
+        account_names = self.snapshot.account_names
+
+        rows = []
+        for tx_id, ordinal, cents, cc_id, account, cat_ids, description in zip(
+            cols.ids[idx].tolist(),
+            cols.dates[idx].tolist(),
+            cols.cents[idx].tolist(),
+            cols.cost_centers[idx].tolist(),
+            cols.accounts[idx].tolist(),
+            cols.category_ids[idx],
+            cols.descriptions[idx],
+        ):
+            rows.append({
+                "id": tx_id,
+                "date": datetime.date.fromordinal(ordinal),
+                "description": description,
+                "amount": cents / 100,
+                "account": account_names[account],
+                "cost_center": (
+                    {"id": cc_id, "name": cost_center_names.get(cc_id)} if cc_id >= 0 else None
+                ),
+                "spend_categories": [
+                    {"id": cat_id, "name": category_names.get(cat_id)} for cat_id in cat_ids
+                ],
+            })
+        return rows
+
+    def to_columns(self) -> "formats.TransactionColumns":
+        """The selection as dictionary-encoded columns, without building per-row dicts."""
+        from . import formats
+
+        cols, idx = self.columns, self.indices
+        cost_centers = cols.cost_centers[idx]
+        category_ids = cols.category_ids[idx]
+        used_categories = {cat_id for row in category_ids for cat_id in row}
+
+        # Re-code accounts densely over the accounts present in the selection
+        account_codes, accounts = np.unique(cols.accounts[idx], return_inverse=True)
+        return formats.TransactionColumns(
+            ids = cols.ids[idx].tolist(),
+            dates = [datetime.date.fromordinal(o) for o in cols.dates[idx].tolist()],
+            descriptions = cols.descriptions[idx].tolist(),
+            amounts = (cols.cents[idx] / 100).tolist(),
+            accounts = accounts.tolist(),
+            cost_center_ids = [cc_id if cc_id >= 0 else None for cc_id in cost_centers.tolist()],
+            spend_category_ids = [list(row) for row in category_ids],
+            account_names = [self.snapshot.account_names[code] for code in account_codes.tolist()],
+            cost_center_names = {
+                cc_id: self.snapshot.cost_center_names.get(cc_id)
+                for cc_id in np.unique(cost_centers[cost_centers >= 0]).tolist()
+            },
+            category_names = {cat_id: self.snapshot.category_names.get(cat_id) for cat_id in used_categories},
+        )
+
+    def summary(self) -> dict:
+        """Totals, plus per cost center and per month breakdowns."""
+        cols, idx = self.columns, self.indices
+        cents = cols.cents[idx]
+
+        # Cost center breakdown (rows without a cost center are left out)
+        cost_centers = cols.cost_centers[idx]
+        has_cc = cost_centers >= 0
+        cc_ids, cc_inverse = np.unique(cost_centers[has_cc], return_inverse=True)
+        cc_counts = np.bincount(cc_inverse, minlength=len(cc_ids))
+        cc_totals = _grouped_sum(cc_inverse, cents[has_cc], len(cc_ids))
+        names = self.snapshot.cost_center_names
+        by_cost_center = sorted(
+            (
+                {"id": cc_id, "name": names.get(cc_id), "count": count, "total": total / 100}
+                for cc_id, count, total in zip(cc_ids.tolist(), cc_counts.tolist(), cc_totals)
+            ),
+            key=lambda item: item["name"] or "",
+        )
+
+        # Month breakdown
+        days = (cols.dates[idx] - EPOCH_ORDINAL).astype("datetime64[D]")
+        months = days.astype("datetime64[M]")
+        month_keys, month_inverse = np.unique(months, return_inverse=True)
+        month_counts = np.bincount(month_inverse, minlength=len(month_keys))
+        month_totals = _grouped_sum(month_inverse, cents, len(month_keys))
+        by_month = [
+            {"month": str(month), "count": count, "total": total / 100}
+            for month, count, total in zip(month_keys, month_counts.tolist(), month_totals)
+        ]
+
+        return {
+            "count": len(idx),
+            "total": int(cents.sum()) / 100,
+            "income": int(cents[cents > 0].sum()) / 100,
+            "expenses": int(cents[cents < 0].sum()) / 100,
+            "by_cost_center": by_cost_center,
+            "by_month": by_month,
+        }
+
+
+# ============================================
+# SNAPSHOT
+# ============================================
+
+
+class LedgerSnapshot:
+    """
+    Compact in-memory copy of the ledger for one database.
+
+    Built once, then kept current by applying committed changes published by
+    app.events. Readers grab the current column version without locking.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.account_names: List[str] = []
+        self.cost_center_names: Dict[int, str] = {}
+        self.category_names: Dict[int, str] = {}
+        self._account_codes: Dict[str, int] = {}
+        self._category_bits: Dict[int, int] = {}
+        self._columns: Optional[_Columns] = None
+        self._lock = threading.Lock()
+
+    # ========================
+    # MAINTENANCE
+    # ========================
+
+    def refresh(self) -> None:
+        """Rebuild the whole snapshot from the database."""
+        with self._lock, self.engine.connect() as conn:
+            self._load_dimensions(conn)
+            self._columns = self._build(*self._fetch(conn))
+
+    def apply(self, changes: events.LedgerChanges) -> None:
+        """Apply a committed change set (re-reads only the touched rows)."""
+        if self._columns is None:
+            return
+        if changes.full:
+            self.refresh()
+            return
+
+        with self._lock, self.engine.connect() as conn:
+            if changes.dimensions:
+                self._load_dimensions(conn)
+
+            touched = changes.transaction_ids | changes.deleted_ids
+            if not touched:
+                return
+
+            current = self._columns
+            keep = ~np.isin(current.ids, np.fromiter(touched, dtype=np.int64, count=len(touched)))
+            fresh = self._build(*self._fetch(conn, sorted(changes.transaction_ids)))
+            self._columns = _concat(_take(current, keep), fresh)
+
+    # ========================
+    # QUERIES
+    # ========================
+
+    def select(
+        self,
+        search: Optional[str] = None,
+        cost_center_ids: Optional[Union[int, List[int]]] = None,
+        spend_category_ids: Optional[Union[int, List[int]]] = None,
+        account: Optional[Union[str, List[str]]] = None,
+        start_date: Optional[datetime.date] = None,
+        end_date: Optional[datetime.date] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        spend_category_match: str = "any",
+    ) -> Selection:
+        """Evaluate the get_transactions filter set with vectorized operations."""
+        if self._columns is None:
+            self.refresh()
+        cols = self._columns
+        mask = np.ones(len(cols), dtype=bool)
+
+        if search:
+            mask &= np.strings.find(cols.search_text, search.lower()) >= 0
+
+        if cost_center_ids:
+            ids = [cost_center_ids] if isinstance(cost_center_ids, int) else cost_center_ids
+            mask &= np.isin(cols.cost_centers, ids)
+
+        if spend_category_ids:
+            ids = [spend_category_ids] if isinstance(spend_category_ids, int) else spend_category_ids
+            wanted = self._category_mask(ids, cols.categories.shape[1])
+            if spend_category_match == "all":
+                # A category no row has (so no bit) can't be matched by every row
+                known = all(cat_id in self._category_bits for cat_id in ids)
+                mask &= ((cols.categories & wanted) == wanted).all(axis=1) & known
+            else:
+                mask &= (cols.categories & wanted).any(axis=1)
+
+        if account:
+            accounts = [account] if isinstance(account, str) else account
+            codes = [self._account_codes[name] for name in accounts if name in self._account_codes]
+            mask &= np.isin(cols.accounts, codes)
+
+        if start_date:
+            mask &= cols.dates >= start_date.toordinal()
+
+        if end_date:
+            mask &= cols.dates <= end_date.toordinal()
+
+        if min_amount is not None:
+            mask &= cols.cents >= to_cents(min_amount)
+
+        if max_amount is not None:
+            mask &= cols.cents <= to_cents(max_amount)
+
+        return Selection(self, cols, np.flatnonzero(mask))
+
+    # ========================
+    # INTERNAL HELPERS
+    # ========================
+
+    def _load_dimensions(self, conn) -> None:
+        self.cost_center_names = dict(conn.execute(select(CostCenter.id, CostCenter.name)).all())
+        self.category_names = dict(conn.execute(select(SpendCategory.id, SpendCategory.name)).all())
+
+    def _fetch(self, conn, ids: Optional[Sequence[int]] = None):
+        """Read transaction rows and their spend category ids (all rows when ids is None)."""
+        columns = (
+            Transaction.id, Transaction.date, Transaction.description,
+            Transaction.amount_cents, Transaction.account, Transaction.cost_center_id,
+        )
+        link = transaction_spend_categories.c
+
+        if ids is None:
+            rows = conn.execute(select(*columns).order_by(Transaction.id)).all()
+            links = conn.execute(select(link.transaction_id, link.spend_category_id)).all()
+            return rows, links
+
+        rows, links = [], []
+        for start in range(0, len(ids), ID_CHUNK):
+            chunk = ids[start:start + ID_CHUNK]
+            rows += conn.execute(
+                select(*columns).where(Transaction.id.in_(chunk)).order_by(Transaction.id)
+            ).all()
+            links += conn.execute(
+                select(link.transaction_id, link.spend_category_id).where(link.transaction_id.in_(chunk))
+            ).all()
+        return rows, links
+
+    def _build(self, rows, links) -> _Columns:
+        categories_by_tx: Dict[int, List[int]] = {}
+        for tx_id, category_id in links:
+            categories_by_tx.setdefault(tx_id, []).append(category_id)
+            if category_id not in self._category_bits:
+                self._category_bits[category_id] = len(self._category_bits)
+
+        n = len(rows)
+        words = max(1, -(-len(self._category_bits) // WORD_BITS))
+        bitsets = np.zeros((n, words), dtype=np.uint64)
+        category_ids = np.empty(n, dtype=object)
+
+        for i, row in enumerate(rows):
+            cat_ids = tuple(sorted(categories_by_tx.get(row.id, ())))
+            category_ids[i] = cat_ids
+            for cat_id in cat_ids:
+                bit = self._category_bits[cat_id]
+                bitsets[i, bit // WORD_BITS] |= np.uint64(1 << (bit % WORD_BITS))
+
+        descriptions = np.empty(n, dtype=object)
+        descriptions[:] = [row.description for row in rows]
+
+        return _Columns(
+            ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=n),
+            dates = np.fromiter((row.date.toordinal() for row in rows), dtype=np.int32, count=n),
+            cents = np.fromiter((row.amount_cents for row in rows), dtype=np.int64, count=n),
+            cost_centers = np.fromiter(
+                (-1 if row.cost_center_id is None else row.cost_center_id for row in rows),
+                dtype=np.int32, count=n,
+            ),
+            accounts = np.fromiter((self._account_code(row.account) for row in rows), dtype=np.int32, count=n),
+            categories = bitsets,
+            category_ids = category_ids,
+            descriptions = descriptions,
+            search_text = np.array(
+                [row.description.lower() for row in rows], dtype=np.dtypes.StringDType()
+            ),
+        )
+
+    def _account_code(self, name: str) -> int:
+        code = self._account_codes.get(name)
+        if code is None:
+            code = self._account_codes[name] = len(self.account_names)
+            self.account_names.append(name)
+        return code
+
+    def _category_mask(self, ids: Iterable[int], words: int) -> np.ndarray:
+        wanted = np.zeros(words, dtype=np.uint64)
+        for cat_id in ids:
+            bit = self._category_bits.get(cat_id)
+            if bit is not None and bit // WORD_BITS < words:
+                wanted[bit // WORD_BITS] |= np.uint64(1 << (bit % WORD_BITS))
+        return wanted
+
+
+def _take(cols: _Columns, keep: np.ndarray) -> _Columns:
+    return _Columns(**{name: getattr(cols, name)[keep] for name in _Columns.__dataclass_fields__})
+
+
+def _concat(old: _Columns, new: _Columns) -> _Columns:
+    """Append new rows, widening bitsets if new categories appeared, and keep id order."""
+    words = max(old.categories.shape[1], new.categories.shape[1])
+    parts = {}
+    for name in _Columns.__dataclass_fields__:
+        a, b = getattr(old, name), getattr(new, name)
+        if name == "categories":
+            a = np.pad(a, ((0, 0), (0, words - a.shape[1])))
+            b = np.pad(b, ((0, 0), (0, words - b.shape[1])))
+        parts[name] = np.concatenate([a, b])
+
+    merged = _Columns(**parts)
+    if len(old) and len(new) and new.ids[0] < old.ids[-1]:
+        merged = _take(merged, np.argsort(merged.ids, kind="stable"))
+    return merged
+
+
+def _grouped_sum(inverse: np.ndarray, cents: np.ndarray, groups: int) -> List[int]:
+    """Exact integer per-group sums (bincount weights are float64)."""
+    totals = np.zeros(groups, dtype=np.int64)
+    np.add.at(totals, inverse, cents)
+    return totals.tolist()
+
+
+# ============================================
+# REGISTRY
+# ============================================
+
+
+_snapshots: "weakref.WeakKeyDictionary[Engine, LedgerSnapshot]" = weakref.WeakKeyDictionary()
+_registry_lock = threading.Lock()
+
+
+def get_snapshot(engine: Engine) -> LedgerSnapshot:
+    """The snapshot for a database, built on first use."""
+    with _registry_lock:
+        snapshot = _snapshots.get(engine)
+        if snapshot is None:
+            snapshot = _snapshots[engine] = LedgerSnapshot(engine)
+    if snapshot._columns is None:
+        snapshot.refresh()
+    return snapshot
+
+
+@events.on_close
+def _forget(engine: Engine) -> None:
+    with _registry_lock:
+        _snapshots.pop(engine, None)
+
+
+@events.subscribe
+def _apply_changes(engine: Engine, changes: events.LedgerChanges) -> None:
+    snapshot = _snapshots.get(engine)
+    if snapshot is not None:
+        snapshot.apply(changes)
@@ -0,0 +1,71 @@
+# app/config.py - runtime settings read from environment variables
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class Settings:
+    """
+    Application settings. Every field can be overridden with a FINANCE_* environment variable.
+    """
+    database_url: str = "sqlite:///./transactions.db"
+
+    # Requests with an X-Ledger header use their own database, <ledger_dir>/<name>.db.
+    # At most max_open_ledgers stay open (least recently used closed first), and
+    # ledgers idle for ledger_idle_seconds are closed; the default database always stays open
+    ledger_dir: Optional[str] = None  # default: ledgers/ next to the database
+    max_open_ledgers: int = 8
+    ledger_idle_seconds: float = 600.0
+
+    # Serve /transactions/filter and /transactions/summary from an in-memory columnar snapshot
+    columnar_engine: bool = False
+
+    # Run read endpoints on an async (aiosqlite) engine instead of the threadpool
+    async_reads: bool = False
+
+    # Group commit: the writer commits up to write_batch_size queued writes at once.
+    # Writes that queue up during a commit share the next one; a delay > 0 also waits
+    # that long for more (worth it when fsync is slow, costs latency otherwise)
+    write_batch_size: int = 64
+    write_batch_delay_ms: float = 0.0
+
+    # Online backups (app/backups.py): taken every backup_interval_hours while the API
+    # runs (0 = only on demand via POST /backups), newest backup_keep kept
+    backup_interval_hours: float = 0.0
+    backup_keep: int = 7
+    backup_compress: bool = False
+    backup_dir: Optional[str] = None  # default: backups/ next to the database
+
+    # Honour the X-Profile request header (cprofile / sample) and write profiles to profile_dir
+    profiling: bool = False
+    profile_dir: str = "profiles"
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            database_url = os.getenv("FINANCE_DATABASE_URL", cls.database_url),
+            ledger_dir = os.getenv("FINANCE_LEDGER_DIR", cls.ledger_dir),
+            max_open_ledgers = int(os.getenv("FINANCE_MAX_OPEN_LEDGERS", cls.max_open_ledgers)),
+            ledger_idle_seconds = float(os.getenv("FINANCE_LEDGER_IDLE_SECONDS", cls.ledger_idle_seconds)),
+            columnar_engine = _env_flag("FINANCE_COLUMNAR_ENGINE", cls.columnar_engine),
+            async_reads = _env_flag("FINANCE_ASYNC_READS", cls.async_reads),
+            write_batch_size = int(os.getenv("FINANCE_WRITE_BATCH_SIZE", cls.write_batch_size)),
+            write_batch_delay_ms = float(os.getenv("FINANCE_WRITE_BATCH_DELAY_MS", cls.write_batch_delay_ms)),
+            backup_interval_hours = float(os.getenv("FINANCE_BACKUP_INTERVAL_HOURS", cls.backup_interval_hours)),
+            backup_keep = int(os.getenv("FINANCE_BACKUP_KEEP", cls.backup_keep)),
+            backup_compress = _env_flag("FINANCE_BACKUP_COMPRESS", cls.backup_compress),
+            backup_dir = os.getenv("FINANCE_BACKUP_DIR", cls.backup_dir),
+            profiling = _env_flag("FINANCE_PROFILING", cls.profiling),
+            profile_dir = os.getenv("FINANCE_PROFILE_DIR", cls.profile_dir),
+        )
+
+
+settings = Settings.from_env()
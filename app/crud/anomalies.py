@@ -0,0 +1,159 @@
+# app/crud/anomalies.py - amount anomaly scores from persisted per cost center / per merchant running statistics
+from sqlalchemy import bindparam, delete, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app import recurring
+from app.crud.distributions import COST_CENTER
+from app.models import AmountStats
+from app.sketches import Moments
+
+
+MERCHANT = "merchant"
+
+MIN_HISTORY = 5           # amounts a cost center / merchant needs before its statistics score anything
+MIN_SPREAD_CENTS = 500    # the spread never counts as less than $5...
+RELATIVE_SPREAD = 0.1     # ...or 10% of the mean (a $15.49 subscription going to $17.99 isn't an anomaly)
+FLAG_SCORE = 4.0          # scores from here up are listed by GET /transactions/anomalies
+
+KEY_CHUNK = 5_000         # stay well under SQLite's bound-parameter limit
+
+Key = Tuple[str, str]                   # (dimension, name)
+Row = Tuple[Optional[str], str, int]    # (cost_center_name, description, amount_cents)
+
+
+def keys_of(cost_center_name: Optional[str], description: str) -> List[Key]:
+    keys = [(MERCHANT, recurring.normalize_merchant(description))]
+    if cost_center_name:
+        keys.append((COST_CENTER, cost_center_name))
+    return keys
+
+
+def score(amount_cents: int, history: Iterable[Optional[Moments]]) -> Optional[float]:
+    """
+    How many spreads the amount is from the mean, the highest over the cost
+    center and merchant statistics with enough history (None if neither has).
+    """
+    best = None
+    for moments in history:
+        if moments is None or moments.n < MIN_HISTORY:
+            continue
+        spread = max(moments.std, RELATIVE_SPREAD * abs(moments.mean), MIN_SPREAD_CENTS)
+        z = abs(amount_cents - moments.mean) / spread
+        best = z if best is None or z > best else best
+    return None if best is None else round(best, 2)
+
+
+# ============================================
+# WRITE PATH
+# ============================================
+
+
+def record_amounts(db: Session, rows: Iterable[Row]) -> List[Optional[float]]:
+    """
+    Score each new amount against the statistics so far, then add it, in row
+    order (so a first import of a long history scores its later rows against
+    its earlier ones). O(1) per row; returns the scores in row order.
+    """
+    keyed = [(keys_of(cost_center_name, description), amount) for cost_center_name, description, amount in rows]
+    conn = db.connection()
+    stats = _load(conn, {key for keys, _ in keyed for key in keys})
+    stored = set(stats)
+
+    scores = []
+    for keys, amount in keyed:
+        scores.append(score(amount, (stats.get(key) for key in keys)))
+        for key in keys:
+            stats.setdefault(key, Moments()).add(amount)
+    _save(conn, stats, stored)
+    return scores
+
+
+def remove_amounts(db: Session, rows: Iterable[Row]) -> None:
+    """Take deleted amounts (or the old values of edited rows) out of the statistics."""
+    keyed = [(keys_of(cost_center_name, description), amount) for cost_center_name, description, amount in rows]
+    conn = db.connection()
+    stats = _load(conn, {key for keys, _ in keyed for key in keys})
+    stored = set(stats)
+    for keys, amount in keyed:
+        for key in keys:
+            if key in stats:
+                stats[key].remove(amount)
+    _save(conn, stats, stored)
+
+
+def rebuild_all(db: Session, rescore: bool = False) -> None:
+    """
+    Rebuild every statistic from the ledger, in one scan. With rescore, also
+    score every row against the rest of its history (each row left out of its
+    own statistics), for rows written before scores existed.
+    """
+    conn = db.connection()
+    conn.execute(delete(AmountStats))
+    rows = conn.exec_driver_sql("""
+        SELECT t.id, cc.name, t.description, t.amount_cents
+        FROM transactions t LEFT JOIN cost_centers cc ON cc.id = t.cost_center_id
+    """).all()
+
+    stats: Dict[Key, Moments] = {}
+    keyed = []
+    for tx_id, cost_center_name, description, amount in rows:
+        keys = keys_of(cost_center_name, description)
+        for key in keys:
+            stats.setdefault(key, Moments()).add(amount)
+        if rescore:
+            keyed.append((tx_id, keys, amount))
+    _save(conn, stats, set())
+
+    if keyed:
+        conn.exec_driver_sql(
+            "UPDATE transactions SET anomaly_score = ? WHERE id = ?",
+            [(score(amount, (stats[key].without(amount) for key in keys)), tx_id) for tx_id, keys, amount in keyed],
+        )
+
+
+# ============================================
+# INTERNAL HELPERS
+# ============================================
+
+
+_select_stats = select(AmountStats.dimension, AmountStats.key, AmountStats.n, AmountStats.mean, AmountStats.m2).where(
+    AmountStats.dimension == bindparam("dimension"),
+    AmountStats.key.in_(bindparam("keys", expanding=True)),
+)
+
+
+def _load(conn: Connection, keys: Iterable[Key]) -> Dict[Key, Moments]:
+    by_dimension: Dict[str, List[str]] = {}
+    for dimension, name in keys:
+        by_dimension.setdefault(dimension, []).append(name)
+
+    stats = {}
+    for dimension, names in by_dimension.items():
+        for start in range(0, len(names), KEY_CHUNK):
+            chunk = names[start:start + KEY_CHUNK]
+            for _, name, n, mean, m2 in conn.execute(_select_stats, {"dimension": dimension, "keys": chunk}):
+                stats[(dimension, name)] = Moments(n, mean, m2)
+    return stats
+
+
+def _save(conn: Connection, stats: Dict[Key, Moments], stored: Set[Key]) -> None:
+    """Write back the given statistics (stored: the keys that have a row); keys left with no amounts are dropped."""
+    updated, inserted, dropped = [], [], []
+    for (dimension, name), m in stats.items():
+        if not m.n:
+            if (dimension, name) in stored:
+                dropped.append((dimension, name))
+        elif (dimension, name) in stored:
+            updated.append((m.n, m.mean, m.m2, dimension, name))
+        else:
+            inserted.append((dimension, name, m.n, m.mean, m.m2))
+
+    if updated:
+        conn.exec_driver_sql("UPDATE amount_stats SET n = ?, mean = ?, m2 = ? WHERE dimension = ? AND key = ?", updated)
+    if inserted:
+        conn.exec_driver_sql("INSERT INTO amount_stats (dimension, key, n, mean, m2) VALUES (?, ?, ?, ?, ?)", inserted)
+    if dropped:
+        conn.exec_driver_sql("DELETE FROM amount_stats WHERE dimension = ? AND key = ?", dropped)
@@ -0,0 +1,100 @@
+# app/crud/category_bits.py - spend category bit positions and the denormalized Transaction.category_mask
+from sqlalchemy import bindparam, event, inspect, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from typing import Iterable, List, Optional, Sequence
+
+from app.models import Archive, SpendCategory, Transaction
+
+
+# Positions 0-62, so every mask is a non-negative 64-bit SQLite integer
+MASK_BITS = 63
+
+# A transaction's mask from its links; {id} is the transaction id expression
+MASK_SQL = (
+    "SELECT COALESCE(SUM(1 << sc.bit), 0) FROM {links} l JOIN spend_categories sc ON sc.id = l.spend_category_id "
+    "WHERE l.transaction_id = {id} AND sc.bit IS NOT NULL"
+)
+
+
+def mask_of(bits: Iterable[Optional[int]]) -> int:
+    mask = 0
+    for bit in bits:
+        if bit is not None:
+            mask |= 1 << bit
+    return mask
+
+
+# ============================================
+# BIT POSITIONS
+# ============================================
+
+
+def free_bits(conn: Connection, count: int) -> List[int]:
+    """Up to `count` unused bit positions, lowest first."""
+    used = set(conn.exec_driver_sql("SELECT bit FROM spend_categories WHERE bit IS NOT NULL").scalars())
+    return [bit for bit in range(MASK_BITS) if bit not in used][:count]
+
+
+def assign_bits(db: Session) -> None:
+    """
+    Give free positions (freed when categories are deleted) to categories
+    without one, ORing the new bit into the masks of their linked rows.
+
+    Categories archived years use are left alone: archive files are read-only,
+    so their rows' masks can't gain the bit.
+    """
+    conn = db.connection()
+    waiting = conn.exec_driver_sql("SELECT id FROM spend_categories WHERE bit IS NULL ORDER BY id").scalars().all()
+    if not waiting:
+        return
+    pinned = {category_id for archive in db.query(Archive) for category_id in archive.spend_category_ids}
+    assigned = list(zip([i for i in waiting if i not in pinned], free_bits(conn, len(waiting))))
+    if not assigned:
+        return
+
+    # ORM update, so SpendCategory objects in the session see their bit
+    for category_id, bit in assigned:
+        db.execute(update(SpendCategory).where(SpendCategory.id == category_id).values(bit = bit))
+    conn.exec_driver_sql(
+        "UPDATE transactions SET category_mask = category_mask | (1 << ?) "
+        "WHERE id IN (SELECT transaction_id FROM transaction_spend_categories WHERE spend_category_id = ?)",
+        [(bit, category_id) for category_id, bit in assigned],
+    )
+
+
+# ============================================
+# MASKS
+# ============================================
+
+
+def refresh_masks(conn: Connection, ids_query: Optional[str] = None) -> None:
+    """Recompute category_mask from the links, for the rows ids_query (SQL) selects or for every row."""
+    mask = MASK_SQL.format(links="transaction_spend_categories", id="transactions.id")
+    where = f" WHERE id IN ({ids_query})" if ids_query else ""
+    conn.exec_driver_sql(f"UPDATE transactions SET category_mask = ({mask}){where}")
+
+
+_bits_query = select(SpendCategory.bit).where(SpendCategory.id.in_(bindparam("ids", expanding=True)))
+
+
+def wanted_mask(conn: Connection, category_ids: Sequence[int]) -> Optional[int]:
+    """
+    The mask of the given (distinct) categories, or None when one of them has
+    no bit or doesn't exist: filters then check the links instead.
+    """
+    bits = conn.execute(_bits_query, {"ids": list(category_ids)}).scalars().all()
+    if len(bits) != len(category_ids) or None in bits:
+        return None
+    return mask_of(bits)
+
+
+@event.listens_for(Session, "before_flush")
+def _set_masks(session: Session, flush_context, instances) -> None:
+    # ORM writes: masks of new rows, and of rows whose categories changed
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Transaction) and (
+            obj in session.new or inspect(obj).attrs.spend_categories.history.has_changes()
+        ):
+            obj.category_mask = mask_of(category.bit for category in obj.spend_categories)
@@ -0,0 +1,261 @@
+# app/crud/dimensions.py - cost centers, spend categories and accounts: cache, get-or-create, cleanup
+from sqlalchemy import delete, exists, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+import threading
+import weakref
+from typing import Dict, Iterable, List, NamedTuple, Optional, Type, Union
+
+from app import events
+from app.crud import category_bits
+from app.models import Account, Archive, CostCenter, SpendCategory, Transaction, transaction_spend_categories
+
+
+UNCATEGORIZED = "Uncategorized"
+
+Dimension = Union[Type[CostCenter], Type[SpendCategory], Type[Account]]
+DIMENSIONS = (CostCenter, SpendCategory, Account)
+
+
+# ============================================
+# CACHE
+# ============================================
+
+
+class Dimensions(NamedTuple):
+    """name -> id for every dimension, each ordered by name."""
+    cost_centers: Dict[str, int]
+    spend_categories: Dict[str, int]
+    accounts: Dict[str, int]
+
+    def ids(self, model: Dimension) -> Dict[str, int]:
+        return self[DIMENSIONS.index(model)]
+
+    def rows(self, model: Dimension) -> List[dict]:
+        return [{"id": id, "name": name} for name, id in self.ids(model).items()]
+
+
+class DimensionCache:
+    """
+    Process-wide copy of the dimension tables for one database.
+
+    Loaded on first use and dropped whenever a commit adds or removes a
+    dimension row (published by app.events), so it only holds committed rows.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._current: Optional[Dimensions] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def peek(self) -> Optional[Dimensions]:
+        """Current dimensions if loaded, without touching the database."""
+        return self._current
+
+    def get(self) -> Dimensions:
+        """Current dimensions, reloading them (three small queries) if invalidated."""
+        current = self._current
+        if current is not None:
+            return current
+
+        with self._lock:
+            generation = self._generation
+            with self.engine.connect() as conn:
+                current = Dimensions(*(
+                    dict(conn.execute(select(model.name, model.id).order_by(model.name)).all())
+                    for model in DIMENSIONS
+                ))
+            # An invalidation that raced with the load means this copy may be stale
+            if generation == self._generation:
+                self._current = current
+        return current
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._current = None
+
+
+_caches: "weakref.WeakKeyDictionary[Engine, DimensionCache]" = weakref.WeakKeyDictionary()
+_registry_lock = threading.Lock()
+
+
+def get_cache(engine: Engine) -> DimensionCache:
+    """The dimension cache for a database (loaded lazily by DimensionCache.get())."""
+    with _registry_lock:
+        cache = _caches.get(engine)
+        if cache is None:
+            cache = _caches[engine] = DimensionCache(engine)
+    return cache
+
+
+@events.on_close
+def _forget(engine: Engine) -> None:
+    with _registry_lock:
+        _caches.pop(engine, None)
+
+
+@events.subscribe
+def _invalidate_cache(engine: Engine, changes: events.LedgerChanges) -> None:
+    cache = _caches.get(engine)
+    if cache is not None and (changes.dimensions or changes.full):
+        cache.invalidate()
+
+
+# ============================================
+# GET OR CREATE
+# ============================================
+
+
+def clean_names(names: Iterable[Optional[str]]) -> List[str]:
+    """Strip and deduplicate names (keeping order). Falls back to ["Uncategorized"]."""
+    cleaned = dict.fromkeys(name.strip() for name in names if name and name.strip())
+    return list(cleaned) or [UNCATEGORIZED]
+
+
+def get_or_create(db: Session, model: Dimension, names: Iterable[str]) -> Dict[str, Union[CostCenter, SpendCategory, Account]]:
+    """
+    Map each name to its row, creating the missing ones.
+
+    Names the dimension cache already knows are loaded by primary key. The rest
+    go through one INSERT ... ON CONFLICT DO NOTHING RETURNING (a concurrent
+    writer creating the same name is not an error) and one SELECT for the rows
+    that already existed. New spend categories take the lowest free mask bits.
+    Nothing is committed here.
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+
+    rows = {}
+    cache = _caches.get(_engine(db))
+    current = cache.peek() if cache is not None else None
+    if current is not None:
+        known = current.ids(model)
+        ids = [known[name] for name in names if name in known]
+        if ids:
+            rows.update((row.name, row) for row in db.query(model).filter(model.id.in_(ids)))
+
+    # Unknown to the cache, or deleted since it was loaded
+    missing = [name for name in names if name not in rows]
+    if not missing:
+        return rows
+
+    values = [{"name": name} for name in missing]
+    if model is SpendCategory:
+        bits = category_bits.free_bits(db.connection(), len(missing))
+        for row, bit in zip(values, bits + [None] * (len(missing) - len(bits))):
+            row["bit"] = bit
+    stmt = (
+        sqlite_insert(model)
+        .values(values)
+        .on_conflict_do_nothing(index_elements=["name"])
+        .returning(model)
+    )
+    created = {row.name: row for row in db.scalars(stmt)}
+    if created:
+        # Core-style inserts bypass the flush, so report them to the caches directly
+        events.note(db, events.LedgerChanges(dimensions=True))
+    rows.update(created)
+
+    existing = [name for name in missing if name not in rows]
+    if existing:
+        rows.update((row.name, row) for row in db.query(model).filter(model.name.in_(existing)))
+    return rows
+
+
+def resolve_cost_center(db: Session, name: Optional[str]) -> CostCenter:
+    """Get or create a cost center ("Uncategorized" when name is blank)."""
+    (name,) = clean_names([name])
+    return get_or_create(db, CostCenter, [name])[name]
+
+
+def resolve_spend_categories(db: Session, names: Iterable[Optional[str]]) -> List[SpendCategory]:
+    """Get or create spend categories in one batch, in the order given."""
+    names = clean_names(names)
+    rows = get_or_create(db, SpendCategory, names)
+    return [rows[name] for name in names]
+
+
+def ensure_accounts(db: Session, names: Iterable[str]) -> None:
+    """Make sure every account name used by a transaction has an accounts row."""
+    get_or_create(db, Account, names)
+
+
+# ============================================
+# CLEANUP
+# ============================================
+
+
+def delete_orphans(
+    db: Session,
+    cost_center_ids: Iterable[Optional[int]] = (),
+    spend_category_ids: Iterable[Optional[int]] = (),
+    accounts: Iterable[Optional[str]] = (),
+) -> None:
+    """
+    Delete the given cost centers / spend categories / accounts if no transaction uses them anymore.
+    One DELETE per dimension; pending changes are flushed first so they're counted.
+    """
+    cost_center_ids = {i for i in cost_center_ids if i is not None}
+    spend_category_ids = {i for i in spend_category_ids if i is not None}
+    accounts = {name for name in accounts if name}
+    if not cost_center_ids and not spend_category_ids and not accounts:
+        return
+
+    # Rows in archive files still reference these (app/archive.py)
+    for pinned in db.query(Archive):
+        cost_center_ids -= set(pinned.cost_center_ids)
+        spend_category_ids -= set(pinned.spend_category_ids)
+        accounts -= set(pinned.accounts)
+
+    db.flush()
+    deleted = 0
+
+    if cost_center_ids:
+        deleted += db.execute(
+            delete(CostCenter)
+            .where(
+                CostCenter.id.in_(cost_center_ids),
+                ~exists().where(Transaction.cost_center_id == CostCenter.id),
+            )
+            .execution_options(synchronize_session="fetch")
+        ).rowcount
+
+    if spend_category_ids:
+        deleted_categories = db.execute(
+            delete(SpendCategory)
+            .where(
+                SpendCategory.id.in_(spend_category_ids),
+                ~exists().where(transaction_spend_categories.c.spend_category_id == SpendCategory.id),
+            )
+            .execution_options(synchronize_session="fetch")
+        ).rowcount
+        if deleted_categories:
+            category_bits.assign_bits(db)  # their bits are free again
+        deleted += deleted_categories
+
+    if accounts:
+        deleted += db.execute(
+            delete(Account)
+            .where(
+                Account.name.in_(accounts),
+                ~exists().where(Transaction.account == Account.name),
+            )
+            .execution_options(synchronize_session="fetch")
+        ).rowcount
+
+    if deleted:
+        events.note(db, events.LedgerChanges(dimensions=True))
+
+
+# ============================================
+# INTERNAL HELPERS
+# ============================================
+
+
+def _engine(db: Session) -> Engine:
+    bind = db.get_bind()
+    return bind.engine if isinstance(bind, Connection) else bind
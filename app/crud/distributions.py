@@ -0,0 +1,238 @@
+# app/crud/distributions.py - amount distributions backed by persisted per-dimension sketches
+from sqlalchemy import delete, or_, select
+from sqlalchemy.orm import Session
+
+from typing import Dict, Iterable, List, Optional, Tuple
+from collections import defaultdict
+
+from app.models import AmountSketch, CostCenter, Transaction
+from app.sketches import KLLSketch
+
+
+COST_CENTER = "cost_center"
+ACCOUNT = "account"
+
+QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+
+# Removed amounts a sketch may still hold, as a share of its live ones, before it is rebuilt.
+# Comparable to the KLL rank error at k=200, so quantiles stay about as accurate.
+STALE_FRACTION = 0.02
+
+
+# ============================================
+# WRITE PATH
+# ============================================
+
+
+def record_amounts(db: Session, rows: Iterable[Tuple[str, str, int]]) -> None:
+    """
+    Add newly inserted amounts to the cost center and account sketches.
+
+    Args:
+        rows: (cost_center_name, account, amount_cents) for each new transaction
+    """
+    values: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+    for cost_center_name, account, amount in rows:
+        if cost_center_name:
+            values[(COST_CENTER, cost_center_name)].append(amount)
+        values[(ACCOUNT, account)].append(amount)
+
+    if not values:
+        return
+
+    existing = _load_sketches(db, values.keys())
+
+    for (dimension, key), amounts in values.items():
+        row = existing.get((dimension, key))
+        sketch = KLLSketch.from_dict(row.payload) if row else KLLSketch()
+        sketch.update_many(amounts)
+
+        if row:
+            row.payload = sketch.to_dict()
+        else:
+            db.add(AmountSketch(dimension=dimension, key=key, payload=sketch.to_dict()))
+
+
+def forget_amounts(db: Session, rows: Iterable[Tuple[Optional[str], str, int]]) -> None:
+    """
+    Take removed amounts (deleted rows, or the old values of edited rows) out
+    of the cost center and account sketches. Call after the change is made
+    (and after record_amounts for the new values), as a rebuild reads the ledger.
+
+    KLL sketches can't forget values, so a removed amount is only counted as
+    stale: counts leave it out, and quantiles may still see up to
+    STALE_FRACTION stale values. A key is rebuilt from its rows once its stale
+    share passes that, or when the amount was its min or max (so those stay
+    exact). That is O(1) per removal, plus one scan of a key's rows every
+    STALE_FRACTION of its size in removals, instead of a scan each time.
+
+    Args:
+        rows: (cost_center_name, account, amount_cents) for each removed amount
+    """
+    values: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+    for cost_center_name, account, amount in rows:
+        if cost_center_name:
+            values[(COST_CENTER, cost_center_name)].append(amount)
+        values[(ACCOUNT, account)].append(amount)
+
+    rebuild = set()
+    for (dimension, key), row in _load_sketches(db, values.keys()).items():
+        amounts = values[(dimension, key)]
+        stale = row.stale + len(amounts)
+        live = row.payload["n"] - stale
+        if (
+            live <= 0
+            or min(amounts) <= row.payload["min"]
+            or max(amounts) >= row.payload["max"]
+            or stale > STALE_FRACTION * live
+        ):
+            rebuild.add((dimension, key))
+        else:
+            row.stale = stale
+
+    if rebuild:
+        rebuild_sketches(
+            db,
+            cost_center_names = [key for dimension, key in rebuild if dimension == COST_CENTER],
+            accounts = [key for dimension, key in rebuild if dimension == ACCOUNT],
+        )
+
+
+def rebuild_sketches(
+    db: Session,
+    cost_center_names: Iterable[Optional[str]] = (),
+    accounts: Iterable[Optional[str]] = (),
+) -> None:
+    """
+    Rebuild sketches for the given keys from the ledger, in one scan of their
+    rows (and clear their stale counts). Keys with no remaining rows are dropped.
+    """
+    db.flush()
+
+    keys = {(COST_CENTER, name) for name in cost_center_names if name}
+    keys |= {(ACCOUNT, account) for account in accounts if account}
+    if not keys:
+        return
+
+    existing = _load_sketches(db, keys)
+
+    # One scan for all the keys, on Core rows (a bulk edit can touch every key)
+    cost_center_names = [key for dimension, key in keys if dimension == COST_CENTER]
+    accounts = [key for dimension, key in keys if dimension == ACCOUNT]
+    rows = db.connection().execute(
+        select(CostCenter.name, Transaction.account, Transaction.amount_cents)
+        .outerjoin(CostCenter, Transaction.cost_center_id == CostCenter.id)
+        .where(or_(CostCenter.name.in_(cost_center_names), Transaction.account.in_(accounts)))
+    )
+    values: Dict[Tuple[str, str], List[int]] = {key: [] for key in keys}
+    for cost_center_name, account, amount in rows:
+        if (COST_CENTER, cost_center_name) in values:
+            values[(COST_CENTER, cost_center_name)].append(amount)
+        if (ACCOUNT, account) in values:
+            values[(ACCOUNT, account)].append(amount)
+
+    for (dimension, key), amounts in values.items():
+        sketch = KLLSketch()
+        sketch.update_many(amounts)
+
+        row = existing.get((dimension, key))
+        if sketch.n == 0:
+            if row:
+                db.delete(row)
+        elif row:
+            row.payload = sketch.to_dict()
+            row.stale = 0
+        else:
+            db.add(AmountSketch(dimension=dimension, key=key, payload=sketch.to_dict()))
+
+
+def rebuild_all_sketches(db: Session) -> None:
+    """Rebuild every cost center and account sketch from the ledger, in one scan."""
+    db.flush()
+    db.execute(delete(AmountSketch))
+    # Core rows: skipping the ORM result layer matters at a million rows
+    rows = db.connection().execute(
+        select(CostCenter.name, Transaction.account, Transaction.amount_cents)
+        .outerjoin(CostCenter, Transaction.cost_center_id == CostCenter.id)
+    )
+    record_amounts(db, rows)
+
+
+# ============================================
+# READ PATH
+# ============================================
+
+
+def get_distribution(
+    db: Session,
+    cost_center_ids: Optional[List[int]] = None,
+    account: Optional[List[str]] = None,
+    bins: int = 20,
+) -> dict:
+    """
+    Quantiles and histogram of amounts for the selected cost centers or accounts.
+    With no selection, the distribution covers the whole ledger.
+
+    Cost centers and accounts are sketched independently, so only one
+    dimension can be selected per query.
+    """
+    if cost_center_ids and account:
+        raise ValueError("Distribution can be filtered by cost center or account, not both")
+
+    query = db.query(AmountSketch)
+    if cost_center_ids:
+        names = db.query(CostCenter.name).filter(CostCenter.id.in_(cost_center_ids))
+        query = query.filter(
+            AmountSketch.dimension == COST_CENTER,
+            AmountSketch.key.in_(names.scalar_subquery()),
+        )
+    elif account:
+        query = query.filter(AmountSketch.dimension == ACCOUNT, AmountSketch.key.in_(account))
+    else:
+        query = query.filter(AmountSketch.dimension == COST_CENTER)
+
+    sketch = KLLSketch()
+    stale = 0
+    for row in query:
+        sketch.merge(KLLSketch.from_dict(row.payload))
+        stale += row.stale
+
+    # Sketches hold integer cents; the API speaks dollars
+    result = {
+        "count": sketch.n - stale,
+        "min": _dollars(sketch.min),
+        "max": _dollars(sketch.max),
+        "histogram": [
+            {"lower": b["lower"] / 100, "upper": b["upper"] / 100, "count": b["count"]}
+            for b in sketch.histogram(bins)
+        ],
+    }
+    for label, q in QUANTILES.items():
+        result[label] = _dollars(sketch.quantile(q))
+    return result
+
+
+# ============================================
+# INTERNAL HELPERS
+# ============================================
+
+
+def _dollars(cents: Optional[int]) -> Optional[float]:
+    return None if cents is None else cents / 100
+
+
+def _load_sketches(db: Session, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], AmountSketch]:
+    """Load existing sketch rows for (dimension, key) pairs in one query per dimension."""
+    by_dimension: Dict[str, set] = defaultdict(set)
+    for dimension, key in keys:
+        by_dimension[dimension].add(key)
+
+    existing = {}
+    for dimension, names in by_dimension.items():
+        rows = db.query(AmountSketch).filter(
+            AmountSketch.dimension == dimension,
+            AmountSketch.key.in_(names),
+        )
+        for row in rows:
+            existing[(row.dimension, row.key)] = row
+    return existing
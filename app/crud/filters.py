@@ -0,0 +1,181 @@
+# app/crud/filters.py - the standard transaction filters as a spec, compiled once per filter shape into Core statements
+from sqlalchemy import bindparam, exists, func, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import ColumnElement, Executable
+
+import dataclasses
+import threading
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple, Union
+
+from app.crud import category_bits
+from app.models import Transaction, transaction_spend_categories
+from app.money import to_cents
+
+
+@dataclass(frozen=True)
+class FilterSpec:
+    """
+    Which transactions a request selects, with list filters as tuples and amounts in cents.
+
+    Its shape (the set of filters present) decides the SQL; the values are
+    only bound parameters. So every statement built from a spec is cached per
+    shape: a request builds no SQLAlchemy constructs, and SQLAlchemy's compiled
+    cache hits on the statement it gets back. IN lists use expanding
+    parameters, so their length doesn't change the shape.
+
+    Spend categories match any (default) or all of the selected ids. Once
+    with_category_bits() has found a bit for each of them, either is one
+    bitwise check of Transaction.category_mask; otherwise the links are checked.
+    """
+    search: Optional[str] = None
+    cost_center_ids: Tuple[int, ...] = ()
+    spend_category_ids: Tuple[int, ...] = ()
+    account: Tuple[str, ...] = ()
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    min_cents: Optional[int] = None
+    max_cents: Optional[int] = None
+    all_spend_categories: bool = False
+    category_bits: Optional[int] = None   # mask of the selected categories, when they all have a bit
+
+    @classmethod
+    def from_filters(
+        cls,
+        search: Optional[str] = None,
+        cost_center_ids: Optional[Union[int, List[int]]] = None,
+        spend_category_ids: Optional[Union[int, List[int]]] = None,
+        account: Optional[Union[str, List[str]]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        spend_category_match: str = "any",
+    ) -> "FilterSpec":
+        """From the get_transactions keyword filters (single values or lists, amounts in dollars)."""
+        return cls(
+            search = search or None,
+            cost_center_ids = _as_tuple(cost_center_ids),
+            spend_category_ids = tuple(sorted(set(_as_tuple(spend_category_ids)))),
+            account = _as_tuple(account),
+            start_date = start_date,
+            end_date = end_date,
+            min_cents = None if min_amount is None else to_cents(min_amount),
+            max_cents = None if max_amount is None else to_cents(max_amount),
+            all_spend_categories = spend_category_match == "all",
+        )
+
+    def with_category_bits(self, conn: Connection) -> "FilterSpec":
+        """This spec with category_bits looked up (on conn, so they match its snapshot of the masks)."""
+        if not self.spend_category_ids:
+            return self
+        return dataclasses.replace(self, category_bits = category_bits.wanted_mask(conn, self.spend_category_ids))
+
+    def without(self, name: str) -> "FilterSpec":
+        """The same spec with one filter dropped (facets ignore their own filter)."""
+        return dataclasses.replace(self, **{name: _FIELD_DEFAULTS[name]})
+
+    @property
+    def shape(self) -> FrozenSet[str]:
+        """Names of the criteria (keys of _CRITERIA) this spec's statements use."""
+        names = {name for name in _FILTERS if _present(getattr(self, name))}
+        if "spend_category_ids" in names:
+            names.remove("spend_category_ids")
+            kind = "spend_category_ids" if self.category_bits is None else "category_bits"
+            names.add(f"all_{kind}" if self.all_spend_categories else kind)
+        return frozenset(names)
+
+    def params(self) -> Dict[str, Any]:
+        """Bound parameter values for statements built from this spec's shape."""
+        params = {name: getattr(self, name) for name in _FILTERS if _present(getattr(self, name))}
+        if "search" in params:
+            params["search"] = f"%{self.search}%"
+        if "spend_category_ids" in params:
+            params["spend_category_count"] = len(self.spend_category_ids)
+            if self.category_bits is not None:
+                params["category_bits"] = self.category_bits
+        return params
+
+
+def _as_tuple(value) -> tuple:
+    if value is None or value == []:
+        return ()
+    if isinstance(value, (int, str)):
+        return (value,)
+    return tuple(value)
+
+
+def _present(value) -> bool:
+    return value is not None and value != ()
+
+
+_FIELD_DEFAULTS = {field.name: field.default for field in dataclasses.fields(FilterSpec)}
+
+# Fields that are filters (the others say how spend categories match)
+_FILTERS = (
+    "search", "cost_center_ids", "spend_category_ids", "account", "start_date", "end_date", "min_cents", "max_cents",
+)
+
+
+# ============================================
+# CRITERIA
+# ============================================
+
+
+_link = transaction_spend_categories
+
+
+def _category_bits() -> ColumnElement:
+    return Transaction.category_mask.op("&")(bindparam("category_bits"))
+
+
+# Bound parameters are named after the spec fields (see FilterSpec.params)
+_CRITERIA: Dict[str, Callable[[], ColumnElement]] = {
+    "search": lambda: Transaction.description.ilike(bindparam("search")),
+    "cost_center_ids": lambda: Transaction.cost_center_id.in_(bindparam("cost_center_ids", expanding=True)),
+    "spend_category_ids": lambda: exists().where(
+        _link.c.transaction_id == Transaction.id,
+        _link.c.spend_category_id.in_(bindparam("spend_category_ids", expanding=True)),
+    ),
+    "all_spend_category_ids": lambda: select(func.count()).where(
+        _link.c.transaction_id == Transaction.id,
+        _link.c.spend_category_id.in_(bindparam("spend_category_ids", expanding=True)),
+    ).scalar_subquery() == bindparam("spend_category_count"),
+    "category_bits": lambda: _category_bits() != 0,
+    "all_category_bits": lambda: _category_bits() == bindparam("category_bits"),
+    "account": lambda: Transaction.account.in_(bindparam("account", expanding=True)),
+    "start_date": lambda: Transaction.date >= bindparam("start_date"),
+    "end_date": lambda: Transaction.date <= bindparam("end_date"),
+    "min_cents": lambda: Transaction.amount_cents >= bindparam("min_cents"),
+    "max_cents": lambda: Transaction.amount_cents <= bindparam("max_cents"),
+}
+
+
+def _criteria(shape: FrozenSet[str]) -> List[ColumnElement]:
+    return [build() for name, build in _CRITERIA.items() if name in shape]
+
+
+# ============================================
+# STATEMENT CACHE
+# ============================================
+
+
+# (statement name, shape) -> statement; at most 3 * 2^7 shapes per name
+_statements: Dict[Tuple[str, FrozenSet[str]], Executable] = {}
+_statements_lock = threading.Lock()
+
+
+def cached(name: str, spec: FilterSpec, build: Callable[[List[ColumnElement]], Executable]) -> Executable:
+    """
+    The statement `name` for this spec's shape, built once with build(criteria).
+    Execute it with spec.params(). build must depend on nothing but the criteria.
+    """
+    key = (name, spec.shape)
+    statement = _statements.get(key)
+    if statement is None:
+        with _statements_lock:
+            statement = _statements.get(key)
+            if statement is None:
+                statement = _statements[key] = build(_criteria(key[1]))
+    return statement
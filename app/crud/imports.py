@@ -0,0 +1,133 @@
+# app/crud/imports.py - import provenance, per-account watermarks and re-upload dedupe
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from typing import Any, Dict, List, Optional
+from collections import Counter
+import datetime
+
+from app.crud import staging
+from app.models import Import
+from app.profiling import StageTimer, stage
+from app.records import ParsedTransaction
+
+
+# ============================================
+# WATERMARKS
+# ============================================
+
+
+def find_import(db: Session, file_hash: str) -> Optional[Import]:
+    """An earlier import of exactly the same file, if any."""
+    return db.scalars(select(Import).where(Import.file_hash == file_hash).limit(1)).first()
+
+
+def get_watermarks(db: Session) -> Dict[str, datetime.date]:
+    """
+    account -> date at or below which an upload's rows are already in the ledger.
+
+    One day before the latest imported date: an export taken mid-day holds
+    only part of its last day, so that day is re-read and deduplicated.
+    """
+    rows = db.execute(
+        select(Import.account, func.max(Import.last_date))
+        .where(Import.account.is_not(None))
+        .group_by(Import.account)
+    ).all()
+    return {account: last_date - datetime.timedelta(days=1) for account, last_date in rows if last_date}
+
+
+def get_watermark_starts(db: Session) -> Dict[str, datetime.date]:
+    """
+    account -> date from which the watermark applies: older rows predate every
+    import of the account (a backfill) and are read like a first upload.
+
+    One day after the earliest imported date, so that day is re-read and
+    deduplicated too, like the watermark's last day.
+    """
+    rows = db.execute(
+        select(Import.account, func.min(Import.first_date))
+        .where(Import.account.is_not(None))
+        .group_by(Import.account)
+    ).all()
+    return {account: first_date + datetime.timedelta(days=1) for account, first_date in rows if first_date}
+
+
+# ============================================
+# LOADING
+# ============================================
+
+
+def load_import(
+    db: Session,
+    file_hash: str,
+    institution: str,
+    transactions: List[ParsedTransaction],
+    skipped: Optional[Dict[str, int]] = None,
+    timer: Optional[StageTimer] = None,
+    upsert: bool = False,
+) -> Dict[str, Any]:
+    """
+    Save an upload's new rows and record its provenance in one commit.
+
+    Rows go through a temp staging table (app/crud/staging.py): rows already in
+    the ledger are marked there with one join, and the rest are promoted with
+    INSERT ... SELECT.
+
+    Args:
+        transactions: Rows the parser kept (above the watermarks)
+        skipped: account -> rows the parser skipped at or below the watermark
+            (counted in "watermarked" as well as "skipped")
+        timer: Optional StageTimer (stage, dimensions, insert, update, commit)
+        upsert: Rows with the ID of a ledger row update it (only the changed
+            fields) instead of being loaded as new rows; rows with the ID of
+            an archived row are counted as archived and left out
+
+    Returns:
+        {"duplicate": bool, "loaded": int, "skipped": int, "watermarked": int, "updated": int, "unchanged": int, "archived": int}
+    """
+    watermarked = sum((skipped or {}).values())
+    if find_import(db, file_hash) is not None:
+        # Same file finished uploading while this one was parsing
+        return {
+            "duplicate": True,
+            "loaded": 0,
+            "skipped": len(transactions) + watermarked,
+            "watermarked": watermarked,
+            "updated": 0,
+            "unchanged": 0,
+            "archived": 0,
+        }
+
+    skipped = Counter(skipped or {})
+    with staging.staged(db, transactions, timer, upsert = upsert) as conn:
+        accounts = staging.per_account(conn)
+        updates = staging.update_counts(conn)
+        loaded = staging.promote(db, conn, timer)
+
+    for account in accounts:
+        skipped[account["account"]] += account["duplicates"]
+    total_skipped = sum(skipped.values())
+
+    records = [
+        Import(
+            file_hash = file_hash,
+            institution = institution,
+            account = account["account"],
+            first_date = account["first_date"],
+            last_date = account["last_date"],
+            rows_loaded = account["new"],
+            rows_skipped = skipped.pop(account["account"], 0),
+        )
+        for account in accounts if account["new"]
+    ]
+    if not records:
+        # Nothing new, but remember the file so the next upload short-circuits
+        records.append(Import(file_hash = file_hash, institution = institution))
+    # Skips for accounts with nothing new go on the first row
+    records[0].rows_skipped = (records[0].rows_skipped or 0) + sum(skipped.values())
+    db.add_all(records)
+
+    with stage(timer, "commit"):
+        db.commit()  # the import rows and the transactions together
+    return {"duplicate": False, "loaded": loaded, "skipped": total_skipped, "watermarked": watermarked, **updates}
@@ -1,11 +1,14 @@
 # app/crud/operations.py - database CRUD operations
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, case, func, select
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 from typing import List, Optional, Union
 from datetime import date
 
-from app import schemas
-from app.models import Transaction, SpendCategory, CostCenter
+from app import archive, formats, schemas
+from app.crud import anomalies, dimensions, distributions
+from app.crud.filters import FilterSpec, cached
+from app.models import Account, Transaction, SpendCategory, CostCenter, transaction_spend_categories
 
 
 # ============================================
@@ -14,9 +17,10 @@ from app.models import Transaction, SpendCategory, CostCenter
 
 
 def create_transaction(db: Session, txn: schemas.TransactionCreate) -> Transaction:
-    """Create a transaction with categories."""
-    cost_center = _get_or_create_cost_center(db, txn.cost_center_name)
-    spend_categories = _resolve_spend_categories(db, txn.spend_category_names or [])
+    """Create a transaction with categories, in a single commit."""
+    cost_center = dimensions.resolve_cost_center(db, txn.cost_center_name)
+    spend_categories = dimensions.resolve_spend_categories(db, txn.spend_category_names or [])
+    dimensions.ensure_accounts(db, [txn.account])
     
     new_tx = Transaction(
         date = txn.date or date.today(),
@@ -28,8 +32,11 @@ def create_transaction(db: Session, txn: schemas.TransactionCreate) -> Transacti
     )
     
     db.add(new_tx)
+    distributions.record_amounts(db, [(cost_center.name, new_tx.account, new_tx.amount_cents)])
+    new_tx.anomaly_score = anomalies.record_amounts(
+        db, [(cost_center.name, new_tx.description, new_tx.amount_cents)]
+    )[0]
     db.commit()
-    db.refresh(new_tx)
     return new_tx
 
 
@@ -48,39 +55,220 @@ def get_transactions(
     end_date: Optional[date] = None,
     min_amount: Optional[float] = None,
     max_amount: Optional[float] = None,
+    spend_category_match: str = "any",
 ) -> List[Transaction]:
-    """The ONE query function that handles all filtering."""
-    query = session.query(Transaction)
-    
-    # Apply filters
-    if search:
-        query = query.filter(Transaction.description.ilike(f"%{search}%"))
+    """
+    The ONE query function that handles all filtering (archived years included).
+    spend_category_match is "any" (a transaction in one of spend_category_ids) or "all".
+    """
+    spec = FilterSpec.from_filters(
+        search = search,
+        cost_center_ids = cost_center_ids,
+        spend_category_ids = spend_category_ids,
+        account = account,
+        start_date = start_date,
+        end_date = end_date,
+        min_amount = min_amount,
+        max_amount = max_amount,
+        spend_category_match = spend_category_match,
+    ).with_category_bits(session.connection())
+    # Load cost centers and spend categories up front (no per-row lazy loads,
+    # and results stay usable after an async session's run_sync returns)
+    statement = cached("list", spec, lambda where: (
+        select(Transaction)
+        .options(joinedload(Transaction.cost_center), selectinload(Transaction.spend_categories))
+        .where(*where)
+    ))
+
+    # Closed years moved to archive files are unioned back in when the date range reaches them
+    with archive.including(session, start_date, end_date):
+        return session.execute(statement, spec.params()).scalars().all()
+
+
+def get_anomalies(
+    session: Session,
+    min_score: float = anomalies.FLAG_SCORE,
+    limit: int = 200,
+    **filters,
+) -> List[Transaction]:
+    """
+    Transactions scored at least min_score (app/crud/anomalies.py), highest first.
+    Accepts the get_transactions filters (archived years included).
+    """
+    spec = FilterSpec.from_filters(**filters).with_category_bits(session.connection())
+    statement = cached("anomalies", spec, lambda where: (
+        select(Transaction)
+        .options(joinedload(Transaction.cost_center), selectinload(Transaction.spend_categories))
+        .where(*where, Transaction.anomaly_score >= bindparam("min_score"))
+        .order_by(Transaction.anomaly_score.desc(), Transaction.id)
+        .limit(bindparam("limit"))
+    ))
 
-    if cost_center_ids:
-        ids = [cost_center_ids] if isinstance(cost_center_ids, int) else cost_center_ids
-        query = query.filter(Transaction.cost_center_id.in_(ids))
+    with archive.including(session, spec.start_date, spec.end_date):
+        return session.execute(statement, {**spec.params(), "min_score": min_score, "limit": limit}).scalars().all()
 
-    if spend_category_ids:
-        ids = [spend_category_ids] if isinstance(spend_category_ids, int) else spend_category_ids
-        query = query.filter(Transaction.spend_categories.any(SpendCategory.id.in_(ids)))
-    
-    if account:
-        accounts = [account] if isinstance(account, str) else account
-        query = query.filter(Transaction.account.in_(accounts))
 
-    if start_date:
-        query = query.filter(Transaction.date >= start_date)
+def get_transaction_columns(session: Session, **filters) -> formats.TransactionColumns:
+    """
+    The get_transactions result as columns for the export formats (archived years included).
+    Selects plain columns, so no Transaction objects are built.
+    """
+    spec = FilterSpec.from_filters(**filters).with_category_bits(session.connection())
+    params = spec.params()
+    link = transaction_spend_categories
+    rows_statement = cached("columns", spec, lambda where: select(
+        Transaction.id, Transaction.date, Transaction.description, Transaction.amount_cents,
+        Transaction.account, Transaction.cost_center_id,
+    ).where(*where))
+    links_statement = cached("column_categories", spec, lambda where: (
+        select(link.c.transaction_id, link.c.spend_category_id)
+        .where(link.c.transaction_id.in_(select(Transaction.id).where(*where)))
+        .order_by(link.c.transaction_id, link.c.spend_category_id)
+    ))
+
+    # Plain Core statements run on the session's connection, skipping the ORM result layer
+    conn = session.connection()
+    with archive.including(session, spec.start_date, spec.end_date):
+        rows = conn.execute(rows_statement, params).all()
+        links = conn.execute(links_statement, params).all()
+    cost_center_names = dict(conn.execute(select(CostCenter.id, CostCenter.name)).all())
+    category_names = dict(conn.execute(select(SpendCategory.id, SpendCategory.name)).all())
+
+    categories = {}
+    for tx_id, category_id in links:
+        categories.setdefault(tx_id, []).append(category_id)
+
+    account_codes = {}
+    used_cost_centers, used_categories = set(), set()
+    for _, _, _, _, account_name, cost_center_id in rows:
+        account_codes.setdefault(account_name, len(account_codes))
+        used_cost_centers.add(cost_center_id)
+    for _, category_id in links:
+        used_categories.add(category_id)
+
+    return formats.TransactionColumns(
+        ids = [row[0] for row in rows],
+        dates = [row[1] for row in rows],
+        descriptions = [row[2] for row in rows],
+        amounts = [row[3] / 100 for row in rows],
+        accounts = [account_codes[row[4]] for row in rows],
+        cost_center_ids = [row[5] for row in rows],
+        spend_category_ids = [categories.get(row[0], []) for row in rows],
+        account_names = list(account_codes),
+        cost_center_names = {i: cost_center_names.get(i) for i in used_cost_centers if i is not None},
+        category_names = {i: category_names.get(i) for i in used_categories},
+    )
 
-    if end_date:
-        query = query.filter(Transaction.date <= end_date)
-    
-    if min_amount is not None:
-        query = query.filter(Transaction.amount >= min_amount)
 
-    if max_amount is not None:
-        query = query.filter(Transaction.amount <= max_amount)
-    
-    return query.all()
+def get_summary(session: Session, **filters) -> dict:
+    """
+    Common aggregates over the filtered transactions: totals, plus
+    per cost center and per month breakdowns. Accepts the get_transactions
+    filters (archived years included).
+    """
+    spec = FilterSpec.from_filters(**filters).with_category_bits(session.connection())
+    params = spec.params()
+
+    # Integer SUMs over cents are exact; convert to dollars only for the response
+    cents = Transaction.amount_cents
+    totals = cached("summary_totals", spec, lambda where: select(
+        func.count(Transaction.id),
+        func.coalesce(func.sum(cents), 0),
+        func.coalesce(func.sum(case((cents > 0, cents), else_=0)), 0),
+        func.coalesce(func.sum(case((cents < 0, cents), else_=0)), 0),
+    ).where(*where))
+    by_cost_center_statement = cached("summary_cost_centers", spec, lambda where: (
+        select(CostCenter.id, CostCenter.name, func.count(Transaction.id), func.sum(cents))
+        .join_from(Transaction, CostCenter)
+        .where(*where)
+        .group_by(CostCenter.id)
+        .order_by(CostCenter.name)
+    ))
+    by_month_statement = cached("summary_months", spec, lambda where: _by_month(where))
+
+    conn = session.connection()
+    with archive.including(session, spec.start_date, spec.end_date):
+        count, total, income, expenses = conn.execute(totals, params).one()
+        by_cost_center = conn.execute(by_cost_center_statement, params).all()
+        by_month = conn.execute(by_month_statement, params).all()
+
+    return {
+        "count": count,
+        "total": total / 100,
+        "income": income / 100,
+        "expenses": expenses / 100,
+        "by_cost_center": [
+            {"id": cc_id, "name": name, "count": n, "total": amount / 100}
+            for cc_id, name, n, amount in by_cost_center
+        ],
+        "by_month": [
+            {"month": label, "count": n, "total": amount / 100}
+            for label, n, amount in by_month
+        ],
+    }
+
+
+def _by_month(where):
+    month = func.strftime('%Y-%m', Transaction.date)
+    return (
+        select(month, func.count(Transaction.id), func.sum(Transaction.amount_cents))
+        .where(*where)
+        .group_by(month)
+        .order_by(month)
+    )
+
+
+def get_facets(session: Session, **filters) -> dict:
+    """
+    Every cost center, spend category and account with the count and total of
+    matching transactions. Accepts the get_transactions filters.
+
+    Each facet ignores its own filter (selecting "Meals" still shows how many
+    transactions "Car" would add). All queries share the session's read transaction.
+    """
+    conn = session.connection()
+    spec = FilterSpec.from_filters(**filters).with_category_bits(conn)
+    cents = Transaction.amount_cents
+    measures = (func.count(Transaction.id), func.coalesce(func.sum(cents), 0))
+    link = transaction_spend_categories
+
+    def grouped(name: str, key, facet_filter: str, join: bool = False) -> dict:
+        facet_spec = spec.without(facet_filter)
+
+        def build(where):
+            statement = select(key, *measures)
+            if join:
+                statement = statement.join_from(Transaction, link)
+            return statement.where(*where).group_by(key)
+
+        statement = cached(name, facet_spec, build)
+        return {value: (n, amount) for value, n, amount in conn.execute(statement, facet_spec.params())}
+
+    by_cost_center = grouped("facet_cost_centers", Transaction.cost_center_id, "cost_center_ids")
+    by_category = grouped("facet_categories", link.c.spend_category_id, "spend_category_ids", join = True)
+    by_account = grouped("facet_accounts", Transaction.account, "account")
+    totals = cached("facet_totals", spec, lambda where: select(*measures).where(*where))
+    count, total = conn.execute(totals, spec.params()).one()
+
+    def values(rows, counts) -> List[dict]:
+        # rows: (id, name, key into counts); values with no matches get zeros
+        result = []
+        for value_id, name, key in rows:
+            n, amount = counts.get(key, (0, 0))
+            result.append({"id": value_id, "name": name, "count": n, "total": amount / 100})
+        return result
+
+    cost_centers = session.query(CostCenter.id, CostCenter.name).order_by(CostCenter.name)
+    categories = session.query(SpendCategory.id, SpendCategory.name).order_by(SpendCategory.name)
+    accounts = session.query(Account.name).order_by(Account.name)
+
+    return {
+        "count": count,
+        "total": total / 100,
+        "cost_centers": values(((i, name, i) for i, name in cost_centers), by_cost_center),
+        "spend_categories": values(((i, name, i) for i, name in categories), by_category),
+        "accounts": values(((None, name, name) for (name,) in accounts), by_account),
+    }
 
 
 # ============================================
@@ -89,39 +277,59 @@ def get_transactions(
 
 
 def update_transaction(db: Session, tx_id: int, txn: schemas.TransactionUpdate):
-    """Update a transaction with auto-cleanup of orphaned categories."""
+    """Update a transaction with auto-cleanup of orphaned categories, in a single commit."""
     existing = db.get(Transaction, tx_id)
     if not existing:
         return None
     
     # Store old cost center/spend categories for cleanup
     old_cost_center_id = existing.cost_center_id
-    old_spend_categories = list(existing.spend_categories)
+    old_cost_center_name = existing.cost_center.name if existing.cost_center else None
+    old_spend_category_ids = [c.id for c in existing.spend_categories]
+    old_account = existing.account
+    old_amount = (old_cost_center_name, existing.description, existing.amount_cents)
     
     # Update fields
     update_data = txn.model_dump(exclude_unset=True)
+    affects_score = bool(update_data.keys() & {'amount', 'description', 'cost_center_name'})
     
     # Handle categories
     if 'cost_center_name' in update_data:
-        existing.cost_center = _get_or_create_cost_center(db, update_data.pop('cost_center_name'))
+        existing.cost_center = dimensions.resolve_cost_center(db, update_data.pop('cost_center_name'))
     
     if 'spend_category_names' in update_data:
-        existing.spend_categories = _resolve_spend_categories(db, update_data.pop('spend_category_names'))
+        existing.spend_categories = dimensions.resolve_spend_categories(db, update_data.pop('spend_category_names') or [])
+    
+    if update_data.get('account') and update_data['account'] != old_account:
+        dimensions.ensure_accounts(db, [update_data['account']])
     
     # Update scalar fields
     for field, value in update_data.items():
         setattr(existing, field, value)
     
-    db.commit()
-    db.refresh(existing)
+    # Keep amount sketches in sync, only if the amount or its cost center / account actually changed
+    old_sketched = (old_cost_center_name, old_account, old_amount[2])
+    new_sketched = (existing.cost_center.name, existing.account, existing.amount_cents)
+    if new_sketched != old_sketched:
+        distributions.record_amounts(db, [new_sketched])
+        distributions.forget_amounts(db, [old_sketched])
     
-    # Cleanup orphaned cost center (if changed)
-    if old_cost_center_id and old_cost_center_id != existing.cost_center_id:
-        _cleanup_orphaned_cost_center(db, old_cost_center_id)
+    # Re-score against the history without the old values
+    if affects_score:
+        anomalies.remove_amounts(db, [old_amount])
+        existing.anomaly_score = anomalies.record_amounts(
+            db, [(existing.cost_center.name, existing.description, existing.amount_cents)]
+        )[0]
     
-    # Cleanup orphaned categories
-    _cleanup_orphaned_spend_categories(db, old_spend_categories)
-
+    # Cleanup orphaned cost center / categories left behind by the change
+    dimensions.delete_orphans(
+        db,
+        cost_center_ids=[old_cost_center_id] if old_cost_center_id != existing.cost_center.id else [],
+        spend_category_ids=old_spend_category_ids,
+        accounts=[old_account] if old_account != existing.account else [],
+    )
+    
+    db.commit()
     return existing
 
 
@@ -138,19 +346,24 @@ def delete_transaction(db: Session, tx_id: int) -> bool:
     
     # Store references before deletion
     old_cost_center_id = tx.cost_center_id
-    old_spend_categories = list(tx.spend_categories)
+    old_cost_center_name = tx.cost_center.name if tx.cost_center else None
+    old_spend_category_ids = [c.id for c in tx.spend_categories]
+    old_account = tx.account
     
     # Delete the transaction
     db.delete(tx)
-    db.commit()
+    distributions.forget_amounts(db, [(old_cost_center_name, old_account, tx.amount_cents)])
+    anomalies.remove_amounts(db, [(old_cost_center_name, tx.description, tx.amount_cents)])
     
-    # Cleanup orphaned cost center
-    if old_cost_center_id:
-        _cleanup_orphaned_cost_center(db, old_cost_center_id)
-
-    # Cleanup orphaned spend categories
-    _cleanup_orphaned_spend_categories(db, old_spend_categories)
+    # Cleanup orphaned cost center / spend categories
+    dimensions.delete_orphans(
+        db,
+        cost_center_ids=[old_cost_center_id],
+        spend_category_ids=old_spend_category_ids,
+        accounts=[old_account],
+    )
     
+    db.commit()
     return True
 
 
@@ -170,110 +383,5 @@ def get_all_spend_categories(session: Session) -> List[SpendCategory]:
 
 
 def get_unique_accounts(session: Session) -> List[str]:
-    """Get all unique account names."""
-    return [acc for (acc,) in session.query(Transaction.account).distinct().order_by(Transaction.account).all()]
-
-
-# ============================================
-# INTERNAL HELPERS
-# ============================================
-
-
-def _get_or_create_cost_center(db: Session, name: Optional[str]) -> CostCenter:
-    """Get or create a cost center."""
-    if not name or not name.strip():
-        name = "Uncategorized"
-    
-    cost_center = db.query(CostCenter).filter(CostCenter.name == name).first()
-    if not cost_center:
-        cost_center = CostCenter(name=name)
-        db.add(cost_center)
-        db.commit()
-        db.refresh(cost_center)
-    
-    return cost_center
-
-
-def _get_or_create_spend_category(db: Session, name: Optional[str]) -> SpendCategory:
-    """Get or create a spend category."""
-    if not name or not name.strip():
-        name = "Uncategorized"
-    
-    spend_category = db.query(SpendCategory).filter(SpendCategory.name == name).first()
-    if not spend_category:
-        spend_category = SpendCategory(name=name)
-        db.add(spend_category)
-        db.commit()
-        db.refresh(spend_category)
-    
-    return spend_category
-
-
-def _resolve_spend_categories(db: Session, names: List[str]) -> List[SpendCategory]:
-    """Get or create spend categories from names."""
-    if not names:
-        names = ["Uncategorized"]
-    
-    categories = []
-    seen = set()
-    
-    for name in names:
-        name = name.strip()
-        if not name or name in seen:
-            continue
-        
-        category = _get_or_create_spend_category(db, name)
-        categories.append(category)
-        seen.add(name)
-    
-    return categories if categories else [_get_or_create_spend_category(db, "Uncategorized")]
-
-
-# ============================================
-# CLEANUP HELPERS (Auto-cleanup orphaned items)
-# ============================================
-
-
-def _cleanup_orphaned_spend_categories(db: Session, old_categories: List[SpendCategory]) -> None:
-    """
-    Delete spend categories that are no longer used by any transactions.
-    Called after transaction update/delete.
-    """
-    for category in old_categories:
-        try:
-            # Refresh to get latest state from database
-            db.refresh(category)
-            
-            # Check if this category is still used by any transaction
-            if not category.transactions:
-                db.delete(category)
-        except Exception:
-            # Category might already be deleted or session issues
-            pass
-    
-    # Commit all deletions at once
-    try:
-        db.commit()
-    except Exception:
-        db.rollback()
-
-
-def _cleanup_orphaned_cost_center(db: Session, cost_center_id: int) -> None:
-    """
-    Delete a cost center if it's no longer used by any transactions.
-    Called after transaction update/delete.
-    """
-    try:
-        cost_center = db.get(CostCenter, cost_center_id)
-        if not cost_center:
-            return
-        
-        # Refresh to get latest state
-        db.refresh(cost_center)
-        
-        # Check if this cost center is still used
-        if not cost_center.transactions:
-            db.delete(cost_center)
-            db.commit()
-    except Exception:
-        db.rollback()
+    """Get all unique account names (from the accounts table, not a scan of transactions)."""
+    return [name for (name,) in session.query(Account.name).order_by(Account.name).all()]
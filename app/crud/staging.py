@@ -0,0 +1,494 @@
+# app/crud/staging.py - uploads staged in a temp table: set-based diff against the ledger, promotion and edits
+from sqlalchemy.orm import Session
+
+import datetime
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+from app import archive, events
+from app.crud import anomalies, category_bits, dimensions, distributions
+from app.models import Account, CostCenter, SpendCategory
+from app.money import from_cents
+from app.profiling import StageTimer, stage
+from app.records import ParsedTransaction
+
+
+STAGING = "import_staging"
+STAGING_CATEGORIES = "import_staging_categories"
+STAGING_UPDATES = "import_staging_updates"
+STAGING_ARCHIVED = "import_staging_archived"
+SAMPLE_SIZE = 20
+
+# Bits of import_staging_updates.changed: which fields of the ledger row the staged row changes
+CHANGED_FIELDS = {
+    "date": 1,
+    "description": 2,
+    "amount": 4,
+    "account": 8,
+    "cost_center": 16,
+    "spend_categories": 32,
+}
+ROW_FIELDS = 1 | 2 | 4 | 8 | 16      # columns of transactions
+AMOUNT_KEYS = 4 | 8 | 16             # what the amount sketches are keyed on
+SCORE_KEYS = 2 | 4 | 16              # what anomaly scores depend on (merchant from the description)
+
+
+@contextmanager
+def staged(
+    db: Session,
+    transactions: Sequence[ParsedTransaction],
+    timer: Optional[StageTimer] = None,
+    upsert: bool = False,
+):
+    """
+    Bulk-load parsed rows into temp tables on the session's connection and mark
+    the ones already in the ledger (timed as "stage"). The tables are dropped on exit.
+
+    Temp tables live outside the database file, so staging a preview takes no
+    write lock. Names are stored cleaned, the way the loader would save them.
+
+    With upsert, rows whose ID is in the ledger are edits: they move to the
+    updates table, diffed field by field against their ledger rows, and are
+    neither new nor duplicates. Rows whose ID is in an archived year (exports
+    include them) are read-only: they move to the archived table and are
+    neither loaded nor applied. Other rows (no ID, or an ID no longer in the
+    ledger) are deduplicated as usual.
+    """
+    with stage(timer, "stage"):
+        conn = _stage(db, transactions, upsert)
+    try:
+        yield conn
+    finally:
+        _drop(conn)
+
+
+def _stage(db: Session, transactions: Sequence[ParsedTransaction], upsert: bool = False):
+    conn = db.connection()
+    _drop(conn)
+    # Same column types (so the same affinities) as transactions, or the joins can't use indexes
+    conn.exec_driver_sql(
+        f"CREATE TEMP TABLE {STAGING} ("
+        "row_id INTEGER PRIMARY KEY, date DATE NOT NULL, description VARCHAR NOT NULL, "
+        "amount_cents INTEGER NOT NULL, account VARCHAR NOT NULL, cost_center VARCHAR NOT NULL, "
+        "duplicate INTEGER NOT NULL DEFAULT 0, transaction_id INTEGER, ledger_id INTEGER, anomaly_score REAL)"
+    )
+    conn.exec_driver_sql(
+        f"CREATE TEMP TABLE {STAGING_CATEGORIES} (row_id INTEGER NOT NULL, name VARCHAR NOT NULL, PRIMARY KEY (row_id, name))"
+    )
+    conn.exec_driver_sql(
+        f"CREATE TEMP TABLE {STAGING_UPDATES} ("
+        "row_id INTEGER PRIMARY KEY, id INTEGER NOT NULL UNIQUE, date DATE NOT NULL, description VARCHAR NOT NULL, "
+        "amount_cents INTEGER NOT NULL, account VARCHAR NOT NULL, cost_center VARCHAR NOT NULL, "
+        "changed INTEGER NOT NULL DEFAULT 0)"
+    )
+    conn.exec_driver_sql(f"CREATE TEMP TABLE {STAGING_ARCHIVED} (id INTEGER PRIMARY KEY)")
+    rows, links = [], []
+    cleaned_cost_centers, cleaned_categories = {}, {}
+    for row_id, t in enumerate(transactions, start=1):
+        if t.cost_center not in cleaned_cost_centers:
+            cleaned_cost_centers[t.cost_center] = dimensions.clean_names([t.cost_center])[0]
+        if t.spend_categories not in cleaned_categories:
+            cleaned_categories[t.spend_categories] = dimensions.clean_names(t.spend_categories)
+        rows.append((
+            row_id, t.date.isoformat(), t.description, t.amount_cents, t.account,
+            cleaned_cost_centers[t.cost_center], t.id if upsert else None,
+        ))
+        links.extend((row_id, name) for name in cleaned_categories[t.spend_categories])
+    conn.exec_driver_sql(
+        f"INSERT INTO {STAGING} (row_id, date, description, amount_cents, account, cost_center, ledger_id) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.exec_driver_sql(f"INSERT INTO {STAGING_CATEGORIES} (row_id, name) VALUES (?, ?)", links)
+    if upsert:
+        _split_updates(conn)
+    _mark_duplicates(conn)
+    return conn
+
+
+def _split_updates(conn) -> None:
+    """
+    Move staged rows whose ledger_id is in the ledger to the updates table and
+    flag the fields each one changes. If an ID repeats, its last row wins.
+    Rows whose ledger_id is archived move to the archived table.
+    """
+    conn.exec_driver_sql(f"""
+        INSERT INTO {STAGING_UPDATES} (row_id, id, date, description, amount_cents, account, cost_center)
+        SELECT s.row_id, s.ledger_id, s.date, s.description, s.amount_cents, s.account, s.cost_center
+        FROM {STAGING} s
+        WHERE s.row_id IN (SELECT MAX(row_id) FROM {STAGING} WHERE ledger_id IS NOT NULL GROUP BY ledger_id)
+          AND EXISTS (SELECT 1 FROM transactions t WHERE t.id = s.ledger_id)
+    """)
+    conn.exec_driver_sql(f"""
+        DELETE FROM {STAGING}
+        WHERE ledger_id IS NOT NULL AND EXISTS (SELECT 1 FROM transactions t WHERE t.id = {STAGING}.ledger_id)
+    """)
+
+    # Archived years are read-only; loaded as new rows, these would duplicate the archived ones
+    archived = archive.archived_ids(
+        conn, conn.exec_driver_sql(f"SELECT ledger_id FROM {STAGING} WHERE ledger_id IS NOT NULL").scalars()
+    )
+    if archived:
+        conn.exec_driver_sql(f"INSERT INTO {STAGING_ARCHIVED} (id) VALUES (?)", [(tx_id,) for tx_id in archived])
+        conn.exec_driver_sql(f"DELETE FROM {STAGING} WHERE ledger_id IN (SELECT id FROM {STAGING_ARCHIVED})")
+
+    bits = CHANGED_FIELDS
+    u = STAGING_UPDATES
+    conn.exec_driver_sql(f"""
+        UPDATE {u} SET changed =
+            {bits["date"]} * (t.date IS NOT {u}.date)
+            + {bits["description"]} * (t.description IS NOT {u}.description)
+            + {bits["amount"]} * (t.amount_cents IS NOT {u}.amount_cents)
+            + {bits["account"]} * (t.account IS NOT {u}.account)
+            + {bits["cost_center"]} * (cc.name IS NOT {u}.cost_center)
+        FROM transactions t LEFT JOIN cost_centers cc ON cc.id = t.cost_center_id
+        WHERE t.id = {u}.id
+    """)
+    # Category sets differ if either side has a name the other lacks
+    ledger_names = (
+        "SELECT sc.name FROM transaction_spend_categories l JOIN spend_categories sc ON sc.id = l.spend_category_id "
+        f"WHERE l.transaction_id = {u}.id"
+    )
+    conn.exec_driver_sql(f"""
+        UPDATE {u} SET changed = changed | {bits["spend_categories"]}
+        WHERE EXISTS (
+            SELECT 1 FROM {STAGING_CATEGORIES} c WHERE c.row_id = {u}.row_id AND c.name NOT IN ({ledger_names})
+        ) OR EXISTS (
+            SELECT 1 FROM ({ledger_names}) AS ledger
+            WHERE NOT EXISTS (SELECT 1 FROM {STAGING_CATEGORIES} c WHERE c.row_id = {u}.row_id AND c.name = ledger.name)
+        )
+    """)
+
+
+def _mark_duplicates(conn) -> None:
+    """
+    Flag staged rows whose (date, description, amount, account) is already in the ledger.
+
+    Identical rows are counted, not collapsed: the n-th staged copy of a key is
+    a duplicate only if the ledger holds at least n copies of it.
+    """
+    # Scan the ledger's rows in the upload's accounts and date range once, probing the staged keys by index
+    conn.exec_driver_sql(f"CREATE INDEX temp.{STAGING}_key ON {STAGING} (date, description, amount_cents, account)")
+    conn.exec_driver_sql(f"""
+        WITH ledger AS (
+            SELECT t.date, t.description, t.amount_cents, t.account, COUNT(*) AS copies
+            FROM transactions t
+            WHERE t.account IN (SELECT DISTINCT account FROM {STAGING})
+              AND t.date >= (SELECT MIN(date) FROM {STAGING})
+              AND EXISTS (
+                  SELECT 1 FROM {STAGING} s
+                  WHERE s.date = t.date AND s.description = t.description
+                    AND s.amount_cents = t.amount_cents AND s.account = t.account
+              )
+            GROUP BY t.date, t.description, t.amount_cents, t.account
+        ),
+        ranked AS (
+            SELECT row_id, date, description, amount_cents, account, ROW_NUMBER() OVER (
+                PARTITION BY date, description, amount_cents, account ORDER BY row_id
+            ) AS copy
+            FROM {STAGING}
+        )
+        UPDATE {STAGING} SET duplicate = 1
+        WHERE row_id IN (
+            SELECT ranked.row_id FROM ranked JOIN ledger USING (date, description, amount_cents, account)
+            WHERE ranked.copy <= ledger.copies
+        )
+    """)
+
+
+def _drop(conn) -> None:
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS temp.{STAGING}")
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS temp.{STAGING_CATEGORIES}")
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS temp.{STAGING_UPDATES}")
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS temp.{STAGING_ARCHIVED}")
+
+
+# ============================================
+# DIFF
+# ============================================
+
+
+def per_account(conn) -> List[Dict[str, Any]]:
+    """New / duplicate row counts and the date range of the new rows, per account."""
+    rows = conn.exec_driver_sql(f"""
+        SELECT account, SUM(duplicate = 0), SUM(duplicate),
+               MIN(CASE WHEN duplicate = 0 THEN date END), MAX(CASE WHEN duplicate = 0 THEN date END)
+        FROM {STAGING} GROUP BY account ORDER BY account
+    """)
+    return [
+        {
+            "account": account,
+            "new": new,
+            "duplicates": duplicates,
+            "first_date": first and datetime.date.fromisoformat(first),
+            "last_date": last and datetime.date.fromisoformat(last),
+        }
+        for account, new, duplicates, first, last in rows
+    ]
+
+
+# Distinct names used by the new rows and by the edits that change them, per dimension
+_USED_NAMES = {
+    CostCenter: f"""
+        SELECT cost_center AS name FROM {STAGING} WHERE duplicate = 0
+        UNION SELECT cost_center FROM {STAGING_UPDATES} WHERE changed & {CHANGED_FIELDS["cost_center"]}
+    """,
+    SpendCategory: f"""
+        SELECT c.name AS name FROM {STAGING_CATEGORIES} c JOIN {STAGING} s ON s.row_id = c.row_id WHERE s.duplicate = 0
+        UNION SELECT c.name FROM {STAGING_CATEGORIES} c JOIN {STAGING_UPDATES} u ON u.row_id = c.row_id
+        WHERE u.changed & {CHANGED_FIELDS["spend_categories"]}
+    """,
+    Account: f"""
+        SELECT account AS name FROM {STAGING} WHERE duplicate = 0
+        UNION SELECT account FROM {STAGING_UPDATES} WHERE changed & {CHANGED_FIELDS["account"]}
+    """,
+}
+
+
+def new_names(conn) -> Dict[str, List[str]]:
+    """Cost centers, spend categories and accounts the new rows and edits would create."""
+    tables = {"cost_centers": CostCenter, "spend_categories": SpendCategory, "accounts": Account}
+    names = {}
+    for key, model in tables.items():
+        table = model.__tablename__
+        names[key] = list(conn.exec_driver_sql(
+            f"SELECT name FROM ({_USED_NAMES[model]}) AS staged "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {table}.name = staged.name) ORDER BY name"
+        ).scalars())
+    return names
+
+
+def update_counts(conn) -> Dict[str, int]:
+    """Staged edits of ledger rows that change something, those that don't, and those of archived (read-only) rows."""
+    updated, unchanged = conn.exec_driver_sql(
+        f"SELECT COALESCE(SUM(changed != 0), 0), COALESCE(SUM(changed = 0), 0) FROM {STAGING_UPDATES}"
+    ).one()
+    archived = conn.exec_driver_sql(f"SELECT COUNT(*) FROM {STAGING_ARCHIVED}").scalar()
+    return {"updated": updated, "unchanged": unchanged, "archived": archived}
+
+
+def sample(conn, duplicate: bool, limit: int = SAMPLE_SIZE) -> List[Dict[str, Any]]:
+    """The first `limit` new (or duplicate) rows in file order."""
+    rows = conn.exec_driver_sql(f"""
+        SELECT s.date, s.description, s.amount_cents, s.account, s.cost_center, group_concat(c.name, char(31))
+        FROM (SELECT * FROM {STAGING} WHERE duplicate = ? ORDER BY row_id LIMIT ?) s
+        JOIN {STAGING_CATEGORIES} c ON c.row_id = s.row_id
+        GROUP BY s.row_id ORDER BY s.row_id
+    """, (int(duplicate), limit))
+    return [
+        {
+            "date": datetime.date.fromisoformat(day),
+            "description": description,
+            "amount": float(from_cents(amount_cents)),
+            "account": account,
+            "cost_center": cost_center,
+            "spend_categories": categories.split("\x1f"),
+        }
+        for day, description, amount_cents, account, cost_center, categories in rows
+    ]
+
+
+def sample_updates(conn, limit: int = SAMPLE_SIZE) -> List[Dict[str, Any]]:
+    """The first `limit` edits that change their ledger row, with the new values and the changed fields."""
+    rows = conn.exec_driver_sql(f"""
+        SELECT u.id, u.date, u.description, u.amount_cents, u.account, u.cost_center, u.changed,
+               group_concat(c.name, char(31))
+        FROM (SELECT * FROM {STAGING_UPDATES} WHERE changed != 0 ORDER BY row_id LIMIT ?) u
+        JOIN {STAGING_CATEGORIES} c ON c.row_id = u.row_id
+        GROUP BY u.row_id ORDER BY u.row_id
+    """, (limit,))
+    return [
+        {
+            "id": tx_id,
+            "date": datetime.date.fromisoformat(day),
+            "description": description,
+            "amount": float(from_cents(amount_cents)),
+            "account": account,
+            "cost_center": cost_center,
+            "spend_categories": categories.split("\x1f"),
+            "changes": [field for field, bit in CHANGED_FIELDS.items() if changed & bit],
+        }
+        for tx_id, day, description, amount_cents, account, cost_center, changed, categories in rows
+    ]
+
+
+def preview(
+    db: Session,
+    transactions: Sequence[ParsedTransaction],
+    sample_size: int = SAMPLE_SIZE,
+    upsert: bool = False,
+) -> Dict[str, Any]:
+    """What loading these rows would do, without writing to the ledger."""
+    with staged(db, transactions, upsert = upsert) as conn:
+        accounts = per_account(conn)
+        return {
+            "rows": len(transactions),
+            "new": sum(a["new"] for a in accounts),
+            "duplicates": sum(a["duplicates"] for a in accounts),
+            **update_counts(conn),
+            "accounts": accounts,
+            "new_names": new_names(conn),
+            "sample": {
+                "new": sample(conn, False, sample_size),
+                "duplicates": sample(conn, True, sample_size),
+                "updated": sample_updates(conn, sample_size),
+            },
+        }
+
+
+# ============================================
+# PROMOTE
+# ============================================
+
+
+def promote(db: Session, conn, timer: Optional[StageTimer] = None) -> int:
+    """
+    Insert the staged rows that aren't duplicates into the ledger and apply the
+    staged edits; nothing is committed.
+
+    Dimensions are created first (a handful of names), then the rows and their
+    category links go in with one INSERT ... SELECT each, and the edits with one
+    UPDATE ... FROM plus a rewrite of the changed category links. Returns the
+    inserted row count.
+    """
+    with stage(timer, "dimensions"):
+        _create_dimensions(db, conn)
+    with stage(timer, "insert"):
+        count = _insert(db, conn)
+    with stage(timer, "update"):
+        _update(db, conn)
+    return count
+
+
+def _create_dimensions(db: Session, conn) -> None:
+    dimensions.get_or_create(db, CostCenter, conn.exec_driver_sql(_USED_NAMES[CostCenter]).scalars())
+    dimensions.get_or_create(db, SpendCategory, conn.exec_driver_sql(_USED_NAMES[SpendCategory]).scalars())
+    dimensions.ensure_accounts(db, conn.exec_driver_sql(_USED_NAMES[Account]).scalars())
+
+
+def _insert(db: Session, conn) -> int:
+    # Ids are assigned here so the category links can be joined on them
+    last_id = conn.exec_driver_sql(
+        "SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'transactions'), 0), "
+        "COALESCE((SELECT MAX(id) FROM transactions), 0))"
+    ).scalar()
+    conn.exec_driver_sql(f"""
+        UPDATE {STAGING} SET transaction_id = ? + numbered.n
+        FROM (SELECT row_id, ROW_NUMBER() OVER (ORDER BY row_id) AS n FROM {STAGING} WHERE duplicate = 0) AS numbered
+        WHERE {STAGING}.row_id = numbered.row_id
+    """, (last_id,))
+
+    # Scored in date order, so each row is compared with the history before it
+    new_rows = conn.exec_driver_sql(
+        f"SELECT row_id, cost_center, description, amount_cents FROM {STAGING} WHERE duplicate = 0 ORDER BY date, row_id"
+    ).all()
+    scores = anomalies.record_amounts(db, (row[1:] for row in new_rows))
+    scored = [(score, row[0]) for row, score in zip(new_rows, scores) if score is not None]
+    if scored:
+        conn.exec_driver_sql(f"UPDATE {STAGING} SET anomaly_score = ? WHERE row_id = ?", scored)
+
+    # Category masks from the staged names, as the links don't exist yet
+    count = conn.exec_driver_sql(f"""
+        INSERT INTO transactions (id, date, description, amount_cents, account, cost_center_id, category_mask, anomaly_score)
+        SELECT s.transaction_id, s.date, s.description, s.amount_cents, s.account, cc.id, (
+            SELECT COALESCE(SUM(1 << sc.bit), 0)
+            FROM {STAGING_CATEGORIES} c JOIN spend_categories sc ON sc.name = c.name
+            WHERE c.row_id = s.row_id AND sc.bit IS NOT NULL
+        ), s.anomaly_score
+        FROM {STAGING} s JOIN cost_centers cc ON cc.name = s.cost_center
+        WHERE s.duplicate = 0 ORDER BY s.transaction_id
+    """).rowcount
+    conn.exec_driver_sql(f"""
+        INSERT INTO transaction_spend_categories (transaction_id, spend_category_id)
+        SELECT s.transaction_id, sc.id
+        FROM {STAGING} s
+        JOIN {STAGING_CATEGORIES} c ON c.row_id = s.row_id
+        JOIN spend_categories sc ON sc.name = c.name
+        WHERE s.duplicate = 0
+    """)
+
+    distributions.record_amounts(db, conn.exec_driver_sql(
+        f"SELECT cost_center, account, amount_cents FROM {STAGING} WHERE duplicate = 0"
+    ))
+    # Core inserts bypass the flush tracking
+    events.note(db, events.LedgerChanges(transaction_ids=set(range(last_id + 1, last_id + count + 1))))
+    return count
+
+
+def _update(db: Session, conn) -> int:
+    """Write the changed fields of the staged edits; unchanged rows aren't touched."""
+    ids = conn.exec_driver_sql(f"SELECT id FROM {STAGING_UPDATES} WHERE changed != 0").scalars().all()
+    if not ids:
+        return 0
+
+    # What the edited rows held before, for the sketches and the orphan cleanup
+    old_rows = conn.exec_driver_sql(f"""
+        SELECT u.changed, t.cost_center_id, cc.name, t.account, u.cost_center, u.account
+        FROM {STAGING_UPDATES} u
+        JOIN transactions t ON t.id = u.id
+        LEFT JOIN cost_centers cc ON cc.id = t.cost_center_id
+        WHERE u.changed & {ROW_FIELDS}
+    """).fetchall()
+    rescored = conn.exec_driver_sql(f"""
+        SELECT u.id, cc.name, t.description, t.amount_cents, u.cost_center, u.description, u.amount_cents
+        FROM {STAGING_UPDATES} u
+        JOIN transactions t ON t.id = u.id
+        LEFT JOIN cost_centers cc ON cc.id = t.cost_center_id
+        WHERE u.changed & {SCORE_KEYS}
+        ORDER BY u.date, u.id
+    """).fetchall()
+    old_category_ids = conn.exec_driver_sql(f"""
+        SELECT DISTINCT l.spend_category_id
+        FROM {STAGING_UPDATES} u JOIN transaction_spend_categories l ON l.transaction_id = u.id
+        WHERE u.changed & {CHANGED_FIELDS["spend_categories"]}
+    """).scalars().all()
+
+    conn.exec_driver_sql(f"""
+        UPDATE transactions SET
+            date = u.date, description = u.description, amount_cents = u.amount_cents,
+            account = u.account, cost_center_id = cc.id
+        FROM {STAGING_UPDATES} u JOIN cost_centers cc ON cc.name = u.cost_center
+        WHERE transactions.id = u.id AND u.changed & {ROW_FIELDS}
+    """)
+    conn.exec_driver_sql(f"""
+        DELETE FROM transaction_spend_categories
+        WHERE transaction_id IN (
+            SELECT id FROM {STAGING_UPDATES} WHERE changed & {CHANGED_FIELDS["spend_categories"]}
+        )
+    """)
+    conn.exec_driver_sql(f"""
+        INSERT INTO transaction_spend_categories (transaction_id, spend_category_id)
+        SELECT u.id, sc.id
+        FROM {STAGING_UPDATES} u
+        JOIN {STAGING_CATEGORIES} c ON c.row_id = u.row_id
+        JOIN spend_categories sc ON sc.name = c.name
+        WHERE u.changed & {CHANGED_FIELDS["spend_categories"]}
+    """)
+    category_bits.refresh_masks(
+        conn, f"SELECT id FROM {STAGING_UPDATES} WHERE changed & {CHANGED_FIELDS['spend_categories']}"
+    )
+
+    # Edited amounts are re-scored against the history without their old values
+    if rescored:
+        anomalies.remove_amounts(db, (row[1:4] for row in rescored))
+        scores = anomalies.record_amounts(db, (row[4:] for row in rescored))
+        conn.exec_driver_sql(
+            "UPDATE transactions SET anomaly_score = ? WHERE id = ?",
+            [(score, row[0]) for row, score in zip(rescored, scores)],
+        )
+
+    # Core statements bypass the flush tracking
+    events.note(db, events.LedgerChanges(transaction_ids=set(ids)))
+    moved = [row for row in old_rows if row[0] & AMOUNT_KEYS]
+    distributions.rebuild_sketches(
+        db,
+        cost_center_names = {name for row in moved for name in (row[2], row[4])},
+        accounts = {account for row in moved for account in (row[3], row[5])},
+    )
+    dimensions.delete_orphans(
+        db,
+        cost_center_ids = {row[1] for row in old_rows if row[0] & CHANGED_FIELDS["cost_center"]},
+        spend_category_ids = old_category_ids,
+        accounts = {row[3] for row in old_rows if row[0] & CHANGED_FIELDS["account"]},
+    )
+    return len(ids)
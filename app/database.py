@@ -1,16 +1,109 @@
 # app/database.py - sets up database
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
-from .models import Base
+import threading
+from typing import Optional
 
+from .config import settings
+from . import migrations
 
-DATABASE_URL = "sqlite:///./transactions.db"
 
+DATABASE_URL = settings.database_url
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def make_engine(url: str) -> Engine:
+    """Create an engine. No connection is opened until the first query."""
+    engine = create_engine(url, connect_args={"check_same_thread": False})
 
-def init_db():
-    Base.metadata.create_all(bind=engine)
+    @event.listens_for(engine, "connect")
+    def _configure_connection(dbapi_connection, connection_record):
+        # Let SQLAlchemy issue BEGIN itself (pysqlite's implicit transactions break SAVEPOINT)
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers run alongside the single writer; wait instead of failing on a held lock
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    return engine
+
+
+def make_sessionmaker(bind: Engine) -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=bind)
+
+
+def make_async_engine(url: str) -> AsyncEngine:
+    """Async engine on the same SQLite file, using the aiosqlite driver."""
+    async_url = make_url(url).set(drivername="sqlite+aiosqlite")
+    return create_async_engine(async_url)
+
+
+def make_async_sessionmaker(bind: AsyncEngine) -> async_sessionmaker:
+    # Read results are used after the session closes, so don't expire them
+    return async_sessionmaker(bind=bind, autoflush=False, expire_on_commit=False)
+
+
+# ============================================
+# DEFAULT DATABASE
+# ============================================
+
+
+# Created on first use, not at import: the API opens one engine per ledger (app/ledgers.py)
+# and only the CLIs and loaders' own-session path use the default database directly
+_default_engine: Optional[Engine] = None
+_default_sessionmaker: Optional[sessionmaker] = None
+_default_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """Engine for settings.database_url, created on first call."""
+    global _default_engine, _default_sessionmaker
+    if _default_engine is None:
+        with _default_lock:
+            if _default_engine is None:
+                engine = make_engine(DATABASE_URL)
+                _default_sessionmaker = make_sessionmaker(engine)
+                _default_engine = engine
+    return _default_engine
+
+
+def get_sessionmaker() -> sessionmaker:
+    """Session factory bound to get_engine()."""
+    get_engine()
+    return _default_sessionmaker
+
+
+def __getattr__(name: str):
+    # `from app.database import engine, SessionLocal` keeps working, without an engine at import time
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_sessionmaker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+def init_db(bind: Optional[Engine] = None):
+    """
+    Create tables for a new database, or migrate an existing one to the current schema.
+    Runs at most once per database per process; later calls return immediately.
+    """
+    bind = bind or get_engine()
+    key = str(bind.url)
+    if key in _initialized:
+        return
+
+    with _init_lock:
+        if key not in _initialized:
+            migrations.upgrade(bind)
+            _initialized.add(key)
@@ -0,0 +1,151 @@
+# app/events.py - publishes committed ledger changes to in-process caches
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from dataclasses import dataclass, field
+from typing import Callable, List, Set
+
+from .models import Transaction, CostCenter, SpendCategory
+
+
+_PENDING_KEY = "pending_ledger_changes"
+
+
+@dataclass
+class LedgerChanges:
+    """
+    What a committed database transaction changed.
+
+    Only ids are tracked; subscribers re-read the rows they care about after
+    commit. Ids that no longer exist should be treated as deleted.
+    """
+    transaction_ids: Set[int] = field(default_factory=set)  # inserted or updated
+    deleted_ids: Set[int] = field(default_factory=set)
+    dimensions: bool = False  # cost centers / spend categories added or removed
+    full: bool = False        # unknown scope (bulk Core writes) - rebuild everything
+
+    def merge(self, other: "LedgerChanges") -> None:
+        self.transaction_ids |= other.transaction_ids
+        self.deleted_ids |= other.deleted_ids
+        self.transaction_ids -= self.deleted_ids
+        self.dimensions = self.dimensions or other.dimensions
+        self.full = self.full or other.full
+
+    def __bool__(self) -> bool:
+        return bool(self.transaction_ids or self.deleted_ids or self.dimensions or self.full)
+
+
+Subscriber = Callable[[Engine, LedgerChanges], None]
+Closer = Callable[[Engine], None]
+
+_subscribers: List[Subscriber] = []
+_closers: List[Closer] = []
+
+
+# ============================================
+# PUBLIC API
+# ============================================
+
+
+def subscribe(callback: Subscriber) -> Subscriber:
+    """Register a callback(engine, changes) run after every commit that touched the ledger."""
+    if callback not in _subscribers:
+        _subscribers.append(callback)
+    return callback
+
+
+def on_close(callback: Closer) -> Closer:
+    """Register a callback(engine) run when a ledger closes its engine, to drop what is cached for it."""
+    if callback not in _closers:
+        _closers.append(callback)
+    return callback
+
+
+def close(engine: Engine) -> None:
+    """Forget every cache held for an engine that is being closed."""
+    for callback in list(_closers):
+        callback(engine)
+
+
+def note(session: Session, changes: LedgerChanges) -> None:
+    """Record changes made with Core statements, which the flush tracking can't see."""
+    _pending(session).merge(changes)
+
+
+def invalidate(engine: Engine) -> None:
+    """Tell every cache to rebuild from scratch (e.g. after a bulk import or restore)."""
+    publish(engine, LedgerChanges(full=True))
+
+
+def publish(engine: Engine, changes: LedgerChanges) -> None:
+    for callback in list(_subscribers):
+        callback(engine, changes)
+
+
+def publish_connection(conn: Connection) -> None:
+    """Publish changes held back on a connection once its outer transaction has committed."""
+    changes = conn.info.pop(_PENDING_KEY, None)
+    if changes:
+        publish(conn.engine, changes)
+
+
+def discard_connection(conn: Connection) -> None:
+    """Drop held-back changes after the outer transaction failed; caches rebuild instead."""
+    if conn.info.pop(_PENDING_KEY, None) is not None:
+        invalidate(conn.engine)
+
+
+# ============================================
+# SESSION HOOKS
+# ============================================
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session: Session, flush_context) -> None:
+    changes = LedgerChanges()
+
+    for obj in session.new:
+        if isinstance(obj, Transaction):
+            changes.transaction_ids.add(obj.id)
+        elif isinstance(obj, (CostCenter, SpendCategory)):
+            changes.dimensions = True
+
+    for obj in session.dirty:
+        if isinstance(obj, Transaction) and session.is_modified(obj):
+            changes.transaction_ids.add(obj.id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Transaction):
+            changes.deleted_ids.add(obj.id)
+        elif isinstance(obj, (CostCenter, SpendCategory)):
+            changes.dimensions = True
+
+    if changes:
+        note(session, changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session: Session) -> None:
+    changes = session.info.pop(_PENDING_KEY, None)
+    if not changes or not _subscribers:
+        return
+
+    bind = session.get_bind()
+    if isinstance(bind, Connection) and bind.in_transaction():
+        # Session joined an outer transaction (app.writer group commit): its commit only
+        # released a savepoint, so hold the changes until the connection really commits
+        bind.info.setdefault(_PENDING_KEY, LedgerChanges()).merge(changes)
+        return
+
+    engine = bind.engine if isinstance(bind, Connection) else bind
+    publish(engine, changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _pending(session: Session) -> LedgerChanges:
+    return session.info.setdefault(_PENDING_KEY, LedgerChanges())
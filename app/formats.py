@@ -0,0 +1,207 @@
+# app/formats.py - alternative encodings for transaction lists: columnar JSON and Arrow IPC
+import datetime
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+
+
+ROWS = "json"
+COLUMNAR = "columnar"
+ARROW = "arrow"
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.finance.columnar+json"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+_MEDIA_TYPES = {COLUMNAR_MEDIA_TYPE: COLUMNAR, ARROW_MEDIA_TYPE: ARROW}
+
+
+# ============================================
+# NEGOTIATION
+# ============================================
+
+
+def negotiate(request: Request) -> str:
+    """
+    Response format for a list endpoint: ?format=json|columnar|arrow wins, then the Accept header.
+    Anything else (including application/json and */*) gets the row JSON.
+
+    ?format is read from the raw query string because the list endpoints take
+    their filters as one query model, which can't share the query with other params.
+    """
+    requested = request.query_params.get("format")
+    if requested:
+        if requested not in (ROWS, COLUMNAR, ARROW):
+            raise HTTPException(status_code=400, detail=f"Unknown format: {requested}")
+        return requested
+
+    for media_type in request.headers.get("accept", "").split(","):
+        fmt = _MEDIA_TYPES.get(media_type.split(";")[0].strip())
+        if fmt:
+            return fmt
+    return ROWS
+
+
+# ============================================
+# COLUMNS
+# ============================================
+
+
+@dataclass
+class TransactionColumns:
+    """
+    A transaction list as parallel columns. Cost centers, spend categories and
+    accounts are dictionary-encoded: rows hold ids / codes, names are listed once.
+    """
+    ids: List[int]
+    dates: List[datetime.date]
+    descriptions: List[str]
+    amounts: List[float]
+    accounts: List[int]                 # codes into account_names
+    cost_center_ids: List[Optional[int]]
+    spend_category_ids: List[List[int]]
+    account_names: List[str]
+    cost_center_names: Dict[int, str]
+    category_names: Dict[int, str]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def from_transactions(transactions: Iterable) -> TransactionColumns:
+    """Columns from Transaction rows (cost_center / spend_categories already loaded)."""
+    ids, dates, descriptions, amounts, accounts = [], [], [], [], []
+    cost_center_ids, spend_category_ids = [], []
+    account_codes: Dict[str, int] = {}
+    cost_center_names: Dict[int, str] = {}
+    category_names: Dict[int, str] = {}
+
+    for txn in transactions:
+        ids.append(txn.id)
+        dates.append(txn.date)
+        descriptions.append(txn.description)
+        amounts.append(txn.amount_cents / 100)
+        accounts.append(account_codes.setdefault(txn.account, len(account_codes)))
+
+        cost_center = txn.cost_center
+        if cost_center is None:
+            cost_center_ids.append(None)
+        else:
+            cost_center_ids.append(cost_center.id)
+            cost_center_names[cost_center.id] = cost_center.name
+
+        row_categories = []
+        for category in txn.spend_categories:
+            row_categories.append(category.id)
+            category_names[category.id] = category.name
+        spend_category_ids.append(row_categories)
+
+    return TransactionColumns(
+        ids = ids,
+        dates = dates,
+        descriptions = descriptions,
+        amounts = amounts,
+        accounts = accounts,
+        cost_center_ids = cost_center_ids,
+        spend_category_ids = spend_category_ids,
+        account_names = list(account_codes),
+        cost_center_names = cost_center_names,
+        category_names = category_names,
+    )
+
+
+# ============================================
+# ENCODERS
+# ============================================
+
+
+def to_columnar_json(columns: TransactionColumns) -> dict:
+    """
+    Struct-of-arrays JSON: one array per field, plus the dimension dictionaries.
+    cost_center_id / spend_category_ids index the dictionaries by id; account
+    holds positions in dictionaries.accounts.
+    """
+    return {
+        "count": len(columns),
+        "columns": {
+            "id": columns.ids,
+            "date": [d.isoformat() for d in columns.dates],
+            "description": columns.descriptions,
+            "amount": columns.amounts,
+            "account": columns.accounts,
+            "cost_center_id": columns.cost_center_ids,
+            "spend_category_ids": columns.spend_category_ids,
+        },
+        "dictionaries": {
+            "accounts": columns.account_names,
+            "cost_centers": _dictionary(columns.cost_center_names),
+            "spend_categories": _dictionary(columns.category_names),
+        },
+    }
+
+
+def to_arrow(columns: TransactionColumns) -> bytes:
+    """One Arrow IPC stream (a single record batch) with dictionary-encoded names."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise HTTPException(status_code=406, detail="Arrow responses need pyarrow installed")
+
+    cost_center_ids = sorted(columns.cost_center_names)
+    cost_center_codes = {cc_id: code for code, cc_id in enumerate(cost_center_ids)}
+    category_ids = sorted(columns.category_names)
+    category_codes = {cat_id: code for code, cat_id in enumerate(category_ids)}
+
+    cost_center_names = pa.array([columns.cost_center_names[i] for i in cost_center_ids], pa.string())
+    category_names = pa.array([columns.category_names[i] for i in category_ids], pa.string())
+
+    offsets, codes = [0], []
+    for row in columns.spend_category_ids:
+        codes.extend(category_codes[cat_id] for cat_id in row)
+        offsets.append(len(codes))
+
+    batch = pa.RecordBatch.from_arrays(
+        [
+            pa.array(columns.ids, pa.int64()),
+            pa.array(columns.dates, pa.date32()),
+            pa.array(columns.descriptions, pa.string()),
+            pa.array(columns.amounts, pa.float64()),
+            pa.DictionaryArray.from_arrays(
+                pa.array(columns.accounts, pa.int32()), pa.array(columns.account_names, pa.string())
+            ),
+            pa.array(columns.cost_center_ids, pa.int32()),
+            pa.DictionaryArray.from_arrays(
+                pa.array(
+                    [None if cc_id is None else cost_center_codes[cc_id] for cc_id in columns.cost_center_ids],
+                    pa.int32(),
+                ),
+                cost_center_names,
+            ),
+            pa.ListArray.from_arrays(
+                pa.array(offsets, pa.int32()),
+                pa.DictionaryArray.from_arrays(pa.array(codes, pa.int32()), category_names),
+            ),
+        ],
+        names = [
+            "id", "date", "description", "amount", "account",
+            "cost_center_id", "cost_center", "spend_categories",
+        ],
+    )
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as stream:
+        stream.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def respond(fmt: str, columns: TransactionColumns) -> Response:
+    """Encoded response for the non-row formats."""
+    if fmt == ARROW:
+        return Response(content=to_arrow(columns), media_type=ARROW_MEDIA_TYPE)
+    return JSONResponse(content=to_columnar_json(columns), media_type=COLUMNAR_MEDIA_TYPE)
+
+
+def _dictionary(names: Dict[int, str]) -> dict:
+    ids = sorted(names)
+    return {"id": ids, "name": [names[i] for i in ids]}
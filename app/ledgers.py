@@ -0,0 +1,203 @@
+# app/ledgers.py - one SQLite database per ledger, opened on demand and kept in a bounded LRU
+from sqlalchemy.engine import Engine, make_url
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from . import database, events
+from .config import Settings
+from .writer import WriteQueue
+
+
+LEDGER_HEADER = "X-Ledger"
+DEFAULT = "default"
+
+# Ledger names become file names
+_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class InvalidLedger(ValueError):
+    pass
+
+
+def default_directory(database_url: str) -> str:
+    """ledgers/ next to the default database (or the working directory for in-memory databases)."""
+    path = make_url(database_url).database
+    if not path or path == ":memory:":
+        return "ledgers"
+    return os.path.join(os.path.dirname(os.path.abspath(path)), "ledgers")
+
+
+class Ledger:
+    """
+    One ledger's database: engine, session factories and its own writer thread,
+    so a long write to one ledger never queues writes to another.
+    """
+
+    def __init__(self, name: str, url: str, settings: Settings, engine: Optional[Engine] = None):
+        self.name = name
+        self.url = url
+        self.engine = engine or database.make_engine(url)
+        self.SessionLocal = database.make_sessionmaker(self.engine)
+        self.writer = WriteQueue(
+            self.engine,
+            max_batch = settings.write_batch_size,
+            max_delay = settings.write_batch_delay_ms / 1000,
+        )
+
+        # Optional async read path (read endpoints fall back to the threadpool without it)
+        self.async_engine = None
+        self.AsyncSessionLocal = None
+        if settings.async_reads:
+            self.async_engine = database.make_async_engine(url)
+            self.AsyncSessionLocal = database.make_async_sessionmaker(self.async_engine)
+
+        self.in_use = 0  # requests currently using the ledger; never closed while > 0
+        self.last_used = time.monotonic()
+
+    def open(self) -> None:
+        """Create or migrate the database and start the writer (blocking)."""
+        database.init_db(self.engine)
+        self.writer.start()
+
+    async def close(self, dispose: bool = True) -> None:
+        """Let queued writes commit, then close every connection and drop the caches kept for the engine."""
+        await run_in_threadpool(self.writer.stop)
+        if self.async_engine is not None:
+            await self.async_engine.dispose()
+        if dispose:
+            self.engine.dispose()
+            events.close(self.engine)
+
+    def __repr__(self) -> str:
+        return f"<Ledger(name={self.name!r}, url={self.url!r}, in_use={self.in_use})>"
+
+
+class LedgerRegistry:
+    """
+    The default ledger plus every named ledger opened by a request.
+
+    Named ledgers are opened on first use and kept in LRU order. Opening one
+    past max_open closes the least recently used idle ledger; evict_idle()
+    closes ledgers unused for longer than idle_seconds. Caches keyed by engine
+    (dimensions, columnar, recurring, suggest, archives) are dropped on close
+    (events.on_close). The default ledger is
+    opened at startup and stays open.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.directory = settings.ledger_dir or default_directory(settings.database_url)
+        self.max_open = max(1, settings.max_open_ledgers)
+        self.idle_seconds = settings.ledger_idle_seconds
+
+        # The process-wide default engine is shared with the loaders and CLIs
+        engine = database.get_engine() if settings.database_url == database.DATABASE_URL else None
+        self.default = Ledger(DEFAULT, settings.database_url, settings, engine = engine)
+        self._open: "OrderedDict[str, Ledger]" = OrderedDict()
+        self._lock = asyncio.Lock()  # held while opening or closing ledgers
+
+    def path(self, name: str) -> str:
+        if not _NAME.match(name):
+            raise InvalidLedger(f"Invalid ledger name {name!r}: use 1-64 letters, digits, '-' or '_'")
+        return os.path.join(self.directory, f"{name}.db")
+
+    @property
+    def open_names(self) -> List[str]:
+        """Open named ledgers, least recently used first."""
+        return list(self._open)
+
+    async def acquire(self, name: Optional[str] = None) -> Ledger:
+        """The ledger for a request (opening it if needed); pair with release()."""
+        if not name or name == DEFAULT:
+            ledger = self.default
+        else:
+            ledger = self._open.get(name)
+            if ledger is None:
+                ledger = await self._open_ledger(name)
+            self._open.move_to_end(name)
+        ledger.in_use += 1
+        ledger.last_used = time.monotonic()
+        return ledger
+
+    def release(self, ledger: Ledger) -> None:
+        ledger.in_use -= 1
+        ledger.last_used = time.monotonic()
+
+    async def evict_idle(self, now: Optional[float] = None) -> List[str]:
+        """Close named ledgers unused for idle_seconds. Returns their names."""
+        now = time.monotonic() if now is None else now
+        async with self._lock:
+            idle = [
+                name for name, ledger in self._open.items()
+                if ledger.in_use == 0 and now - ledger.last_used >= self.idle_seconds
+            ]
+            for name in idle:
+                await self._open.pop(name).close()
+        return idle
+
+    async def close(self) -> None:
+        """Close every ledger (shutdown). The default engine is left to its owner."""
+        async with self._lock:
+            while self._open:
+                await self._open.popitem(last=False)[1].close()
+        await self.default.close(dispose = False)
+
+    # ========================
+    # INTERNAL HELPERS
+    # ========================
+
+    async def _open_ledger(self, name: str) -> Ledger:
+        path = self.path(name)
+        async with self._lock:
+            ledger = self._open.get(name)
+            if ledger is not None:
+                return ledger
+
+            # Make room first: the least recently used ledgers no request is using
+            for lru_name in list(self._open):
+                if len(self._open) < self.max_open:
+                    break
+                if self._open[lru_name].in_use == 0:
+                    await self._open.pop(lru_name).close()
+
+            ledger = Ledger(name, f"sqlite:///{path}", self.settings)
+            os.makedirs(self.directory, exist_ok=True)
+            await run_in_threadpool(ledger.open)
+            self._open[name] = ledger
+            return ledger
+
+
+class LedgerMiddleware:
+    """
+    Resolve the X-Ledger header to request.state.ledger (400 for an invalid name).
+    Pure ASGI, so the ledger stays in use until background tasks have finished too.
+    """
+
+    def __init__(self, app, registry: LedgerRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            ledger = await self.registry.acquire(Headers(scope=scope).get(LEDGER_HEADER))
+        except InvalidLedger as e:
+            await JSONResponse({"detail": str(e)}, status_code=400)(scope, receive, send)
+            return
+
+        scope.setdefault("state", {})["ledger"] = ledger
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.registry.release(ledger)
@@ -1,10 +1,13 @@
 # app/loaders.py - takes parsed .csv data and loads it into DB
 from sqlalchemy.orm import Session
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence, Union
 
-from .database import SessionLocal, init_db
+from .crud import anomalies, dimensions, distributions
+from .database import get_sessionmaker, init_db
 from .models import Transaction, CostCenter, SpendCategory
+from .profiling import StageTimer, stage
+from .records import ParsedTransaction
 
 
 def get_or_create_cost_center(db: Session, name: Optional[str]) -> CostCenter:
@@ -12,19 +15,7 @@ def get_or_create_cost_center(db: Session, name: Optional[str]) -> CostCenter:
     Get existing cost center or create if it doesn't exist.
     If name is None or empty, returns/creates "Uncategorized".
     """
-    if not name or not name.strip():
-        name = "Uncategorized"
-    else:
-        name = name.strip()
-    
-    cost_center = db.query(CostCenter).filter(CostCenter.name == name).first()
-    
-    if not cost_center:
-        cost_center = CostCenter(name=name)
-        db.add(cost_center)
-        db.flush()  # Ensure cost center gets an ID before continuing
-    
-    return cost_center
+    return dimensions.resolve_cost_center(db, name)
 
 
 def get_or_create_spend_categories(db: Session, names: List[str]) -> List[SpendCategory]:
@@ -33,50 +24,30 @@ def get_or_create_spend_categories(db: Session, names: List[str]) -> List[SpendC
     If the list is empty or all names are empty, returns ["Uncategorized"].
     Removes duplicates and empty strings.
     """
-    # Clean and deduplicate names
-    cleaned_names = []
-    seen = set()
-    
-    for name in names:
-        if name and name.strip():
-            cleaned = name.strip()
-            if cleaned not in seen:
-                cleaned_names.append(cleaned)
-                seen.add(cleaned)
-    
-    # If no valid names, default to Uncategorized
-    if not cleaned_names:
-        cleaned_names = ["Uncategorized"]
-    
-    # Get or create each category
-    categories = []
-    for name in cleaned_names:
-        category = db.query(SpendCategory).filter(SpendCategory.name == name).first()
-        
-        if not category:
-            category = SpendCategory(name=name)
-            db.add(category)
-            db.flush()  # Ensure category gets an ID
-        
-        categories.append(category)
-    
-    return categories
+    return dimensions.resolve_spend_categories(db, names)
 
 
-def save_transactions(transactions: List[Dict[str, Any]], db_session: Optional[Session] = None):
+def save_transactions(
+    transactions: Sequence[Union[ParsedTransaction, Dict[str, Any]]],
+    db_session: Optional[Session] = None,
+    timer: Optional[StageTimer] = None,
+):
     """
     Save a list of parsed transactions to the database.
     
     Args:
-        transactions: List of transaction dictionaries with keys:
+        transactions: ParsedTransaction records (from the parsers), or dicts with
+            the same keys, which are converted:
             - date: datetime.date
             - description: str
             - cost_center: str or None (cost center name)
-            - spend_categories: list[str] (spend category names, can be empty)
-            - amount: float
+            - spend_categories: spend category names, can be empty
+            - amount_cents: int (negative = expense, positive = income/credit),
+              or amount: dollars, as parsers used to return
             - account: str
 
         db_session: Optional SQLAlchemy session. If None, creates a new session.
+        timer: Optional StageTimer; records dimensions, insert and commit stages.
     
     Raises:
         Exception: If database operations fail (transaction will be rolled back)
@@ -84,31 +55,65 @@ def save_transactions(transactions: List[Dict[str, Any]], db_session: Optional[S
     own_session = db_session is None
     
     if own_session:
-        init_db()
-        db_session = SessionLocal()
+        init_db()  # no-op after the first call in this process
+        db_session = get_sessionmaker()()
     
     try:
-        for t in transactions:
-            # Get or create cost center
-            cost_center = get_or_create_cost_center(db_session, t.get("cost_center"))
-            
-            # Get or create spend categories
-            spend_category_names = t.get("spend_categories", [])
-            spend_categories = get_or_create_spend_categories(db_session, spend_category_names)
-            
-            # Create transaction
-            db_transaction = Transaction(
-                date = t["date"],
-                description = t["description"],
-                cost_center = cost_center,
-                spend_categories = spend_categories,
-                amount = t["amount"],
-                account = t["account"],
+        new_amounts = []
+        new_transactions = []
+        transactions = [
+            t if isinstance(t, ParsedTransaction) else ParsedTransaction.from_dict(t) for t in transactions
+        ]
+        
+        # Resolve every cost center / spend category in the file up front (one batch each).
+        # Names are interned, so cleaning once per distinct name or category tuple is enough.
+        with stage(timer, "dimensions"):
+            cleaned_cost_centers = {}
+            cleaned_categories = {}
+            cost_center_names = []
+            spend_category_names = []
+            for t in transactions:
+                if t.cost_center not in cleaned_cost_centers:
+                    cleaned_cost_centers[t.cost_center] = dimensions.clean_names([t.cost_center])[0]
+                if t.spend_categories not in cleaned_categories:
+                    cleaned_categories[t.spend_categories] = dimensions.clean_names(t.spend_categories)
+                cost_center_names.append(cleaned_cost_centers[t.cost_center])
+                spend_category_names.append(cleaned_categories[t.spend_categories])
+            cost_centers = dimensions.get_or_create(db_session, CostCenter, cost_center_names)
+            categories = dimensions.get_or_create(
+                db_session, SpendCategory, [name for names in spend_category_names for name in names]
             )
+            dimensions.ensure_accounts(db_session, [t.account for t in transactions])
+        
+        with stage(timer, "insert"):
+            for t, cc_name, sc_names in zip(transactions, cost_center_names, spend_category_names):
+                cost_center = cost_centers[cc_name]
+                spend_categories = [categories[name] for name in sc_names]
+                
+                # Create transaction
+                db_transaction = Transaction(
+                    date = t.date,
+                    description = t.description,
+                    cost_center = cost_center,
+                    spend_categories = spend_categories,
+                    amount_cents = t.amount_cents,
+                    account = t.account,
+                )
+                
+                db_session.add(db_transaction)
+                new_transactions.append(db_transaction)
+                new_amounts.append((cost_center.name, db_transaction.account, db_transaction.amount_cents))
             
-            db_session.add(db_transaction)
+            distributions.record_amounts(db_session, new_amounts)
+            scores = anomalies.record_amounts(
+                db_session, [(t.cost_center.name, t.description, t.amount_cents) for t in new_transactions]
+            )
+            for db_transaction, score in zip(new_transactions, scores):
+                db_transaction.anomaly_score = score
+            db_session.flush()
         
-        db_session.commit()
+        with stage(timer, "commit"):
+            db_session.commit()
         
     except Exception as e:
         db_session.rollback()
@@ -1,13 +1,23 @@
 # app/main.py - bundles core functionality
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
-from .database import init_db
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
+from typing import Optional
+
+from . import database, suggest
+from .ledgers import LedgerMiddleware, LedgerRegistry
+from .config import Settings, settings as default_settings
 
 from app.api.transactions import router as transactions_router
+from app.api.snapshots import router as snapshots_router
+from app.api.backups import router as backups_router, run_backup
 
 
-app = FastAPI(title="Transactions API")
+logger = logging.getLogger(__name__)
 
 
 # Allow cross-origin requests (for React frontend)
@@ -17,18 +27,101 @@ origins = [
 ]
 
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,       # domains allowed to make requests
-    allow_credentials=True,
-    allow_methods=["*"],         # GET, POST, PUT, DELETE, etc.
-    allow_headers=["*"],         # Accept all headers
-)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Initialize the default database once per process (skipped when the schema version is current).
+    # Named ledgers are opened by the first request that uses them
+    database.init_db(app.state.engine)
+
+    # Build the in-memory ledger snapshot up front so the first filter request is fast
+    if app.state.settings.columnar_engine:
+        from app import columnar
+        columnar.get_snapshot(app.state.engine)
+    # Same for the description typeahead index
+    await run_in_threadpool(suggest.get_index(app.state.engine).refresh)
+    app.state.writer.start()
+
+    # Scheduled online backups (off unless FINANCE_BACKUP_INTERVAL_HOURS is set)
+    backup_task = None
+    if app.state.settings.backup_interval_hours > 0:
+        backup_task = asyncio.create_task(_backup_periodically(app))
+    idle_task = None
+    if app.state.settings.ledger_idle_seconds > 0:
+        idle_task = asyncio.create_task(_close_idle_ledgers(app))
+    yield
+
+    for task in (backup_task, idle_task):
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    # Let queued writes commit before the process exits
+    await app.state.ledgers.close()
+
+
+async def _backup_periodically(app: FastAPI):
+    interval = app.state.settings.backup_interval_hours * 3600
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            result = await run_in_threadpool(run_backup, app)
+            logger.info("Backup written to %s (%.1f MB/s)", result["path"], result["copy_mb_per_s"] or 0)
+        except Exception:
+            logger.exception("Scheduled backup failed")
+
+
+async def _close_idle_ledgers(app: FastAPI):
+    registry = app.state.ledgers
+    while True:
+        await asyncio.sleep(min(60.0, registry.idle_seconds / 2))
+        try:
+            for name in await registry.evict_idle():
+                logger.info("Closed idle ledger %s", name)
+        except Exception:
+            logger.exception("Closing idle ledgers failed")
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """
+    Build the API. Nothing touches the database until startup (lifespan),
+    so importing this module stays cheap.
+    """
+    settings = settings or default_settings
+
+    app = FastAPI(title="Transactions API", lifespan=lifespan)
+    app.state.settings = settings
+
+    # One database per ledger (X-Ledger header), each with its own engine and writer thread
+    # (SQLite allows a single writer per file). Requests without the header use the default one
+    app.state.ledgers = LedgerRegistry(settings)
+    default = app.state.ledgers.default
+    app.state.engine = default.engine
+    app.state.SessionLocal = default.SessionLocal
+    app.state.writer = default.writer
+    app.state.async_engine = default.async_engine
+    app.state.AsyncSessionLocal = default.AsyncSessionLocal
+
+    app.add_middleware(LedgerMiddleware, registry=app.state.ledgers)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,       # domains allowed to make requests
+        allow_credentials=True,
+        allow_methods=["*"],         # GET, POST, PUT, DELETE, etc.
+        allow_headers=["*"],         # Accept all headers
+    )
+
+    # Opt-in per-request profiling (X-Profile header), off unless FINANCE_PROFILING=1
+    if settings.profiling:
+        from app import profiling
+        profiling.install(app, settings.profile_dir)
 
+    # Include routers
+    app.include_router(transactions_router)
+    app.include_router(snapshots_router)
+    app.include_router(backups_router)
 
-# Initialize the database (creates tables if not present)
-init_db()
+    return app
 
 
-# Include routers
-app.include_router(transactions_router)
+app = create_app()
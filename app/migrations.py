@@ -0,0 +1,180 @@
+# app/migrations.py - upgrades existing SQLite databases to the current schema
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from .crud import anomalies, category_bits, distributions
+from .models import Account, AmountSketch, AmountStats, Base, Import, SpendCategory, Transaction
+
+
+# Bump when adding a step to MIGRATIONS. Stored in SQLite's PRAGMA user_version.
+SCHEMA_VERSION = 8
+
+
+# ============================================
+# MIGRATION STEPS
+# ============================================
+
+
+def _amount_to_integer_cents(conn: Connection) -> None:
+    """v1: transactions.amount (REAL dollars) -> transactions.amount_cents (INTEGER cents)."""
+    columns = {c["name"] for c in inspect(conn).get_columns("transactions")}
+    if "amount" not in columns:
+        return
+
+    # Steps are re-runnable: pysqlite auto-commits DDL, so a failed run may leave the new column behind
+    if "amount_cents" not in columns:
+        conn.exec_driver_sql(
+            "ALTER TABLE transactions ADD COLUMN amount_cents INTEGER NOT NULL DEFAULT 0"
+        )
+
+    conn.exec_driver_sql(
+        "UPDATE transactions SET amount_cents = CAST(ROUND(amount * 100) AS INTEGER)"
+    )
+    conn.exec_driver_sql("ALTER TABLE transactions DROP COLUMN amount")
+
+    # Sketches held float dollars; rebuild them in cents
+    if inspect(conn).has_table("amount_sketches"):
+        _sketch_table(conn)
+        conn.exec_driver_sql("DELETE FROM amount_sketches")
+        with Session(bind=conn) as db:
+            distributions.rebuild_all_sketches(db)
+            db.flush()
+
+
+def _accounts_table(conn: Connection) -> None:
+    """v2: accounts dimension table, backfilled from the account names in use."""
+    Account.__table__.create(conn, checkfirst=True)
+    conn.exec_driver_sql(
+        "INSERT OR IGNORE INTO accounts (name) SELECT DISTINCT account FROM transactions"
+    )
+
+
+def _autoincrement_transaction_ids(conn: Connection) -> None:
+    """
+    v3: rebuild transactions with AUTOINCREMENT so ids are never reused
+    (archived rows keep their ids). SQLite can't ALTER this, so copy into a new table.
+    """
+    sql = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'transactions'"
+    ).scalar()
+    if "AUTOINCREMENT" in sql.upper():
+        return
+
+    conn.exec_driver_sql("DROP TABLE IF EXISTS transactions_new")
+    ddl = str(CreateTable(Transaction.__table__).compile(conn))
+    conn.exec_driver_sql(ddl.replace("CREATE TABLE transactions", "CREATE TABLE transactions_new", 1))
+
+    # Columns added by later steps take their defaults
+    existing = {c["name"] for c in inspect(conn).get_columns("transactions")}
+    columns = ", ".join(c.name for c in Transaction.__table__.columns if c.name in existing)
+    conn.exec_driver_sql(f"INSERT INTO transactions_new ({columns}) SELECT {columns} FROM transactions")
+    conn.exec_driver_sql("DROP TABLE transactions")
+    conn.exec_driver_sql("ALTER TABLE transactions_new RENAME TO transactions")
+    for index in Transaction.__table__.indexes:
+        index.create(conn)
+
+
+def _imports_table(conn: Connection) -> None:
+    """v4: import provenance (file hash, per-account date range and row counts)."""
+    Import.__table__.create(conn, checkfirst=True)
+
+
+def _category_masks(conn: Connection) -> None:
+    """v5: spend category bit positions and transactions.category_mask, backfilled from the links."""
+    if "bit" not in {c["name"] for c in inspect(conn).get_columns("spend_categories")}:
+        conn.exec_driver_sql("ALTER TABLE spend_categories ADD COLUMN bit INTEGER")
+    for index in SpendCategory.__table__.indexes:
+        index.create(conn, checkfirst=True)
+    if "category_mask" not in {c["name"] for c in inspect(conn).get_columns("transactions")}:
+        conn.exec_driver_sql("ALTER TABLE transactions ADD COLUMN category_mask INTEGER NOT NULL DEFAULT 0")
+
+    waiting = conn.exec_driver_sql("SELECT id FROM spend_categories WHERE bit IS NULL ORDER BY id").scalars().all()
+    bits = category_bits.free_bits(conn, len(waiting))
+    if bits:
+        conn.exec_driver_sql("UPDATE spend_categories SET bit = ? WHERE id = ?", list(zip(bits, waiting)))
+    category_bits.refresh_masks(conn)
+
+
+def _anomaly_scores(conn: Connection) -> None:
+    """v6: per cost center / merchant amount statistics, and transactions.anomaly_score for the existing rows."""
+    AmountStats.__table__.create(conn, checkfirst=True)
+    if "anomaly_score" not in {c["name"] for c in inspect(conn).get_columns("transactions")}:
+        conn.exec_driver_sql("ALTER TABLE transactions ADD COLUMN anomaly_score FLOAT")
+    for index in Transaction.__table__.indexes:
+        index.create(conn, checkfirst=True)
+    with Session(bind=conn) as db:
+        anomalies.rebuild_all(db, rescore=True)
+        db.flush()
+
+
+def _amount_sketches(conn: Connection) -> None:
+    """
+    v7: per cost center / account amount sketches, built from the ledger when
+    the table is new or empty (databases from before the sketches, or upgraded
+    by a build that created the table without filling it).
+    """
+    _sketch_table(conn)
+    if conn.exec_driver_sql("SELECT 1 FROM amount_sketches LIMIT 1").first() is not None:
+        return
+    if conn.exec_driver_sql("SELECT 1 FROM transactions LIMIT 1").first() is None:
+        return
+    with Session(bind=conn) as db:
+        distributions.rebuild_all_sketches(db)
+        db.flush()
+
+
+def _sketch_staleness(conn: Connection) -> None:
+    """v8: amount_sketches.stale, the removed amounts a sketch still holds (rebuilt lazily)."""
+    _sketch_table(conn)
+
+
+def _sketch_table(conn: Connection) -> None:
+    # Sketches are rebuilt through the ORM model by earlier steps too, so they need its columns
+    AmountSketch.__table__.create(conn, checkfirst=True)
+    if "stale" not in {c["name"] for c in inspect(conn).get_columns("amount_sketches")}:
+        conn.exec_driver_sql("ALTER TABLE amount_sketches ADD COLUMN stale INTEGER NOT NULL DEFAULT 0")
+
+
+# MIGRATIONS[i] upgrades a database from version i to i + 1
+MIGRATIONS = [
+    _amount_to_integer_cents,
+    _accounts_table,
+    _autoincrement_transaction_ids,
+    _imports_table,
+    _category_masks,
+    _anomaly_scores,
+    _amount_sketches,
+    _sketch_staleness,
+]
+
+
+# ============================================
+# PUBLIC API
+# ============================================
+
+
+def get_version(conn: Connection) -> int:
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def upgrade(engine: Engine) -> None:
+    """
+    Bring a database up to SCHEMA_VERSION.
+
+    Existing databases run the pending steps in order; new databases are
+    created straight from the models. The version is stamped last, so an
+    interrupted upgrade is retried on the next start.
+    """
+    with engine.begin() as conn:
+        version = get_version(conn)
+        if version >= SCHEMA_VERSION:
+            return
+
+        if inspect(conn).has_table("transactions"):
+            for step in MIGRATIONS[version:]:
+                step(conn)
+
+        Base.metadata.create_all(bind=conn)
+        conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
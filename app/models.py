@@ -1,7 +1,10 @@
 # app/models.py - sets up SQLite database tables using SQLAlchemy ORM
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Table, Index
+from sqlalchemy import Column, Integer, Float, String, Date, DateTime, ForeignKey, Table, Index, JSON, UniqueConstraint, func
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import declarative_base, relationship
 
+from .money import from_cents, to_cents
+
 
 Base = declarative_base()
 
@@ -55,6 +58,8 @@ class SpendCategory(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, nullable=False, index=True)
+    # Position in Transaction.category_mask (0-62); NULL once every position is taken
+    bit = Column(Integer, nullable=True)
 
     # Many-to-many with transactions
     transactions = relationship(
@@ -63,10 +68,33 @@ class SpendCategory(Base):
         back_populates="spend_categories"
     )
 
+    __table_args__ = (
+        Index('idx_spend_category_bit', 'bit', unique=True),
+    )
+
     def __repr__(self):
         return f"<SpendCategory(id={self.id}, name={self.name})>"
 
 
+# ============================================
+# Account Model
+# ============================================
+
+
+class Account(Base):
+    """
+    Account names (e.g., 'Discover', 'Schwab Checking').
+    Transactions keep the name; this table lets listing accounts skip scanning them.
+    """
+    __tablename__ = "accounts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<Account(id={self.id}, name={self.name})>"
+
+
 # ============================================
 # Transaction Model
 # ============================================
@@ -79,9 +107,13 @@ class Transaction(Base):
     id = Column(Integer, primary_key=True, index=True)
     date = Column(Date, nullable=False, index=True)
     description = Column(String, nullable=False, index=True)
-    amount = Column(Float, nullable=False)
+    amount_cents = Column(Integer, nullable=False)  # exact integer cents (negative = expense)
     account = Column(String, nullable=False, index=True)
     cost_center_id = Column(Integer, ForeignKey('cost_centers.id', ondelete="SET NULL"), nullable=True)
+    # OR of 1 << SpendCategory.bit over its spend categories (denormalized; the links are the truth)
+    category_mask = Column(Integer, nullable=False, default=0, server_default="0")
+    # How unusual the amount was for its cost center / merchant when written (app/crud/anomalies.py)
+    anomaly_score = Column(Float, nullable=True)
 
     # Many-to-one with cost center
     cost_center = relationship(
@@ -100,10 +132,128 @@ class Transaction(Base):
     __table_args__ = (
         Index('idx_account_date', 'account', 'date'),
         Index('idx_cost_center', 'cost_center_id'),
+        Index('idx_anomaly_score', 'anomaly_score'),
+        # Ids are never reused, so archived rows (app/archive.py) can't collide with new ones
+        {'sqlite_autoincrement': True},
     )
 
+    @hybrid_property
+    def amount(self):
+        """Decimal dollar view of amount_cents. Query and aggregate on amount_cents instead."""
+        return from_cents(self.amount_cents)
+
+    @amount.setter
+    def amount(self, value):
+        self.amount_cents = to_cents(value)
+
+    @amount.expression
+    def amount(cls):
+        return cls.amount_cents / 100.0
+
     def __repr__(self):
         return (
             f"<Transaction(id={self.id}, date={self.date}, amount={self.amount}, "
             f"account={self.account}, cost_center_id={self.cost_center_id})>"
         )
+
+
+# ============================================
+# Amount Sketch Model
+# ============================================
+
+
+class AmountSketch(Base):
+    """
+    Persisted KLL sketch of transaction amounts for one cost center or account.
+    Keyed by name so sketches survive cost center cleanup/re-creation.
+    """
+    __tablename__ = "amount_sketches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    dimension = Column(String, nullable=False)  # 'cost_center' or 'account'
+    key = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    # Removed amounts the sketch still holds (KLL can't forget); see distributions.forget_amounts
+    stale = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        UniqueConstraint('dimension', 'key', name='uq_amount_sketch_dimension_key'),
+    )
+
+    def __repr__(self):
+        return f"<AmountSketch(dimension={self.dimension}, key={self.key})>"
+
+
+class AmountStats(Base):
+    """
+    Running count, mean and sum of squared deviations (Welford) of transaction
+    amounts for one cost center or merchant. Keyed by name, like AmountSketch.
+    """
+    __tablename__ = "amount_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    dimension = Column(String, nullable=False)  # 'cost_center' or 'merchant'
+    key = Column(String, nullable=False)
+    n = Column(Integer, nullable=False)
+    mean = Column(Float, nullable=False)
+    m2 = Column(Float, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('dimension', 'key', name='uq_amount_stats_dimension_key'),
+    )
+
+    def __repr__(self):
+        return f"<AmountStats(dimension={self.dimension}, key={self.key}, n={self.n})>"
+
+
+# ============================================
+# Archive Model
+# ============================================
+
+
+class Archive(Base):
+    """
+    A closed year moved out of the hot database into its own read-only SQLite file.
+    The dimensions its rows use are pinned so orphan cleanup keeps them.
+    """
+    __tablename__ = "archives"
+
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    path = Column(String, nullable=False)  # absolute path of the archive file
+    row_count = Column(Integer, nullable=False)
+    cost_center_ids = Column(JSON, nullable=False, default=list)
+    spend_category_ids = Column(JSON, nullable=False, default=list)
+    accounts = Column(JSON, nullable=False, default=list)
+
+    def __repr__(self):
+        return f"<Archive(year={self.year}, rows={self.row_count})>"
+
+
+# ============================================
+# Import Model
+# ============================================
+
+
+class Import(Base):
+    """
+    Provenance of one CSV upload, per account in the file.
+    The latest last_date per account is the watermark later uploads skip up to.
+    """
+    __tablename__ = "imports"
+
+    id = Column(Integer, primary_key=True, index=True)
+    file_hash = Column(String, nullable=False, index=True)  # sha256 of the uploaded bytes
+    institution = Column(String, nullable=False)
+    account = Column(String, nullable=True)  # None when no row was loaded
+    first_date = Column(Date, nullable=True)
+    last_date = Column(Date, nullable=True)
+    rows_loaded = Column(Integer, nullable=False, default=0)
+    rows_skipped = Column(Integer, nullable=False, default=0)  # at/below the watermark or already loaded
+    imported_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index('idx_import_account_last_date', 'account', 'last_date'),
+    )
+
+    def __repr__(self):
+        return f"<Import(account={self.account}, {self.first_date}..{self.last_date}, loaded={self.rows_loaded})>"
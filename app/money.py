@@ -0,0 +1,41 @@
+# app/money.py - exact conversions between decimal dollar amounts and integer cents
+import re
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Union
+
+
+CENT = Decimal("0.01")
+
+Amount = Union[int, float, str, Decimal]
+
+
+def to_cents(value: Amount) -> int:
+    """
+    Convert a dollar amount to integer cents, rounding half away from zero.
+    Floats go through their shortest repr, so 0.1 + 0.2 becomes 30 cents, not 30.000000000000004.
+    """
+    if isinstance(value, float):
+        value = repr(value)
+    return int(Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP) * 100)
+
+
+def from_cents(cents: int) -> Decimal:
+    """Integer cents back to an exact two-place Decimal dollar amount."""
+    return Decimal(cents) / 100
+
+
+def parse_cents(text: str) -> int:
+    """
+    Parse a currency string such as "$1,234.56", "-12.5" or "(3.00)" straight to cents.
+    Raises ValueError if the text isn't a number.
+    """
+    cleaned = re.sub(r'[$,\s]', '', text)
+
+    # Accounting style negatives: (12.34)
+    if cleaned.startswith('(') and cleaned.endswith(')'):
+        cleaned = '-' + cleaned[1:-1]
+
+    try:
+        return to_cents(Decimal(cleaned))
+    except InvalidOperation:
+        raise ValueError(f"Could not convert '{text}' to an amount")
@@ -1,7 +1,37 @@
 # app/parsers.py - parses .csv downloads from Discover CC and Schwab Checking Account
 import csv
-import re
-from datetime import datetime
+from collections import Counter
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from .money import parse_cents
+from .records import ParsedTransaction
+
+
+class Watermarks:
+    """
+    Per-account dates at or below which rows are already in the ledger.
+    Parsers skip those rows before any further parsing; skipped counts rows per account.
+
+    starts bounds the skipped range from below: rows dated before an account's
+    start predate everything imported for it (an older backfill), so they are kept.
+    """
+
+    def __init__(self, dates: Optional[Dict[str, date]] = None, starts: Optional[Dict[str, date]] = None):
+        self.dates = dates or {}
+        self.starts = starts or {}
+        self.skipped = Counter()
+
+    def skip(self, account: str, row_date: date) -> bool:
+        watermark = self.dates.get(account)
+        if watermark is None or row_date > watermark:
+            return False
+        start = self.starts.get(account)
+        if start is not None and row_date < start:
+            return False
+        self.skipped[account] += 1
+        return True
 
 
 def clean_header(header):
@@ -34,26 +64,33 @@ def validate_headers(expected_headers, actual_headers, source_name):
         )
 
 
-def clean_currency_string(value):
-    """Remove currency symbols, commas, and whitespace from monetary values."""
+@lru_cache(maxsize=4096)
+def parse_date(text: str, *formats: str) -> date:
+    """
+    Parse a date with the first of `formats` that matches.
+    Cached: an export repeats a few hundred distinct dates, and strptime is most of a row's parse time.
+    """
+    for fmt in formats[:-1]:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    return datetime.strptime(text, formats[-1]).date()
+
+
+def clean_currency_cents(value):
+    """Parse a monetary value (currency symbols, commas, whitespace allowed) straight to integer cents."""
     if not value or value.strip() == "":
-        return 0.0
-    
-    # Remove dollar signs, commas, and whitespace
-    cleaned = re.sub(r'[$,\s]', '', str(value).strip())
-    
-    # Handle empty string after cleaning
-    if not cleaned:
-        return 0.0
+        return 0
     
     try:
-        return float(cleaned)
+        return parse_cents(str(value).strip())
     except ValueError:
-        print(f"Warning: Could not convert '{value}' to float, using 0.0")
-        return 0.0
+        print(f"Warning: Could not convert '{value}' to an amount, using 0")
+        return 0
 
 
-def load_discover_csv(file_path: str):
+def load_discover_csv(file_path: str, watermarks: Optional[Watermarks] = None) -> List[ParsedTransaction]:
     """
     Parse Discover credit card CSV export.
     
@@ -100,29 +137,33 @@ def load_discover_csv(file_path: str):
         category_header = header_mapping.get(clean_header("Category"))
         
         for row in reader:
+            transaction_date = parse_date(row[date_header].strip(), "%m/%d/%Y")
+            if watermarks and watermarks.skip("Discover", transaction_date):
+                continue
+            
             # Parse amount
-            raw_amount = clean_currency_string(row[amount_header])
+            raw_amount = clean_currency_cents(row[amount_header])
             
             # Get cost center from Discover's Category column
             cost_center = row[category_header].strip() if row[category_header].strip() else "Uncategorized"
             
             # For Discover: negative amounts in CSV = credits (positive in ledger)
             #               positive amounts in CSV = expenses (negative in ledger)
-            amount = -raw_amount
+            amount_cents = -raw_amount
             
-            transactions.append({
-                "date": datetime.strptime(row[date_header].strip(), "%m/%d/%Y").date(),
-                "description": row[desc_header].strip(),
-                "cost_center": cost_center,
-                "spend_categories": [],  # Empty by default - user can categorize later
-                "amount": amount,
-                "account": "Discover",
-            })
+            # Spend categories are empty by default - user can categorize later
+            transactions.append(ParsedTransaction(
+                date = transaction_date,
+                description = row[desc_header].strip(),
+                amount_cents = amount_cents,
+                account = "Discover",
+                cost_center = cost_center,
+            ))
     
     return transactions
 
 
-def load_schwab_csv(file_path: str):
+def load_schwab_csv(file_path: str, watermarks: Optional[Watermarks] = None) -> List[ParsedTransaction]:
     """
     Parse Schwab checking account CSV export.
     
@@ -174,6 +215,10 @@ def load_schwab_csv(file_path: str):
         deposit_header = header_mapping.get(clean_header("Deposit"))
         
         for row in reader:
+            transaction_date = parse_date(row[date_header].strip(), "%m/%d/%Y")
+            if watermarks and watermarks.skip("Schwab Checking", transaction_date):
+                continue
+            
             # Clean and process amounts
             withdrawal_str = row.get(withdrawal_header, "").strip()
             deposit_str = row.get(deposit_header, "").strip()
@@ -182,31 +227,31 @@ def load_schwab_csv(file_path: str):
             # Determine amount
             if withdrawal_str and withdrawal_str != "":
                 # Withdrawals are expenses (negative in DB)
-                amount = -clean_currency_string(withdrawal_str)
+                amount_cents = -clean_currency_cents(withdrawal_str)
             elif deposit_str and deposit_str != "":
                 # Deposits are income (positive in DB)
-                amount = clean_currency_string(deposit_str)
+                amount_cents = clean_currency_cents(deposit_str)
             else:
                 # Skip rows with no amount (shouldn't happen but just in case)
-                amount = 0.0
+                amount_cents = 0
             
-            transactions.append({
-                "date": datetime.strptime(row[date_header].strip(), "%m/%d/%Y").date(),
-                "description": description,
-                "amount": amount,
-                "account": "Schwab Checking",
-                "cost_center": None,  # Schwab doesn't provide categories - will default to "Uncategorized"
-                "spend_categories": []  # Empty by default - user can categorize later
-            })
+            # Schwab doesn't provide categories - cost center defaults to "Uncategorized" in the loader
+            transactions.append(ParsedTransaction(
+                date = transaction_date,
+                description = description,
+                amount_cents = amount_cents,
+                account = "Schwab Checking",
+            ))
     
     return transactions
 
 
-def load_custom_csv(file_path: str):
+def load_custom_csv(file_path: str, watermarks: Optional[Watermarks] = None) -> List[ParsedTransaction]:
     """
     Parse custom export CSV format from this app.
     
     Expected columns:
+    - ID: Transaction id (optional column; blank for new rows)
     - Date: Transaction date (YYYY-MM-DD)
     - Description: Transaction description
     - Amount: Transaction amount (negative = expense, positive = income)
@@ -216,6 +261,7 @@ def load_custom_csv(file_path: str):
     
     This format is used for exporting and re-importing transactions after bulk editing.
     Spend categories should be comma-separated (e.g., "Restaurant, Night Life").
+    Rows with an ID are edits of existing rows, so watermarks don't skip them.
     """
     transactions = []
     
@@ -255,20 +301,22 @@ def load_custom_csv(file_path: str):
         account_header = header_mapping.get(clean_header("Account"))
         cost_center_header = header_mapping.get(clean_header("Cost Center"))
         spend_categories_header = header_mapping.get(clean_header("Spend Categories"))
+        id_header = header_mapping.get(clean_header("ID"))
         
         for row_num, row in enumerate(reader, start=2):  # Start at 2 (header is row 1)
             try:
-                # Parse date - handle both YYYY-MM-DD and MM/DD/YYYY formats
-                date_str = row[date_header].strip()
-                try:
-                    # Try ISO format first (YYYY-MM-DD)
-                    transaction_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-                except ValueError:
-                    # Fall back to MM/DD/YYYY
-                    transaction_date = datetime.strptime(date_str, "%m/%d/%Y").date()
+                # Parse date - ISO format (YYYY-MM-DD) first, falling back to MM/DD/YYYY
+                transaction_date = parse_date(row[date_header].strip(), "%Y-%m-%d", "%m/%d/%Y")
+                
+                id_str = row[id_header].strip() if id_header else ""
+                transaction_id = int(id_str) if id_str else None
+                
+                account = row[account_header].strip()
+                if watermarks and transaction_id is None and watermarks.skip(account, transaction_date):
+                    continue
                 
                 # Parse amount
-                amount = clean_currency_string(row[amount_header])
+                amount_cents = clean_currency_cents(row[amount_header])
                 
                 # Get cost center
                 cost_center = row[cost_center_header].strip() if row[cost_center_header].strip() else None
@@ -288,14 +336,15 @@ def load_custom_csv(file_path: str):
                         if cleaned_cat:
                             spend_categories.append(cleaned_cat)
                 
-                transactions.append({
-                    "date": transaction_date,
-                    "description": row[desc_header].strip(),
-                    "amount": amount,
-                    "account": row[account_header].strip(),
-                    "cost_center": cost_center,
-                    "spend_categories": spend_categories
-                })
+                transactions.append(ParsedTransaction(
+                    date = transaction_date,
+                    description = row[desc_header].strip(),
+                    amount_cents = amount_cents,
+                    account = account,
+                    cost_center = cost_center,
+                    spend_categories = spend_categories,
+                    id = transaction_id,
+                ))
                 
             except Exception as e:
                 # Provide helpful error message with row number
@@ -306,30 +355,31 @@ def load_custom_csv(file_path: str):
     return transactions
 
 
-def parse_csv(file_path: str, institution: str):
+def parse_csv(file_path: str, institution: str, watermarks: Optional[Watermarks] = None) -> List[ParsedTransaction]:
     """
     Route to the correct parser based on institution name.
     
     Args:
         file_path: Path to the CSV file
         institution: Institution name (e.g., 'discover', 'schwab', 'custom')
+        watermarks: Optional per-account watermarks; rows at or below them are skipped
     
     Returns:
-        List of transaction dictionaries with keys:
+        List of ParsedTransaction records with:
         - date: datetime.date
         - description: str
-        - amount: float (negative = expense, positive = income/credit)
+        - amount_cents: int (negative = expense, positive = income/credit)
         - account: str
         - cost_center: str or None (maps to cost center name)
-        - spend_categories: list[str] (empty by default, user categorizes later)
+        - spend_categories: tuple[str, ...] (empty by default, user categorizes later)
     """
     institution = institution.lower().strip()
     
     if institution == "discover":
-        return load_discover_csv(file_path)
+        return load_discover_csv(file_path, watermarks)
     elif institution in ["schwab", "schwab checking"]:
-        return load_schwab_csv(file_path)
+        return load_schwab_csv(file_path, watermarks)
     elif institution == "custom":
-        return load_custom_csv(file_path)
+        return load_custom_csv(file_path, watermarks)
     else:
         raise ValueError(f"No parser available for institution: {institution}")
@@ -0,0 +1,172 @@
+# app/profiling.py - opt-in per-request profiles (cProfile or stack sampling) and stage timers
+from fastapi import FastAPI, Request
+
+import cProfile
+import datetime
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+PROFILE_HEADER = "X-Profile"
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+
+# One profiled request at a time; cProfile and tracemalloc are process-wide
+_lock = threading.Lock()
+
+
+# ============================================
+# STAGE TIMING
+# ============================================
+
+
+class StageTimer:
+    """Wall-clock time per named stage of one operation, in the order stages first ran."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        """Milliseconds per stage, plus the total since the timer was created."""
+        timings = {f"{name}_ms": round(seconds * 1000, 2) for name, seconds in self.stages.items()}
+        timings["total_ms"] = round((time.perf_counter() - self.started) * 1000, 2)
+        return timings
+
+
+@contextmanager
+def stage(timer: Optional[StageTimer], name: str):
+    """timer.stage(name), or nothing when no timer was passed."""
+    if timer is None:
+        yield
+    else:
+        with timer.stage(name):
+            yield
+
+
+# ============================================
+# REQUEST PROFILING
+# ============================================
+
+
+class StackSampler:
+    """
+    Wall-clock sampling profiler over every thread (event loop, threadpool, writer).
+    Writes collapsed stacks ("frame;frame;frame count"), the input format of flamegraph tools.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path: str) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+
+
+def install(app: FastAPI, directory: str) -> None:
+    """
+    Profile requests that send `X-Profile: cprofile` or `X-Profile: sample`.
+
+    cprofile: deterministic profile of the event loop thread (.prof, open with pstats / snakeviz).
+    sample: stack samples of every thread, so threadpool and writer work shows up (.txt).
+    Both record tracemalloc's peak for the request. tracemalloc is process-wide,
+    so the peak includes concurrent requests. The profile path and peak come back
+    as X-Profile-File and X-Profile-Peak-KB headers.
+    """
+
+    @app.middleware("http")
+    async def profile_request(request: Request, call_next):
+        mode = request.headers.get(PROFILE_HEADER, "").strip().lower()
+        if mode not in ("cprofile", "sample"):
+            return await call_next(request)
+        if not _lock.acquire(blocking=False):
+            response = await call_next(request)
+            response.headers[PROFILE_HEADER] = "busy"
+            return response
+
+        try:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+
+            profiler = cProfile.Profile() if mode == "cprofile" else StackSampler()
+            if mode == "cprofile":
+                profiler.enable()
+            else:
+                profiler.start()
+            try:
+                response = await call_next(request)
+            finally:
+                if mode == "cprofile":
+                    profiler.disable()
+                else:
+                    profiler.stop()
+                peak = tracemalloc.get_traced_memory()[1]
+                if started_tracing:
+                    tracemalloc.stop()
+
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, _file_name(request, "prof" if mode == "cprofile" else "txt"))
+            if mode == "cprofile":
+                profiler.dump_stats(path)
+            else:
+                profiler.dump(path)
+        finally:
+            _lock.release()
+
+        response.headers[PROFILE_HEADER] = mode
+        response.headers["X-Profile-File"] = path
+        response.headers["X-Profile-Peak-KB"] = str(peak // 1024)
+        return response
+
+
+def _file_name(request: Request, extension: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", request.url.path).strip("_") or "root"
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%d-%H%M%S-%f")
+    return f"{stamp}-{request.method.lower()}-{slug}.{extension}"
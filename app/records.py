@@ -0,0 +1,69 @@
+# app/records.py - compact record type for parsed CSV rows, shared by parsers and loaders
+import sys
+from datetime import date
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .money import to_cents
+
+
+# Shared by every row without spend categories (most bank exports)
+NO_CATEGORIES: Tuple[str, ...] = ()
+
+
+class ParsedTransaction:
+    """
+    One parsed CSV row, before it becomes a Transaction.
+
+    __slots__ instead of a per-row dict, and account / cost center / spend
+    category names are interned, so a million rows from one export share a
+    handful of name strings.
+    """
+    __slots__ = ("date", "description", "amount_cents", "account", "cost_center", "spend_categories", "id")
+
+    def __init__(
+        self,
+        date: date,
+        description: str,
+        amount_cents: int,
+        account: str,
+        cost_center: Optional[str] = None,
+        spend_categories: Iterable[str] = NO_CATEGORIES,
+        id: Optional[int] = None,
+    ):
+        self.date = date
+        self.description = description
+        self.amount_cents = amount_cents
+        self.account = sys.intern(account)
+        self.cost_center = sys.intern(cost_center) if cost_center else None
+        self.spend_categories = tuple(sys.intern(name) for name in spend_categories) or NO_CATEGORIES
+        self.id = id  # ledger id, for custom exports re-imported with upsert
+
+    @classmethod
+    def from_dict(cls, row: Dict[str, Any]) -> "ParsedTransaction":
+        """
+        From a dict row: keys as in as_dict, or the rows parsers used to return,
+        whose "amount" is in dollars (converted with money.to_cents).
+        """
+        return cls(
+            date = row["date"],
+            description = row["description"],
+            amount_cents = row["amount_cents"] if "amount_cents" in row else to_cents(row["amount"]),
+            account = row["account"],
+            cost_center = row.get("cost_center"),
+            spend_categories = row.get("spend_categories") or NO_CATEGORIES,
+            id = row.get("id"),
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ParsedTransaction):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return (
+            f"<ParsedTransaction(date={self.date}, description={self.description!r}, "
+            f"amount_cents={self.amount_cents}, account={self.account!r})>"
+        )
@@ -0,0 +1,328 @@
+# app/recurring.py - recurring charge (subscription) detection, cached per database and updated incrementally
+import bisect
+import calendar
+import datetime
+import re
+import threading
+import weakref
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from . import archive, events
+
+
+# Days between consecutive charges that count as each period (inclusive)
+PERIODS: Dict[str, Tuple[int, int]] = {
+    "weekly": (6, 8),
+    "monthly": (27, 33),
+    "annual": (355, 375),
+}
+# Charges in a row needed before a run counts as recurring
+MIN_OCCURRENCES = {"weekly": 4, "monthly": 3, "annual": 2}
+# Days past the expected date before a charge counts as cancelled
+GRACE_DAYS = {"weekly": 3, "monthly": 7, "annual": 30}
+
+AMOUNT_TOLERANCE = 0.15     # relative change allowed from one charge to the next
+MIN_TOLERANCE_CENTS = 100   # ...but always at least $1
+ID_CHUNK = 10_000           # stay well under SQLite's bound-parameter limit
+
+GroupKey = Tuple[str, str]  # (account, normalized merchant)
+
+
+# ============================================
+# MERCHANT NORMALIZATION
+# ============================================
+
+
+# Card processor prefixes: "SQ *BLUE BOTTLE", "TST* JOES", "PAYPAL *SPOTIFY"
+_PROCESSOR_PREFIX = re.compile(r"^(?:sq|tst|sp|pp|paypal|pos|ach|ckcd|dd|in)\s*\*\s*")
+_SEPARATORS = re.compile(r"[*/,#_]")
+_HAS_DIGIT = re.compile(r"\S*\d\S*")  # store numbers, phone numbers, reference ids, dates
+_OTHER = re.compile(r"[^a-z&'. ]+")
+
+
+@lru_cache(maxsize=65536)
+def normalize_merchant(description: str) -> str:
+    """
+    Merchant name from a bank description, stable across charges.
+    "NETFLIX.COM 866-579-7172 CA" and "Netflix.com 844-505-2993 CA" both become "netflix.com ca".
+    """
+    text = _PROCESSOR_PREFIX.sub("", description.lower().strip())
+    text = _HAS_DIGIT.sub(" ", _SEPARATORS.sub(" ", text))
+    words = (word.strip(".'") for word in _OTHER.sub(" ", text).split())
+    return " ".join(word for word in words if word) or description.lower().strip()
+
+
+# ============================================
+# DETECTION
+# ============================================
+
+
+class Charge(NamedTuple):
+    """One charge in a group; groups are kept sorted by (date, id)."""
+    date: datetime.date
+    id: int
+    amount_cents: int
+    cost_center_id: Optional[int]
+    description: str
+
+
+@dataclass(frozen=True)
+class RecurringCharge:
+    account: str
+    merchant: str
+    description: str             # of the latest charge
+    period: str                  # weekly / monthly / annual
+    occurrences: int             # charges in the current run
+    first_date: datetime.date
+    last_date: datetime.date
+    amount_cents: int            # latest charge (negative)
+    average_cents: int           # over the run
+    next_date: datetime.date
+    cost_center_id: Optional[int]
+    last_transaction_id: int
+
+    def is_active(self, today: datetime.date) -> bool:
+        return today <= self.next_date + datetime.timedelta(days=GRACE_DAYS[self.period])
+
+
+def detect(key: GroupKey, charges: Sequence[Charge]) -> Optional[RecurringCharge]:
+    """
+    Find the run of periodic charges that ends with the group's latest charge.
+
+    One pass over the charges in date order. A run continues while the gap
+    to the previous charge fits the run's period and the amount stays within
+    tolerance of the previous charge (so gradual price increases don't break
+    it). A gap or amount that doesn't fit starts a new run.
+    """
+    if len(charges) < 2:
+        return None
+
+    start, period, total = 0, None, charges[0].amount_cents
+    for i in range(1, len(charges)):
+        previous, charge = charges[i - 1], charges[i]
+        gap_period = _period((charge.date - previous.date).days)
+        if gap_period is not None and _same_amount(previous.amount_cents, charge.amount_cents):
+            if period is None or gap_period == period:
+                period = gap_period
+                total += charge.amount_cents
+                continue
+            # Same amounts at a different rhythm: the new run starts at the previous charge
+            start, period, total = i - 1, gap_period, previous.amount_cents + charge.amount_cents
+        else:
+            start, period, total = i, None, charge.amount_cents
+
+    count = len(charges) - start
+    if period is None or count < MIN_OCCURRENCES[period]:
+        return None
+
+    first, last = charges[start], charges[-1]
+    return RecurringCharge(
+        account = key[0],
+        merchant = key[1],
+        description = last.description,
+        period = period,
+        occurrences = count,
+        first_date = first.date,
+        last_date = last.date,
+        amount_cents = last.amount_cents,
+        average_cents = round(total / count),
+        next_date = next_date(last.date, period, anchor_day=first.date.day),
+        cost_center_id = last.cost_center_id,
+        last_transaction_id = last.id,
+    )
+
+
+def next_date(last: datetime.date, period: str, anchor_day: Optional[int] = None) -> datetime.date:
+    """The expected date of the charge after `last` (monthly charges keep their day of month)."""
+    if period == "weekly":
+        return last + datetime.timedelta(days=7)
+    if period == "monthly":
+        year, month = (last.year + 1, 1) if last.month == 12 else (last.year, last.month + 1)
+        day = min(anchor_day or last.day, calendar.monthrange(year, month)[1])
+        return datetime.date(year, month, day)
+    day = min(last.day, calendar.monthrange(last.year + 1, last.month)[1])
+    return datetime.date(last.year + 1, last.month, day)
+
+
+def _period(gap_days: int) -> Optional[str]:
+    for name, (low, high) in PERIODS.items():
+        if low <= gap_days <= high:
+            return name
+    return None
+
+
+def _same_amount(a: int, b: int) -> bool:
+    return abs(a - b) <= max(MIN_TOLERANCE_CENTS, AMOUNT_TOLERANCE * abs(a))
+
+
+# ============================================
+# INDEX
+# ============================================
+
+
+class RecurringIndex:
+    """
+    Charges grouped by (account, merchant) and the recurring run found in each.
+
+    Built once (archived years included), then kept current from the changes
+    published by app.events: only the groups a commit touched are re-detected.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._groups: Dict[GroupKey, List[Charge]] = {}
+        self._keys: Dict[int, GroupKey] = {}  # transaction id -> its group
+        self._found: Dict[GroupKey, RecurringCharge] = {}
+        self._built = False
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        """Rebuild every group from the database."""
+        with self._lock, Session(self.engine) as db:
+            start = _history_start(db)
+            with archive.including(db, start_date = start):
+                rows = db.connection().exec_driver_sql(f"{_CHARGES} ORDER BY date, id").fetchall()
+
+            groups: Dict[GroupKey, List[Charge]] = defaultdict(list)
+            keys = {}
+            for row in rows:
+                key, charge = _charge(row)
+                groups[key].append(charge)  # already in (date, id) order
+                keys[charge.id] = key
+
+            self._groups = dict(groups)
+            self._keys = keys
+            self._found = {}
+            for key, charges in self._groups.items():
+                self._detect(key, charges)
+            self._built = True
+
+    def apply(self, changes: events.LedgerChanges) -> None:
+        """Apply a committed change set, re-detecting only the groups it touched."""
+        if not self._built:
+            return
+        if changes.full:
+            self.refresh()
+            return
+        touched = changes.transaction_ids | changes.deleted_ids
+        if not touched:
+            return
+
+        with self._lock:
+            dirty = set()
+            for tx_id in touched:
+                key = self._keys.pop(tx_id, None)
+                if key is not None:
+                    self._groups[key] = [c for c in self._groups[key] if c.id != tx_id]
+                    dirty.add(key)
+
+            for row in self._fetch(sorted(changes.transaction_ids)):
+                key, charge = _charge(row)
+                bisect.insort(self._groups.setdefault(key, []), charge)
+                self._keys[charge.id] = key
+                dirty.add(key)
+
+            for key in dirty:
+                charges = self._groups.get(key)
+                if charges:
+                    self._detect(key, charges)
+                else:
+                    self._groups.pop(key, None)
+                    self._found.pop(key, None)
+
+    def charges(
+        self,
+        today: Optional[datetime.date] = None,
+        include_inactive: bool = False,
+        accounts: Optional[Iterable[str]] = None,
+    ) -> List[RecurringCharge]:
+        """Recurring charges ordered by next expected date (active ones only by default)."""
+        if not self._built:
+            self.refresh()
+        today = today or datetime.date.today()
+        accounts = set(accounts) if accounts else None
+        with self._lock:
+            found = list(self._found.values())
+        return sorted(
+            (
+                r for r in found
+                if (include_inactive or r.is_active(today)) and (accounts is None or r.account in accounts)
+            ),
+            key = lambda r: (r.next_date, r.account, r.merchant),
+        )
+
+    # ========================
+    # INTERNAL HELPERS
+    # ========================
+
+    def _detect(self, key: GroupKey, charges: List[Charge]) -> None:
+        found = detect(key, charges)
+        if found is None:
+            self._found.pop(key, None)
+        else:
+            self._found[key] = found
+
+    def _fetch(self, ids: Sequence[int]) -> list:
+        rows = []
+        with self.engine.connect() as conn:
+            for start in range(0, len(ids), ID_CHUNK):
+                chunk = ids[start:start + ID_CHUNK]
+                rows += conn.exec_driver_sql(
+                    f"{_CHARGES} AND id IN ({', '.join('?' * len(chunk))})", tuple(chunk)
+                ).fetchall()
+        return rows
+
+
+# Raw rows (dates stay ISO text) are much cheaper to fetch than ORM rows
+_CHARGES = "SELECT id, date, description, amount_cents, account, cost_center_id FROM transactions WHERE amount_cents < 0"
+
+
+def _charge(row) -> Tuple[GroupKey, Charge]:
+    tx_id, day, description, amount_cents, account, cost_center_id = row
+    charge = Charge(datetime.date.fromisoformat(day), tx_id, amount_cents, cost_center_id, description)
+    return (account, normalize_merchant(description)), charge
+
+
+def _history_start(db: Session) -> Optional[datetime.date]:
+    """Oldest date to read: everything, unless there are more archived years than one query can attach."""
+    years = archive.years_for(db.connection())
+    if len(years) <= archive.MAX_ATTACHED:
+        return None
+    return datetime.date(years[-archive.MAX_ATTACHED][0], 1, 1)
+
+
+# ============================================
+# REGISTRY
+# ============================================
+
+
+_indexes: "weakref.WeakKeyDictionary[Engine, RecurringIndex]" = weakref.WeakKeyDictionary()
+_registry_lock = threading.Lock()
+
+
+def get_index(engine: Engine) -> RecurringIndex:
+    """The recurring charge index for a database (built on first use of charges())."""
+    with _registry_lock:
+        index = _indexes.get(engine)
+        if index is None:
+            index = _indexes[engine] = RecurringIndex(engine)
+    return index
+
+
+@events.on_close
+def _forget(engine: Engine) -> None:
+    with _registry_lock:
+        _indexes.pop(engine, None)
+
+
+@events.subscribe
+def _apply_changes(engine: Engine, changes: events.LedgerChanges) -> None:
+    index = _indexes.get(engine)
+    if index is not None:
+        index.apply(changes)
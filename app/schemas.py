@@ -2,7 +2,7 @@
 from pydantic import BaseModel, Field, field_validator
 
 import datetime
-from typing import Optional, List
+from typing import Literal, Optional, List
 
 
 # ============================================
@@ -136,6 +136,37 @@ class TransactionWithID(TransactionBase):
         from_attributes = True
 
 
+# ============================================
+# FILTER PARAMS
+# ============================================
+
+
+class TransactionFilterParams(BaseModel):
+    """Standard transaction filters, shared by the list and analytics endpoints."""
+    # Text search
+    search: Optional[str] = None
+
+    # Categorical filters
+    cost_center_ids: Optional[List[int]] = None
+    spend_category_ids: Optional[List[int]] = None
+    spend_category_match: Literal["any", "all"] = "any"   # a transaction in any / all of spend_category_ids
+    account: Optional[List[str]] = None
+
+    # Date range
+    start_date: Optional[datetime.date] = None
+    end_date: Optional[datetime.date] = None
+
+    # Amount range
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+
+
+class AnomalyFilterParams(TransactionFilterParams):
+    """The standard filters, plus the score threshold (default anomalies.FLAG_SCORE) and a row limit."""
+    min_score: Optional[float] = Field(default=None, ge=0)
+    limit: int = Field(default=200, ge=1, le=5000)
+
+
 # ============================================
 # RESPONSE WRAPPERS
 # ============================================
@@ -146,6 +177,17 @@ class TransactionListResponse(BaseModel):
     count: int
 
 
+class FlaggedTransaction(TransactionWithID):
+    anomaly_score: float
+
+
+class FlaggedTransactionListResponse(BaseModel):
+    """Transactions with unusual amounts for their cost center or merchant, highest score first."""
+    transactions: List[FlaggedTransaction]
+    count: int
+    min_score: float
+
+
 class CostCenterListResponse(BaseModel):
     cost_centers: List[CostCenterWithID]
     count: int
@@ -154,3 +196,113 @@ class CostCenterListResponse(BaseModel):
 class SpendCategoryListResponse(BaseModel):
     spend_categories: List[SpendCategoryWithID]
     count: int
+
+
+# ============================================
+# SUMMARY SCHEMAS
+# ============================================
+
+
+class CostCenterTotal(BaseModel):
+    id: int
+    name: str
+    count: int
+    total: float
+
+
+class MonthTotal(BaseModel):
+    month: str  # YYYY-MM
+    count: int
+    total: float
+
+
+class TransactionSummaryResponse(BaseModel):
+    count: int
+    total: float
+    income: float
+    expenses: float
+    by_cost_center: List[CostCenterTotal]
+    by_month: List[MonthTotal]
+
+
+# ============================================
+# FACET SCHEMAS
+# ============================================
+
+
+class FacetValue(BaseModel):
+    id: Optional[int] = None  # accounts are identified by name
+    name: str
+    count: int
+    total: float
+
+
+class TransactionFacetsResponse(BaseModel):
+    """Filter options with live counts; each facet ignores its own filter."""
+    count: int
+    total: float
+    cost_centers: List[FacetValue]
+    spend_categories: List[FacetValue]
+    accounts: List[FacetValue]
+
+
+# ============================================
+# DISTRIBUTION SCHEMAS
+# ============================================
+
+
+class HistogramBin(BaseModel):
+    lower: float
+    upper: float
+    count: int
+
+
+class AmountDistributionResponse(BaseModel):
+    """Approximate amount distribution (KLL sketch, ~1% rank error)."""
+    count: int
+    min: Optional[float] = None
+    max: Optional[float] = None
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p99: Optional[float] = None
+    histogram: List[HistogramBin] = Field(default_factory=list)
+
+
+# ============================================
+# RECURRING CHARGE SCHEMAS
+# ============================================
+
+
+class RecurringCharge(BaseModel):
+    account: str
+    merchant: str
+    description: str
+    period: str
+    occurrences: int
+    first_date: datetime.date
+    last_date: datetime.date
+    amount: float
+    average_amount: float
+    next_date: datetime.date
+    next_amount: float
+    cost_center: Optional[str] = None
+    active: bool
+
+
+class RecurringChargeListResponse(BaseModel):
+    """Recurring charges ordered by next expected date."""
+    charges: List[RecurringCharge]
+    count: int
+
+
+class Suggestion(BaseModel):
+    description: str
+    count: int
+    last_date: datetime.date
+
+
+class SuggestionListResponse(BaseModel):
+    """Typeahead suggestions, most used and most recent first."""
+    query: str
+    suggestions: List[Suggestion]
+    count: int
@@ -0,0 +1,240 @@
+# app/sketches.py - mergeable KLL quantile sketch and running moments for streaming amount distributions
+import math
+from typing import Any, Dict, List, Optional
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang, Liberty).
+
+    Keeps a bounded number of items regardless of how many values are added, and
+    answers rank/quantile queries with an error of roughly 1.7/k of the total count.
+    Two sketches can be merged, so per-key sketches can be combined at query time.
+
+    The compaction coin is deterministic (alternates per compaction) so a sketch
+    built from the same stream always has the same state.
+    """
+
+    C = 2 / 3
+
+    def __init__(self, k: int = 200):
+        self.k = k
+        self.n = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.compactors: List[List[float]] = [[]]
+        self._coin = False
+        self._max_size = self._capacity(0)
+
+    # ========================
+    # UPDATES
+    # ========================
+
+    def update(self, value: float) -> None:
+        """Add a single value to the sketch."""
+        self.compactors[0].append(value)
+        self.n += 1
+        self.min = value if self.min is None or value < self.min else self.min
+        self.max = value if self.max is None or value > self.max else self.max
+
+        if self._size() >= self._max_size:
+            self._compress()
+
+    def update_many(self, values: List[float]) -> None:
+        """Add values in order; same resulting state as calling update() for each, much faster."""
+        start, size = 0, self._size()
+        while start < len(values):
+            # Append exactly up to the point where update() would compress
+            chunk = values[start:start + max(self._max_size - size, 1)]
+            start += len(chunk)
+            self.compactors[0].extend(chunk)
+            self.n += len(chunk)
+            low, high = min(chunk), max(chunk)
+            self.min = low if self.min is None or low < self.min else self.min
+            self.max = high if self.max is None or high > self.max else self.max
+
+            size = self._size()
+            if size >= self._max_size:
+                self._compress()
+                size = self._size()
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """Merge another sketch into this one (in place) and return self."""
+        if other.n == 0:
+            return self
+
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+
+        self.n += other.n
+        self.min = other.min if self.min is None or other.min < self.min else self.min
+        self.max = other.max if self.max is None or other.max > self.max else self.max
+
+        while self._size() >= self._max_size:
+            self._compress()
+        return self
+
+    # ========================
+    # QUERIES
+    # ========================
+
+    def rank(self, value: float) -> int:
+        """Estimated number of values <= value."""
+        total = 0
+        for level, items in enumerate(self.compactors):
+            weight = 1 << level
+            total += weight * sum(1 for item in items if item <= value)
+        return total
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated value at quantile q (0.0 - 1.0). None for an empty sketch."""
+        if self.n == 0:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        target = q * self.n
+        cumulative = 0
+        for item, weight in self._weighted_items():
+            cumulative += weight
+            if cumulative >= target:
+                return item
+        return self.max
+
+    def histogram(self, bins: int = 20) -> List[Dict[str, float]]:
+        """Equal-width histogram between min and max with estimated counts per bin."""
+        if self.n == 0:
+            return []
+        if self.min == self.max:
+            return [{"lower": self.min, "upper": self.max, "count": self.n}]
+
+        width = (self.max - self.min) / bins
+        edges = [self.min + i * width for i in range(bins)] + [self.max]
+
+        histogram = []
+        previous_rank = 0
+        for lower, upper in zip(edges, edges[1:]):
+            upper_rank = self.rank(upper)
+            histogram.append({"lower": lower, "upper": upper, "count": upper_rank - previous_rank})
+            previous_rank = upper_rank
+        return histogram
+
+    # ========================
+    # SERIALIZATION
+    # ========================
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "k": self.k,
+            "n": self.n,
+            "min": self.min,
+            "max": self.max,
+            "coin": self._coin,
+            "compactors": self.compactors,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "KLLSketch":
+        sketch = cls(k=data["k"])
+        sketch.n = data["n"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        sketch._coin = data["coin"]
+        sketch.compactors = [list(items) for items in data["compactors"]]
+        sketch._max_size = sum(sketch._capacity(h) for h in range(len(sketch.compactors)))
+        return sketch
+
+    # ========================
+    # INTERNAL HELPERS
+    # ========================
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self.k * self.C ** depth)) + 1
+
+    def _size(self) -> int:
+        return sum(len(items) for items in self.compactors)
+
+    def _grow(self) -> None:
+        self.compactors.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def _compress(self) -> None:
+        """Compact the lowest full level(s) until the sketch fits its size budget."""
+        for level in range(len(self.compactors)):
+            items = self.compactors[level]
+            if len(items) < self._capacity(level):
+                continue
+
+            if level + 1 >= len(self.compactors):
+                self._grow()
+
+            items.sort()
+            # Odd-sized levels keep their largest item so total weight is preserved
+            leftover = [items.pop()] if len(items) % 2 else []
+            offset = 1 if self._coin else 0
+            self._coin = not self._coin
+
+            self.compactors[level + 1].extend(items[offset::2])
+            self.compactors[level] = leftover
+
+            if self._size() < self._max_size:
+                break
+
+    def _weighted_items(self):
+        weighted = [
+            (item, 1 << level)
+            for level, items in enumerate(self.compactors)
+            for item in items
+        ]
+        weighted.sort(key=lambda pair: pair[0])
+        return weighted
+
+
+class Moments:
+    """
+    Running count, mean and sum of squared deviations from the mean (Welford).
+
+    O(1) per value, and unlike a KLL sketch a value can be removed again
+    (Welford run backwards), so edits and deletes need no rebuild.
+    """
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self, n: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value: float) -> None:
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def remove(self, value: float) -> None:
+        """Take out a value that was added before."""
+        if self.n <= 1:
+            self.n, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        self.n -= 1
+        delta = value - self.mean
+        self.mean -= delta / self.n
+        # Rounding can leave a hair below zero once the remaining values are all equal
+        self.m2 = max(self.m2 - delta * (value - self.mean), 0.0)
+
+    def without(self, value: float) -> "Moments":
+        """A copy with one of the added values taken out (leave-one-out)."""
+        other = Moments(self.n, self.mean, self.m2)
+        other.remove(value)
+        return other
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation (0 below two values)."""
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
@@ -0,0 +1,220 @@
+# app/snapshots.py - Parquet snapshots of the whole ledger (export, and bulk restore into an empty database)
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.types import Date, Float, Integer, String
+
+import os
+from contextlib import ExitStack
+from typing import Dict
+
+from . import archive, events
+from .crud import anomalies, distributions
+from .migrations import MIGRATIONS, SCHEMA_VERSION
+from .models import (
+    Account, AmountSketch, AmountStats, CostCenter, SpendCategory, Transaction, transaction_spend_categories,
+)
+
+
+ROW_GROUP_SIZE = 64_000
+
+# Written and restored in this order (parents before the rows that reference them)
+_TABLES = (
+    CostCenter.__table__,
+    SpendCategory.__table__,
+    Transaction.__table__,
+    transaction_spend_categories,
+)
+
+_ORDER = {table.name: [c.name for c in table.primary_key.columns] for table in _TABLES}
+
+# Everything a restore writes, all of which must start out empty
+_RESTORED_TABLES = (*_TABLES, Account.__table__, AmountSketch.__table__, AmountStats.__table__)
+
+_VERSION_KEY = b"finance.schema_version"
+# Snapshots were added at schema v4; older ones are upgraded on restore
+OLDEST_VERSION = 4
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet snapshots need pyarrow installed (pip install pyarrow)")
+    return pa, pq
+
+
+def _arrow_schema(pa, table):
+    """Parquet schema for a table, from its SQLAlchemy column types."""
+    types = {Integer: pa.int64(), Float: pa.float64(), String: pa.string(), Date: pa.date32()}
+    fields = []
+    for column in table.columns:
+        arrow_type = next(t for sql_type, t in types.items() if isinstance(column.type, sql_type))
+        fields.append(pa.field(column.name, arrow_type, nullable=column.nullable))
+    return pa.schema(fields, metadata={_VERSION_KEY: str(SCHEMA_VERSION).encode()})
+
+
+def _to_arrow(pa, values, arrow_type):
+    if pa.types.is_date(arrow_type):
+        return pa.array(values, pa.string()).cast(arrow_type)
+    return pa.array(values, arrow_type)
+
+
+def _path(directory: str, table) -> str:
+    return os.path.join(directory, f"{table.name}.parquet")
+
+
+# ============================================
+# EXPORT
+# ============================================
+
+
+def export_ledger(engine: Engine, directory: str, row_group_size: int = ROW_GROUP_SIZE) -> Dict[str, int]:
+    """
+    Write transactions, cost centers, spend categories and their links to
+    <directory>/<table>.parquet. Archived years are included.
+
+    Rows are streamed from SQLite one row group at a time, so memory stays
+    flat however large the ledger is. The hot tables are read in one
+    transaction (consistent with each other), then the read-only archived
+    years a few at a time (archive.archived_selects), so any number of them
+    can be exported. Returns the row count per table.
+    """
+    pa, pq = _pyarrow()
+    os.makedirs(directory, exist_ok=True)
+    schemas = {table.name: _arrow_schema(pa, table) for table in _TABLES}
+    counts = {table.name: 0 for table in _TABLES}
+
+    with ExitStack() as stack, engine.connect() as conn:
+        writers = {
+            table.name: stack.enter_context(
+                pq.ParquetWriter(_path(directory, table), schemas[table.name], compression="zstd")
+            )
+            for table in _TABLES
+        }
+
+        def write(table_name: str, select_sql: str) -> None:
+            schema = schemas[table_name]
+            # Raw rows (dates stay ISO text) are much cheaper to fetch; Arrow parses the dates
+            result = conn.execution_options(stream_results=True).exec_driver_sql(
+                f"SELECT {', '.join(schema.names)} FROM ({select_sql}) ORDER BY {', '.join(_ORDER[table_name])}"
+            )
+            for rows in result.partitions(row_group_size):
+                columns = list(zip(*rows))
+                writers[table_name].write_batch(pa.RecordBatch.from_arrays(
+                    [_to_arrow(pa, values, field.type) for values, field in zip(columns, schema)],
+                    schema = schema,
+                ))
+                counts[table_name] += len(rows)
+
+        for table in _TABLES:
+            write(table.name, f"SELECT * FROM main.{table.name}")
+        conn.commit()
+        for selects in archive.archived_selects(conn):
+            for table_name, select_sql in selects.items():
+                write(table_name, select_sql)
+            conn.commit()
+    return counts
+
+
+# ============================================
+# IMPORT
+# ============================================
+
+
+def import_ledger(db: Session, directory: str, batch_size: int = ROW_GROUP_SIZE) -> Dict[str, int]:
+    """
+    Bulk-load a snapshot written by export_ledger into an empty ledger, in one commit.
+
+    Rows keep their ids (and anomaly scores). Accounts, amount sketches and
+    amount statistics are rebuilt from the loaded transactions; archived years
+    in the snapshot land in the hot database.
+
+    Snapshots from an older schema (OLDEST_VERSION on) are restored too: the
+    columns they lack take their defaults, then the data steps of the
+    migrations since their version (app/migrations.py) fill them in.
+    """
+    pa, pq = _pyarrow()
+    for table in _RESTORED_TABLES:
+        if db.scalar(select(func.count()).select_from(table)):
+            raise ValueError("Snapshots can only be imported into an empty ledger")
+
+    files, versions = {}, set()
+    for table in _TABLES:
+        path = _path(directory, table)
+        if not os.path.exists(path):
+            raise ValueError(f"Snapshot is missing {os.path.basename(path)}")
+        files[table.name] = pq.ParquetFile(path)
+        versions.add((files[table.name].schema_arrow.metadata or {}).get(_VERSION_KEY))
+    version = versions.pop() if len(versions) == 1 else None
+    if version is None or not version.isdigit() or not OLDEST_VERSION <= int(version) <= SCHEMA_VERSION:
+        raise ValueError(
+            f"Snapshot schema version {version and version.decode()} can't be restored into this database "
+            f"(versions {OLDEST_VERSION} to {SCHEMA_VERSION})"
+        )
+    version = int(version)
+
+    conn = db.connection()
+    # Building secondary indexes once after the load beats updating them per row
+    indexes = [index for table in _TABLES for index in table.indexes]
+    for index in indexes:
+        index.drop(conn)
+
+    counts = {}
+    for table in _TABLES:
+        names = [column.name for column in table.columns if column.name in files[table.name].schema_arrow.names]
+        sql = (
+            f"INSERT INTO {table.name} ({', '.join(names)}) "
+            f"VALUES ({', '.join('?' for _ in names)})"
+        )
+        counts[table.name] = 0
+        for batch in files[table.name].iter_batches(batch_size=batch_size, columns=names):
+            # Dates go in as ISO text, the way SQLAlchemy's Date type stores them
+            columns = [
+                (column.cast(pa.string()) if pa.types.is_date(column.type) else column).to_pylist()
+                for column in batch.columns
+            ]
+            conn.exec_driver_sql(sql, list(zip(*columns)))
+            counts[table.name] += batch.num_rows
+
+    for index in indexes:
+        index.create(conn)
+    conn.exec_driver_sql("INSERT INTO accounts (name) SELECT DISTINCT account FROM transactions")
+    distributions.rebuild_all_sketches(db)
+    anomalies.rebuild_all(db)
+    db.flush()
+    # Older snapshots: backfill what later versions added (each step is re-runnable on the current schema)
+    for step in MIGRATIONS[version:]:
+        step(conn)
+    events.note(db, events.LedgerChanges(full=True))
+    db.commit()
+    return counts
+
+
+if __name__ == "__main__":
+    # python -m app.snapshots export backups/2025-06-01
+    # python -m app.snapshots import backups/2025-06-01
+    import argparse
+    import time
+
+    from .database import get_engine, get_sessionmaker, init_db
+
+    parser = argparse.ArgumentParser(description="Export or restore the ledger as Parquet files")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("directory")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    init_db(engine)
+    started = time.perf_counter()
+    if args.command == "export":
+        counts = export_ledger(engine, args.directory)
+    else:
+        with get_sessionmaker()() as db:
+            counts = import_ledger(db, args.directory)
+    elapsed = time.perf_counter() - started
+
+    for table, count in counts.items():
+        print(f"{args.command}ed {count} {table}")
+    print(f"in {elapsed:.1f}s")
@@ -0,0 +1,374 @@
+# app/suggest.py - description typeahead: in-memory prefix index per database, updated incrementally
+import bisect
+import datetime
+import heapq
+import threading
+import weakref
+from array import array
+from operator import itemgetter
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from sqlalchemy.engine import Engine
+
+from . import events
+
+
+MAX_LIMIT = 50          # suggestions per query
+MAX_WORDS = 6           # word starts indexed per description (after the first)
+RECENCY_DAYS = 90       # a description last used this long ago ranks at half its count
+CACHE_RANGE = 2_000     # prefixes matching more index keys than this keep a ranked top list
+STALE_LIMIT = 500       # more top lists (or descriptions) than this to re-rank after a change: rebuild them all
+INSORT_LIMIT = 64       # more index keys than this added or dropped by a change: merge them in one pass
+ID_CHUNK = 10_000       # stay well under SQLite's bound-parameter limit
+
+
+class Suggestion(NamedTuple):
+    description: str
+    count: int
+    last_date: datetime.date
+
+
+def fold(text: str) -> str:
+    """Case- and whitespace-insensitive form of a description or query."""
+    return " ".join(text.casefold().split())
+
+
+def index_keys(description: str) -> List[str]:
+    """
+    Keys a description is found under: the whole folded text, and the text from
+    each later word that starts with a letter, so "coffee" finds "Blue Bottle Coffee".
+    """
+    text = fold(description)
+    keys = [text]
+    for i in range(1, len(text)):
+        if len(keys) > MAX_WORDS:
+            break
+        if text[i - 1] == " " and text[i].isalpha():
+            keys.append(text[i:])
+    return keys
+
+
+# ============================================
+# INDEX
+# ============================================
+
+
+class SuggestIndex:
+    """
+    Distinct descriptions of one database, searched by prefix.
+
+    Index keys are kept sorted (with the description number of each key in a
+    parallel array), so the keys under a prefix are one binary-searched range.
+    Ranking a range costs time proportional to its size, so every prefix with
+    more than CACHE_RANGE keys keeps its top MAX_LIMIT descriptions, built
+    bottom-up from its children's: any query is either a small range or one
+    dict lookup. Scores depend on the day, so the tables are rebuilt daily.
+
+    Kept current from the changes published by app.events. Each transaction id
+    maps to its description's number in a flat int array, so deletes are applied
+    without re-reading the row. Deleting the latest use of a description doesn't
+    move its last date back. Archived years (app/archive.py) aren't indexed.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._keys: List[str] = []
+        self._key_numbers = array("l")       # parallel to _keys
+        self._numbers: Dict[str, int] = {}   # description -> number
+        self._descriptions: List[str] = []   # number -> description
+        self._counts = array("q")            # number -> transactions using it
+        self._last = array("l")              # number -> date ordinal of the latest one
+        self._by_id = array("l")             # transaction id -> number (-1 if none)
+        self._top: Dict[str, List[int]] = {}  # wide prefix -> best numbers, best first
+        self._day = 0                        # ordinal the rankings were computed for
+        self._built = False
+        self._lock = threading.Lock()
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    def ready(self, today: Optional[datetime.date] = None) -> bool:
+        """Whether suggest() answers from memory without rebuilding anything first."""
+        return self._built and self._day == (today or datetime.date.today()).toordinal()
+
+    def refresh(self, today: Optional[datetime.date] = None) -> None:
+        """Rebuild from the database."""
+        with self._lock, self.engine.connect() as conn:
+            rows = conn.exec_driver_sql("SELECT id, description, date FROM transactions").fetchall()
+            self._numbers, self._descriptions = {}, []
+            self._counts, self._last = array("q"), array("l")
+            self._by_id = array("l", [-1]) * (max((row[0] for row in rows), default=0) + 1)
+            for row in rows:
+                self._add(row, index = False)
+            # One sort instead of an insort per key
+            keys = sorted(
+                (key, number)
+                for number, count in enumerate(self._counts) if count
+                for key in index_keys(self._descriptions[number])
+            )
+            self._keys = [key for key, _ in keys]
+            self._key_numbers = array("l", (number for _, number in keys))
+            self._rank_all((today or datetime.date.today()).toordinal())
+            self._built = True
+
+    def apply(self, changes: events.LedgerChanges) -> None:
+        """Apply a committed change set: only the touched rows are re-read."""
+        if not self._built:
+            return
+        if changes.full:
+            self.refresh()
+            return
+        touched = changes.transaction_ids | changes.deleted_ids
+        if not touched:
+            return
+
+        rows = self._fetch(sorted(changes.transaction_ids))
+        with self._lock:
+            before = {}   # description number -> score before the change
+            indexed = {}  # description number -> whether its keys were in the index before the change
+            for tx_id in touched:
+                number = self._by_id[tx_id] if tx_id < len(self._by_id) else -1
+                if number >= 0:
+                    before.setdefault(number, self._score(number))
+                    indexed.setdefault(number, True)
+                    self._remove(tx_id)
+            for row in rows:
+                number = self._numbers.get(row[1])
+                if number is not None:
+                    before.setdefault(number, self._score(number))
+                    indexed.setdefault(number, self._counts[number] > 0)
+                self._add(row, index = False)
+                before.setdefault(self._numbers[row[1]], 0.0)
+                indexed.setdefault(self._numbers[row[1]], False)
+            self._reindex(
+                [number for number, was in indexed.items() if not was and self._counts[number]],
+                {number for number, was in indexed.items() if was and not self._counts[number]},
+            )
+            self._rerank(before)
+
+    def suggest(self, query: str, limit: int = 10, today: Optional[datetime.date] = None) -> List[Suggestion]:
+        """
+        Descriptions with a word starting with `query`, most used (and most
+        recently used) first. Builds the index first if needed.
+        """
+        if not self._built:
+            self.refresh(today)
+        day = (today or datetime.date.today()).toordinal()
+
+        with self._lock:
+            if day != self._day:
+                self._rank_all(day)
+            return self._lookup(fold(query), limit)
+
+    def try_suggest(self, query: str, limit: int = 10, today: Optional[datetime.date] = None) -> Optional[List[Suggestion]]:
+        """
+        suggest() if it answers right away, else None: while the index is
+        being built, re-ranked or updated. Never waits, so it is safe to call
+        from the event loop.
+        """
+        if not self.ready(today) or not self._lock.acquire(blocking = False):
+            return None
+        try:
+            if self._day != (today or datetime.date.today()).toordinal():
+                return None
+            return self._lookup(fold(query), limit)
+        finally:
+            self._lock.release()
+
+    # ========================
+    # RANKING
+    # ========================
+
+    def _lookup(self, prefix: str, limit: int) -> List[Suggestion]:
+        if not prefix:
+            return []
+        numbers = self._top.get(prefix)
+        if numbers is None:
+            lo, hi = self._range(prefix)
+            numbers = self._rank(set(self._key_numbers[lo:hi]), limit)
+        return [
+            Suggestion(self._descriptions[n], self._counts[n], datetime.date.fromordinal(self._last[n]))
+            for n in numbers[:limit]
+        ]
+
+    def _score(self, number: int) -> float:
+        age = max(0, self._day - self._last[number])
+        return self._counts[number] / (1 + age / RECENCY_DAYS)
+
+    def _rank(self, numbers, limit: int = MAX_LIMIT) -> List[int]:
+        return heapq.nlargest(limit, (n for n in numbers if self._counts[n]), key=self._score)
+
+    def _range(self, prefix: str, lo: int = 0, hi: Optional[int] = None) -> Tuple[int, int]:
+        hi = len(self._keys) if hi is None else hi
+        lo = bisect.bisect_left(self._keys, prefix, lo, hi)
+        return lo, bisect.bisect_left(self._keys, prefix + "\U0010ffff", lo, hi)
+
+    def _rank_all(self, day: int) -> None:
+        self._day = day
+        self._top = {}
+        lo, hi = 0, len(self._keys)
+        if hi - lo > CACHE_RANGE:
+            self._rank_children("", lo, hi, recurse = True)
+
+    def _rank_prefix(self, prefix: str, lo: int, hi: int, recurse: bool) -> List[int]:
+        """Top numbers for a prefix's key range; wide prefixes are stored in _top."""
+        if hi - lo <= CACHE_RANGE:
+            self._top.pop(prefix, None)
+            return self._rank(set(self._key_numbers[lo:hi]))
+        if not recurse and prefix in self._top:
+            return self._top[prefix]
+        self._top[prefix] = self._rank_children(prefix, lo, hi, recurse)
+        return self._top[prefix]
+
+    def _rank_children(self, prefix: str, lo: int, hi: int, recurse: bool) -> List[int]:
+        # The top of a range is the top of its children's tops (plus keys equal to the prefix)
+        candidates = set()
+        i = lo
+        while i < hi and self._keys[i] == prefix:
+            candidates.add(self._key_numbers[i])
+            i += 1
+        while i < hi:
+            child = prefix + self._keys[i][len(prefix)]
+            j = self._range(child, i, hi)[1]
+            candidates.update(self._rank_prefix(child, i, j, recurse))
+            i = j
+        return self._rank(candidates)
+
+    def _rerank(self, before: Dict[int, float]) -> None:
+        """Update the stored tops of the prefixes whose descriptions changed score."""
+        if len(before) > STALE_LIMIT:
+            # Merging each one into every top list costs more than ranking them all once
+            self._rank_all(self._day)
+            return
+        stale = set()
+        for number, old in before.items():
+            raised = self._counts[number] and self._score(number) >= old
+            for key in index_keys(self._descriptions[number]):
+                for end in range(1, len(key) + 1):
+                    prefix = key[:end]
+                    top = self._top.get(prefix)
+                    if top is None:
+                        lo, hi = self._range(prefix)
+                        if raised and hi - lo > CACHE_RANGE:
+                            stale.add(prefix)  # grew past CACHE_RANGE; its longer prefixes may have too
+                        break  # longer prefixes are narrower
+                    if raised:
+                        # Only this description's score went up: merging it into the old top is exact
+                        if number not in top:
+                            top.append(number)
+                        top.sort(key=self._score, reverse=True)
+                        del top[MAX_LIMIT:]
+                    elif number in top:
+                        stale.add(prefix)
+
+        if len(stale) > STALE_LIMIT or any(prefix not in self._top for prefix in stale):
+            self._rank_all(self._day)
+            return
+        # Longest first, so each prefix is re-ranked from children that are already current
+        for prefix in sorted(stale, key=len, reverse=True):
+            lo, hi = self._range(prefix)
+            if hi - lo > CACHE_RANGE:
+                self._top[prefix] = self._rank_children(prefix, lo, hi, recurse = False)
+            else:
+                self._top.pop(prefix, None)
+
+    # ========================
+    # INTERNAL HELPERS
+    # ========================
+
+    def _add(self, row, index: bool) -> None:
+        tx_id, description, day = row
+        number = self._numbers.get(description)
+        if number is None:
+            number = self._numbers[description] = len(self._descriptions)
+            self._descriptions.append(description)
+            self._counts.append(0)
+            self._last.append(0)
+        if index and not self._counts[number]:
+            for key in index_keys(description):
+                i = bisect.bisect_left(self._keys, key)
+                self._keys.insert(i, key)
+                self._key_numbers.insert(i, number)
+
+        self._counts[number] += 1
+        self._last[number] = max(self._last[number], datetime.date.fromisoformat(day).toordinal())
+        if tx_id >= len(self._by_id):
+            self._by_id.extend([-1] * (tx_id + 1 - len(self._by_id)))
+        self._by_id[tx_id] = number
+
+    def _remove(self, tx_id: int) -> None:
+        # The keys of a description that is no longer used are dropped by _reindex
+        number = self._by_id[tx_id]
+        self._by_id[tx_id] = -1
+        self._counts[number] -= 1
+
+    def _reindex(self, added: List[int], dropped: Set[int]) -> None:
+        """Add the keys of newly used descriptions and drop those of unused ones."""
+        new = [(key, number) for number in added for key in index_keys(self._descriptions[number])]
+        old = [(key, number) for number in dropped for key in index_keys(self._descriptions[number])]
+        if len(new) + len(old) <= INSORT_LIMIT:
+            # A few keys: O(keys) list inserts and deletes each, but no copy of the index
+            for key, number in old:
+                lo, hi = bisect.bisect_left(self._keys, key), bisect.bisect_right(self._keys, key)
+                for i in range(lo, hi):
+                    if self._key_numbers[i] == number:
+                        del self._keys[i]
+                        del self._key_numbers[i]
+                        break
+            for key, number in new:
+                i = bisect.bisect_left(self._keys, key)
+                self._keys.insert(i, key)
+                self._key_numbers.insert(i, number)
+            return
+
+        # Many keys (a large import): one pass over the index, the new keys appended as a sorted run
+        # that the sort merges in linear time, instead of an O(index) insert per key
+        keys = [pair for pair in zip(self._keys, self._key_numbers) if pair[1] not in dropped]
+        new.sort(key = itemgetter(0))
+        keys += new
+        keys.sort(key = itemgetter(0))
+        self._keys = [key for key, _ in keys]
+        self._key_numbers = array("l", (number for _, number in keys))
+
+    def _fetch(self, ids: Sequence[int]) -> list:
+        rows = []
+        with self.engine.connect() as conn:
+            for start in range(0, len(ids), ID_CHUNK):
+                chunk = ids[start:start + ID_CHUNK]
+                rows += conn.exec_driver_sql(
+                    f"SELECT id, description, date FROM transactions WHERE id IN ({', '.join('?' * len(chunk))})",
+                    tuple(chunk),
+                ).fetchall()
+        return rows
+
+
+# ============================================
+# REGISTRY
+# ============================================
+
+
+_indexes: "weakref.WeakKeyDictionary[Engine, SuggestIndex]" = weakref.WeakKeyDictionary()
+_registry_lock = threading.Lock()
+
+
+def get_index(engine: Engine) -> SuggestIndex:
+    """The suggestion index for a database (built on first use of suggest())."""
+    with _registry_lock:
+        index = _indexes.get(engine)
+        if index is None:
+            index = _indexes[engine] = SuggestIndex(engine)
+    return index
+
+
+@events.on_close
+def _forget(engine: Engine) -> None:
+    with _registry_lock:
+        _indexes.pop(engine, None)
+
+
+@events.subscribe
+def _apply_changes(engine: Engine, changes: events.LedgerChanges) -> None:
+    index = _indexes.get(engine)
+    if index is not None:
+        index.apply(changes)
@@ -0,0 +1,171 @@
+# app/writer.py - single writer thread that group-commits queued database mutations
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Tuple
+
+from . import events
+
+
+@dataclass
+class _Op:
+    fn: Callable[..., Any]
+    args: Tuple[Any, ...]
+    kwargs: dict
+    future: Future = field(default_factory=Future)
+
+
+_STOP = object()
+
+
+class WriteQueue:
+    """
+    Serializes every write to one SQLite database through a single thread.
+
+    SQLite allows one writer at a time, so concurrent writers either wait on the
+    file lock or fail with "database is locked". Here callers submit fn(session, ...)
+    and the writer runs queued operations back to back on one connection:
+    each in its own savepoint (a failing operation only rolls back itself),
+    all of them under one outer transaction that is committed once (group commit).
+
+    A batch takes whatever queued up while the previous one was committing, up to
+    max_batch operations. With max_delay > 0 it also waits up to that many seconds
+    after its first operation for more, which bounds the latency added to a write.
+    """
+
+    def __init__(self, engine: Engine, max_batch: int = 64, max_delay: float = 0.0):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        # Counters for benchmarks and tests
+        self.batches = 0
+        self.operations = 0
+
+    # ========================
+    # Public API
+    # ========================
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Queue fn(session, *args, **kwargs) and return a Future for its result.
+
+        fn may call session.commit() (it only releases a savepoint); its changes are
+        durable once the Future resolves. Results are used after the session
+        closes, so return plain data or fully loaded objects.
+        """
+        self.start()
+        op = _Op(fn, args, kwargs)
+        self._queue.put(op)
+        return op.future
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Await fn(session, ...) from async code without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def start(self) -> None:
+        """Start the writer thread (idempotent; submit() starts it on first use)."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Finish queued operations and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    # ========================
+    # Writer thread
+    # ========================
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+
+            batch = [first]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    op = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if op is _STOP:
+                    stopping = True
+                    break
+                batch.append(op)
+
+            try:
+                self._commit_batch(batch)
+            except Exception as e:
+                # Connection-level failure: fail whatever hasn't resolved, keep the thread alive
+                for op in batch:
+                    if not op.future.done():
+                        op.future.set_exception(e)
+
+    def _commit_batch(self, batch: List[_Op]) -> None:
+        done = []  # (op, result) for operations whose savepoint was released
+
+        with self.engine.connect() as conn:
+            outer = conn.begin()
+
+            for op in batch:
+                if not op.future.set_running_or_notify_cancel():
+                    continue
+
+                savepoint = conn.begin_nested()
+                session = Session(
+                    bind=conn,
+                    join_transaction_mode="create_savepoint",
+                    autoflush=False,
+                    expire_on_commit=False,
+                )
+                try:
+                    result = op.fn(session, *op.args, **op.kwargs)
+                    session.commit()
+                    savepoint.commit()
+                except Exception as e:
+                    session.close()
+                    savepoint.rollback()
+                    # Changes this op already handed to conn.info are still published;
+                    # subscribers re-read every id, so a rolled-back one costs a refresh only
+                    op.future.set_exception(e)
+                    continue
+                finally:
+                    session.close()
+                done.append((op, result))
+
+            try:
+                outer.commit()
+            except Exception as e:
+                events.discard_connection(conn)
+                for op, _ in done:
+                    op.future.set_exception(e)
+                return
+
+            events.publish_connection(conn)
+
+        self.batches += 1
+        self.operations += len(batch)
+        for op, result in done:
+            op.future.set_result(result)
@@ -0,0 +1,103 @@
+# benchmarks/bench_anomalies.py - cost of keeping anomaly statistics current: incremental Welford updates vs recomputing from history
+#
+# Usage: python benchmarks/bench_anomalies.py [--rows 10000 200000] [--writes 1000] [--batch 20000]
+#
+# Seeds a temporary ledger (a few thousand merchants over a handful of cost
+# centers), then times, per ledger size:
+#   write   scoring one new amount and updating its statistics (rolled back), per call
+#   batch   the same for --batch new rows at once, as a staged import does
+#   rebuild recomputing every statistic from the ledger (what each write would
+#           cost without running statistics)
+# The first two should not grow with the ledger; the rebuild does.
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import database  # noqa: E402
+from app.crud import anomalies, imports  # noqa: E402
+from app.records import ParsedTransaction  # noqa: E402
+
+
+COST_CENTERS = ["Meals", "Car", "Living Expenses", "Media", "Travel", "Home"]
+
+
+def merchants(rng, count: int):
+    words = ["blue", "bottle", "shell", "market", "corner", "deli", "city", "parking", "trip", "cloud", "store"]
+    return [" ".join(rng.sample(words, 2)).upper() + f" {i}X" for i in range(count)]
+
+
+def rows(rng, names, count: int):
+    start = datetime.date(2015, 1, 1)
+    return [
+        (rng.choice(COST_CENTERS), f"{rng.choice(names)} #{rng.randrange(1000)}", -rng.randrange(100, 50_000))
+        for _ in range(count)
+    ], start
+
+
+def seed(engine, rng, names, count: int) -> None:
+    new_rows, start = rows(rng, names, count)
+    transactions = [
+        ParsedTransaction(
+            date = start + datetime.timedelta(days=i * 3650 // count),
+            description = description,
+            amount_cents = amount,
+            account = "Discover",
+            cost_center = cost_center,
+            spend_categories = (),
+        )
+        for i, (cost_center, description, amount) in enumerate(new_rows)
+    ]
+    with database.make_sessionmaker(engine)() as db:
+        imports.load_import(db, "seed", "custom", transactions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 200_000])
+    parser.add_argument("--writes", type=int, default=1000)
+    parser.add_argument("--batch", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    names = merchants(rng, 3000)
+    for count in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = database.make_engine(f"sqlite:///{tmp}/bench.db")
+            database.init_db(engine)
+            seed(engine, rng, names, count)
+            SessionLocal = database.make_sessionmaker(engine)
+
+            with SessionLocal() as db:
+                writes, _ = rows(rng, names, args.writes)
+                t0 = time.perf_counter()
+                for row in writes:
+                    anomalies.record_amounts(db, [row])
+                    db.rollback()
+                write_us = (time.perf_counter() - t0) / args.writes * 1e6
+
+                batch, _ = rows(rng, names, args.batch)
+                t0 = time.perf_counter()
+                anomalies.record_amounts(db, batch)
+                batch_ms = (time.perf_counter() - t0) * 1000
+                db.rollback()
+
+                t0 = time.perf_counter()
+                anomalies.rebuild_all(db)
+                rebuild_ms = (time.perf_counter() - t0) * 1000
+                db.rollback()
+
+            print(
+                f"{count:>9,} rows: write {write_us:6.0f} us   batch of {args.batch:,} {batch_ms:6.0f} ms   "
+                f"rebuild {rebuild_ms:7.0f} ms"
+            )
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# benchmarks/bench_categories.py - spend category filters: EXISTS / COUNT subqueries over the links vs the category_mask bit check
+#
+# Usage: python benchmarks/bench_categories.py [--rows 100000 1000000] [--categories 2 3] [--repeat 5]
+#
+# Seeds a temporary database with rows in one to three of 30 spend
+# categories (skewed, so a few are common) and counts the rows matching any
+# and all of the first --categories categories, optionally with a date
+# range. "links" is the filter without category bits (an EXISTS subquery for
+# any-of, a COUNT subquery for all-of, per candidate row); "mask" checks
+# Transaction.category_mask. Best of --repeat, SQLite time only.
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import func, select
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import database  # noqa: E402
+from app.crud import category_bits  # noqa: E402
+from app.crud.filters import FilterSpec, cached  # noqa: E402
+from app.models import Transaction  # noqa: E402
+
+
+CATEGORIES = 30
+
+
+def seed(engine, rows: int) -> None:
+    rng = random.Random(7)
+    start = datetime.date(2015, 1, 1)
+    weights = [1 / (i + 1) for i in range(CATEGORIES)]
+    database.init_db(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO cost_centers (id, name) VALUES (1, 'Uncategorized')")
+        conn.exec_driver_sql(
+            "INSERT INTO spend_categories (id, name, bit) VALUES (?, ?, ?)",
+            [(i + 1, f"Category {i + 1}", i) for i in range(CATEGORIES)],
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO transactions (id, date, description, amount_cents, account, cost_center_id) "
+            "VALUES (?, ?, 'Purchase', ?, 'Discover', 1)",
+            [
+                (i + 1, (start + datetime.timedelta(days=rng.randrange(3650))).isoformat(), -rng.randrange(100, 50_000))
+                for i in range(rows)
+            ],
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO transaction_spend_categories (transaction_id, spend_category_id) VALUES (?, ?)",
+            [
+                (i + 1, category_id)
+                for i in range(rows)
+                for category_id in {c + 1 for c in rng.choices(range(CATEGORIES), weights, k=rng.randint(1, 3))}
+            ],
+        )
+        category_bits.refresh_masks(conn)
+
+
+def best_ms(conn, spec: FilterSpec, repeat: int):
+    statement = cached("bench_count", spec, lambda where: select(func.count()).select_from(Transaction).where(*where))
+    params = spec.params()
+    times, count = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        count = conn.execute(statement, params).scalar()
+        times.append((time.perf_counter() - t0) * 1000)
+    return min(times), count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--categories", type=int, nargs="+", default=[2, 3])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = database.make_engine(f"sqlite:///{tmp}/bench.db")
+            seed(engine, rows)
+            print(f"{rows:,} rows:")
+            with engine.connect() as conn:
+                for n in args.categories:
+                    for match in ("any", "all"):
+                        for dates in ({}, {"start_date": datetime.date(2024, 1, 1)}):
+                            links = FilterSpec.from_filters(
+                                spend_category_ids = list(range(1, n + 1)), spend_category_match = match, **dates,
+                            )
+                            mask = links.with_category_bits(conn)
+                            links_ms, links_count = best_ms(conn, links, args.repeat)
+                            mask_ms, mask_count = best_ms(conn, mask, args.repeat)
+                            assert links_count == mask_count
+                            label = f"{match} of {n}" + (", last year" if dates else "")
+                            print(
+                                f"  {label:<20} {mask_count:>9,} match   links {links_ms:8.1f} ms   "
+                                f"mask {mask_ms:7.1f} ms   ({links_ms / mask_ms:.1f}x)"
+                            )
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# benchmarks/bench_filters.py - per-request Python overhead of filtered reads: cached spec statements vs ORM Query rebuilds
+#
+# Usage: python benchmarks/bench_filters.py [--rows 2000] [--calls 2000]
+#
+# Runs the filtered list, summary and facets reads many times on a small
+# ledger, so the time is mostly statement construction and compilation rather
+# than SQLite. "query" rebuilds an ORM Query with .filter() calls per request
+# (the previous implementation, kept here as the baseline); "spec" is
+# app.crud.operations, which binds FilterSpec values into statements cached
+# per filter shape. Also reports the columnar export read (Core columns vs
+# ORM rows fed to formats.from_transactions).
+# Numbers are microseconds per call, SQLite time included.
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import joinedload, selectinload
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import database, formats  # noqa: E402
+from app.crud import operations  # noqa: E402
+from app.loaders import save_transactions  # noqa: E402
+from app.models import Account, CostCenter, SpendCategory, Transaction, transaction_spend_categories  # noqa: E402
+from app.money import to_cents  # noqa: E402
+
+
+# A request with five of the eight filters, matching a few dozen rows
+FILTERS = {
+    "search": "coffee",
+    "account": ["Discover"],
+    "spend_category_ids": [1, 2],
+    "start_date": datetime.date(2024, 3, 1),
+    "min_amount": -100.0,
+}
+
+
+def seed(engine, rows: int) -> None:
+    rng = random.Random(7)
+    start = datetime.date(2024, 1, 1)
+    save_transactions([
+        {
+            "date": start + datetime.timedelta(days=rng.randrange(365)),
+            "description": rng.choice(["Coffee Shop", "Grocery Store", "Gas Station", "Rent", "Streaming"]),
+            "amount_cents": -rng.randrange(100, 50_000),
+            "account": rng.choice(["Discover", "Schwab Checking"]),
+            "cost_center": rng.choice(["Meals", "Car", "Living Expenses", "Media"]),
+            "spend_categories": rng.sample(["Restaurants", "Gasoline", "Supermarkets", "Services"], 2),
+        }
+        for _ in range(rows)
+    ], db_session=database.make_sessionmaker(engine)())
+
+
+# ============================================
+# BASELINE: ORM Query rebuilt per request
+# ============================================
+
+
+def apply_filters(query, search=None, cost_center_ids=None, spend_category_ids=None, account=None,
+                  start_date=None, end_date=None, min_amount=None, max_amount=None):
+    if search:
+        query = query.filter(Transaction.description.ilike(f"%{search}%"))
+    if cost_center_ids:
+        query = query.filter(Transaction.cost_center_id.in_(cost_center_ids))
+    if spend_category_ids:
+        query = query.filter(Transaction.spend_categories.any(SpendCategory.id.in_(spend_category_ids)))
+    if account:
+        query = query.filter(Transaction.account.in_(account))
+    if start_date:
+        query = query.filter(Transaction.date >= start_date)
+    if end_date:
+        query = query.filter(Transaction.date <= end_date)
+    if min_amount is not None:
+        query = query.filter(Transaction.amount_cents >= to_cents(min_amount))
+    if max_amount is not None:
+        query = query.filter(Transaction.amount_cents <= to_cents(max_amount))
+    return query
+
+
+def query_list(session, **filters):
+    query = session.query(Transaction).options(
+        joinedload(Transaction.cost_center), selectinload(Transaction.spend_categories),
+    )
+    return apply_filters(query, **filters).all()
+
+
+def query_summary(session, **filters):
+    query = apply_filters(session.query(Transaction), **filters)
+    cents = Transaction.amount_cents
+    query.with_entities(
+        func.count(Transaction.id),
+        func.coalesce(func.sum(cents), 0),
+        func.coalesce(func.sum(case((cents > 0, cents), else_=0)), 0),
+        func.coalesce(func.sum(case((cents < 0, cents), else_=0)), 0),
+    ).one()
+    query.join(CostCenter).with_entities(
+        CostCenter.id, CostCenter.name, func.count(Transaction.id), func.sum(cents),
+    ).group_by(CostCenter.id).order_by(CostCenter.name).all()
+    month = func.strftime('%Y-%m', Transaction.date)
+    query.with_entities(month, func.count(Transaction.id), func.sum(cents)).group_by(month).order_by(month).all()
+
+
+def query_facets(session, **filters):
+    measures = (func.count(Transaction.id), func.coalesce(func.sum(Transaction.amount_cents), 0))
+
+    def grouped(key, facet_filter, query=None):
+        query = query if query is not None else session.query(Transaction)
+        query = apply_filters(query, **{k: v for k, v in filters.items() if k != facet_filter})
+        return dict((value, (n, amount)) for value, n, amount in query.with_entities(key, *measures).group_by(key))
+
+    grouped(Transaction.cost_center_id, "cost_center_ids")
+    grouped(
+        transaction_spend_categories.c.spend_category_id, "spend_category_ids",
+        session.query(Transaction).join(transaction_spend_categories),
+    )
+    grouped(Transaction.account, "account")
+    apply_filters(session.query(Transaction), **filters).with_entities(*measures).one()
+    session.query(CostCenter.id, CostCenter.name).order_by(CostCenter.name).all()
+    session.query(SpendCategory.id, SpendCategory.name).order_by(SpendCategory.name).all()
+    session.query(Account.name).order_by(Account.name).all()
+
+
+def query_export(session, **filters):
+    return formats.from_transactions(query_list(session, **filters))
+
+
+# ============================================
+# MAIN
+# ============================================
+
+
+def per_call_us(session, fn, calls: int) -> float:
+    fn(session, **FILTERS)  # warm caches
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        fn(session, **FILTERS)
+        session.rollback()  # a fresh read transaction per call, like a request
+    return (time.perf_counter() - t0) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = database.make_engine(f"sqlite:///{tmp}/bench.db")
+        database.init_db(engine)
+        seed(engine, args.rows)
+        with database.make_sessionmaker(engine)() as session:
+            print(f"{len(operations.get_transactions(session, **FILTERS))} of {args.rows} rows match; per call:")
+            pairs = [
+                ("list", query_list, operations.get_transactions),
+                ("summary", query_summary, operations.get_summary),
+                ("facets", query_facets, operations.get_facets),
+                ("export", query_export, operations.get_transaction_columns),
+            ]
+            for name, baseline, spec in pairs:
+                before = per_call_us(session, baseline, args.calls)
+                after = per_call_us(session, spec, args.calls)
+                print(f"  {name:<8} query {before:7.0f} us   spec {after:7.0f} us   ({before / after:.1f}x)")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/bench_formats.py - payload size and encode time of the transaction list formats
+#
+# Usage: python benchmarks/bench_formats.py [--rows 1000 10000 100000] [--repeat 5]
+#
+# "encode" is the time to turn already-loaded Transaction rows into response bytes
+# (row JSON goes through the pydantic response model, as FastAPI does). "request"
+# is the full GET /transactions/filter round trip through the ASGI app.
+import argparse
+import datetime
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import database, formats, schemas  # noqa: E402
+from app.config import Settings  # noqa: E402
+from app.crud import operations  # noqa: E402
+from app.loaders import save_transactions  # noqa: E402
+from app.main import create_app  # noqa: E402
+
+
+ACCEPT = {
+    formats.ROWS: "application/json",
+    formats.COLUMNAR: formats.COLUMNAR_MEDIA_TYPE,
+    formats.ARROW: formats.ARROW_MEDIA_TYPE,
+}
+
+
+def seed(url: str, rows: int) -> None:
+    engine = database.make_engine(url)
+    database.init_db(engine)
+    rng = random.Random(7)
+    start = datetime.date(2024, 1, 1)
+    save_transactions([
+        {
+            "date": start + datetime.timedelta(days=rng.randrange(365)),
+            "description": rng.choice(["Coffee Shop", "Grocery Store", "Gas Station", "Rent", "Streaming"]),
+            "amount_cents": -rng.randrange(100, 50_000),
+            "account": rng.choice(["Discover", "Schwab Checking", "Amex"]),
+            "cost_center": rng.choice(["Meals", "Car", "Living Expenses", "Media"]),
+            "spend_categories": rng.sample(["Food", "Gas", "Rent", "Fun", "Travel"], rng.randrange(3)),
+        }
+        for _ in range(rows)
+    ], db_session=database.make_sessionmaker(engine)())
+    engine.dispose()
+
+
+def encode(fmt: str, transactions) -> bytes:
+    if fmt == formats.ROWS:
+        response = schemas.TransactionListResponse(transactions=transactions, count=len(transactions))
+        return response.model_dump_json().encode()
+    columns = formats.from_transactions(transactions)
+    if fmt == formats.ARROW:
+        return formats.to_arrow(columns)
+    return json.dumps(formats.to_columnar_json(columns), separators=(",", ":")).encode()
+
+
+def best_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8}  {'format':<10}{'bytes':>12}{'vs json':>9}{'encode ms':>11}{'request ms':>12}")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{tmp}/bench.db"
+            seed(url, rows)
+            app = create_app(Settings(database_url=url))
+
+            with TestClient(app) as client:
+                with app.state.SessionLocal() as db:
+                    transactions = operations.get_transactions(db)
+                    baseline = None
+                    for fmt in (formats.ROWS, formats.COLUMNAR, formats.ARROW):
+                        size = len(encode(fmt, transactions))
+                        baseline = baseline or size
+                        encode_ms = best_ms(lambda: encode(fmt, transactions), args.repeat)
+                        request_ms = best_ms(
+                            lambda: client.get("/transactions/filter", headers={"Accept": ACCEPT[fmt]}).raise_for_status(),
+                            args.repeat,
+                        )
+                        print(
+                            f"{rows:>8}  {fmt:<10}{size:>12,}{size / baseline:>9.2f}"
+                            f"{encode_ms:>11.1f}{request_ms:>12.1f}"
+                        )
+            app.state.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/bench_parse.py - parse throughput and memory per row of parsed CSV records
+#
+# Usage: python benchmarks/bench_parse.py [--rows 1000000] [--save-rows 100000]
+#
+# Parses a generated Discover export and reports rows/s and the tracemalloc
+# bytes per row held by the parsed list, for the slotted ParsedTransaction
+# records and for the equivalent per-row dicts (the previous row type).
+# --save-rows times save_transactions on that many records into a temporary database.
+import argparse
+import csv
+import datetime
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import database, parsers  # noqa: E402
+from app.loaders import save_transactions  # noqa: E402
+
+
+CATEGORIES = ["Restaurants", "Gasoline", "Supermarkets", "Services", "Travel/ Entertainment", "Merchandise"]
+DESCRIPTIONS = ["COFFEE SHOP", "SHELL OIL", "WHOLE FOODS", "NETFLIX.COM", "UNITED AIRLINES", "AMAZON MKTPLACE"]
+
+
+def write_csv(path: str, rows: int) -> None:
+    rng = random.Random(7)
+    start = datetime.date(2024, 1, 1)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Trans. Date", "Post Date", "Description", "Amount", "Category"])
+        for _ in range(rows):
+            day = start + datetime.timedelta(days=rng.randrange(365))
+            writer.writerow([
+                day.strftime("%m/%d/%Y"), day.strftime("%m/%d/%Y"),
+                f"{rng.choice(DESCRIPTIONS)} #{rng.randrange(1000)}",
+                f"{rng.randrange(100, 50_000) / 100:.2f}",
+                rng.choice(CATEGORIES),
+            ])
+
+
+def as_dicts(records):
+    """The per-row dicts parsers used to return, with a fresh list for categories."""
+    return [
+        {
+            "date": r.date,
+            "description": r.description,
+            "cost_center": r.cost_center,
+            "spend_categories": list(r.spend_categories),
+            "amount_cents": r.amount_cents,
+            "account": r.account,
+        }
+        for r in records
+    ]
+
+
+def retained_bytes(build) -> int:
+    """tracemalloc bytes still held by what build() returns."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del value
+    return retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--save-rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/discover.csv"
+        write_csv(path, args.rows)
+
+        t0 = time.perf_counter()
+        records = parsers.parse_csv(path, "discover")
+        parse_s = time.perf_counter() - t0
+        print(f"{len(records):,} rows parsed in {parse_s:.2f}s ({len(records) / parse_s:,.0f} rows/s)")
+        del records
+
+        # Both row types share the same descriptions, dates and amounts; they differ in the per-row containers
+        total = retained_bytes(lambda: parsers.parse_csv(path, "discover"))
+        records = parsers.parse_csv(path, "discover")
+        record_containers = sum(sys.getsizeof(r) for r in records)
+        dict_containers = retained_bytes(lambda: as_dicts(records))
+        shared = total - record_containers
+        print(f"records: {total / args.rows:.0f} B/row ({record_containers / args.rows:.0f} B/row for the record itself)")
+        print(
+            f"dicts:   {(shared + dict_containers) / args.rows:.0f} B/row "
+            f"({dict_containers / args.rows:.0f} B/row for the dict and its category list)"
+        )
+
+        if args.save_rows:
+            engine = database.make_engine(f"sqlite:///{tmp}/save.db")
+            database.init_db(engine)
+            with database.make_sessionmaker(engine)() as db:
+                t0 = time.perf_counter()
+                save_transactions(records[:args.save_rows], db_session=db)
+                save_s = time.perf_counter() - t0
+            engine.dispose()
+            print(f"saved {args.save_rows:,} rows in {save_s:.2f}s ({args.save_rows / save_s:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/bench_read_modes.py - compares threadpool vs async (aiosqlite) read endpoints under load
+#
+# Usage: python benchmarks/bench_read_modes.py [--rows 5000] [--requests 400] [--concurrency 1 16 64 256]
+#
+# Drives the ASGI app in-process with httpx, so the numbers reflect the app's
+# scheduling (threadpool tokens vs event loop) rather than network overhead.
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import database  # noqa: E402
+from app.config import Settings  # noqa: E402
+from app.loaders import save_transactions  # noqa: E402
+from app.main import create_app  # noqa: E402
+
+
+PATHS = [
+    "/transactions/filter?account=Discover&start_date=2024-06-01",
+    "/transactions/filter?search=coffee",
+    "/transactions/cost_centers",
+    "/transactions/accounts",
+    "/transactions/summary?account=Schwab%20Checking",
+]
+
+
+def seed(url: str, rows: int) -> None:
+    engine = database.make_engine(url)
+    database.init_db(engine)
+    rng = random.Random(7)
+    start = datetime.date(2024, 1, 1)
+    save_transactions([
+        {
+            "date": start + datetime.timedelta(days=rng.randrange(365)),
+            "description": rng.choice(["Coffee Shop", "Grocery Store", "Gas Station", "Rent", "Streaming"]),
+            "amount_cents": -rng.randrange(100, 50_000),
+            "account": rng.choice(["Discover", "Schwab Checking"]),
+            "cost_center": rng.choice(["Meals", "Car", "Living Expenses", "Media"]),
+            "spend_categories": [],
+        }
+        for _ in range(rows)
+    ], db_session=database.make_sessionmaker(engine)())
+    engine.dispose()
+
+
+async def drive(app, requests: int, concurrency: int):
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(PATHS[i % len(PATHS)])
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                path = queue.get_nowait()
+                t0 = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64, 256])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        seed(url, args.rows)
+
+        print(f"{'mode':<12}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for mode, async_reads in (("threadpool", False), ("async", True)):
+            app = create_app(Settings(database_url=url, async_reads=async_reads))
+            for concurrency in args.concurrency:
+                result = await drive(app, args.requests, concurrency)
+                print(f"{mode:<12}{concurrency:>8}{result['rps']:>10.1f}{result['p50']:>10.1f}{result['p95']:>10.1f}")
+            if app.state.async_engine is not None:
+                await app.state.async_engine.dispose()
+            app.state.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+# benchmarks/bench_reimport.py - time to re-import an edited custom export with upsert
+#
+# Usage: python benchmarks/bench_reimport.py [--ledger 200000] [--rows 20000] [--edited 0 0.05 1]
+#
+# Seeds a temporary ledger, "exports" --rows of it with their ids (as the
+# frontend's custom CSV does), edits a fraction of those rows (half get a new
+# amount, half a new spend category) and times app.crud.imports.load_import
+# with upsert, per stage. Unchanged rows should add next to nothing.
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import database  # noqa: E402
+from app.crud import imports  # noqa: E402
+from app.profiling import StageTimer  # noqa: E402
+from app.records import ParsedTransaction  # noqa: E402
+
+
+COST_CENTERS = ["Meals", "Car", "Living Expenses", "Media", "Travel"]
+CATEGORIES = ["Restaurants", "Gasoline", "Supermarkets", "Services", "Rent"]
+
+
+def seed(engine, rows: int) -> None:
+    rng = random.Random(7)
+    start = datetime.date(2020, 1, 1)
+    transactions = [
+        ParsedTransaction(
+            date = start + datetime.timedelta(days=rng.randrange(5 * 365)),
+            description = f"{rng.choice(['Coffee Shop', 'Grocery Store', 'Gas Station', 'Rent'])} #{i}",
+            amount_cents = -rng.randrange(100, 50_000),
+            account = rng.choice(["Discover", "Schwab Checking"]),
+            cost_center = rng.choice(COST_CENTERS),
+            spend_categories = rng.sample(CATEGORIES, 2),
+        )
+        for i in range(rows)
+    ]
+    with database.make_sessionmaker(engine)() as db:
+        imports.load_import(db, "seed", "custom", transactions)
+
+
+def export(engine, rows: int):
+    """The first `rows` transactions as a custom export would hold them."""
+    with engine.connect() as conn:
+        result = conn.exec_driver_sql("""
+            SELECT t.id, t.date, t.description, t.amount_cents, t.account, cc.name, group_concat(sc.name, char(31))
+            FROM (SELECT * FROM transactions ORDER BY id LIMIT ?) t
+            JOIN cost_centers cc ON cc.id = t.cost_center_id
+            JOIN transaction_spend_categories l ON l.transaction_id = t.id
+            JOIN spend_categories sc ON sc.id = l.spend_category_id
+            GROUP BY t.id ORDER BY t.id
+        """, (rows,))
+        return [
+            ParsedTransaction(
+                date = datetime.date.fromisoformat(day),
+                description = description,
+                amount_cents = amount_cents,
+                account = account,
+                cost_center = cost_center,
+                spend_categories = categories.split("\x1f"),
+                id = tx_id,
+            )
+            for tx_id, day, description, amount_cents, account, cost_center, categories in result
+        ]
+
+
+def edit(rows, fraction: float, rng):
+    for i in rng.sample(range(len(rows)), int(len(rows) * fraction)):
+        row = rows[i]
+        if i % 2:
+            row.amount_cents -= 100
+        else:
+            row.spend_categories = (rng.choice(CATEGORIES),)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ledger", type=int, default=200_000)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--edited", type=float, nargs="+", default=[0, 0.05, 1])
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = database.make_engine(f"sqlite:///{tmp}/bench.db")
+        database.init_db(engine)
+        seed(engine, args.ledger)
+        SessionLocal = database.make_sessionmaker(engine)
+
+        print(f"{args.rows:,} exported rows re-imported into a {args.ledger:,}-row ledger:")
+        for fraction in args.edited:
+            rows = export(engine, args.rows)
+            edit(rows, fraction, rng)
+            timer = StageTimer()
+            with SessionLocal() as db:
+                t0 = time.perf_counter()
+                result = imports.load_import(db, f"edit-{fraction}", "custom", rows, timer=timer, upsert=True)
+                elapsed = time.perf_counter() - t0
+            stages = "  ".join(f"{name} {ms:.0f}" for name, ms in timer.as_dict().items())
+            print(
+                f"  {fraction:>5.0%} edited: {elapsed * 1000:6.0f} ms  "
+                f"(updated {result['updated']:,}, unchanged {result['unchanged']:,}; ms: {stages})"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
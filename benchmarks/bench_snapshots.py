@@ -0,0 +1,67 @@
+# benchmarks/bench_snapshots.py - times a Parquet export and a bulk restore of a large ledger
+#
+# Usage: python benchmarks/bench_snapshots.py [--rows 1000000]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import database, snapshots  # noqa: E402
+
+
+def seed(engine, rows: int) -> None:
+    """Insert rows with raw SQL; going through save_transactions would dominate the run."""
+    rng = random.Random(7)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO cost_centers (id, name) VALUES (1, 'Meals'), (2, 'Car'), (3, 'Media')")
+        conn.exec_driver_sql("INSERT INTO spend_categories (id, name) VALUES (1, 'Food'), (2, 'Gas'), (3, 'Fun')")
+        conn.exec_driver_sql(
+            "INSERT INTO transactions (id, date, description, amount_cents, account, cost_center_id) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (i, f"2024-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}",
+                 rng.choice(["Coffee Shop", "Gas Station", "Streaming"]), -rng.randrange(100, 50_000),
+                 rng.choice(["Discover", "Amex"]), rng.randrange(1, 4))
+                for i in range(1, rows + 1)
+            ],
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO transaction_spend_categories (transaction_id, spend_category_id) "
+            "SELECT id, 1 + id % 3 FROM transactions"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = database.make_engine(f"sqlite:///{tmp}/source.db")
+        database.init_db(source)
+        seed(source, args.rows)
+
+        t0 = time.perf_counter()
+        snapshots.export_ledger(source, f"{tmp}/snapshot")
+        export_s = time.perf_counter() - t0
+        size = sum(os.path.getsize(f"{tmp}/snapshot/{name}") for name in os.listdir(f"{tmp}/snapshot"))
+
+        target = database.make_engine(f"sqlite:///{tmp}/target.db")
+        database.init_db(target)
+        t0 = time.perf_counter()
+        with database.make_sessionmaker(target)() as db:
+            snapshots.import_ledger(db, f"{tmp}/snapshot")
+        import_s = time.perf_counter() - t0
+
+        print(f"{args.rows:,} transactions, snapshot {size / 1e6:.1f} MB")
+        print(f"export {export_s:.1f}s  import {import_s:.1f}s")
+        source.dispose()
+        target.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/bench_startup.py - tracks cold start: import time and time-to-first-request
+#
+# Usage: python benchmarks/bench_startup.py [--runs 5]
+#
+# Each run is a fresh interpreter so nothing is cached between measurements.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Runs in a child interpreter; prints one JSON line with timings in milliseconds
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+
+from app.main import create_app
+from app.config import Settings
+t_import = time.perf_counter()
+
+from fastapi.testclient import TestClient
+app = create_app(Settings(database_url=sys.argv[1]))
+with TestClient(app) as client:
+    t_started = time.perf_counter()
+    response = client.get("/transactions/")
+    assert response.status_code == 200, response.text
+    t_first = time.perf_counter()
+
+print(json.dumps({
+    "import_ms": (t_import - t0) * 1000,
+    "startup_ms": (t_started - t_import) * 1000,
+    "first_request_ms": (t_first - t_started) * 1000,
+    "time_to_first_request_ms": (t_first - t0) * 1000,
+}))
+"""
+
+
+def run_once(database_url: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, database_url],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+
+        # The first run creates the schema; later runs see a current schema version
+        cold = run_once(url)
+        warm = [run_once(url) for _ in range(args.runs)]
+
+    print(f"{'metric':<26}{'new db':>10}{'median':>10}{'min':>10}")
+    for key in ("import_ms", "startup_ms", "first_request_ms", "time_to_first_request_ms"):
+        values = [r[key] for r in warm]
+        print(f"{key:<26}{cold[key]:>10.1f}{statistics.median(values):>10.1f}{min(values):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# benchmarks/bench_suggest.py - build time and query latency of the description typeahead index
+#
+# Usage: python benchmarks/bench_suggest.py [--rows 100000 1000000] [--queries 2000] [--batch 20000]
+#
+# Seeds a temporary database with descriptions drawn from a few hundred
+# merchants (most with a store or reference number, so distinct descriptions
+# grow with the ledger), builds the prefix index and times random 1-6
+# character prefixes, applying a committed insert every 50 queries. Also
+# reports the daily re-ranking of the stored prefix tops, and applying one
+# commit of --batch rows with new descriptions (a large upload), which holds
+# the index lock while the new keys are merged in.
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import database, events, suggest  # noqa: E402
+
+
+WORDS = [
+    "blue", "bottle", "coffee", "shell", "oil", "whole", "foods", "market", "netflix", "spotify", "united",
+    "airlines", "amazon", "mktplace", "corner", "deli", "city", "parking", "trader", "joes", "target",
+    "costco", "wholesale", "uber", "trip", "lyft", "ride", "apple", "store", "google", "cloud", "chipotle",
+]
+
+
+def seed(engine, rows: int) -> None:
+    rng = random.Random(7)
+    merchants = [" ".join(rng.sample(WORDS, rng.randint(1, 3))).upper() for _ in range(400)]
+    start = datetime.date(2015, 1, 1)
+    database.init_db(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO cost_centers (id, name) VALUES (1, 'Uncategorized')")
+        conn.exec_driver_sql(
+            "INSERT INTO transactions (date, description, amount_cents, account, cost_center_id) VALUES (?, ?, ?, ?, 1)",
+            [
+                (
+                    (start + datetime.timedelta(days=rng.randrange(3650))).isoformat(),
+                    rng.choice(merchants) + (f" #{rng.randrange(2000)}" if rng.random() < 0.7 else ""),
+                    -rng.randrange(100, 50_000),
+                    "Discover",
+                )
+                for _ in range(rows)
+            ],
+        )
+
+
+def insert(engine, rng) -> int:
+    with engine.begin() as conn:
+        return conn.exec_driver_sql(
+            "INSERT INTO transactions (date, description, amount_cents, account, cost_center_id) VALUES (?, ?, -100, 'Discover', 1)",
+            (datetime.date.today().isoformat(), " ".join(rng.sample(WORDS, 2)).upper() + f" #{rng.randrange(10_000)}"),
+        ).lastrowid
+
+
+def insert_batch(engine, rng, rows: int):
+    with engine.begin() as conn:
+        first = conn.exec_driver_sql("SELECT COALESCE(MAX(id), 0) + 1 FROM transactions").scalar()
+        conn.exec_driver_sql(
+            "INSERT INTO transactions (date, description, amount_cents, account, cost_center_id) VALUES (?, ?, -100, 'Discover', 1)",
+            [
+                (datetime.date.today().isoformat(), " ".join(rng.sample(WORDS, 2)).upper() + f" UPLOAD {i}")
+                for i in range(rows)
+            ],
+        )
+    return set(range(first, first + rows))
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99)], latencies[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = database.make_engine(f"sqlite:///{tmp}/bench.db")
+            seed(engine, rows)
+            index = suggest.SuggestIndex(engine)
+
+            t0 = time.perf_counter()
+            index.refresh()
+            build_s = time.perf_counter() - t0
+
+            queries, applies = [], []
+            for i in range(args.queries):
+                if i % 50 == 49:
+                    changes = events.LedgerChanges(transaction_ids={insert(engine, rng)})
+                    t0 = time.perf_counter()
+                    index.apply(changes)
+                    applies.append((time.perf_counter() - t0) * 1000)
+                prefix = rng.choice(WORDS)[:rng.randint(1, 6)]
+                t0 = time.perf_counter()
+                index.suggest(prefix)
+                queries.append((time.perf_counter() - t0) * 1000)
+
+            t0 = time.perf_counter()
+            index._rank_all(index._day)
+            rank_s = time.perf_counter() - t0
+
+            changes = events.LedgerChanges(transaction_ids=insert_batch(engine, rng, args.batch))
+            t0 = time.perf_counter()
+            index.apply(changes)
+            batch_s = time.perf_counter() - t0
+
+            print(
+                f"{rows:>9,} rows, {len(index._numbers):,} distinct descriptions, {len(index._top):,} ranked prefixes: "
+                f"build {build_s:.2f}s, daily re-rank {rank_s:.2f}s, apply {args.batch:,} new {batch_s:.2f}s"
+            )
+            print("          query p50 {:.3f}ms  p99 {:.3f}ms  max {:.3f}ms".format(*percentiles(queries)))
+            print("          apply p50 {:.3f}ms  p99 {:.3f}ms  max {:.3f}ms".format(*percentiles(applies)))
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/bench_writes.py - compares one-commit-per-write sessions with the group-committing writer
+#
+# Usage: python benchmarks/bench_writes.py [--writes 2000] [--threads 1 8 32]
+#
+# "direct" opens a session per write from each thread (the old endpoint behaviour);
+# "writer" submits the same writes to app.writer.WriteQueue.
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import database, schemas  # noqa: E402
+from app.crud import operations  # noqa: E402
+from app.writer import WriteQueue  # noqa: E402
+
+
+def make_txn(i: int) -> schemas.TransactionCreate:
+    return schemas.TransactionCreate(
+        date = datetime.date(2025, 1, 1) + datetime.timedelta(days=i % 365),
+        description = f"Bench {i}",
+        amount = -(i % 500) - 1.0,
+        account = "Discover" if i % 2 else "Schwab Checking",
+        cost_center_name = "Meals" if i % 3 else "Car",
+    )
+
+
+def run_direct(engine, writes: int, threads: int):
+    SessionLocal = database.make_sessionmaker(engine)
+    errors = 0
+
+    def write(i):
+        nonlocal errors
+        with SessionLocal() as db:
+            try:
+                operations.create_transaction(db, make_txn(i))
+            except Exception:
+                errors += 1
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(write, range(writes)))
+    return errors, writes
+
+
+def run_writer(engine, writes: int, threads: int):
+    writer = WriteQueue(engine)
+    errors = 0
+
+    def write(i):
+        nonlocal errors
+        try:
+            writer.submit(operations.create_transaction, make_txn(i)).result()
+        except Exception:
+            errors += 1
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(write, range(writes)))
+    writer.stop()
+    return errors, writer.batches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    print(f"{'mode':<8}{'threads':>8}{'ok writes/s':>13}{'commits':>9}{'errors':>8}")
+    for threads in args.threads:
+        for mode, run in (("direct", run_direct), ("writer", run_writer)):
+            with tempfile.TemporaryDirectory() as tmp:
+                engine = database.make_engine(f"sqlite:///{tmp}/bench.db")
+                database.init_db(engine)
+
+                t0 = time.perf_counter()
+                errors, commits = run(engine, args.writes, threads)
+                elapsed = time.perf_counter() - t0
+
+                print(f"{mode:<8}{threads:>8}{(args.writes - errors) / elapsed:>13.0f}{commits:>9}{errors:>8}")
+                engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
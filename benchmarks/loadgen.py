@@ -0,0 +1,245 @@
+# benchmarks/loadgen.py - mixed concurrent workload against the app running under uvicorn
+#
+# Usage: python benchmarks/loadgen.py [--clients 32] [--duration 30] [--rows 20000]
+#                                     [--mix filter=60,meta=20,edit=15,upload=5] [--upload-rows 2000]
+#                                     [--env FINANCE_ASYNC_READS=1 ...] [--url http://host:port]
+#
+# Starts uvicorn on a temporary database (unless --url points at a running server),
+# seeds it through the upload endpoint, then runs --clients concurrent clients for
+# --duration seconds. Each request picks an operation from the weighted mix.
+# Reports throughput, p50/p95/p99 latency and error rates per route; "locked"
+# counts responses that mention SQLite's "database is locked".
+import argparse
+import asyncio
+import csv
+import datetime
+import io
+import itertools
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ACCOUNTS = ["Discover", "Schwab Checking", "Amex"]
+COST_CENTERS = ["Meals", "Car", "Living Expenses", "Media", "Travel"]
+CATEGORIES = ["Food", "Gas", "Rent", "Fun", "Streaming"]
+DESCRIPTIONS = ["Coffee Shop", "Grocery Store", "Gas Station", "Rent", "Streaming", "Airline"]
+
+
+# ============================================
+# SERVER
+# ============================================
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(database_url: str, env_overrides: dict):
+    port = free_port()
+    env = {**os.environ, "FINANCE_DATABASE_URL": database_url, **env_overrides}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd = ROOT,
+        env = env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            httpx.get(f"{url}/transactions/accounts", timeout=1).raise_for_status()
+            return process, url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("uvicorn did not become ready")
+
+
+# ============================================
+# WORKLOAD
+# ============================================
+
+
+def make_csv(rng: random.Random, rows: int, account: str) -> bytes:
+    """Custom-format export; a fresh account per upload keeps watermarks and file dedupe out of the way."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["Date", "Description", "Amount", "Account", "Cost Center", "Spend Categories"])
+    start = datetime.date(2024, 1, 1)
+    for _ in range(rows):
+        writer.writerow([
+            (start + datetime.timedelta(days=rng.randrange(365))).isoformat(),
+            rng.choice(DESCRIPTIONS),
+            f"{-rng.randrange(100, 50_000) / 100:.2f}",
+            account,
+            rng.choice(COST_CENTERS),
+            ", ".join(rng.sample(CATEGORIES, rng.randrange(3))),
+        ])
+    return out.getvalue().encode()
+
+
+async def upload(client: httpx.AsyncClient, content: bytes) -> httpx.Response:
+    return await client.post(
+        "/transactions/upload-csv",
+        data = {"institution": "custom"},
+        files = {"file": ("load.csv", content, "text/csv")},
+    )
+
+
+class Workload:
+    """Builds one request per operation; `ids` are the transactions edits may target."""
+
+    def __init__(self, rng: random.Random, ids: list, upload_rows: int):
+        self.rng = rng
+        self.ids = ids
+        self.upload_rows = upload_rows
+        self.uploads = itertools.count()
+
+    async def filter(self, client):
+        rng = self.rng
+        start = datetime.date(2024, 1, 1) + datetime.timedelta(days=rng.randrange(300))
+        params = {"start_date": start.isoformat(), "end_date": (start + datetime.timedelta(days=60)).isoformat()}
+        if rng.random() < 0.5:
+            params["account"] = rng.choice(ACCOUNTS)
+        if rng.random() < 0.3:
+            params["search"] = rng.choice(DESCRIPTIONS).split()[0].lower()
+        return "GET /transactions/filter", await client.get("/transactions/filter", params=params)
+
+    async def meta(self, client):
+        path = self.rng.choice([
+            "/transactions/cost_centers", "/transactions/spend_categories",
+            "/transactions/accounts", "/transactions/facets", "/transactions/summary",
+        ])
+        return f"GET {path}", await client.get(path)
+
+    async def edit(self, client):
+        txn_id = self.rng.choice(self.ids)
+        response = await client.put(f"/transactions/{txn_id}", json={
+            "amount": -self.rng.randrange(100, 50_000) / 100,
+            "cost_center_name": self.rng.choice(COST_CENTERS),
+        })
+        return "PUT /transactions/{id}", response
+
+    async def upload(self, client):
+        content = make_csv(self.rng, self.upload_rows, f"Load {next(self.uploads)}")
+        return "POST /transactions/upload-csv", await upload(client, content)
+
+
+async def run_clients(url: str, workload: Workload, mix: dict, clients: int, duration: float):
+    operations = list(mix)
+    weights = [mix[name] for name in operations]
+    results = defaultdict(lambda: {"latencies": [], "errors": 0, "locked": 0})
+    deadline = time.monotonic() + duration
+
+    limits = httpx.Limits(max_connections=clients)
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+        async def worker():
+            while time.monotonic() < deadline:
+                operation = getattr(workload, workload.rng.choices(operations, weights)[0])
+                t0 = time.perf_counter()
+                try:
+                    route, response = await operation(client)
+                    failed = response.status_code >= 400
+                    locked = "database is locked" in response.text
+                except httpx.HTTPError:
+                    route, failed, locked = operation.__name__, True, False
+                stats = results[route]
+                stats["latencies"].append((time.perf_counter() - t0) * 1000)
+                stats["errors"] += failed
+                stats["locked"] += locked
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.monotonic() - started
+    return results, elapsed
+
+
+def percentile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def report(results: dict, elapsed: float) -> None:
+    print(f"{'route':<36}{'count':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'err %':>7}{'locked':>8}")
+    total = errors = 0
+    for route in sorted(results):
+        stats = results[route]
+        ordered = sorted(stats["latencies"])
+        count = len(ordered)
+        total += count
+        errors += stats["errors"]
+        print(
+            f"{route:<36}{count:>7}{count / elapsed:>9.1f}{statistics.median(ordered):>9.1f}"
+            f"{percentile(ordered, 0.95):>9.1f}{percentile(ordered, 0.99):>9.1f}"
+            f"{100 * stats['errors'] / count:>7.1f}{stats['locked']:>8}"
+        )
+    print(f"{'all':<36}{total:>7}{total / elapsed:>9.1f}{'':>27}{100 * errors / max(total, 1):>7.1f}")
+
+
+# ============================================
+# MAIN
+# ============================================
+
+
+def parse_pairs(text: str, cast) -> dict:
+    pairs = dict(item.split("=", 1) for item in text.split(",") if item)
+    return {key.strip(): cast(value) for key, value in pairs.items()}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--rows", type=int, default=20_000, help="rows seeded before the run")
+    parser.add_argument("--upload-rows", type=int, default=2000, help="rows per uploaded CSV")
+    parser.add_argument("--mix", default="filter=60,meta=20,edit=15,upload=5")
+    parser.add_argument("--env", nargs="*", default=[], help="FINANCE_* settings for the server, e.g. FINANCE_ASYNC_READS=1")
+    parser.add_argument("--url", help="drive an already running server instead of starting one")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    mix = parse_pairs(args.mix, float)
+    unknown = set(mix) - {"filter", "meta", "edit", "upload"}
+    if unknown:
+        parser.error(f"unknown operations in --mix: {', '.join(sorted(unknown))}")
+
+    rng = random.Random(args.seed)
+    process = None
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url
+        if url is None:
+            env = dict(pair.split("=", 1) for pair in args.env)
+            process, url = start_server(f"sqlite:///{tmp}/load.db", env)
+        try:
+            async with httpx.AsyncClient(base_url=url, timeout=300) as client:
+                if args.rows:
+                    (await upload(client, make_csv(rng, args.rows, "Seed"))).raise_for_status()
+                columns = (await client.get("/transactions/filter", params={"format": "columnar"})).json()
+            ids = columns["columns"]["id"]
+            if not ids and mix.get("edit"):
+                parser.error("edits need seeded rows (--rows > 0)")
+
+            print(f"{len(ids)} rows, {args.clients} clients, {args.duration:.0f}s, mix {args.mix}")
+            results, elapsed = await run_clients(url, Workload(rng, ids, args.upload_rows), mix, args.clients, args.duration)
+            report(results, elapsed)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
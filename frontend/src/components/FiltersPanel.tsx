@@ -30,7 +30,7 @@ export default function FiltersPanel({
   onFiltersChange,
   onClose
 }: FiltersPanelProps) {
-  const { spend_categories, cost_centers, accounts } = useFilterOptions();
+  const { spend_categories, cost_centers, accounts } = useFilterOptions(filters);
   const { pendingFilters, updateFilter, reset, hasUnsavedChanges } = usePendingFilters(filters);
   const [validationError, setValidationError] = useState<string>("");
 
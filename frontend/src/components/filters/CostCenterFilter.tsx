@@ -5,6 +5,7 @@ import { MultiSelectChips, parseMultiSelectValue } from "../../utils/selectUtils
 interface CostCenterOption {
   id: number;
   name: string;
+  count?: number;  // matching transactions under the current filters
 }
 
 interface CostCenterFilterProps {
@@ -34,7 +35,9 @@ export function CostCenterFilter({ value, options, onChange }: CostCenterFilterP
         )}
       >
         {options.map((cc) => (
-          <MenuItem key={cc.id} value={cc.id}>{cc.name}</MenuItem>
+          <MenuItem key={cc.id} value={cc.id}>
+            {cc.count === undefined ? cc.name : `${cc.name} (${cc.count})`}
+          </MenuItem>
         ))}
       </Select>
     </FormControl>
@@ -1,5 +1,6 @@
 // frontend/src/components/filters/SearchFilter.tsx
-import { TextField } from "@mui/material";
+import { Autocomplete, TextField } from "@mui/material";
+import { useSuggestions } from "../../hooks/useTransactions";
 
 // ========================
 // TYPE DEFINITIONS
@@ -25,14 +26,25 @@ const FIELD_CONFIG = {
 // ========================
 
 export function SearchFilter({ value, onChange }: SearchFilterProps) {
+  // Typeahead hits /transactions/suggest; the full filter only runs when filters are applied
+  const { data: suggestions = [] } = useSuggestions(value);
+
   return (
-    <TextField
-      label={FIELD_CONFIG.LABEL}
-      value={value}
-      onChange={(e) => onChange(e.target.value)}
-      size={FIELD_CONFIG.SIZE}
+    <Autocomplete
+      freeSolo
       fullWidth
-      placeholder={FIELD_CONFIG.PLACEHOLDER}
+      size={FIELD_CONFIG.SIZE}
+      options={suggestions.map((s) => s.description)}
+      filterOptions={(options) => options}  // already matched and ranked by the backend
+      inputValue={value}
+      onInputChange={(_, newValue) => onChange(newValue)}
+      renderInput={(params) => (
+        <TextField
+          {...params}
+          label={FIELD_CONFIG.LABEL}
+          placeholder={FIELD_CONFIG.PLACEHOLDER}
+        />
+      )}
     />
   );
 }
@@ -5,6 +5,7 @@ import { MultiSelectChips, parseMultiSelectValue } from "../../utils/selectUtils
 interface SpendCategoryOption {
   id: number;
   name: string;
+  count?: number;  // matching transactions under the current filters
 }
 
 interface SpendCategoryFilterProps {
@@ -34,7 +35,9 @@ export function SpendCategoryFilter({ value, options, onChange }: SpendCategoryF
         )}
       >
         {options.map((sc) => (
-          <MenuItem key={sc.id} value={sc.id}>{sc.name}</MenuItem>
+          <MenuItem key={sc.id} value={sc.id}>
+            {sc.count === undefined ? sc.name : `${sc.name} (${sc.count})`}
+          </MenuItem>
         ))}
       </Select>
     </FormControl>
@@ -39,7 +39,7 @@ const INSTITUTIONS = {
   },
   custom: {
     label: 'Custom Export (from this app)',
-    format: 'Expected columns: Date, Description, Amount, Account, Cost Center, Spend Categories (comma-separated)',
+    format: 'Expected columns: ID, Date, Description, Amount, Account, Cost Center, Spend Categories (comma-separated). Rows with an ID update that transaction; leave it blank for new rows',
   },
 };
 
@@ -97,11 +97,11 @@ export function CSVUploadDialog({
             </Alert>
           )}
 
-          <Alert severity="warning">
-            {institution === 'custom'
-              ? 'Re-uploading edited transactions will create duplicates. Consider deleting the old transactions first.'
-              : 'Duplicate transactions may be created if you upload the same file multiple times.'}
-          </Alert>
+          {institution !== 'custom' && (
+            <Alert severity="warning">
+              Duplicate transactions may be created if you upload the same file multiple times.
+            </Alert>
+          )}
         </Box>
       </DialogContent>
 
@@ -14,6 +14,7 @@ export interface CSVUploadData {
 export interface CSVUploadResponse {
   message: string;
   count: number;
+  updated: number;
   institution: string;
 }
 
@@ -51,6 +52,8 @@ export function useCSVUpload() {
       const formData = new FormData();
       formData.append('file', file);
       formData.append('institution', institution);
+      // Custom exports carry transaction ids: re-importing one applies the edits in place
+      formData.append('upsert', String(institution === 'custom'));
 
       const res = await client.post(API_CONFIG.ENDPOINT, formData, {
         headers: {
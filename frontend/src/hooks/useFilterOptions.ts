@@ -1,6 +1,8 @@
 // frontend/src/hooks/useFilterOptions.ts - fetches and prepares filter dropdown options from backend metadata
 import { useMemo } from 'react';
-import { useCostCenters, useSpendCategories, useAccounts } from './useTransactions';
+import { useFacets } from './useTransactions';
+import type { FacetValue } from './useTransactions';
+import type { TransactionFilters } from '../types/filters';
 
 // ========================
 // TYPE DEFINITIONS
@@ -9,17 +11,28 @@ import { useCostCenters, useSpendCategories, useAccounts } from './useTransactio
 export interface SpendCategoryOption {
   id: number;
   name: string;
+  count: number;  // matching transactions under the current filters
+  total: number;
 }
 
 export interface CostCenterOption {
   id: number;
   name: string;
+  count: number;
+  total: number;
+}
+
+export interface AccountOption {
+  name: string;
+  count: number;
+  total: number;
 }
 
 export interface FilterOptions {
   spend_categories: SpendCategoryOption[];
   cost_centers: CostCenterOption[];
   accounts: string[];
+  account_options: AccountOption[];
   isLoading: boolean;
   error: Error | null;
 }
@@ -29,54 +42,34 @@ export interface FilterOptions {
 // ========================
 
 /**
- * Fetch and prepare filter options from metadata endpoints
- * Handles loading states and errors from multiple queries
+ * Fetch and prepare filter options from the facets endpoint
+ * One request returns every option with its count/total under the given filters
  */
-export function useFilterOptions(): FilterOptions {
-  const costCentersQuery = useCostCenters();
-  const spendCategoriesQuery = useSpendCategories();
-  const accountsQuery = useAccounts();
+export function useFilterOptions(filters?: TransactionFilters): FilterOptions {
+  const facetsQuery = useFacets(filters);
 
   return useMemo(() => {
-    const isLoading =
-      costCentersQuery.isLoading ||
-      spendCategoriesQuery.isLoading ||
-      accountsQuery.isLoading;
-
-    const error =
-      costCentersQuery.error ||
-      spendCategoriesQuery.error ||
-      accountsQuery.error;
-
-    // Extract and sort cost centers
-    const cost_centers = (costCentersQuery.data?.cost_centers || [])
-      .map(cc => ({ id: cc.id, name: cc.name }))
-      .sort((a, b) => a.name.localeCompare(b.name));
+    const facets = facetsQuery.data;
 
-    // Extract and sort spend categories
-    const spend_categories = (spendCategoriesQuery.data?.spend_categories || [])
-      .map(sc => ({ id: sc.id, name: sc.name }))
-      .sort((a, b) => a.name.localeCompare(b.name));
+    const toOption = (value: FacetValue) => ({
+      id: value.id as number,
+      name: value.name,
+      count: value.count,
+      total: value.total,
+    });
 
-    // Accounts are already sorted from backend
-    const accounts = accountsQuery.data || [];
+    // Facet values are already sorted by name from backend
+    const cost_centers = (facets?.cost_centers || []).map(toOption);
+    const spend_categories = (facets?.spend_categories || []).map(toOption);
+    const account_options = (facets?.accounts || []).map(({ name, count, total }) => ({ name, count, total }));
 
     return {
       cost_centers,
       spend_categories,
-      accounts,
-      isLoading,
-      error: error as Error | null,
+      accounts: account_options.map(account => account.name),
+      account_options,
+      isLoading: facetsQuery.isLoading,
+      error: facetsQuery.error as Error | null,
     };
-  }, [
-    costCentersQuery.data,
-    costCentersQuery.isLoading,
-    costCentersQuery.error,
-    spendCategoriesQuery.data,
-    spendCategoriesQuery.isLoading,
-    spendCategoriesQuery.error,
-    accountsQuery.data,
-    accountsQuery.isLoading,
-    accountsQuery.error,
-  ]);
+  }, [facetsQuery.data, facetsQuery.isLoading, facetsQuery.error]);
 }
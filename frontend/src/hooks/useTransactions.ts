@@ -18,6 +18,27 @@ export interface SpendCategory {
   name: string;
 }
 
+export interface FacetValue {
+  id: number | null;  // accounts are identified by name
+  name: string;
+  count: number;
+  total: number;
+}
+
+export interface TransactionFacets {
+  count: number;
+  total: number;
+  cost_centers: FacetValue[];
+  spend_categories: FacetValue[];
+  accounts: FacetValue[];
+}
+
+export interface Suggestion {
+  description: string;
+  count: number;
+  last_date: string;
+}
+
 export interface Transaction {
   id: number;
   date: string;
@@ -63,7 +84,9 @@ const QUERY_KEYS = {
   COST_CENTERS: "cost_centers",
   SPEND_CATEGORIES: "spend_categories",
   ACCOUNTS: "accounts",
+  FACETS: "facets",
   DATE_RANGE: "date_range",
+  SUGGEST: "suggest",
 } as const;
 
 // ========================
@@ -112,6 +135,22 @@ export function useAccounts() {
   });
 }
 
+/**
+ * Fetch filter options with live counts/totals under the given filters (one request)
+ * Each facet ignores its own filter, so selected options don't hide their siblings
+ */
+export function useFacets(filters?: TransactionFilters) {
+  return useQuery<TransactionFacets>({
+    queryKey: [QUERY_KEYS.TRANSACTIONS, QUERY_KEYS.FACETS, filters ?? null],
+    queryFn: async () => {
+      const params = filters ? buildFilterParams(filters) : new URLSearchParams();
+      const res = await client.get(`/transactions/facets?${params}`);
+      return res.data;
+    },
+    staleTime: STALE_TIME.SHORT,
+  });
+}
+
 /**
  * Fetch date range metadata
  */
@@ -126,6 +165,24 @@ export function useDateRange() {
   });
 }
 
+/**
+ * Description typeahead (served from the backend's in-memory prefix index)
+ * Cached per query, so retyping or backspacing doesn't refetch
+ */
+export function useSuggestions(query: string) {
+  const trimmed = query.trim();
+  return useQuery<Suggestion[]>({
+    queryKey: [QUERY_KEYS.TRANSACTIONS, QUERY_KEYS.SUGGEST, trimmed],
+    queryFn: async () => {
+      const res = await client.get("/transactions/suggest", { params: { q: trimmed } });
+      return res.data.suggestions;
+    },
+    enabled: trimmed.length > 0,
+    staleTime: STALE_TIME.SHORT,
+    placeholderData: (previous) => previous,
+  });
+}
+
 // ========================
 // TRANSACTION QUERIES
 // ========================
@@ -1,7 +1,7 @@
 // frontend/src/utils/exportUtils.ts
 import type { Transaction } from '../hooks/useTransactions';
 
-const CSV_HEADERS = ['Date', 'Description', 'Amount', 'Account', 'Cost Center', 'Spend Categories'];
+const CSV_HEADERS = ['ID', 'Date', 'Description', 'Amount', 'Account', 'Cost Center', 'Spend Categories'];
 const UNCATEGORIZED = 'Uncategorized';
 
 function escapeCSVValue(value: string): string {
@@ -15,6 +15,7 @@ function formatTransactionRow(txn: Transaction): string[] {
     : UNCATEGORIZED;
 
   return [
+    txn.id.toString(),
     txn.date,
     escapeCSVValue(txn.description),
     txn.amount.toString(),
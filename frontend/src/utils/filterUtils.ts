@@ -88,8 +88,8 @@ function areNumberArraysEqual(a: number[], b: number[]): boolean {
  * - account: string[] (query param repeated for each account)
  * - spend_category_ids: number[] (query param repeated)
  * - cost_center_ids: number[] (query param repeated)
- * - start: string (YYYY-MM-DD)
- * - end: string (YYYY-MM-DD)
+ * - start_date: string (YYYY-MM-DD)
+ * - end_date: string (YYYY-MM-DD)
  * - min_amount: number
  * - max_amount: number
  * - search: string
@@ -114,10 +114,10 @@ export function buildFilterParams(filters: TransactionFilters): URLSearchParams
 
   // Date filters (YYYY-MM-DD format expected)
   if (filters.dateFrom) {
-    params.append('start', filters.dateFrom);
+    params.append('start_date', filters.dateFrom);
   }
   if (filters.dateTo) {
-    params.append('end', filters.dateTo);
+    params.append('end_date', filters.dateTo);
   }
 
   // Amount filters (convert to numbers)
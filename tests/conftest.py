@@ -1,12 +1,15 @@
 # automatically sets up a new temporary SQLite DB and session for each test
 # pytest automatically sees the session fixture from conftest.py and injects it into the test function
-# used by test_crud.py and test_queries.py
+# used by test_crud.py and test_queries.py; `client` (and upload_custom) by the API tests
+from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 import pytest
 import datetime
 
+from app.config import Settings
+from app.main import create_app
 from app.models import Base, Transaction
 
 
@@ -57,3 +60,42 @@ def session(tmp_path):
         yield db
     finally:
         db.close()
+
+
+@pytest.fixture
+def db(tmp_path):
+    # empty sqlite db for tests that seed their own data through the app's write paths
+    test_engine = create_engine(
+        f"sqlite:///{tmp_path}/empty.db", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(test_engine)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+    db = TestingSessionLocal()
+
+    try:
+        yield db
+    finally:
+        db.close()
+        test_engine.dispose()
+
+
+@pytest.fixture
+def client(tmp_path):
+    # the full app over an empty ledger, with its startup and shutdown run
+    app = create_app(Settings(database_url = f"sqlite:///{tmp_path}/ledger.db"))
+    with TestClient(app) as client:
+        yield client
+    app.state.engine.dispose()
+
+
+def upload_custom(client, rows, preview=False):
+    """Upload rows (ID, Date, Description, Amount, Account, Cost Center, Spend Categories) as a custom export, with upsert."""
+    lines = ["ID,Date,Description,Amount,Account,Cost Center,Spend Categories"]
+    lines += [",".join(f'"{value}"' for value in row) for row in rows]
+    response = client.post(
+        "/transactions/upload-csv",
+        data = {"institution": "custom", "upsert": "true", "preview": str(preview).lower()},
+        files = {"file": ("export.csv", "\n".join(lines).encode(), "text/csv")},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
@@ -0,0 +1,126 @@
+import datetime
+
+from app import schemas
+from app.crud import anomalies, operations
+from app.database import init_db, make_engine, make_sessionmaker
+from app.migrations import SCHEMA_VERSION, upgrade
+from app.models import AmountStats
+from app.sketches import Moments
+
+from conftest import upload_custom
+
+
+def create(db, description, amount, cost_center="Meals", day=1):
+    return operations.create_transaction(db, schemas.TransactionCreate(
+        date = datetime.date(2025, 3, day),
+        description = description,
+        amount = amount,
+        account = "Amex",
+        cost_center_name = cost_center,
+        spend_category_names = ["Food"],
+    ))
+
+
+def stats(db):
+    return {
+        (row.dimension, row.key): (row.n, round(row.mean, 6), round(row.m2, 4))
+        for row in db.query(AmountStats)
+    }
+
+
+# ---------------------------
+# Scoring
+# ---------------------------
+def test_unusual_amounts_score_high(db):
+    history = [
+        create(db, f"Bistro #{day}", amount, day=day)
+        for day, amount in enumerate([-42.0, -35.5, -51.0, -38.0, -47.25, -40.0], start=1)
+    ]
+    assert [t.anomaly_score for t in history[:anomalies.MIN_HISTORY]] == [None] * anomalies.MIN_HISTORY
+
+    usual = create(db, "Bistro #7", -44.0, day=7)
+    unusual = create(db, "Bistro #8", -900.0, day=8)
+
+    assert usual.anomaly_score < 1
+    assert unusual.anomaly_score >= anomalies.FLAG_SCORE
+    assert [t.id for t in operations.get_anomalies(db)] == [unusual.id]
+
+
+def test_small_spreads_are_floored():
+    steady = Moments()
+    for _ in range(12):
+        steady.add(-1549)
+
+    assert anomalies.score(-1799, [steady]) < 2
+    assert anomalies.score(-1799, [None, Moments(3, -1549.0, 0.0)]) is None
+
+
+# ---------------------------
+# Consistency
+# ---------------------------
+def test_statistics_follow_creates_updates_and_deletes(db):
+    rows = [create(db, f"Cafe {i % 3}", -5.0 - i, cost_center="Meals" if i % 4 else "Car") for i in range(12)]
+
+    operations.update_transaction(db, rows[0].id, schemas.TransactionUpdate(amount=-120.0, cost_center_name="Meals"))
+    operations.update_transaction(db, rows[1].id, schemas.TransactionUpdate(description="Diner"))
+    operations.delete_transaction(db, rows[2].id)
+    incremental = stats(db)
+
+    anomalies.rebuild_all(db)
+    assert stats(db) == incremental
+    assert ("merchant", "diner") in incremental
+
+
+# ---------------------------
+# Imports and endpoint
+# ---------------------------
+def test_imported_outliers_are_listed_under_filters(client):
+    history = [
+        ("", f"2025-02-{day:02d}", f"Lunch Spot {day}", f"-{20 + day % 7}.00", "Amex", "Meals", "Restaurant")
+        for day in range(1, 21)
+    ]
+    upload_custom(client, history + [
+        ("", "2025-03-01", "Steakhouse", "-900.00", "Amex", "Meals", "Restaurant"),
+        ("", "2025-03-02", "Rent", "-2000.00", "Checking", "Home", "Housing"),
+    ])
+
+    flagged = client.get("/transactions/anomalies").json()
+    assert [t["description"] for t in flagged["transactions"]] == ["Steakhouse"]
+    assert flagged["transactions"][0]["anomaly_score"] >= anomalies.FLAG_SCORE
+    assert client.get("/transactions/anomalies", params={"account": "Checking"}).json()["count"] == 0
+    above = flagged["transactions"][0]["anomaly_score"] + 1
+    assert client.get("/transactions/anomalies", params={"min_score": above}).json()["count"] == 0
+
+    # Correcting the amount on re-import re-scores the row
+    steak = flagged["transactions"][0]
+    upload_custom(client, [(steak["id"], "2025-03-01", "Steakhouse", "-30.00", "Amex", "Meals", "Restaurant")])
+    assert client.get("/transactions/anomalies").json()["count"] == 0
+
+
+# ---------------------------
+# Migration
+# ---------------------------
+def test_upgrade_builds_statistics_and_scores_existing_rows(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path}/v5.db")
+    init_db(engine)
+    SessionLocal = make_sessionmaker(engine)
+    with SessionLocal() as db:
+        for day in range(1, 9):
+            create(db, f"Bistro #{day}", -40.0 - day, day=day)
+        create(db, "Bistro #9", -900.0, day=9)
+        expected = stats(db)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE amount_stats")
+        conn.exec_driver_sql("DROP INDEX idx_anomaly_score")
+        conn.exec_driver_sql("ALTER TABLE transactions DROP COLUMN anomaly_score")
+        conn.exec_driver_sql("PRAGMA user_version = 5")
+
+    upgrade(engine)
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA user_version").scalar() == SCHEMA_VERSION
+    with SessionLocal() as db:
+        assert stats(db) == expected
+        # Each row was scored against all the others, so the outlier stands out
+        assert [t.description for t in operations.get_anomalies(db)] == ["Bistro #9"]
+    engine.dispose()
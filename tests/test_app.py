@@ -0,0 +1,46 @@
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from app import database, migrations
+from app.config import Settings
+from app.main import create_app
+
+
+# ---------------------------
+# App factory tests
+# ---------------------------
+def test_create_app_defers_database_setup_to_startup(tmp_path):
+    db_path = tmp_path / "app.db"
+    app = create_app(Settings(database_url=f"sqlite:///{db_path}"))
+    assert not db_path.exists()
+
+    with TestClient(app) as client:
+        assert db_path.exists()
+        response = client.get("/transactions/")
+        assert response.status_code == 200
+        assert response.json()["count"] == 0
+
+    app.state.engine.dispose()
+
+
+def test_init_db_runs_once_per_database(tmp_path):
+    engine = database.make_engine(f"sqlite:///{tmp_path}/once.db")
+
+    with mock.patch.object(migrations, "upgrade", wraps=migrations.upgrade) as upgrade:
+        database.init_db(engine)
+        database.init_db(engine)
+        assert upgrade.call_count == 1
+
+    engine.dispose()
+
+
+def test_upgrade_skips_current_schema(tmp_path):
+    engine = database.make_engine(f"sqlite:///{tmp_path}/current.db")
+    migrations.upgrade(engine)
+
+    with mock.patch.object(migrations.Base.metadata, "create_all") as create_all:
+        migrations.upgrade(engine)
+        create_all.assert_not_called()
+
+    engine.dispose()
@@ -0,0 +1,149 @@
+import datetime
+import os
+import stat
+
+import pytest
+from sqlalchemy import event
+
+from app import archive, schemas
+from app.crud import operations
+from app.database import init_db, make_engine, make_sessionmaker
+from app.migrations import upgrade
+from app.models import CostCenter, Transaction
+
+
+THIS_YEAR = datetime.date.today().year
+
+
+def make_txn(day, description, cost_center="Meals", categories=("Food",), account="Discover"):
+    return schemas.TransactionCreate(
+        date = day,
+        description = description,
+        amount = -10.0,
+        account = account,
+        cost_center_name = cost_center,
+        spend_category_names = list(categories),
+    )
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path}/ledger.db")
+    init_db(engine)
+    with make_sessionmaker(engine)() as db:
+        for txn in [
+            make_txn(datetime.date(2019, 3, 1), "Old coffee"),
+            make_txn(datetime.date(2019, 7, 4), "Old gas", cost_center="Car", categories=["Gas"], account="Amex"),
+            make_txn(datetime.date(2020, 5, 1), "Lunch"),
+            make_txn(datetime.date(THIS_YEAR, 1, 2), "New coffee"),
+        ]:
+            operations.create_transaction(db, txn)
+    yield engine
+    engine.dispose()
+
+
+def descriptions(transactions):
+    return sorted(t.description for t in transactions)
+
+
+# ---------------------------
+# Archiving
+# ---------------------------
+def test_archive_moves_year_to_read_only_file(engine, tmp_path):
+    result = archive.archive_year(engine, 2019)
+
+    assert result["row_count"] == 2
+    assert result["path"] == str(tmp_path / "archive" / "transactions_2019.db")
+    assert stat.S_IMODE(os.stat(result["path"]).st_mode) == 0o444
+
+    with engine.connect() as conn:
+        hot_rows = conn.exec_driver_sql("SELECT COUNT(*) FROM transactions").scalar()
+    assert hot_rows == 2
+
+    with pytest.raises(ValueError, match="already archived"):
+        archive.archive_year(engine, 2019)
+
+
+def test_only_closed_years_can_be_archived(engine):
+    with pytest.raises(ValueError, match="closed years"):
+        archive.archive_year(engine, THIS_YEAR)
+
+
+# ---------------------------
+# Transparent reads
+# ---------------------------
+def test_get_transactions_unions_archived_years(engine):
+    archive.archive_year(engine, 2019)
+
+    with make_sessionmaker(engine)() as db:
+        all_rows = operations.get_transactions(db)
+        assert descriptions(all_rows) == ["Lunch", "New coffee", "Old coffee", "Old gas"]
+        old_gas = next(t for t in all_rows if t.description == "Old gas")
+        assert old_gas.cost_center.name == "Car"
+        assert [c.name for c in old_gas.spend_categories] == ["Gas"]
+
+        filtered = operations.get_transactions(
+            db, start_date=datetime.date(2019, 1, 1), end_date=datetime.date(2019, 12, 31), account=["Amex"]
+        )
+        assert descriptions(filtered) == ["Old gas"]
+
+        # Writes still go to the hot tables once the query is done
+        operations.create_transaction(db, make_txn(datetime.date(THIS_YEAR, 2, 1), "Later"))
+        assert len(operations.get_transactions(db)) == 5
+
+
+def test_planner_skips_years_outside_date_range(engine):
+    archive.archive_year(engine, 2019)
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+
+    try:
+        with make_sessionmaker(engine)() as db:
+            recent = operations.get_transactions(db, start_date=datetime.date(2020, 1, 1))
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert descriptions(recent) == ["Lunch", "New coffee"]
+    assert not any("ATTACH" in s or "archive_2019" in s for s in statements)
+
+
+def test_archived_dimensions_survive_orphan_cleanup(engine):
+    archive.archive_year(engine, 2019)
+
+    with make_sessionmaker(engine)() as db:
+        # The last hot "Car" transaction goes away, but 2019 rows still use it
+        txn = operations.create_transaction(db, make_txn(datetime.date(THIS_YEAR, 3, 1), "Tolls", cost_center="Car"))
+        operations.delete_transaction(db, txn.id)
+        assert db.query(CostCenter).filter(CostCenter.name == "Car").count() == 1
+        assert "Amex" in operations.get_unique_accounts(db)
+
+
+# ---------------------------
+# Migration
+# ---------------------------
+def test_upgrade_rebuilds_transactions_with_autoincrement(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path}/v2.db")
+    init_db(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE transactions")
+        conn.exec_driver_sql(
+            "CREATE TABLE transactions (id INTEGER NOT NULL PRIMARY KEY, date DATE NOT NULL, "
+            "description VARCHAR NOT NULL, account VARCHAR NOT NULL, cost_center_id INTEGER, "
+            "amount_cents INTEGER NOT NULL)"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO transactions (id, date, description, account, amount_cents) "
+            "VALUES (7, '2025-01-01', 'Coffee', 'Discover', -525)"
+        )
+        conn.exec_driver_sql("PRAGMA user_version = 2")
+
+    upgrade(engine)
+
+    with make_sessionmaker(engine)() as db:
+        assert db.get(Transaction, 7).amount_cents == -525
+        db.query(Transaction).delete()
+        db.commit()
+        created = operations.create_transaction(db, make_txn(datetime.date(2025, 2, 1), "Next"))
+        assert created.id == 8  # not reused even though the table was emptied
+    engine.dispose()
@@ -0,0 +1,64 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.main import create_app
+
+
+SEED = [
+    {"date": "2025-01-01", "description": "Coffee Shop", "amount": -5.25, "account": "Discover",
+     "cost_center_name": "Meals", "spend_category_names": ["Restaurant"]},
+    {"date": "2025-01-10", "description": "Rent", "amount": -1200.0, "account": "Schwab Checking",
+     "cost_center_name": "Living Expenses", "spend_category_names": ["Rent"]},
+    {"date": "2025-02-15", "description": "Paycheck", "amount": 2500.0, "account": "Schwab Checking",
+     "cost_center_name": "Income"},
+]
+
+READ_PATHS = [
+    "/transactions/",
+    "/transactions/filter?account=Discover",
+    "/transactions/filter?search=rent&min_amount=-2000",
+    "/transactions/cost_centers",
+    "/transactions/spend_categories",
+    "/transactions/accounts",
+    "/transactions/facets?cost_center_ids=1&min_amount=-100",
+    "/transactions/summary",
+    "/transactions/distribution",
+]
+
+
+@pytest.fixture
+def clients(tmp_path):
+    url = f"sqlite:///{tmp_path}/reads.db"
+    sync_app = create_app(Settings(database_url=url))
+    async_app = create_app(Settings(database_url=url, async_reads=True))
+
+    with TestClient(sync_app) as sync_client, TestClient(async_app) as async_client:
+        for txn in SEED:
+            assert sync_client.post("/transactions/", json=txn).status_code == 200
+        yield sync_client, async_client
+
+    sync_app.state.engine.dispose()
+    async_app.state.engine.dispose()
+
+
+# ---------------------------
+# Parity tests
+# ---------------------------
+@pytest.mark.parametrize("path", READ_PATHS)
+def test_async_reads_match_threadpool_reads(clients, path):
+    sync_client, async_client = clients
+
+    expected = sync_client.get(path)
+    actual = async_client.get(path)
+    assert expected.status_code == actual.status_code == 200
+    assert actual.json() == expected.json()
+
+
+def test_async_read_sees_new_writes(clients):
+    sync_client, async_client = clients
+    async_client.post("/transactions/", json={
+        "date": "2025-03-01", "description": "Taxi", "amount": -20.0, "account": "Amex",
+    })
+
+    assert async_client.get("/transactions/accounts").json() == ["Amex", "Discover", "Schwab Checking"]
@@ -0,0 +1,109 @@
+import datetime
+import gzip
+import sqlite3
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import backups, schemas
+from app.config import Settings
+from app.crud import operations
+from app.database import init_db, make_engine
+from app.main import create_app
+from app.writer import WriteQueue
+
+
+def make_txn(i):
+    return schemas.TransactionCreate(
+        date = datetime.date(2025, 1, 1),
+        description = f"Coffee {i}",
+        amount = -3.5,
+        account = "Discover",
+        cost_center_name = "Meals",
+    )
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path}/ledger.db")
+    init_db(engine)
+    yield engine
+    engine.dispose()
+
+
+def count_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+    finally:
+        conn.close()
+
+
+# ---------------------------
+# Backup tests
+# ---------------------------
+def test_backup_is_consistent_while_writes_continue(engine, tmp_path):
+    writer = WriteQueue(engine)
+    writer.start()
+    for i in range(50):
+        writer.submit(operations.create_transaction, make_txn(i)).result()
+
+    stop = threading.Event()
+
+    def keep_writing():
+        i = 50
+        while not stop.is_set():
+            writer.submit(operations.create_transaction, make_txn(i)).result()
+            i += 1
+
+    thread = threading.Thread(target=keep_writing)
+    thread.start()
+    try:
+        result = backups.backup_database(engine, str(tmp_path / "backups"), pages=1, sleep=0)
+    finally:
+        stop.set()
+        thread.join()
+        writer.stop()
+
+    assert result["steps"] >= 1
+    assert result["bytes"] == result["stored_bytes"]
+    conn = sqlite3.connect(result["path"])
+    assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] >= 50
+    conn.close()
+
+
+def test_retention_and_compression(engine, tmp_path):
+    directory = str(tmp_path / "backups")
+    first = backups.backup_database(engine, directory, keep=2)
+    backups.backup_database(engine, directory, keep=2)
+    latest = backups.backup_database(engine, directory, keep=2, compress=True)
+
+    assert latest["removed"] == [first["path"].rsplit("/", 1)[1]]
+    assert [b["path"] for b in backups.list_backups(directory)][0] == latest["path"]
+    assert len(backups.list_backups(directory)) == 2
+
+    restored = tmp_path / "restored.db"
+    with gzip.open(latest["path"], "rb") as packed:
+        restored.write_bytes(packed.read())
+    assert count_rows(restored) == 0
+
+
+# ---------------------------
+# API
+# ---------------------------
+def test_backup_endpoint(tmp_path):
+    settings = Settings(database_url=f"sqlite:///{tmp_path}/api.db", backup_dir=str(tmp_path / "bk"))
+    with TestClient(create_app(settings)) as client:
+        client.post("/transactions/", json={
+            "date": "2025-01-01", "description": "Coffee", "amount": -3.5, "account": "Discover",
+        })
+        response = client.post("/backups/")
+        assert response.status_code == 200
+        assert count_rows(response.json()["path"]) == 1
+        assert [b["path"] for b in client.get("/backups/").json()["backups"]] == [response.json()["path"]]
+
+        with backups._lock:
+            assert client.post("/backups/").status_code == 409
@@ -0,0 +1,125 @@
+import datetime
+
+from app import schemas
+from app.crud import category_bits, imports, operations
+from app.database import init_db, make_engine, make_sessionmaker
+from app.migrations import SCHEMA_VERSION, upgrade
+from app.models import SpendCategory
+from app.records import ParsedTransaction
+
+
+def create(db, description, categories):
+    return operations.create_transaction(db, schemas.TransactionCreate(
+        date = datetime.date(2025, 3, 1),
+        description = description,
+        amount = -10.0,
+        account = "Amex",
+        cost_center_name = "Meals",
+        spend_category_names = categories,
+    ))
+
+
+def stale_masks(conn):
+    """Rows whose category_mask doesn't match their links."""
+    mask = category_bits.MASK_SQL.format(links="transaction_spend_categories", id="t.id")
+    return conn.exec_driver_sql(f"SELECT t.id FROM transactions t WHERE t.category_mask != ({mask})").all()
+
+
+def category_ids(db):
+    return {c.name: c.id for c in db.query(SpendCategory)}
+
+
+def descriptions(db, **filters):
+    return sorted(t.description for t in operations.get_transactions(db, **filters))
+
+
+# ---------------------------
+# Consistency
+# ---------------------------
+def test_masks_follow_the_links_through_orm_writes(db):
+    dinner = create(db, "Dinner", ["Restaurant", "Business"])
+    lunch = create(db, "Lunch", ["Restaurant"])
+    assert dinner.category_mask != 0 and lunch.category_mask != 0
+    assert stale_masks(db.connection()) == []
+
+    operations.update_transaction(db, dinner.id, schemas.TransactionUpdate(spend_category_names=["Travel"]))
+    operations.update_transaction(db, lunch.id, schemas.TransactionUpdate(spend_category_names=["Travel"]))
+    assert stale_masks(db.connection()) == []
+
+    # Restaurant and Business were deleted as orphans; their bits go to the next categories
+    assert set(category_ids(db)) == {"Travel"}
+    create(db, "Taxi", ["Taxi", "Business"])
+    bits = [c.bit for c in db.query(SpendCategory)]
+    assert None not in bits and len(set(bits)) == 3
+    assert stale_masks(db.connection()) == []
+
+
+def test_masks_follow_the_links_through_imports(db):
+    def row(description, categories, tx_id=None):
+        return ParsedTransaction(
+            date = datetime.date(2025, 3, 1), description = description, amount_cents = -1000,
+            account = "Amex", cost_center = "Meals", spend_categories = categories, id = tx_id,
+        )
+
+    imports.load_import(db, "first", "custom", [row("Dinner", ["Restaurant", "Business"]), row("Fuel", ["Gas"])])
+    assert stale_masks(db.connection()) == []
+
+    ids = {t.description: t.id for t in operations.get_transactions(db)}
+    imports.load_import(db, "second", "custom", [
+        row("Dinner", ["Restaurant"], ids["Dinner"]), row("Fuel", ["Gas", "Road Trip"], ids["Fuel"]),
+    ], upsert=True)
+    assert stale_masks(db.connection()) == []
+    assert descriptions(db, spend_category_ids=[category_ids(db)["Road Trip"]]) == ["Fuel"]
+
+
+# ---------------------------
+# Filtering
+# ---------------------------
+def test_any_and_all_of_the_selected_categories(db):
+    create(db, "Dinner", ["Restaurant", "Business"])
+    create(db, "Lunch", ["Restaurant"])
+    create(db, "Flight", ["Business", "Travel"])
+    ids = category_ids(db)
+    both = [ids["Restaurant"], ids["Business"]]
+
+    def check():
+        assert descriptions(db, spend_category_ids=both) == ["Dinner", "Flight", "Lunch"]
+        assert descriptions(db, spend_category_ids=both, spend_category_match="all") == ["Dinner"]
+        assert descriptions(db, spend_category_ids=both + [999], spend_category_match="all") == []
+        assert operations.get_summary(db, spend_category_ids=both, spend_category_match="all")["count"] == 1
+        facets = operations.get_facets(db, spend_category_ids=both, spend_category_match="all")
+        assert facets["count"] == 1
+        assert {c["name"]: c["count"] for c in facets["spend_categories"]}["Travel"] == 1
+
+    check()
+    # Categories without a bit (more than 63 of them) are filtered through the links
+    db.query(SpendCategory).filter(SpendCategory.id == ids["Business"]).update({"bit": None})
+    check()
+
+
+# ---------------------------
+# Migration
+# ---------------------------
+def test_upgrade_backfills_bits_and_masks(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path}/v4.db")
+    init_db(engine)
+    SessionLocal = make_sessionmaker(engine)
+    with SessionLocal() as db:
+        create(db, "Dinner", ["Restaurant", "Business"])
+        create(db, "Fuel", ["Gas"])
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX idx_spend_category_bit")
+        conn.exec_driver_sql("ALTER TABLE spend_categories DROP COLUMN bit")
+        conn.exec_driver_sql("ALTER TABLE transactions DROP COLUMN category_mask")
+        conn.exec_driver_sql("PRAGMA user_version = 4")
+
+    upgrade(engine)
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA user_version").scalar() == SCHEMA_VERSION
+        assert stale_masks(conn) == []
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM transactions WHERE category_mask = 0").scalar() == 0
+    with SessionLocal() as db:
+        ids = category_ids(db)
+        assert descriptions(db, spend_category_ids=[ids["Business"], ids["Restaurant"]], spend_category_match="all") == ["Dinner"]
+    engine.dispose()
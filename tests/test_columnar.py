@@ -0,0 +1,119 @@
+import datetime
+
+from fastapi.testclient import TestClient
+import pytest
+
+from app import archive, schemas
+from app.columnar import get_snapshot
+from app.config import Settings
+from app.crud import operations
+from app.main import create_app
+
+
+def seed(db):
+    rows = [
+        ("Coffee Shop", -5.25, "Discover", "Meals", ["Restaurant"], datetime.date(2025, 1, 1)),
+        ("Grocery Store", -50.00, "Schwab Checking", "Meals", ["Groceries"], datetime.date(2025, 1, 2)),
+        ("Rent", -1200.00, "Schwab Checking", "Living Expenses", ["Rent"], datetime.date(2025, 1, 10)),
+        ("Concert Ticket", -100.00, "Discover", "Entertainment", ["Concerts", "Restaurant"], datetime.date(2025, 2, 5)),
+        ("Paycheck", 2500.00, "Schwab Checking", "Income", [], datetime.date(2025, 2, 15)),
+    ]
+    for description, amount, account, cost_center, categories, day in rows:
+        operations.create_transaction(db, schemas.TransactionCreate(
+            date = day,
+            description = description,
+            amount = amount,
+            account = account,
+            cost_center_name = cost_center,
+            spend_category_names = categories,
+        ))
+
+
+def ids(transactions):
+    return sorted(t["id"] if isinstance(t, dict) else t.id for t in transactions)
+
+
+FILTER_CASES = [
+    {},
+    {"search": "shop"},
+    {"account": ["Discover"]},
+    {"cost_center_ids": [1]},
+    {"spend_category_ids": [1]},
+    {"spend_category_ids": [1, 4], "spend_category_match": "all"},
+    {"spend_category_ids": [1, 99], "spend_category_match": "all"},
+    {"start_date": datetime.date(2025, 1, 2), "end_date": datetime.date(2025, 1, 31)},
+    {"min_amount": -100.0, "max_amount": -5.25},
+    {"account": ["Nope"]},
+]
+
+
+# ---------------------------
+# Filter parity tests
+# ---------------------------
+@pytest.mark.parametrize("filters", FILTER_CASES)
+def test_select_matches_sql(db, filters):
+    seed(db)
+    snapshot = get_snapshot(db.get_bind())
+
+    expected = operations.get_transactions(db, **filters)
+    assert ids(snapshot.select(**filters).rows()) == ids(expected)
+
+
+def test_rows_render_transaction_shape(db):
+    seed(db)
+    row = get_snapshot(db.get_bind()).select(search="concert").rows()[0]
+
+    assert row["amount"] == -100.0
+    assert row["account"] == "Discover"
+    assert row["cost_center"]["name"] == "Entertainment"
+    assert {c["name"] for c in row["spend_categories"]} == {"Concerts", "Restaurant"}
+    schemas.TransactionWithID.model_validate(row)
+
+
+def test_summary_matches_sql(db):
+    seed(db)
+    snapshot = get_snapshot(db.get_bind())
+
+    assert snapshot.select().summary() == operations.get_summary(db)
+    assert snapshot.select(account=["Discover"]).summary() == operations.get_summary(db, account=["Discover"])
+
+
+# ---------------------------
+# Write-through tests
+# ---------------------------
+def test_snapshot_follows_writes(db):
+    seed(db)
+    snapshot = get_snapshot(db.get_bind())
+
+    created = operations.create_transaction(db, schemas.TransactionCreate(
+        date = datetime.date(2025, 3, 1),
+        description = "Taxi",
+        amount = -20.0,
+        account = "Amex",
+        spend_category_names = ["Rides"],
+    ))
+    assert ids(snapshot.select(account=["Amex"]).rows()) == [created.id]
+
+    operations.update_transaction(db, created.id, schemas.TransactionUpdate(amount=-25.0))
+    assert snapshot.select(search="taxi").rows()[0]["amount"] == -25.0
+
+    operations.delete_transaction(db, created.id)
+    assert snapshot.select(search="taxi").rows() == []
+    assert ids(snapshot.select().rows()) == ids(operations.get_transactions(db))
+
+
+def test_summary_endpoint_includes_archived_years(tmp_path):
+    app = create_app(Settings(database_url = f"sqlite:///{tmp_path}/ledger.db", columnar_engine = True))
+    with TestClient(app) as client:
+        for day in ("2019-03-01", "2025-03-01"):
+            txn = {"date": day, "description": "Coffee", "amount": -4.0, "account": "Discover"}
+            assert client.post("/transactions/", json=txn).status_code == 200
+        archive.archive_year(app.state.engine, 2019)
+
+        listed = client.get("/transactions/filter").json()
+        summary = client.get("/transactions/summary").json()
+        assert listed["count"] == 2
+        assert summary["count"] == listed["count"]
+        # Ranges clear of the archived years are still served from the snapshot
+        assert client.get("/transactions/summary", params={"start_date": "2025-01-01"}).json()["count"] == 1
+    app.state.engine.dispose()
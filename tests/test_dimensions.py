@@ -0,0 +1,150 @@
+from contextlib import contextmanager
+import datetime
+
+from sqlalchemy import event
+
+from app import schemas
+from app.crud import dimensions, operations
+from app.models import CostCenter, SpendCategory
+
+
+@contextmanager
+def count_statements(db):
+    counts = {"statements": 0, "commits": 0}
+    engine = db.get_bind()
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        counts["statements"] += 1
+
+    def on_commit(conn):
+        counts["commits"] += 1
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    event.listen(engine, "commit", on_commit)
+    try:
+        yield counts
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+        event.remove(engine, "commit", on_commit)
+
+
+def _create(db, description, cost_center, categories, amount=-10.0, account="Discover"):
+    return operations.create_transaction(db, schemas.TransactionCreate(
+        date = datetime.date(2025, 1, 1),
+        description = description,
+        amount = amount,
+        account = account,
+        cost_center_name = cost_center,
+        spend_category_names = categories,
+    ))
+
+
+# ---------------------------
+# Get or create
+# ---------------------------
+def test_get_or_create_returns_existing_and_new_rows(db):
+    first = dimensions.get_or_create(db, SpendCategory, ["Rent", "Food"])
+    second = dimensions.get_or_create(db, SpendCategory, ["Food", "Gas", "Food"])
+    db.commit()
+
+    assert second["Food"].id == first["Food"].id
+    assert set(second) == {"Food", "Gas"}
+    assert db.query(SpendCategory).count() == 3
+
+
+def test_resolve_spend_categories_cleans_names(db):
+    categories = dimensions.resolve_spend_categories(db, [" Rent ", "", "Rent", None])
+    assert [c.name for c in categories] == ["Rent"]
+    assert [c.name for c in dimensions.resolve_spend_categories(db, [])] == ["Uncategorized"]
+    assert dimensions.resolve_cost_center(db, "  ").name == "Uncategorized"
+
+
+# ---------------------------
+# Single commit per call
+# ---------------------------
+def test_create_uses_one_commit_and_constant_statements(db):
+    with count_statements(db) as new_names:
+        _create(db, "First", "Meals", ["A", "B", "C"], account="Discover")
+
+    with count_statements(db) as more_new_names:
+        _create(db, "Second", "Car", ["D", "E", "F"], account="Amex")
+
+    assert new_names["commits"] == more_new_names["commits"] == 1
+    assert new_names["statements"] == more_new_names["statements"]
+
+
+def test_update_uses_one_commit_and_cleans_up_orphans(db):
+    keep = _create(db, "Keep", "Meals", ["Food"])
+    txn = _create(db, "Move", "Car", ["Gas", "Tolls"])
+
+    with count_statements(db) as counts:
+        operations.update_transaction(db, txn.id, schemas.TransactionUpdate(
+            cost_center_name = "Meals",
+            spend_category_names = ["Food"],
+            amount = -12.5,
+        ))
+
+    assert counts["commits"] == 1
+    assert [c.name for c in db.query(CostCenter)] == ["Meals"]
+    assert [c.name for c in db.query(SpendCategory)] == ["Food"]
+    assert keep.cost_center.name == "Meals"
+
+
+def test_delete_uses_one_commit_and_cleans_up_orphans(db):
+    txn = _create(db, "Only", "Car", ["Gas"])
+
+    with count_statements(db) as counts:
+        assert operations.delete_transaction(db, txn.id)
+
+    assert counts["commits"] == 1
+    assert db.query(CostCenter).count() == 0
+    assert db.query(SpendCategory).count() == 0
+
+
+# ---------------------------
+# Dimension cache
+# ---------------------------
+def test_cache_reloads_only_after_dimension_changes(db):
+    _create(db, "Coffee", "Meals", ["Food"])
+    cache = dimensions.get_cache(db.get_bind())
+    assert list(cache.get().accounts) == ["Discover"]
+
+    with count_statements(db) as counts:
+        cache.get()
+    assert counts["statements"] == 0
+
+    # Known names only: no dimension row added, cache stays valid
+    _create(db, "Lunch", "Meals", ["Food"])
+    assert cache.peek() is not None
+
+    _create(db, "Taxi", "Car", ["Travel"], account="Amex")
+    assert cache.peek() is None
+    current = cache.get()
+    assert list(current.cost_centers) == ["Car", "Meals"]
+    assert list(current.accounts) == ["Amex", "Discover"]
+    assert [row["name"] for row in current.rows(SpendCategory)] == ["Food", "Travel"]
+
+
+def test_warm_cache_skips_upsert_for_known_names(db):
+    _create(db, "Coffee", "Meals", ["Food", "Fun"])
+    dimensions.get_cache(db.get_bind()).get()
+
+    statements = []
+    engine = db.get_bind()
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        _create(db, "Lunch", "Meals", ["Food", "Fun"])
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert not any("ON CONFLICT" in s for s in statements)
+
+
+def test_accounts_follow_transactions(db):
+    txn = _create(db, "Coffee", "Meals", [], account="Discover")
+    operations.update_transaction(db, txn.id, schemas.TransactionUpdate(account="Amex"))
+    assert operations.get_unique_accounts(db) == ["Amex"]
+
+    operations.delete_transaction(db, txn.id)
+    assert operations.get_unique_accounts(db) == []
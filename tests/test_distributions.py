@@ -0,0 +1,156 @@
+import datetime
+import sqlite3
+
+import pytest
+
+from app import schemas
+from app.crud import distributions, operations
+from app.crud.distributions import get_distribution
+from app.database import init_db, make_engine, make_sessionmaker
+from app.loaders import save_transactions
+from app.migrations import upgrade
+from app.models import AmountSketch, CostCenter
+
+
+def make_txn(amount, cost_center="Meals", account="Discover"):
+    return schemas.TransactionCreate(
+        date = datetime.date(2025, 3, 1),
+        description = "Test",
+        amount = amount,
+        account = account,
+        cost_center_name = cost_center,
+    )
+
+
+# ---------------------------
+# Write path tests
+# ---------------------------
+def test_create_records_cost_center_and_account_sketches(db):
+    for amount in [-10.0, -20.0, -30.0]:
+        operations.create_transaction(db, make_txn(amount))
+
+    keys = {(s.dimension, s.key) for s in db.query(AmountSketch)}
+    assert keys == {("cost_center", "Meals"), ("account", "Discover")}
+
+    dist = get_distribution(db)
+    assert dist["count"] == 3
+    assert dist["min"] == -30.0
+    assert dist["max"] == -10.0
+    assert dist["p50"] == -20.0
+
+
+def test_bulk_load_records_sketches(db):
+    save_transactions([
+        {"date": datetime.date(2025, 1, i), "description": "Row", "amount_cents": -100 * i,
+         "account": "Schwab Checking", "cost_center": None, "spend_categories": []}
+        for i in range(1, 11)
+    ], db_session=db)
+
+    dist = get_distribution(db, account=["Schwab Checking"])
+    assert dist["count"] == 10
+    assert dist["min"] == -10.0
+
+
+def test_update_and_delete_rebuild_affected_sketches(db):
+    tx = operations.create_transaction(db, make_txn(-10.0))
+    other = operations.create_transaction(db, make_txn(-50.0))
+
+    operations.update_transaction(
+        db, tx.id, schemas.TransactionUpdate(amount=-99.0, cost_center_name="Car")
+    )
+    car = db.query(CostCenter).filter(CostCenter.name == "Car").one()
+    assert get_distribution(db, cost_center_ids=[car.id])["max"] == -99.0
+
+    operations.delete_transaction(db, other.id)
+    meals = db.query(AmountSketch).filter(AmountSketch.key == "Meals").first()
+    assert meals is None  # no Meals rows left
+    assert get_distribution(db)["count"] == 1
+
+
+def test_removals_are_counted_stale_until_a_rebuild_is_due(db, monkeypatch):
+    rows = [operations.create_transaction(db, make_txn(-1.0 - i)) for i in range(200)]
+    rebuilt = []
+    real_rebuild = distributions.rebuild_sketches
+    monkeypatch.setattr(distributions, "rebuild_sketches", lambda *a, **kw: rebuilt.append(kw) or real_rebuild(*a, **kw))
+
+    # Amounts inside the range are only marked stale: no scan per write
+    operations.delete_transaction(db, rows[100].id)
+    operations.update_transaction(db, rows[101].id, schemas.TransactionUpdate(amount=-50.5))
+    operations.update_transaction(db, rows[102].id, schemas.TransactionUpdate(description="Renamed"))
+    assert rebuilt == []
+    assert {s.key: s.stale for s in db.query(AmountSketch)} == {"Meals": 2, "Discover": 2}
+    assert get_distribution(db)["count"] == 199
+
+    # Removing the min rebuilds, so min / max stay exact
+    operations.delete_transaction(db, rows[-1].id)
+    assert len(rebuilt) == 1
+    dist = get_distribution(db)
+    assert (dist["count"], dist["min"]) == (198, -199.0)
+    assert {s.key: s.stale for s in db.query(AmountSketch)} == {"Meals": 0, "Discover": 0}
+
+    # More than STALE_FRACTION stale values rebuild too
+    for tx in rows[1:4]:
+        operations.delete_transaction(db, tx.id)
+    assert len(rebuilt) == 1
+    operations.delete_transaction(db, rows[4].id)
+    assert len(rebuilt) == 2
+    assert get_distribution(db)["count"] == 194
+
+
+def test_distribution_rejects_two_dimensions(db):
+    with pytest.raises(ValueError):
+        get_distribution(db, cost_center_ids=[1], account=["Discover"])
+
+
+# ---------------------------
+# Migration tests
+# ---------------------------
+def test_upgrade_builds_sketches_for_existing_rows(tmp_path):
+    # A ledger from before the sketches: float amounts, no amount_sketches table
+    path = tmp_path / "legacy.db"
+    legacy = sqlite3.connect(path)
+    legacy.executescript("""
+        CREATE TABLE cost_centers (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL UNIQUE);
+        CREATE TABLE spend_categories (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL UNIQUE);
+        CREATE TABLE transactions (
+            id INTEGER PRIMARY KEY, date DATE NOT NULL, description VARCHAR NOT NULL,
+            amount FLOAT NOT NULL, account VARCHAR NOT NULL,
+            cost_center_id INTEGER REFERENCES cost_centers(id) ON DELETE SET NULL
+        );
+        CREATE TABLE transaction_spend_categories (
+            transaction_id INTEGER, spend_category_id INTEGER,
+            PRIMARY KEY (transaction_id, spend_category_id)
+        );
+        INSERT INTO cost_centers VALUES (1, 'Meals');
+        INSERT INTO transactions VALUES (1, '2025-01-01', 'Coffee', -4.35, 'Discover', 1);
+        INSERT INTO transactions VALUES (2, '2025-01-02', 'Lunch', -12.00, 'Discover', 1);
+        INSERT INTO transactions VALUES (3, '2025-01-03', 'Dinner', -30.00, 'Discover', 1);
+    """)
+    legacy.commit()
+    legacy.close()
+
+    engine = make_engine(f"sqlite:///{path}")
+    upgrade(engine)
+
+    with make_sessionmaker(engine)() as db:
+        dist = get_distribution(db)
+        assert (dist["count"], dist["min"], dist["p50"]) == (3, -30.0, -12.0)
+        meals = db.query(CostCenter).filter_by(name="Meals").one()
+        assert get_distribution(db, cost_center_ids=[meals.id])["count"] == 3
+    engine.dispose()
+
+
+def test_upgrade_fills_an_empty_sketch_table(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path}/v6.db")
+    init_db(engine)
+    with make_sessionmaker(engine)() as db:
+        operations.create_transaction(db, make_txn(-10.0))
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM amount_sketches")
+        conn.exec_driver_sql("PRAGMA user_version = 6")
+
+    upgrade(engine)
+
+    with make_sessionmaker(engine)() as db:
+        assert get_distribution(db)["count"] == 1
+    engine.dispose()
@@ -0,0 +1,74 @@
+import datetime
+
+from app import schemas
+from app.crud import operations
+from app.models import CostCenter
+
+
+def make_txn(description, amount, cost_center, categories, account):
+    return schemas.TransactionCreate(
+        date = datetime.date(2025, 3, 1),
+        description = description,
+        amount = amount,
+        account = account,
+        cost_center_name = cost_center,
+        spend_category_names = categories,
+    )
+
+
+def seed(db):
+    for txn in [
+        make_txn("Coffee", -5.0, "Meals", ["Food"], "Discover"),
+        make_txn("Dinner", -45.0, "Meals", ["Food", "Fun"], "Amex"),
+        make_txn("Gas", -30.0, "Car", ["Gas"], "Discover"),
+        make_txn("Paycheck", 2000.0, "Income", [], "Schwab Checking"),
+    ]:
+        operations.create_transaction(db, txn)
+
+
+def by_name(values):
+    return {v["name"]: (v["count"], v["total"]) for v in values}
+
+
+# ---------------------------
+# Facet tests
+# ---------------------------
+def test_facets_without_filters(db):
+    seed(db)
+    facets = operations.get_facets(db)
+
+    assert facets["count"] == 4
+    assert facets["total"] == 1920.0
+    assert by_name(facets["cost_centers"]) == {
+        "Car": (1, -30.0), "Income": (1, 2000.0), "Meals": (2, -50.0),
+    }
+    assert by_name(facets["spend_categories"])["Food"] == (2, -50.0)
+    assert by_name(facets["accounts"]) == {
+        "Amex": (1, -45.0), "Discover": (2, -35.0), "Schwab Checking": (1, 2000.0),
+    }
+
+
+def test_facet_ignores_its_own_filter(db):
+    seed(db)
+    meals = db.query(CostCenter).filter(CostCenter.name == "Meals").one()
+    facets = operations.get_facets(db, cost_center_ids=[meals.id])
+
+    assert facets["count"] == 2
+    # Other cost centers keep their counts so they can still be added to the selection
+    assert by_name(facets["cost_centers"])["Car"] == (1, -30.0)
+    # Other facets are narrowed by the cost center filter, and empty values are kept
+    assert by_name(facets["accounts"]) == {
+        "Amex": (1, -45.0), "Discover": (1, -5.0), "Schwab Checking": (0, 0.0),
+    }
+    assert by_name(facets["spend_categories"])["Gas"] == (0, 0.0)
+
+
+def test_facets_combine_other_filters(db):
+    seed(db)
+    facets = operations.get_facets(db, account=["Discover"], max_amount=-10.0)
+
+    assert facets["count"] == 1
+    assert by_name(facets["cost_centers"])["Car"] == (1, -30.0)
+    assert by_name(facets["cost_centers"])["Meals"] == (0, 0.0)
+    # The account facet drops only the account filter, not the amount filter
+    assert by_name(facets["accounts"])["Amex"] == (1, -45.0)
@@ -0,0 +1,63 @@
+import datetime
+
+from app import schemas
+from app.crud import operations
+from app.crud.filters import FilterSpec, cached
+
+
+def seed(db):
+    for description, amount, account, categories in [
+        ("Coffee", -5.0, "Discover", ["Food"]),
+        ("Dinner", -45.0, "Amex", ["Food", "Fun"]),
+        ("Gas", -30.0, "Discover", ["Gas"]),
+    ]:
+        operations.create_transaction(db, schemas.TransactionCreate(
+            date = datetime.date(2025, 3, 1),
+            description = description,
+            amount = amount,
+            account = account,
+            cost_center_name = "Meals",
+            spend_category_names = categories,
+        ))
+
+
+# ---------------------------
+# Filter spec tests
+# ---------------------------
+def test_spec_normalizes_filters():
+    spec = FilterSpec.from_filters(search="", account="Amex", cost_center_ids=[1, 2], min_amount=-4.5)
+
+    assert spec.shape == {"account", "cost_center_ids", "min_cents"}
+    assert spec.params() == {"account": ("Amex",), "cost_center_ids": (1, 2), "min_cents": -450}
+    assert spec.without("account").shape == {"cost_center_ids", "min_cents"}
+
+
+def test_statements_are_built_once_per_shape():
+    built = []
+
+    def build(where):
+        built.append(len(where))
+        return object()
+
+    first = cached("test_shape", FilterSpec.from_filters(account=["Amex"], search="cof"), build)
+    second = cached("test_shape", FilterSpec.from_filters(account=["Amex", "Discover"], search="gas"), build)
+    other = cached("test_shape", FilterSpec.from_filters(account=["Amex"]), build)
+
+    assert first is second and other is not first
+    assert built == [2, 1]
+
+
+def test_one_cached_statement_serves_different_values(db):
+    seed(db)
+
+    def descriptions(**filters):
+        return sorted(t.description for t in operations.get_transactions(db, **filters))
+
+    assert descriptions(account="Discover", spend_category_ids=[1]) == ["Coffee"]
+    assert descriptions(account=["Discover", "Amex"], spend_category_ids=[1, 2]) == ["Coffee", "Dinner"]
+    assert descriptions(search="GA", max_amount=-10) == ["Gas"]
+    assert operations.get_summary(db, account="Amex")["total"] == -45.0
+
+    columns = operations.get_transaction_columns(db, spend_category_ids=[2])
+    assert columns.descriptions == ["Dinner"]
+    assert [[columns.category_names[i] for i in row] for row in columns.spend_category_ids] == [["Food", "Fun"]]
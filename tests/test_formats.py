@@ -0,0 +1,95 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.main import create_app
+
+
+SEED = [
+    {"date": "2025-01-01", "description": "Coffee Shop", "amount": -5.25, "account": "Discover",
+     "cost_center_name": "Meals", "spend_category_names": ["Restaurant", "Coffee"]},
+    {"date": "2025-01-10", "description": "Rent", "amount": -1200.0, "account": "Schwab Checking",
+     "cost_center_name": "Living Expenses", "spend_category_names": ["Rent"]},
+    {"date": "2025-02-15", "description": "Paycheck", "amount": 2500.0, "account": "Schwab Checking",
+     "cost_center_name": "Income"},
+]
+
+
+@pytest.fixture(params=[False, True], ids=["sql", "columnar_engine"])
+def client(request, tmp_path):
+    app = create_app(Settings(database_url=f"sqlite:///{tmp_path}/formats.db", columnar_engine=request.param))
+    with TestClient(app) as client:
+        for txn in SEED:
+            assert client.post("/transactions/", json=txn).status_code == 200
+        yield client
+
+
+def rows_from_columnar(body):
+    """Rebuild row JSON from the struct-of-arrays response."""
+    cols, dicts = body["columns"], body["dictionaries"]
+    cost_centers = dict(zip(dicts["cost_centers"]["id"], dicts["cost_centers"]["name"]))
+    categories = dict(zip(dicts["spend_categories"]["id"], dicts["spend_categories"]["name"]))
+    return [
+        {
+            "id": cols["id"][i],
+            "date": cols["date"][i],
+            "description": cols["description"][i],
+            "amount": cols["amount"][i],
+            "account": dicts["accounts"][cols["account"][i]],
+            "cost_center": {"id": cols["cost_center_id"][i], "name": cost_centers[cols["cost_center_id"][i]]},
+            "spend_categories": [
+                {"id": cat_id, "name": categories[cat_id]} for cat_id in cols["spend_category_ids"][i]
+            ],
+        }
+        for i in range(body["count"])
+    ]
+
+
+def by_id(rows):
+    return sorted(rows, key=lambda row: row["id"])
+
+
+# ---------------------------
+# Columnar JSON
+# ---------------------------
+@pytest.mark.parametrize("path", ["/transactions/", "/transactions/filter?account=Schwab%20Checking"])
+def test_columnar_json_matches_rows(client, path):
+    rows = client.get(path).json()["transactions"]
+    sep = "&" if "?" in path else "?"
+    response = client.get(f"{path}{sep}format=columnar")
+
+    assert response.headers["content-type"].startswith("application/vnd.finance.columnar+json")
+    assert by_id(rows_from_columnar(response.json())) == by_id(rows)
+
+
+def test_accept_header_selects_format(client):
+    response = client.get("/transactions/filter", headers={"Accept": "application/vnd.finance.columnar+json"})
+    assert response.json()["count"] == 3
+    assert "transactions" in client.get("/transactions/filter", headers={"Accept": "application/json"}).json()
+
+
+def test_unknown_format_is_rejected(client):
+    assert client.get("/transactions/?format=xml").status_code == 400
+
+
+# ---------------------------
+# Arrow IPC
+# ---------------------------
+def test_arrow_stream_matches_rows(client):
+    pa = pytest.importorskip("pyarrow")
+
+    rows = by_id(client.get("/transactions/filter").json()["transactions"])
+    response = client.get("/transactions/filter", headers={"Accept": "application/vnd.apache.arrow.stream"})
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert pa.types.is_dictionary(table.schema.field("account").type)
+    arrow_rows = by_id(table.to_pylist())
+
+    assert [r["id"] for r in arrow_rows] == [r["id"] for r in rows]
+    assert [r["date"].isoformat() for r in arrow_rows] == [r["date"] for r in rows]
+    assert [r["account"] for r in arrow_rows] == [r["account"] for r in rows]
+    assert [r["cost_center"] for r in arrow_rows] == [r["cost_center"]["name"] for r in rows]
+    assert [r["spend_categories"] for r in arrow_rows] == [
+        [c["name"] for c in r["spend_categories"]] for r in rows
+    ]
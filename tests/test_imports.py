@@ -0,0 +1,247 @@
+import datetime
+
+from app import archive
+from app.crud import imports
+from app.database import init_db, make_engine, make_sessionmaker
+from app.migrations import SCHEMA_VERSION, upgrade
+from app.models import Import, Transaction
+
+from conftest import upload_custom
+
+
+def discover_csv(*rows):
+    lines = ["Trans. Date,Description,Amount,Category"]
+    lines += [f"{day},{description},{amount},Food" for day, description, amount in rows]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def upload(client, content, preview=False, full=False):
+    response = client.post(
+        "/transactions/upload-csv",
+        data = {"institution": "discover", "preview": str(preview).lower(), "full": str(full).lower()},
+        files = {"file": ("export.csv", content, "text/csv")},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def ledger(client):
+    with client.app.state.SessionLocal() as db:
+        return sorted((t.date.isoformat(), t.description) for t in db.query(Transaction))
+
+
+# ---------------------------
+# Upload tests
+# ---------------------------
+def test_same_file_twice_is_a_no_op(client):
+    content = discover_csv(("03/01/2025", "Coffee", "3.50"))
+    assert upload(client, content)["count"] == 1
+
+    again = upload(client, content)
+    assert again["duplicate"] is True
+    assert again["count"] == 0
+    assert len(ledger(client)) == 1
+
+
+def test_overlapping_export_loads_only_new_rows(client):
+    upload(client, discover_csv(
+        ("03/01/2025", "Coffee", "3.50"),
+        ("03/02/2025", "Lunch", "12.00"),
+        ("03/03/2025", "Coffee", "3.50"),  # export taken mid-day
+    ))
+
+    # The next export repeats March, and March 3rd now has a second purchase
+    result = upload(client, discover_csv(
+        ("03/01/2025", "Coffee", "3.50"),
+        ("03/02/2025", "Lunch", "12.00"),
+        ("03/03/2025", "Coffee", "3.50"),
+        ("03/03/2025", "Coffee", "3.50"),
+        ("03/04/2025", "Gas", "30.00"),
+    ))
+
+    assert result["count"] == 2
+    assert result["skipped"] == 3
+    assert ledger(client) == [
+        ("2025-03-01", "Coffee"), ("2025-03-02", "Lunch"),
+        ("2025-03-03", "Coffee"), ("2025-03-03", "Coffee"), ("2025-03-04", "Gas"),
+    ]
+
+    with client.app.state.SessionLocal() as db:
+        assert imports.get_watermarks(db) == {"Discover": datetime.date(2025, 3, 3)}
+        latest = db.query(Import).order_by(Import.id.desc()).first()
+        assert (latest.first_date, latest.last_date, latest.rows_loaded, latest.rows_skipped) == (
+            datetime.date(2025, 3, 3), datetime.date(2025, 3, 4), 2, 3,
+        )
+
+
+def test_fully_overlapping_export_is_recorded(client):
+    upload(client, discover_csv(("03/01/2025", "Coffee", "3.50"), ("03/02/2025", "Lunch", "12.00")))
+    result = upload(client, discover_csv(("03/02/2025", "Lunch", "12.00")))
+
+    assert (result["count"], result["skipped"], result["duplicate"]) == (0, 1, False)
+    assert upload(client, discover_csv(("03/02/2025", "Lunch", "12.00")))["duplicate"] is True
+
+
+def test_older_backfill_is_not_watermarked(client):
+    upload(client, discover_csv(("03/01/2025", "Coffee", "3.50"), ("03/05/2025", "Lunch", "12.00")))
+
+    # An export of the months before the first import, overlapping its first days
+    result = upload(client, discover_csv(
+        ("01/15/2025", "Gas", "30.00"),
+        ("02/20/2025", "Tires", "300.00"),
+        ("03/01/2025", "Coffee", "3.50"),
+        ("03/02/2025", "Books", "20.00"),
+    ))
+
+    assert (result["count"], result["skipped"], result["watermarked"]) == (2, 2, 1)
+    assert ledger(client) == [
+        ("2025-01-15", "Gas"), ("2025-02-20", "Tires"), ("2025-03-01", "Coffee"), ("2025-03-05", "Lunch"),
+    ]
+
+
+def test_full_upload_reads_rows_below_the_watermark(client):
+    upload(client, discover_csv(("03/01/2025", "Coffee", "3.50"), ("03/05/2025", "Lunch", "12.00")))
+    content = discover_csv(("03/03/2025", "Books", "20.00"), ("03/05/2025", "Lunch", "12.00"))
+
+    watermarked = upload(client, content, preview=True)
+    assert (watermarked["count"], watermarked["watermarked"]) == (0, 1)
+
+    result = upload(client, content, full=True)
+    assert (result["count"], result["skipped"], result["watermarked"]) == (1, 1, 0)
+    assert ("2025-03-03", "Books") in ledger(client)
+
+
+# ---------------------------
+# Preview tests
+# ---------------------------
+def test_preview_reports_the_diff_without_writing(client):
+    upload(client, discover_csv(("03/01/2025", "Coffee", "3.50"), ("03/02/2025", "Lunch", "12.00")))
+    content = (
+        b"Trans. Date,Description,Amount,Category\n"
+        b"03/02/2025,Lunch,12.00,Food\n"
+        b"03/03/2025,Coffee,3.50,Food\n"
+        b"03/03/2025,Coffee,3.50,Food\n"
+        b"03/04/2025,Tires,300.00,Car\n"
+    )
+
+    result = upload(client, content, preview=True)
+
+    diff = result["diff"]
+    assert (result["preview"], result["count"], result["skipped"]) == (True, 3, 1)
+    assert diff["accounts"] == [{
+        "account": "Discover", "new": 3, "duplicates": 1,
+        "first_date": "2025-03-03", "last_date": "2025-03-04",
+    }]
+    assert diff["new_names"] == {"cost_centers": ["Car"], "spend_categories": [], "accounts": []}
+    assert [row["description"] for row in diff["sample"]["new"]] == ["Coffee", "Coffee", "Tires"]
+    assert diff["sample"]["duplicates"][0] == {
+        "date": "2025-03-02", "description": "Lunch", "amount": -12.0,
+        "account": "Discover", "cost_center": "Food", "spend_categories": ["Uncategorized"],
+    }
+    assert len(ledger(client)) == 2
+
+    # Previewing doesn't count as importing the file
+    loaded = upload(client, content)
+    assert (loaded["duplicate"], loaded["count"], loaded["skipped"]) == (False, 3, 1)
+    assert len(ledger(client)) == 5
+
+
+def test_loaded_rows_keep_categories_and_sketches(client):
+    content = (
+        b"Date,Description,Amount,Account,Cost Center,Spend Categories\n"
+        b"2025-03-01,Dinner,-40.00,Amex,Meals,\"Restaurant, Date Night\"\n"
+        b"2025-03-02,Fuel,-30.00,Amex,,\n"
+    )
+    response = client.post(
+        "/transactions/upload-csv",
+        data = {"institution": "custom"},
+        files = {"file": ("custom.csv", content, "text/csv")},
+    )
+    assert response.json()["count"] == 2
+
+    rows = client.get("/transactions/filter").json()["transactions"]
+    by_description = {row["description"]: row for row in rows}
+    assert {c["name"] for c in by_description["Dinner"]["spend_categories"]} == {"Restaurant", "Date Night"}
+    assert by_description["Fuel"]["cost_center"]["name"] == "Uncategorized"
+    assert client.get("/transactions/accounts").json() == ["Amex"]
+    assert client.get("/transactions/distribution", params={"account": "Amex"}).json()["count"] == 2
+
+
+# ---------------------------
+# Re-import tests
+# ---------------------------
+def test_reimported_export_updates_rows_by_id(client):
+    upload_custom(client, [
+        ("", "2025-03-01", "Dinner", "-40.00", "Amex", "Meals", "Restaurant"),
+        ("", "2025-03-02", "Fuel", "-30.00", "Amex", "Car", "Gas"),
+        ("", "2025-03-03", "Rent", "-900.00", "Checking", "Home", "Housing"),
+    ])
+    ids = {row["description"]: row["id"] for row in client.get("/transactions/filter").json()["transactions"]}
+
+    edited = [
+        (ids["Dinner"], "2025-03-01", "Dinner", "-45.00", "Amex", "Meals", "Restaurant"),
+        (ids["Fuel"], "2025-03-02", "Fuel", "-30.00", "Amex", "Travel", "Gas, Road Trip"),
+        (ids["Rent"], "2025-03-03", "Rent", "-900.00", "Checking", "Home", "Housing"),
+        ("", "2025-03-04", "Coffee", "-4.00", "Amex", "Meals", ""),
+    ]
+    preview = upload_custom(client, edited, preview=True)["diff"]
+    assert (preview["new"], preview["updated"], preview["unchanged"]) == (1, 2, 1)
+    assert preview["new_names"]["cost_centers"] == ["Travel"]
+    assert [(row["id"], row["changes"]) for row in preview["sample"]["updated"]] == [
+        (ids["Dinner"], ["amount"]), (ids["Fuel"], ["cost_center", "spend_categories"]),
+    ]
+
+    result = upload_custom(client, edited)
+    assert (result["count"], result["updated"]) == (1, 2)
+
+    rows = {row["description"]: row for row in client.get("/transactions/filter").json()["transactions"]}
+    assert len(rows) == 4
+    assert rows["Dinner"]["amount"] == -45.0
+    assert rows["Fuel"]["cost_center"]["name"] == "Travel"
+    assert {c["name"] for c in rows["Fuel"]["spend_categories"]} == {"Gas", "Road Trip"}
+    assert "Car" not in {c["name"] for c in client.get("/transactions/cost_centers").json()["cost_centers"]}
+    distribution = client.get("/transactions/distribution", params={"account": "Amex"}).json()
+    assert (distribution["count"], distribution["min"]) == (3, -45.0)
+
+
+def test_reimported_rows_of_archived_years_are_left_as_is(client):
+    upload_custom(client, [
+        ("", "2019-03-01", "Old coffee", "-3.00", "Amex", "Meals", "Restaurant"),
+        ("", "2025-03-01", "Dinner", "-40.00", "Amex", "Meals", "Restaurant"),
+    ])
+    archive.archive_year(client.app.state.engine, 2019)
+    exported = client.get("/transactions/filter").json()["transactions"]
+    assert {row["description"] for row in exported} == {"Old coffee", "Dinner"}
+
+    edited = [
+        (row["id"], row["date"], row["description"], "-5.00", row["account"], row["cost_center"]["name"], "Restaurant")
+        for row in exported
+    ]
+    preview = upload_custom(client, edited, preview=True)["diff"]
+    assert (preview["new"], preview["updated"], preview["archived"]) == (0, 1, 1)
+
+    result = upload_custom(client, edited)
+    assert (result["count"], result["updated"], result["archived"]) == (0, 1, 1)
+    rows = client.get("/transactions/filter").json()["transactions"]
+    assert sorted((row["id"], row["description"], row["amount"]) for row in rows) == sorted(
+        (row["id"], row["description"], -3.0 if row["description"] == "Old coffee" else -5.0) for row in exported
+    )
+
+
+# ---------------------------
+# Migration
+# ---------------------------
+def test_upgrade_adds_imports_table(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path}/v3.db")
+    init_db(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE imports")
+        conn.exec_driver_sql("PRAGMA user_version = 3")
+
+    upgrade(engine)
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA user_version").scalar() == SCHEMA_VERSION
+    with make_sessionmaker(engine)() as db:
+        assert imports.get_watermarks(db) == {}
+    engine.dispose()
@@ -0,0 +1,121 @@
+import datetime
+import gc
+import weakref
+
+from fastapi.testclient import TestClient
+import pytest
+
+from app import columnar, recurring, suggest
+from app.columnar import get_snapshot
+from app.config import Settings
+from app.crud import dimensions
+from app.main import create_app
+
+
+def make_client(tmp_path, **overrides):
+    settings = Settings(database_url = f"sqlite:///{tmp_path}/default.db", ledger_idle_seconds = 0, **overrides)
+    return TestClient(create_app(settings))
+
+
+def create(client, description, ledger=None):
+    txn = {
+        "date": str(datetime.date(2025, 3, 15)),
+        "description": description,
+        "amount": -4.5,
+        "account": "Chase",
+        "cost_center": "Meals",
+        "spend_categories": ["Coffee"],
+    }
+    headers = {"X-Ledger": ledger} if ledger else {}
+    response = client.post("/transactions/", json=txn, headers=headers)
+    assert response.status_code == 200, response.text
+
+
+def descriptions(client, ledger=None):
+    headers = {"X-Ledger": ledger} if ledger else {}
+    return [t["description"] for t in client.get("/transactions/", headers=headers).json()["transactions"]]
+
+
+# ---------------------------
+# Ledger tests
+# ---------------------------
+def test_each_ledger_has_its_own_database(tmp_path):
+    with make_client(tmp_path) as client:
+        create(client, "Default coffee")
+        create(client, "Alice coffee", ledger="alice")
+        create(client, "Bob coffee", ledger="bob")
+
+        assert descriptions(client) == ["Default coffee"]
+        assert descriptions(client, "alice") == ["Alice coffee"]
+        assert descriptions(client, "default") == ["Default coffee"]
+        assert client.get("/transactions/accounts", headers={"X-Ledger": "carol"}).json() == []
+
+    assert sorted(p.name for p in (tmp_path / "ledgers").glob("*.db")) == ["alice.db", "bob.db", "carol.db"]
+    client.app.state.engine.dispose()
+
+
+def test_least_recently_used_ledger_is_closed_past_the_limit(tmp_path):
+    with make_client(tmp_path, max_open_ledgers = 2) as client:
+        registry = client.app.state.ledgers
+        for name in ("a", "b", "c"):
+            create(client, f"{name} coffee", ledger=name)
+        assert registry.open_names == ["b", "c"]
+
+        descriptions(client, "b")
+        create(client, "a again", ledger="a")  # reopened from its file; "c" is now least recent
+        assert registry.open_names == ["b", "a"]
+        assert descriptions(client, "a") == ["a coffee", "a again"]
+
+    client.app.state.engine.dispose()
+
+
+def test_idle_ledgers_are_closed(tmp_path):
+    with make_client(tmp_path) as client:
+        registry = client.app.state.ledgers
+        create(client, "Alice coffee", ledger="alice")
+        engine = registry._open["alice"].engine
+
+        registry.idle_seconds = 3600
+        assert client.portal.call(registry.evict_idle) == []
+        registry.idle_seconds = 0
+        assert client.portal.call(registry.evict_idle) == ["alice"]
+        assert registry.open_names == []
+        assert engine.pool.checkedout() == 0
+
+        assert descriptions(client, "alice") == ["Alice coffee"]
+
+    client.app.state.engine.dispose()
+
+
+def test_closed_ledgers_leave_no_caches_behind(tmp_path):
+    names = [f"ledger{i}" for i in range(5)]
+    with make_client(tmp_path) as client:
+        registry = client.app.state.ledgers
+        for name in names:
+            create(client, f"{name} coffee", ledger=name)
+            headers = {"X-Ledger": name}
+            assert client.get("/transactions/suggest", params={"q": "led"}, headers=headers).status_code == 200
+            assert client.get("/transactions/recurring", headers=headers).status_code == 200
+            get_snapshot(registry._open[name].engine)
+        engines = [weakref.ref(registry._open[name].engine) for name in names]
+        caches = (recurring._indexes, suggest._indexes, dimensions._caches, columnar._snapshots)
+        for cache in caches:
+            assert all(engine() in cache for engine in engines)
+
+        assert client.portal.call(registry.evict_idle) == names
+        gc.collect()
+        assert all(engine() is None for engine in engines)
+        for cache in caches:
+            assert not any(engine() in cache for engine in engines)
+
+    client.app.state.engine.dispose()
+
+
+@pytest.mark.parametrize("name", ["../escape", "a" * 65, "bad name"])
+def test_invalid_ledger_names_are_rejected(tmp_path, name):
+    with make_client(tmp_path) as client:
+        response = client.get("/transactions/", headers={"X-Ledger": name})
+        assert response.status_code == 400
+        assert client.app.state.ledgers.open_names == []
+
+    client.app.state.engine.dispose()
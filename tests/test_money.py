@@ -0,0 +1,124 @@
+import datetime
+import sqlite3
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app import schemas
+from app.crud import operations
+from app.migrations import SCHEMA_VERSION, get_version, upgrade
+from app.models import Base, Transaction
+from app.money import from_cents, parse_cents, to_cents
+
+
+# ---------------------------
+# Conversion tests
+# ---------------------------
+def test_to_cents_is_exact():
+    assert to_cents(0.1 + 0.2) == 30
+    assert to_cents(-4.5) == -450
+    assert to_cents("19.995") == 2000
+    assert to_cents(Decimal("-0.005")) == -1
+    assert from_cents(-1999) == Decimal("-19.99")
+
+
+@pytest.mark.parametrize("text, cents", [
+    ("$1,234.56", 123456),
+    ("-12.5", -1250),
+    ("(3.00)", -300),
+    (" 7 ", 700),
+])
+def test_parse_cents(text, cents):
+    assert parse_cents(text) == cents
+
+
+def test_parse_cents_rejects_garbage():
+    with pytest.raises(ValueError):
+        parse_cents("abc")
+
+
+# ---------------------------
+# Storage / aggregation tests
+# ---------------------------
+def test_sums_are_exact_over_many_rows(db):
+    for _ in range(200):
+        operations.create_transaction(db, schemas.TransactionCreate(
+            date = datetime.date(2025, 1, 1),
+            description = "Dime",
+            amount = 0.1,
+            account = "Discover",
+        ))
+
+    assert operations.get_summary(db)["total"] == 20.0
+    assert sum(t.amount for t in operations.get_transactions(db)) == Decimal("20")
+
+
+def test_amount_range_filter_uses_cents(db):
+    operations.create_transaction(db, schemas.TransactionCreate(
+        date = datetime.date(2025, 1, 1),
+        description = "Edge",
+        amount = 0.3,
+        account = "Discover",
+    ))
+
+    assert len(operations.get_transactions(db, min_amount=0.1 + 0.2)) == 1
+    assert len(operations.get_transactions(db, max_amount=0.29)) == 0
+
+
+# ---------------------------
+# Migration tests
+# ---------------------------
+def test_upgrade_converts_float_amounts(tmp_path):
+    path = tmp_path / "legacy.db"
+    legacy = sqlite3.connect(path)
+    legacy.executescript("""
+        CREATE TABLE cost_centers (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL UNIQUE);
+        CREATE TABLE spend_categories (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL UNIQUE);
+        CREATE TABLE transactions (
+            id INTEGER PRIMARY KEY, date DATE NOT NULL, description VARCHAR NOT NULL,
+            amount FLOAT NOT NULL, account VARCHAR NOT NULL,
+            cost_center_id INTEGER REFERENCES cost_centers(id) ON DELETE SET NULL
+        );
+        CREATE TABLE transaction_spend_categories (
+            transaction_id INTEGER, spend_category_id INTEGER,
+            PRIMARY KEY (transaction_id, spend_category_id)
+        );
+        INSERT INTO cost_centers VALUES (1, 'Meals');
+        INSERT INTO transactions VALUES (1, '2025-01-01', 'Coffee', -4.35, 'Discover', 1);
+        INSERT INTO transactions VALUES (2, '2025-01-02', 'Refund', 0.29, 'Discover', 1);
+    """)
+    legacy.commit()
+    legacy.close()
+
+    engine = create_engine(f"sqlite:///{path}")
+    upgrade(engine)
+
+    with engine.connect() as conn:
+        assert get_version(conn) == SCHEMA_VERSION
+    with Session(engine) as db:
+        cents = [t.amount_cents for t in db.query(Transaction).order_by(Transaction.id)]
+        assert cents == [-435, 29]
+    engine.dispose()
+
+
+def test_upgrade_backfills_accounts_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/v1.db")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE accounts")
+        conn.exec_driver_sql(
+            "INSERT INTO transactions (date, description, amount_cents, account) VALUES "
+            "('2025-01-01', 'Coffee', -525, 'Discover'), ('2025-01-02', 'Rent', -120000, 'Schwab Checking'), "
+            "('2025-01-03', 'Lunch', -1200, 'Discover')"
+        )
+        conn.exec_driver_sql("PRAGMA user_version = 1")
+
+    upgrade(engine)
+
+    with engine.connect() as conn:
+        assert get_version(conn) == SCHEMA_VERSION
+        names = [name for (name,) in conn.exec_driver_sql("SELECT name FROM accounts ORDER BY name")]
+    assert names == ["Discover", "Schwab Checking"]
+    engine.dispose()
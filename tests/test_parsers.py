@@ -1,9 +1,11 @@
 import os
 import tempfile
 import csv
+import datetime
 import pytest
 
 from app import parsers
+from app.records import NO_CATEGORIES, ParsedTransaction
 
 
 def make_temp_csv(headers, rows):
@@ -31,8 +33,8 @@ def test_load_discover_csv_success():
     os.unlink(file_path)
 
     assert len(txns) == 1
-    assert txns[0]["account"] == "Discover"
-    assert txns[0]["amount"] == -3.50  # Positive CSV amount becomes negative expense
+    assert txns[0].account == "Discover"
+    assert txns[0].amount_cents == -350  # Positive CSV amount becomes negative expense
 
 
 def test_load_discover_csv_credit():
@@ -47,8 +49,8 @@ def test_load_discover_csv_credit():
     os.unlink(file_path)
 
     assert len(txns) == 1
-    assert txns[0]["account"] == "Discover"
-    assert txns[0]["amount"] == 25.00  # Negative CSV amount becomes positive credit
+    assert txns[0].account == "Discover"
+    assert txns[0].amount_cents == 2500  # Negative CSV amount becomes positive credit
 
 
 def test_load_discover_csv_wrong_headers():
@@ -79,8 +81,8 @@ def test_load_schwab_csv_success():
     os.unlink(file_path)
 
     assert len(txns) == 1
-    assert txns[0]["account"] == "Schwab Checking"
-    assert txns[0]["amount"] == 1500.0
+    assert txns[0].account == "Schwab Checking"
+    assert txns[0].amount_cents == 150000
 
 
 def test_load_schwab_csv_wrong_headers():
@@ -97,6 +99,96 @@ def test_load_schwab_csv_wrong_headers():
     assert "Schwab Checking export" in str(e.value)
 
 
+def test_watermark_skips_rows_on_or_before_it():
+    file_path = make_temp_csv(
+        headers=["Trans. Date", "Description", "Amount", "Category"],
+        rows=[{"Trans. Date": day, "Description": "Coffee", "Amount": "3.50", "Category": "Food"}
+              for day in ["07/30/2023", "07/31/2023", "08/01/2023"]]
+    )
+
+    watermarks = parsers.Watermarks({"Discover": datetime.date(2023, 7, 31)})
+    txns = parsers.parse_csv(file_path, "Discover", watermarks)
+    os.unlink(file_path)
+
+    assert [t.date for t in txns] == [datetime.date(2023, 8, 1)]
+    assert watermarks.skipped == {"Discover": 2}
+
+
+def test_watermark_keeps_rows_before_its_start():
+    file_path = make_temp_csv(
+        headers=["Trans. Date", "Description", "Amount", "Category"],
+        rows=[{"Trans. Date": day, "Description": "Coffee", "Amount": "3.50", "Category": "Food"}
+              for day in ["06/30/2023", "07/01/2023", "07/31/2023", "08/01/2023"]]
+    )
+
+    watermarks = parsers.Watermarks({"Discover": datetime.date(2023, 7, 31)}, {"Discover": datetime.date(2023, 7, 1)})
+    txns = parsers.parse_csv(file_path, "Discover", watermarks)
+    os.unlink(file_path)
+
+    assert [t.date for t in txns] == [datetime.date(2023, 6, 30), datetime.date(2023, 8, 1)]
+    assert watermarks.skipped == {"Discover": 2}
+
+
+def test_custom_rows_with_an_id_bypass_watermarks():
+    headers = ["ID", "Date", "Description", "Amount", "Account", "Cost Center", "Spend Categories"]
+    file_path = make_temp_csv(
+        headers=headers,
+        rows=[dict(zip(headers, row)) for row in [
+            ["7", "2023-07-01", "Coffee", "-3.50", "Amex", "Food", "Cafe, Treats"],
+            ["", "2023-07-02", "Coffee", "-3.50", "Amex", "Food", ""],
+            ["", "2023-08-01", "Lunch", "-12.00", "Amex", "Food", ""],
+        ]]
+    )
+
+    watermarks = parsers.Watermarks({"Amex": datetime.date(2023, 7, 31)})
+    txns = parsers.parse_csv(file_path, "custom", watermarks)
+    os.unlink(file_path)
+
+    assert [(t.id, t.description) for t in txns] == [(7, "Coffee"), (None, "Lunch")]
+    assert txns[0].spend_categories == ("Cafe", "Treats")
+    assert watermarks.skipped == {"Amex": 1}
+
+
+# ---------------------------
+# Record tests
+# ---------------------------
+def test_parsed_rows_share_names_and_empty_categories():
+    file_path = make_temp_csv(
+        headers=["Trans. Date", "Description", "Amount", "Category"],
+        rows=[{"Trans. Date": "08/01/2023", "Description": f"Coffee {i}",
+               "Amount": "3.50", "Category": "Fo" + "od"} for i in range(3)]
+    )
+
+    txns = parsers.load_discover_csv(file_path)
+    os.unlink(file_path)
+
+    assert all(t.cost_center is txns[0].cost_center for t in txns)
+    assert all(t.account is txns[0].account for t in txns)
+    assert all(t.spend_categories is NO_CATEGORIES for t in txns)
+    assert not hasattr(txns[0], "__dict__")
+
+
+def test_parsed_transaction_dict_round_trip():
+    row = {
+        "date": datetime.date(2024, 1, 2),
+        "description": "Groceries",
+        "amount_cents": -4200,
+        "account": "Amex",
+        "cost_center": "",
+        "spend_categories": ["Food", "Home"],
+    }
+
+    record = ParsedTransaction.from_dict(row)
+
+    assert record.cost_center is None
+    assert record.spend_categories == ("Food", "Home")
+    assert ParsedTransaction.from_dict(record.as_dict()) == record
+
+    # Rows in the old dict shape carry dollars
+    legacy = {key: value for key, value in row.items() if key != "amount_cents"}
+    assert ParsedTransaction.from_dict({**legacy, "amount": -42.0}) == record
+
+
 # ---------------------------
 # Router tests
 # ---------------------------
@@ -111,7 +203,7 @@ def test_parse_csv_routes_to_discover():
     os.unlink(file_path)
 
     assert len(txns) == 1
-    assert txns[0]["account"] == "Discover"
+    assert txns[0].account == "Discover"
 
 
 def test_parse_csv_unknown_institution():
@@ -0,0 +1,76 @@
+import os
+import pstats
+
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.main import create_app
+from app.profiling import StageTimer
+
+
+CSV = b"Trans. Date,Description,Amount,Category\n03/01/2025,Coffee,3.50,Food\n03/02/2025,Lunch,12.00,Food\n"
+
+
+def make_client(tmp_path, **overrides):
+    settings = Settings(database_url=f"sqlite:///{tmp_path}/profiling.db", profile_dir=str(tmp_path / "profiles"), **overrides)
+    return TestClient(create_app(settings))
+
+
+# ---------------------------
+# Stage timings
+# ---------------------------
+def test_stage_timer_accumulates_in_order():
+    timer = StageTimer()
+    with timer.stage("parse"):
+        pass
+    timer.add("insert", 0.002)
+    timer.add("insert", 0.001)
+
+    timings = timer.as_dict()
+    assert list(timings) == ["parse_ms", "insert_ms", "total_ms"]
+    assert timings["insert_ms"] == 3.0
+
+
+def test_upload_reports_stage_timings(tmp_path):
+    with make_client(tmp_path) as client:
+        response = client.post(
+            "/transactions/upload-csv",
+            data = {"institution": "discover"},
+            files = {"file": ("export.csv", CSV, "text/csv")},
+        )
+    timings = response.json()["timings"]
+    for stage in ("read", "hash", "watermarks", "parse", "queue", "stage", "dimensions", "insert", "commit", "total"):
+        assert timings[f"{stage}_ms"] >= 0
+
+
+# ---------------------------
+# Request profiles
+# ---------------------------
+def test_profile_header_is_ignored_unless_enabled(tmp_path):
+    with make_client(tmp_path) as client:
+        response = client.get("/transactions/filter", headers={"X-Profile": "cprofile"})
+    assert "X-Profile-File" not in response.headers
+    assert not os.path.exists(tmp_path / "profiles")
+
+
+def test_cprofile_and_sampling_profiles_are_saved(tmp_path):
+    with make_client(tmp_path, profiling=True) as client:
+        plain = client.get("/transactions/filter")
+        assert "X-Profile-File" not in plain.headers
+
+        profiled = client.get("/transactions/filter", headers={"X-Profile": "cprofile"})
+        assert profiled.status_code == 200
+        path = profiled.headers["X-Profile-File"]
+        assert path.endswith("-get-transactions_filter.prof")
+        assert int(profiled.headers["X-Profile-Peak-KB"]) >= 0
+        assert pstats.Stats(path).total_calls > 0
+
+        sampled = client.post(
+            "/transactions/upload-csv",
+            data = {"institution": "discover"},
+            files = {"file": ("export.csv", CSV, "text/csv")},
+            headers = {"X-Profile": "sample"},
+        )
+        assert sampled.status_code == 200
+        assert sampled.headers["X-Profile-File"].endswith(".txt")
+        assert os.path.exists(sampled.headers["X-Profile-File"])
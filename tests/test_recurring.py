@@ -0,0 +1,100 @@
+import datetime
+
+from app import recurring
+from app.recurring import Charge, detect, normalize_merchant
+
+
+def charges(*rows):
+    return [
+        Charge(datetime.date.fromisoformat(day), i, cents, None, "NETFLIX.COM")
+        for i, (day, cents) in enumerate(rows, start=1)
+    ]
+
+
+def months_before(today, n):
+    """The 15th of the month n months before today's."""
+    month = today.month - 1 - n
+    return datetime.date(today.year + month // 12, month % 12 + 1, 15)
+
+
+def upload(client, rows):
+    lines = ["Date,Description,Amount,Account,Cost Center,Spend Categories"]
+    lines += [f"{day.isoformat()},{description},{amount},Amex,Media," for day, description, amount in rows]
+    response = client.post(
+        "/transactions/upload-csv",
+        data = {"institution": "custom"},
+        files = {"file": ("export.csv", ("\n".join(lines) + "\n").encode(), "text/csv")},
+    )
+    assert response.status_code == 200, response.text
+
+
+# ---------------------------
+# Detection tests
+# ---------------------------
+def test_normalize_merchant_drops_reference_numbers_and_prefixes():
+    assert normalize_merchant("NETFLIX.COM 866-579-7172 CA") == normalize_merchant("Netflix.com 844-505-2993 CA")
+    assert normalize_merchant("SQ *BLUE BOTTLE #0142") == "blue bottle"
+    assert normalize_merchant("12345") == "12345"
+
+
+def test_monthly_run_tolerates_small_price_changes():
+    found = detect(("Amex", "netflix.com"), charges(
+        ("2025-01-31", -1549), ("2025-02-28", -1549), ("2025-03-31", -1549), ("2025-04-30", -1699),
+    ))
+
+    assert (found.period, found.occurrences, found.amount_cents) == ("monthly", 4, -1699)
+    assert found.first_date == datetime.date(2025, 1, 31)
+    assert found.next_date == datetime.date(2025, 5, 31)  # keeps the run's day of month
+
+
+def test_run_restarts_after_a_large_amount_change():
+    found = detect(("Amex", "gym"), charges(
+        ("2025-01-05", -3000), ("2025-02-05", -3000), ("2025-03-05", -3000),
+        ("2025-04-05", -9000), ("2025-05-05", -9000),
+    ))
+    assert found is None  # only two charges at the new price
+
+    weekly = detect(("Amex", "gym"), charges(*[(f"2025-06-{day:02d}", -1200) for day in (2, 9, 16, 23)]))
+    assert (weekly.period, weekly.next_date) == ("weekly", datetime.date(2025, 6, 30))
+
+
+def test_annual_and_irregular_charges():
+    annual = detect(("Amex", "domain"), charges(("2023-03-10", -1200), ("2024-03-11", -1200)))
+    assert (annual.period, annual.next_date) == ("annual", datetime.date(2025, 3, 11))
+
+    assert detect(("Amex", "grocer"), charges(("2025-01-02", -5000), ("2025-01-19", -5000), ("2025-02-01", -5000))) is None
+
+
+# ---------------------------
+# Endpoint tests
+# ---------------------------
+def test_recurring_endpoint_is_updated_after_imports_and_deletes(client):
+    today = datetime.date.today()
+    upload(client, [(months_before(today, n), f"SPOTIFY P{n}3F2 STOCKHOLM", "-11.99") for n in (3, 2)])
+    upload(client, [(months_before(today, 1), "Corner Deli", "-8.00")])
+
+    assert client.get("/transactions/recurring").json()["count"] == 0
+    assert recurring.get_index(client.app.state.engine)._built
+
+    # Uploads stay above the account's watermark
+    upload(client, [(months_before(today, 1), "SPOTIFY P93F2 STOCKHOLM", "-11.99"), (today, "Corner Deli", "-23.50")])
+    body = client.get("/transactions/recurring").json()
+
+    assert body["count"] == 1
+    charge = body["charges"][0]
+    assert (charge["merchant"], charge["period"], charge["occurrences"]) == ("spotify stockholm", "monthly", 3)
+    assert (charge["next_amount"], charge["cost_center"], charge["active"]) == (-11.99, "Media", True)
+    assert charge["next_date"] == recurring.next_date(months_before(today, 1), "monthly", 15).isoformat()
+
+    latest = client.get("/transactions/filter", params={"search": "spotify"}).json()["transactions"]
+    newest = max(latest, key=lambda t: t["date"])
+    assert client.delete(f"/transactions/{newest['id']}").status_code == 200
+    assert client.get("/transactions/recurring").json()["count"] == 0
+
+
+def test_stopped_runs_are_listed_only_on_request(client):
+    upload(client, [(datetime.date(2020, month, 1), "Old Magazine", "-4.99") for month in (1, 2, 3)])
+
+    assert client.get("/transactions/recurring").json()["count"] == 0
+    stopped = client.get("/transactions/recurring", params={"include_inactive": True}).json()["charges"]
+    assert [(c["merchant"], c["active"]) for c in stopped] == [("old magazine", False)]
@@ -0,0 +1,112 @@
+import math
+import random
+import statistics
+
+from app.sketches import KLLSketch, Moments
+
+
+# ---------------------------
+# Accuracy tests
+# ---------------------------
+def test_small_sketch_is_exact():
+    sketch = KLLSketch()
+    for value in [5, 1, 4, 2, 3]:
+        sketch.update(value)
+
+    assert sketch.n == 5
+    assert sketch.min == 1
+    assert sketch.max == 5
+    assert sketch.quantile(0.5) == 3
+    assert sketch.rank(2) == 2
+
+
+def test_large_sketch_quantiles_within_error_bound():
+    rng = random.Random(42)
+    values = [rng.uniform(-500, 0) for _ in range(50_000)]
+
+    sketch = KLLSketch(k=200)
+    for value in values:
+        sketch.update(value)
+
+    ordered = sorted(values)
+    for q in (0.5, 0.9, 0.99):
+        estimate = sketch.quantile(q)
+        true_rank = sum(1 for v in ordered if v <= estimate) / len(ordered)
+        assert abs(true_rank - q) < 0.02
+
+    # Memory stays bounded regardless of stream length
+    assert sum(len(level) for level in sketch.compactors) < 1000
+
+
+def test_update_many_matches_single_updates():
+    rng = random.Random(3)
+    values = [rng.randrange(-50_000, 0) for _ in range(20_000)]
+
+    one_by_one, batched = KLLSketch(k=50), KLLSketch(k=50)
+    for value in values:
+        one_by_one.update(value)
+    batched.update_many(values[:7])
+    batched.update_many(values[7:])
+
+    assert batched.to_dict() == one_by_one.to_dict()
+
+
+# ---------------------------
+# Merge / serialization tests
+# ---------------------------
+def test_merge_matches_combined_stream():
+    left, right = KLLSketch(), KLLSketch()
+    for value in range(0, 5000):
+        left.update(value)
+    for value in range(5000, 10000):
+        right.update(value)
+
+    merged = left.merge(right)
+    assert merged.n == 10000
+    assert merged.min == 0
+    assert merged.max == 9999
+    assert abs(merged.quantile(0.5) - 5000) < 200
+
+
+def test_round_trip_serialization():
+    sketch = KLLSketch(k=50)
+    for value in range(1000):
+        sketch.update(value)
+
+    restored = KLLSketch.from_dict(sketch.to_dict())
+    assert restored.n == sketch.n
+    assert restored.quantile(0.9) == sketch.quantile(0.9)
+
+    restored.update(1000)
+    assert restored.max == 1000
+
+
+def test_histogram_counts_sum_to_total():
+    sketch = KLLSketch()
+    for value in range(100):
+        sketch.update(value)
+
+    histogram = sketch.histogram(bins=10)
+    assert len(histogram) == 10
+    assert sum(b["count"] for b in histogram) == 100
+    assert histogram[0]["lower"] == 0
+    assert histogram[-1]["upper"] == 99
+
+
+# ---------------------------
+# Running moments tests
+# ---------------------------
+def test_moments_remove_undoes_add():
+    rng = random.Random(3)
+    values = [rng.uniform(-500, 50) for _ in range(1000)]
+
+    moments = Moments()
+    for value in values:
+        moments.add(value)
+    for value in values[:400]:
+        moments.remove(value)
+
+    assert moments.n == 600
+    assert math.isclose(moments.mean, statistics.mean(values[400:]), abs_tol=1e-9)
+    assert math.isclose(moments.std, statistics.stdev(values[400:]), rel_tol=1e-9)
+    assert math.isclose(moments.without(values[-1]).mean, statistics.mean(values[400:-1]), abs_tol=1e-9)
@@ -0,0 +1,186 @@
+import datetime
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from app import archive, schemas, snapshots
+from app.config import Settings
+from app.crud import distributions, operations
+from app.database import init_db, make_engine, make_sessionmaker
+from app.main import create_app
+from app.models import Account, SpendCategory, Transaction
+
+pytest.importorskip("pyarrow")
+
+
+def make_txn(day, description, amount, cost_center, categories, account):
+    return schemas.TransactionCreate(
+        date = day,
+        description = description,
+        amount = amount,
+        account = account,
+        cost_center_name = cost_center,
+        spend_category_names = categories,
+    )
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path}/ledger.db")
+    init_db(engine)
+    with make_sessionmaker(engine)() as db:
+        for txn in [
+            make_txn(datetime.date(2019, 3, 1), "Old coffee", -4.5, "Meals", ["Food"], "Discover"),
+            make_txn(datetime.date(2025, 1, 2), "Dinner", -45.0, "Meals", ["Food", "Fun"], "Amex"),
+            make_txn(datetime.date(2025, 1, 3), "Paycheck", 2000.0, "Income", [], "Schwab Checking"),
+        ]:
+            operations.create_transaction(db, txn)
+    yield engine
+    engine.dispose()
+
+
+def ledger(db):
+    return sorted(
+        (t.id, t.date, t.description, t.amount_cents, t.account,
+         t.cost_center.name, sorted(c.name for c in t.spend_categories))
+        for t in operations.get_transactions(db)
+    )
+
+
+# ---------------------------
+# Round trip
+# ---------------------------
+def test_export_then_import_restores_the_ledger(engine, tmp_path):
+    archive.archive_year(engine, 2019)
+    counts = snapshots.export_ledger(engine, str(tmp_path / "snapshot"), row_group_size=2)
+    assert counts == {
+        "cost_centers": 2, "spend_categories": 3, "transactions": 3, "transaction_spend_categories": 4,
+    }
+
+    restored = make_engine(f"sqlite:///{tmp_path}/restored.db")
+    init_db(restored)
+    with make_sessionmaker(restored)() as db:
+        assert snapshots.import_ledger(db, str(tmp_path / "snapshot")) == counts
+        with make_sessionmaker(engine)() as original:
+            assert ledger(db) == ledger(original)
+
+        # Derived tables are rebuilt from the loaded rows
+        assert operations.get_unique_accounts(db) == ["Amex", "Discover", "Schwab Checking"]
+        assert distributions.get_distribution(db)["count"] == 3
+
+        # New ids continue after the restored ones
+        created = operations.create_transaction(
+            db, make_txn(datetime.date(2025, 2, 1), "Later", -1.0, "Meals", [], "Amex")
+        )
+        assert created.id == 4
+    restored.dispose()
+
+
+def test_export_reads_archived_years_a_few_at_a_time(engine, tmp_path, monkeypatch):
+    with make_sessionmaker(engine)() as db:
+        operations.create_transaction(db, make_txn(datetime.date(2018, 5, 1), "Older coffee", -4.0, "Meals", ["Food"], "Discover"))
+    archive.archive_year(engine, 2018)
+    archive.archive_year(engine, 2019)
+    monkeypatch.setattr(archive, "MAX_ATTACHED", 1)  # more archived years than one query can attach
+
+    counts = snapshots.export_ledger(engine, str(tmp_path / "snapshot"))
+    assert (counts["transactions"], counts["transaction_spend_categories"]) == (4, 5)
+
+    restored = make_engine(f"sqlite:///{tmp_path}/restored.db")
+    init_db(restored)
+    with make_sessionmaker(restored)() as db:
+        snapshots.import_ledger(db, str(tmp_path / "snapshot"))
+        assert [row[2] for row in ledger(db)] == ["Old coffee", "Dinner", "Paycheck", "Older coffee"]
+    restored.dispose()
+
+
+def test_import_needs_an_empty_ledger(engine, tmp_path):
+    snapshots.export_ledger(engine, str(tmp_path / "snapshot"))
+    with make_sessionmaker(engine)() as db:
+        with pytest.raises(ValueError, match="empty ledger"):
+            snapshots.import_ledger(db, str(tmp_path / "snapshot"))
+
+
+def test_import_rejects_leftover_accounts(engine, tmp_path):
+    snapshots.export_ledger(engine, str(tmp_path / "snapshot"))
+    restored = make_engine(f"sqlite:///{tmp_path}/restored.db")
+    init_db(restored)
+    with make_sessionmaker(restored)() as db:
+        db.add(Account(name = "Amex"))
+        db.commit()
+        with pytest.raises(ValueError, match="empty ledger"):
+            snapshots.import_ledger(db, str(tmp_path / "snapshot"))
+    restored.dispose()
+
+
+def test_import_upgrades_an_older_snapshot(engine, tmp_path):
+    import pyarrow.parquet as pq
+
+    directory = tmp_path / "snapshot"
+    snapshots.export_ledger(engine, str(directory))
+    # Rewrite it as a v4 snapshot: no category bits or masks, no anomaly scores
+    dropped = {"spend_categories": ["bit"], "transactions": ["category_mask", "anomaly_score"]}
+    for path in directory.iterdir():
+        table = pq.read_table(path)
+        table = table.drop_columns(dropped.get(path.stem, []))
+        pq.write_table(table.replace_schema_metadata({b"finance.schema_version": b"4"}), path)
+
+    restored = make_engine(f"sqlite:///{tmp_path}/restored.db")
+    init_db(restored)
+    with make_sessionmaker(restored)() as db:
+        snapshots.import_ledger(db, str(directory))
+        with make_sessionmaker(engine)() as original:
+            assert ledger(db) == ledger(original)
+        # The v5 step handed out bits and rebuilt the masks from the links
+        assert db.scalar(select(func.count()).select_from(SpendCategory).where(SpendCategory.bit.is_(None))) == 0
+        dinner = db.scalar(select(Transaction).where(Transaction.description == "Dinner"))
+        assert dinner.category_mask == sum(1 << c.bit for c in dinner.spend_categories)
+    restored.dispose()
+
+
+def test_import_rejects_a_newer_snapshot(engine, tmp_path):
+    import pyarrow.parquet as pq
+
+    directory = tmp_path / "snapshot"
+    snapshots.export_ledger(engine, str(directory))
+    for path in directory.iterdir():
+        table = pq.read_table(path)
+        version = str(snapshots.SCHEMA_VERSION + 1).encode()
+        pq.write_table(table.replace_schema_metadata({b"finance.schema_version": version}), path)
+
+    restored = make_engine(f"sqlite:///{tmp_path}/restored.db")
+    init_db(restored)
+    with make_sessionmaker(restored)() as db:
+        with pytest.raises(ValueError, match="can't be restored"):
+            snapshots.import_ledger(db, str(directory))
+    restored.dispose()
+
+
+# ---------------------------
+# API
+# ---------------------------
+def test_download_and_restore_through_the_api(engine, tmp_path):
+    source = create_app(Settings(database_url=str(engine.url)))
+    target = create_app(Settings(database_url=f"sqlite:///{tmp_path}/target.db"))
+
+    with TestClient(source) as source_client, TestClient(target) as target_client:
+        download = source_client.get("/snapshots/parquet")
+        assert download.status_code == 200
+        assert download.headers["content-type"] == "application/zip"
+
+        response = target_client.post(
+            "/snapshots/parquet", files={"file": ("ledger.zip", io.BytesIO(download.content), "application/zip")}
+        )
+        assert response.status_code == 200, response.text
+        assert response.json()["counts"]["transactions"] == 3
+
+        rows = target_client.get("/transactions/").json()["transactions"]
+        assert sorted(r["description"] for r in rows) == ["Dinner", "Old coffee", "Paycheck"]
+
+        # A second restore would duplicate ids
+        again = target_client.post(
+            "/snapshots/parquet", files={"file": ("ledger.zip", io.BytesIO(download.content), "application/zip")}
+        )
+        assert again.status_code == 400
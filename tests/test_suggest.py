@@ -0,0 +1,154 @@
+import datetime
+import random
+
+from app import events, suggest
+from app.database import init_db, make_engine
+from app.suggest import index_keys
+
+
+def create(client, description, date, amount=-4.5):
+    txn = {"date": str(date), "description": description, "amount": amount, "account": "Chase"}
+    response = client.post("/transactions/", json=txn)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def suggestions(client, q, **params):
+    response = client.get("/transactions/suggest", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return [s["description"] for s in response.json()["suggestions"]]
+
+
+# ---------------------------
+# Index tests
+# ---------------------------
+def test_index_keys_cover_each_word():
+    assert index_keys("  Blue  Bottle COFFEE #142 ") == ["blue bottle coffee #142", "bottle coffee #142", "coffee #142"]
+
+
+def test_ranking_prefers_frequent_and_recent_descriptions():
+    index = suggest.SuggestIndex(engine=None)
+    index._built = True
+    today = datetime.date(2025, 6, 1)
+    rows = [(1, "Coffee Shop", "2025-05-30"), (2, "Coffee Shop", "2025-05-20"), (3, "Costco", "2025-05-31")]
+    rows += [(4 + i, "Coffee Roasters", "2023-01-01") for i in range(3)]  # more uses, but long ago
+    for row in rows:
+        index._add(row, index = True)
+
+    assert [s.description for s in index.suggest("co", today=today)] == ["Coffee Shop", "Costco", "Coffee Roasters"]
+    assert [s.description for s in index.suggest("ROAST", today=today)] == ["Coffee Roasters"]
+    assert index.suggest("co", limit=1, today=today)[0] == ("Coffee Shop", 2, datetime.date(2025, 5, 30))
+    assert index.suggest("  ", today=today) == []
+
+
+def test_ranked_prefix_tables_match_a_full_scan_after_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(suggest, "CACHE_RANGE", 8)  # store a top list for most prefixes
+    engine = make_engine(f"sqlite:///{tmp_path}/ledger.db")
+    init_db(engine)
+    rng = random.Random(3)
+    words = ["coffee", "corner", "costco", "cab", "deli", "dash", "market"]
+    today = datetime.date(2025, 6, 1)
+
+    def row():
+        day = today - datetime.timedelta(days=rng.randrange(400))
+        return (day.isoformat(), " ".join(rng.sample(words, 2)), -100, "Chase")
+
+    def execute(sql, params=()):
+        with engine.begin() as conn:
+            return conn.exec_driver_sql(sql, params)
+
+    def expected_scores(prefix, index):
+        # Last dates as the index keeps them (deletes don't move them back)
+        counts = execute("SELECT description, COUNT(*) FROM transactions GROUP BY description").fetchall()
+        return sorted(
+            (
+                round(count / (1 + (today.toordinal() - index._last[index._numbers[description]]) / suggest.RECENCY_DAYS), 9)
+                for description, count in counts
+                if any(key.startswith(prefix) for key in index_keys(description))
+            ),
+            reverse = True,
+        )
+
+    execute("INSERT INTO cost_centers (id, name) VALUES (1, 'Uncategorized')")
+    insert = "INSERT INTO transactions (date, description, amount_cents, account, cost_center_id) VALUES (?, ?, ?, ?, 1)"
+    for _ in range(60):
+        execute(insert, row())
+    index = suggest.SuggestIndex(engine)
+    index.refresh(today)
+    assert index._top
+
+    for _ in range(40):
+        if rng.random() < 0.6:
+            new_id = execute(insert, row()).lastrowid
+            changes = events.LedgerChanges(transaction_ids={new_id})
+        else:
+            old_id = rng.choice(execute("SELECT id FROM transactions").scalars().all())
+            execute("DELETE FROM transactions WHERE id = ?", (old_id,))
+            changes = events.LedgerChanges(deleted_ids={old_id})
+        index.apply(changes)
+
+        for prefix in ("c", "co", "d", "market", "x"):
+            found = index.suggest(prefix, limit=5, today=today)
+            assert [round(index._score(index._numbers[s.description]), 9) for s in found] == expected_scores(prefix, index)[:5]
+    engine.dispose()
+
+
+def test_bulk_changes_are_merged_into_the_index(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path}/ledger.db")
+    init_db(engine)
+    insert = "INSERT INTO transactions (date, description, amount_cents, account, cost_center_id) VALUES (?, ?, -100, 'Chase', 1)"
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO cost_centers (id, name) VALUES (1, 'Uncategorized')")
+        conn.exec_driver_sql(insert, [("2025-05-01", f"Old Shop {i}") for i in range(200)])
+    index = suggest.SuggestIndex(engine)
+    index.refresh()
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql(insert, [("2025-05-02", f"New Shop {i}") for i in range(200)])
+        deleted = conn.exec_driver_sql("DELETE FROM transactions WHERE description LIKE 'Old Shop 1%' RETURNING id").scalars().all()
+    # Well over INSORT_LIMIT keys added and dropped
+    index.apply(events.LedgerChanges(transaction_ids=set(range(201, 401)), deleted_ids=set(deleted)))
+
+    rebuilt = suggest.SuggestIndex(engine)
+    rebuilt.refresh()
+    assert index._keys == sorted(index._keys)
+    assert sorted(zip(index._keys, (index._descriptions[n] for n in index._key_numbers))) == sorted(
+        zip(rebuilt._keys, (rebuilt._descriptions[n] for n in rebuilt._key_numbers))
+    )
+    assert [s.description for s in index.suggest("old shop 1")] == []
+    engine.dispose()
+
+
+def test_lookups_on_the_event_loop_never_wait_for_the_lock():
+    index = suggest.SuggestIndex(engine=None)
+    index._built = True
+    index._day = datetime.date.today().toordinal()
+    index._add((1, "Coffee Shop", "2025-05-30"), index = True)
+
+    assert [s.description for s in index.try_suggest("co")] == ["Coffee Shop"]
+    with index._lock:
+        assert index.try_suggest("co") is None
+    assert index.try_suggest("co", today=datetime.date.today() + datetime.timedelta(days=1)) is None
+
+
+# ---------------------------
+# Endpoint tests
+# ---------------------------
+def test_suggestions_follow_creates_updates_and_deletes(client):
+    today = datetime.date.today()
+    first = create(client, "Blue Bottle Coffee", today)
+    create(client, "Blue Bottle Coffee", today)
+    create(client, "Bluebird Books", today)
+
+    assert suggestions(client, "blue") == ["Blue Bottle Coffee", "Bluebird Books"]
+    assert suggestions(client, "coff") == ["Blue Bottle Coffee"]
+
+    response = client.put(f"/transactions/{first}", json={"description": "Corner Deli"})
+    assert response.status_code == 200, response.text
+    assert suggestions(client, "corner") == ["Corner Deli"]
+
+    assert client.delete(f"/transactions/{first}").status_code == 200
+    assert suggestions(client, "corner") == []
+    assert suggestions(client, "blue", limit=1) == ["Blue Bottle Coffee"]  # still used once
+
+    assert client.get("/transactions/suggest", params={"q": ""}).status_code == 422
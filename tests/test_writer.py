@@ -0,0 +1,129 @@
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import events, schemas
+from app.config import Settings
+from app.crud import operations
+from app.database import init_db, make_engine, make_sessionmaker
+from app.main import create_app
+from app.models import Transaction
+from app.writer import WriteQueue
+
+
+def _txn(description, amount=-10.0, account="Discover"):
+    return schemas.TransactionCreate(
+        date = datetime.date(2025, 1, 1),
+        description = description,
+        amount = amount,
+        account = account,
+        cost_center_name = "Meals",
+    )
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path}/writer.db")
+    init_db(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def writer(engine):
+    writer = WriteQueue(engine, max_batch=64, max_delay=0.05)
+    yield writer
+    writer.stop()
+
+
+def _descriptions(engine):
+    with make_sessionmaker(engine)() as db:
+        return sorted(d for (d,) in db.query(Transaction.description))
+
+
+# ---------------------------
+# Group commit
+# ---------------------------
+def test_concurrent_writes_share_commits(engine, writer):
+    gate = threading.Event()
+    writer.submit(lambda db: gate.wait())  # hold the writer so the rest queue up together
+
+    futures = [
+        writer.submit(lambda db, i=i: operations.create_transaction(db, _txn(f"txn {i}")).id)
+        for i in range(20)
+    ]
+    gate.set()
+
+    ids = [f.result(timeout=10) for f in futures]
+    assert len(set(ids)) == 20
+    assert len(_descriptions(engine)) == 20
+    assert writer.operations == 21
+    assert writer.batches < 21
+
+
+def test_failed_operation_rolls_back_only_itself(engine, writer):
+    def fail(db):
+        operations.create_transaction(db, _txn("doomed"))
+        raise RuntimeError("boom")
+
+    gate = threading.Event()
+    writer.submit(lambda db: gate.wait())
+    before = writer.submit(lambda db: operations.create_transaction(db, _txn("before")).id)
+    failed = writer.submit(fail)
+    after = writer.submit(lambda db: operations.create_transaction(db, _txn("after")).id)
+    gate.set()
+
+    assert before.result(timeout=10) and after.result(timeout=10)
+    with pytest.raises(RuntimeError, match="boom"):
+        failed.result(timeout=10)
+    assert _descriptions(engine) == ["after", "before"]
+
+
+def test_changes_publish_after_outer_commit(engine, writer):
+    seen = []
+
+    def listener(bound_engine, changes):
+        if bound_engine is engine:
+            # Published changes must already be visible to other connections
+            seen.append((changes.transaction_ids, _descriptions(engine)))
+
+    events.subscribe(listener)
+    try:
+        txn_id = writer.submit(lambda db: operations.create_transaction(db, _txn("visible")).id).result(timeout=10)
+    finally:
+        events._subscribers.remove(listener)
+
+    assert seen == [({txn_id}, ["visible"])]
+
+
+# ---------------------------
+# API
+# ---------------------------
+def test_concurrent_api_writes_do_not_lock(tmp_path):
+    app = create_app(Settings(database_url=f"sqlite:///{tmp_path}/api.db"))
+
+    with TestClient(app) as client:
+        created = client.post("/transactions/", json={
+            "date": "2025-01-01", "description": "Seed", "amount": -1.0, "account": "Discover",
+        }).json()
+
+        def put(i):
+            return client.put(f"/transactions/{created['id']}", json={"description": f"Edit {i}"}).status_code
+
+        def post(i):
+            return client.post("/transactions/", json={
+                "date": "2025-01-02", "description": f"New {i}", "amount": -2.0, "account": "Amex",
+            }).status_code
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            statuses = list(pool.map(put, range(20))) + list(pool.map(post, range(20)))
+
+        assert set(statuses) == {200}
+        assert client.get("/transactions/").json()["count"] == 21
+        assert client.delete(f"/transactions/{created['id']}").status_code == 200
+        assert client.delete(f"/transactions/{created['id']}").status_code == 404
+
+    app.state.engine.dispose()